@@ -1,24 +1,282 @@
+import importlib
 import os
-import sqlite3
-import pandas as pd
+import queue
+import threading
+import time
 import customtkinter as ctk
-from tkinter import filedialog, messagebox
-import pdfplumber
-import re
+from tkinter import filedialog, messagebox, ttk
 from datetime import datetime
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils.dataframe import dataframe_to_rows
 
-# Configuração Visual
-ctk.set_appearance_mode("Dark")
-ctk.set_default_color_theme("blue")
+# Só módulos leves aqui: pandas (banco, pipeline, sincronização), openpyxl
+# (Excel) e pdfplumber são importados no primeiro uso, para a janela abrir
+# rápido (medido por benchmarks/inicializacao.py)
+from ret.cache import CacheExtracao
+from ret.config import NOME_BANCO, NOME_EXCEL, NOME_METRICAS
+from ret.descoberta import TIPO_OUTROS, TIPOS_POR_PASTA, RegrasDescoberta
+from ret.extracao import EstrategiaPaginas
+from ret.metricas import MetricasExecucao
+from ret.resumo import formatar_brl
+from ret.supervisao import DESCRICAO_FALHAS, LimitesExtracao
+from ret.tabela import ModeloTabela
+
+# Processos usados na extração dos PDFs (None = todos os núcleos da máquina)
+WORKERS_EXTRACAO = None
+
+# Reaproveita o texto/campos de PDFs já lidos em execuções anteriores
+USAR_CACHE_EXTRACAO = True
+
+# Páginas lidas de cada PDF (veja EstrategiaPaginas em ret/extracao.py).
+# Ex.: EstrategiaPaginas('completar', max_paginas=3, incluir_ultima=True, rapido=True)
+# OCR das páginas escaneadas (exige o Tesseract; ConfigOCR em ret/ocr.py):
+# EstrategiaPaginas(ocr=ConfigOCR(workers=1, idioma='por'))
+ESTRATEGIA_PAGINAS = EstrategiaPaginas()
+
+# Arquivos considerados na pasta (padrões glob; veja ret/descoberta.py).
+# Ex.: RegrasDescoberta(excluir=('backup*', 'EAT/2023*'))
+REGRAS_DESCOBERTA = RegrasDescoberta()
+
+# Limites de cada PDF (tempo em s, memória em MB; None desativa): o PDF que
+# passar do limite é interrompido e aparece na aba Sem Valores com o motivo
+LIMITES_EXTRACAO = LimitesExtracao()
+
+# Perfil do processamento (aba Performance): None, 'cprofile' ou 'tracemalloc'.
+# O perfil cobre a thread de processamento; a extração só entra nele com
+# WORKERS_EXTRACAO = 1 e LIMITES_EXTRACAO = LimitesExtracao(None, None)
+PERFIL_EXECUCAO = None
+
+# Intervalo (ms) em que a interface consome os eventos do processamento
+INTERVALO_FILA_MS = 100
+
+# Linhas mantidas na aba Logs (as mais antigas são descartadas)
+MAX_LINHAS_LOG = 5000
+
+# Opções "sem filtro" das listas da Consulta ao Banco
+TODOS_TIPOS = "Todos os tipos"
+TODAS_NOTAS = "Débito e Crédito"
+
+# Módulos pesados importados em segundo plano depois que a janela aparece
+# (None em ATRASO_AQUECIMENTO_MS desativa: a importação fica para o primeiro uso)
+MODULOS_AQUECIMENTO = ('ret.pipeline', 'ret.sincronizacao', 'ret.excel', 'pdfplumber', 'PyPDF2')
+ATRASO_AQUECIMENTO_MS = 500
+
+
+def aquecer_importacoes(modulos=MODULOS_AQUECIMENTO):
+    """Importa os módulos pesados (executado em uma thread, fora da interface)"""
+    for modulo in modulos:
+        try:
+            importlib.import_module(modulo)
+        except ImportError:
+            pass  # Dependência opcional ausente (PyPDF2): fica para o uso normal
+
+class TabelaVirtual(ctk.CTkFrame):
+    """Tabela que materializa só as linhas visíveis (Dados Detalhados)
+
+    A Treeview tem apenas os itens que cabem na altura do widget; ao rolar,
+    ordenar ou filtrar, os mesmos itens recebem os valores da janela atual
+    do modelo. Só os itens da Treeview e o redesenho não dependem da
+    quantidade de registros: o ModeloTabela guarda as colunas exibidas de
+    todos eles e, depois de preparar(), uma ordem por coluna e o texto de
+    filtro de cada linha. Com o ModeloTabelaBanco (consulta ao banco) só a
+    janela exibida é lida.
+    """
+
+    ALTURA_LINHA = 22
+    ALTURA_CABECALHO = 26
+    LINHAS_POR_PASSO_RODA = 3
+    ATRASO_FILTRO_MS = 200
+
+    def __init__(self, master, modelo, **kwargs):
+        super().__init__(master, fg_color="transparent", **kwargs)
+        self.modelo = modelo
+        self.inicio = 0
+        self.itens = []
+        self.anexados = 0
+        self._filtro_agendado = None
+
+        # Barra de filtro
+        barra = ctk.CTkFrame(self, fg_color="transparent")
+        barra.pack(fill="x", pady=(0, 5))
+
+        ctk.CTkLabel(barra, text="Filtrar:", font=("Roboto", 11, "bold")).pack(side="left", padx=(0, 5))
+
+        self.var_filtro = ctk.StringVar()
+        self.var_filtro.trace_add("write", lambda *_: self._agendar_filtro())
+        ctk.CTkEntry(barra, textvariable=self.var_filtro, width=220).pack(side="left", padx=5)
+
+        self.opcoes_coluna = ["Todas as colunas"] + [c.titulo for c in modelo.colunas]
+        self.menu_coluna = ctk.CTkOptionMenu(
+            barra,
+            values=self.opcoes_coluna,
+            width=160,
+            command=lambda _: self._aplicar_filtro()
+        )
+        self.menu_coluna.pack(side="left", padx=5)
+
+        self.lbl_contagem = ctk.CTkLabel(barra, text="", font=("Roboto", 11))
+        self.lbl_contagem.pack(side="right", padx=5)
+
+        # Estilo escuro da Treeview
+        estilo = ttk.Style(self)
+        estilo.theme_use("clam")
+        estilo.configure(
+            "RET.Treeview",
+            background="#34495e", foreground="white", fieldbackground="#2b2b2b",
+            rowheight=self.ALTURA_LINHA, font=("Roboto", 10), borderwidth=0
+        )
+        estilo.configure(
+            "RET.Treeview.Heading",
+            background="#2c3e50", foreground="white", font=("Roboto", 11, "bold"), relief="flat"
+        )
+        estilo.map("RET.Treeview.Heading", background=[("active", "#3d566e")])
+
+        corpo = ctk.CTkFrame(self, fg_color="transparent")
+        corpo.pack(fill="both", expand=True)
+
+        self.nomes = [f"c{i}" for i in range(len(modelo.colunas))]
+        self.tree = ttk.Treeview(
+            corpo, columns=self.nomes, show="headings", style="RET.Treeview",
+            selectmode="none", height=1
+        )
+        for i, coluna in enumerate(modelo.colunas):
+            self.tree.heading(self.nomes[i], text=coluna.titulo, command=lambda i=i: self.ordenar(i))
+            self.tree.column(
+                self.nomes[i], width=coluna.largura, minwidth=40,
+                anchor="e" if coluna.tipo == "numero" else "w"
+            )
+
+        self.scroll = ctk.CTkScrollbar(corpo, command=self._rolar_barra)
+        self.scroll.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self.tree.bind("<Configure>", self._redimensionar)
+        self.tree.bind("<MouseWheel>", self._rolar_roda)
+        self.tree.bind("<Button-4>", self._rolar_roda)
+        self.tree.bind("<Button-5>", self._rolar_roda)
+
+        self._desenhar()
+
+    def definir_registros(self, registros, taxas=None):
+        """Exibe uma nova lista de registros (limpa o filtro e volta ao topo)"""
+        if isinstance(self.modelo, ModeloTabela):
+            self.modelo.definir_registros(registros, taxas)
+            self._reiniciar()
+            return
+        modelo = ModeloTabela(colunas=self.modelo.colunas)
+        modelo.definir_registros(registros, taxas)
+        self.definir_modelo(modelo)
+
+    def definir_modelo(self, modelo):
+        """Troca o modelo exibido (ex.: ModeloTabelaBanco); o anterior é fechado"""
+        anterior, self.modelo = self.modelo, modelo
+        if anterior is not modelo and hasattr(anterior, 'fechar'):
+            anterior.fechar()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        """Limpa o filtro e volta ao topo depois de trocar os registros"""
+        if self._filtro_agendado is not None:
+            self.after_cancel(self._filtro_agendado)
+            self._filtro_agendado = None
+        self.var_filtro.set("")
+        self.menu_coluna.set(self.opcoes_coluna[0])
+        self.modelo.filtrar("")
+        self.inicio = 0
+        self._atualizar_cabecalhos()
+        self._desenhar()
+        # Ordens e textos de filtro calculados fora da thread da interface
+        threading.Thread(target=self.modelo.preparar, daemon=True).start()
+
+    def ordenar(self, indice_coluna):
+        """Ordena pela coluna clicada (novo clique inverte a ordem)"""
+        self.modelo.ordenar(indice_coluna)
+        self.inicio = 0
+        self._atualizar_cabecalhos()
+        self._desenhar()
+
+    def _atualizar_cabecalhos(self):
+        for i, coluna in enumerate(self.modelo.colunas):
+            seta = ""
+            if i == self.modelo.coluna_ordem:
+                seta = " ▼" if self.modelo.decrescente else " ▲"
+            self.tree.heading(self.nomes[i], text=coluna.titulo + seta)
+
+    def _agendar_filtro(self):
+        """Aplica o filtro só quando a digitação pausa"""
+        if self._filtro_agendado is not None:
+            self.after_cancel(self._filtro_agendado)
+        self._filtro_agendado = self.after(self.ATRASO_FILTRO_MS, self._aplicar_filtro)
+
+    def _aplicar_filtro(self):
+        self._filtro_agendado = None
+        indice_coluna = self.opcoes_coluna.index(self.menu_coluna.get()) - 1
+        self.modelo.filtrar(self.var_filtro.get(), None if indice_coluna < 0 else indice_coluna)
+        self.inicio = 0
+        self._desenhar()
+
+    def _redimensionar(self, event):
+        """Ajusta a quantidade de itens reaproveitados à altura disponível"""
+        quantidade = max(1, (event.height - self.ALTURA_CABECALHO) // self.ALTURA_LINHA)
+        if quantidade == len(self.itens):
+            return
+        while len(self.itens) < quantidade:
+            # Novos itens começam fora da Treeview; _desenhar os anexa na posição
+            item = self.tree.insert("", "end", values=())
+            self.tree.detach(item)
+            self.itens.append(item)
+        if len(self.itens) > quantidade:
+            excedentes = self.itens[quantidade:]
+            del self.itens[quantidade:]
+            self.tree.delete(*excedentes)
+            self.anexados = min(self.anexados, quantidade)
+        self._desenhar()
+
+    def _desenhar(self):
+        """Copia para os itens da Treeview a janela atual do modelo"""
+        total = len(self.modelo)
+        quantidade = len(self.itens)
+        self.inicio = max(0, min(self.inicio, total - quantidade))
+
+        linhas = self.modelo.linhas(self.inicio, quantidade)
+        for item, valores in zip(self.itens, linhas):
+            self.tree.item(item, values=valores)
+
+        # Itens sem linha correspondente saem da Treeview (e voltam quando necessário)
+        if len(linhas) < self.anexados:
+            self.tree.detach(*self.itens[len(linhas):self.anexados])
+        else:
+            for posicao in range(self.anexados, len(linhas)):
+                self.tree.move(self.itens[posicao], "", posicao)
+        self.anexados = len(linhas)
+
+        if total:
+            self.scroll.set(self.inicio / total, (self.inicio + len(linhas)) / total)
+        else:
+            self.scroll.set(0, 1)
+        self.lbl_contagem.configure(text=f"{total} de {self.modelo.total} linhas")
+
+    def _rolar_barra(self, *args):
+        """Comandos da barra de rolagem: ('moveto', fração) ou ('scroll', n, 'units'|'pages')"""
+        if args[0] == "moveto":
+            self.inicio = int(float(args[1]) * len(self.modelo))
+        elif args[0] == "scroll":
+            passo = len(self.itens) if args[2] == "pages" else 1
+            self.inicio += int(args[1]) * passo
+        self._desenhar()
+
+    def _rolar_roda(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.inicio -= self.LINHAS_POR_PASSO_RODA
+        else:
+            self.inicio += self.LINHAS_POR_PASSO_RODA
+        self._desenhar()
+        return "break"
 
-# Taxa de câmbio EUR → BRL (ajuste conforme a cotação desejada)
-TAXA_EUR_BRL = 6.0
 
 class SistemaRET(ctk.CTk):
     def __init__(self):
+        # Configuração Visual
+        ctk.set_appearance_mode("Dark")
+        ctk.set_default_color_theme("blue")
         super().__init__()
         
         self.title("Sistema RET - Processamento de PDFs")
@@ -26,10 +284,30 @@ class SistemaRET(ctk.CTk):
         
         # Dados
         self.pasta_selecionada = None
-        self.dados_processados = []
         self.resultados = None
+        self.sem_valores = []
+        self.tabela = None
+        self.metricas = None
+        
+        # Processamento em segundo plano: a thread só publica eventos na fila
+        # e a interface os consome periodicamente com after()
+        self.fila_eventos = queue.Queue()
+        self.evento_cancelar = threading.Event()
+        self.thread_processamento = None
+        self.inicio_processamento = None
+        # Modo vigia: thread própria, parada pelo evento dela
+        self.thread_vigia = None
+        self.evento_parar_vigia = threading.Event()
+        self.vigia_pendente = None
         
         self._setup_ui()
+        self.after(INTERVALO_FILA_MS, self._drenar_fila)
+        if ATRASO_AQUECIMENTO_MS is not None:
+            self.after(ATRASO_AQUECIMENTO_MS, self._aquecer)
+    
+    def _aquecer(self):
+        """Carrega pandas, openpyxl e pdfplumber em segundo plano, com a janela já aberta"""
+        threading.Thread(target=aquecer_importacoes, name='ret-aquecimento', daemon=True).start()
     
     def _setup_ui(self):
         # HEADER
@@ -85,8 +363,27 @@ class SistemaRET(ctk.CTk):
             hover_color="#1976D2"
         ).pack(pady=10, padx=20, fill="x")
         
+        # MODO INCREMENTAL (só PDFs novos/alterados, atualizando o banco)
+        self.var_incremental = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            left,
+            text="Modo incremental (atualiza RET_dados.db)",
+            variable=self.var_incremental,
+            font=("Roboto", 12)
+        ).pack(pady=(20, 0), padx=20, anchor="w")
+        
+        # MODO VIGIA (grava no banco os PDFs que chegarem à pasta, veja ret/vigia.py)
+        self.var_vigia = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            left,
+            text="Vigiar pasta (atualiza o banco ao chegar PDF)",
+            variable=self.var_vigia,
+            command=self.alternar_vigia,
+            font=("Roboto", 12)
+        ).pack(pady=(10, 0), padx=20, anchor="w")
+        
         # BOTÃO PROCESSAR
-        ctk.CTkButton(
+        self.btn_processar = ctk.CTkButton(
             left,
             text="PROCESSAR PDFs",
             command=self.processar,
@@ -94,7 +391,78 @@ class SistemaRET(ctk.CTk):
             font=("Roboto", 16, "bold"),
             fg_color="#4CAF50",
             hover_color="#45a049"
-        ).pack(pady=30, padx=20, fill="x")
+        )
+        self.btn_processar.pack(pady=(30, 10), padx=20, fill="x")
+        
+        self.btn_cancelar = ctk.CTkButton(
+            left,
+            text="Cancelar",
+            command=self.cancelar,
+            height=35,
+            font=("Roboto", 14, "bold"),
+            fg_color="#E53935",
+            hover_color="#C62828",
+            state="disabled"
+        )
+        self.btn_cancelar.pack(pady=(0, 20), padx=20, fill="x")
+        
+        # PROGRESSO
+        self.barra_progresso = ctk.CTkProgressBar(left)
+        self.barra_progresso.set(0)
+        self.barra_progresso.pack(pady=(0, 10), padx=20, fill="x")
+        
+        self.lbl_progresso = ctk.CTkLabel(
+            left,
+            text="",
+            font=("Roboto", 12),
+            justify="left"
+        )
+        self.lbl_progresso.pack(padx=20, anchor="w")
+        
+        self.lbl_arquivo_atual = ctk.CTkLabel(
+            left,
+            text="",
+            font=("Roboto", 11),
+            wraplength=350,
+            justify="left",
+            text_color="#808080"
+        )
+        self.lbl_arquivo_atual.pack(padx=20, anchor="w")
+        
+        # CONSULTA AO BANCO (resultados lidos do RET_dados.db, sem reprocessar os PDFs)
+        ctk.CTkLabel(
+            left,
+            text="Consulta ao Banco",
+            font=("Roboto", 20, "bold")
+        ).pack(pady=(30, 10), padx=20, anchor="w")
+        
+        filtros = ctk.CTkFrame(left, fg_color="transparent")
+        filtros.pack(padx=20, fill="x")
+        filtros.grid_columnconfigure((0, 1), weight=1)
+        
+        self.ent_empresa = ctk.CTkEntry(filtros, placeholder_text="Empresa (todas)")
+        self.ent_empresa.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 5))
+        self.cmb_tipo = ctk.CTkOptionMenu(
+            filtros, values=[TODOS_TIPOS] + [tipo for tipo, _ in TIPOS_POR_PASTA] + [TIPO_OUTROS]
+        )
+        self.cmb_tipo.grid(row=1, column=0, sticky="ew", padx=(0, 5), pady=(0, 5))
+        self.cmb_nota = ctk.CTkOptionMenu(filtros, values=[TODAS_NOTAS, "Débito", "Crédito"])
+        self.cmb_nota.grid(row=1, column=1, sticky="ew", pady=(0, 5))
+        self.ent_de = ctk.CTkEntry(filtros, placeholder_text="De (DD/MM/AAAA)")
+        self.ent_de.grid(row=2, column=0, sticky="ew", padx=(0, 5))
+        self.ent_ate = ctk.CTkEntry(filtros, placeholder_text="Até (DD/MM/AAAA)")
+        self.ent_ate.grid(row=2, column=1, sticky="ew")
+        
+        self.btn_consultar = ctk.CTkButton(
+            left,
+            text="CARREGAR DO BANCO",
+            command=self.carregar_banco,
+            height=40,
+            font=("Roboto", 14, "bold"),
+            fg_color="#7E57C2",
+            hover_color="#5E35B1"
+        )
+        self.btn_consultar.pack(pady=10, padx=20, fill="x")
         
         # PAINEL DIREITO - Resultados
         right = ctk.CTkFrame(main, corner_radius=15)
@@ -114,6 +482,7 @@ class SistemaRET(ctk.CTk):
         self.tabview.add("Dados Detalhados")
         self.tabview.add("Logs")
         self.tabview.add("Sem Valores")
+        self.tabview.add("Performance")
         
         # ABA RESUMO
         self.frame_resumo = ctk.CTkScrollableFrame(self.tabview.tab("Resumo"))
@@ -128,8 +497,11 @@ class SistemaRET(ctk.CTk):
         self.lbl_stats.pack(pady=20, padx=20, anchor="w")
         
         # ABA DADOS DETALHADOS
-        self.frame_dados = ctk.CTkScrollableFrame(self.tabview.tab("Dados Detalhados"))
-        self.frame_dados.pack(fill="both", expand=True)
+        self.tabela_dados = TabelaVirtual(
+            self.tabview.tab("Dados Detalhados"),
+            ModeloTabela()
+        )
+        self.tabela_dados.pack(fill="both", expand=True)
         
         # ABA LOGS
         self.txt_logs = ctk.CTkTextbox(
@@ -146,6 +518,22 @@ class SistemaRET(ctk.CTk):
         self.txt_sem_valores.pack(fill="both", expand=True, padx=10, pady=10)
         self.txt_sem_valores.insert("end", "Nenhum processamento realizado.\nSelecione a pasta e clique em PROCESSAR PDFs.")
         
+        # ABA PERFORMANCE (tempos por etapa e arquivos mais lentos)
+        ctk.CTkButton(
+            self.tabview.tab("Performance"),
+            text="Exportar relatório",
+            command=self.exportar_metricas,
+            width=160,
+            height=30
+        ).pack(padx=10, pady=(10, 0), anchor="e")
+        self.txt_performance = ctk.CTkTextbox(
+            self.tabview.tab("Performance"),
+            font=("Consolas", 11),
+            wrap="none"
+        )
+        self.txt_performance.pack(fill="both", expand=True, padx=10, pady=10)
+        self.txt_performance.insert("end", "Nenhum processamento realizado.")
+        
         # RODAPÉ
         footer = ctk.CTkFrame(self, height=100, corner_radius=15, fg_color="#1a1a2e")
         footer.pack(fill="x", padx=20, pady=(0, 20))
@@ -194,11 +582,62 @@ class SistemaRET(ctk.CTk):
         ).pack(side="left", padx=5)
     
     def log(self, mensagem):
-        """Adiciona mensagem ao log"""
+        """Adiciona mensagem ao log (pode ser chamado de qualquer thread)"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.txt_logs.insert("end", f"[{timestamp}] {mensagem}\n")
-        self.txt_logs.see("end")
-        self.update()
+        self.fila_eventos.put(('log', f"[{timestamp}] {mensagem}\n"))
+    
+    def _drenar_fila(self):
+        """Consome os eventos do processamento e atualiza a interface em lote"""
+        linhas = []
+        progresso = None
+        fim = None
+        vigia = None
+        
+        try:
+            while True:
+                evento = self.fila_eventos.get_nowait()
+                if evento[0] == 'log':
+                    linhas.append(evento[1])
+                elif evento[0] == 'progresso':
+                    progresso = evento
+                elif evento[0] == 'vigia':
+                    vigia = evento[1]
+                else:
+                    fim = evento
+                    break
+        except queue.Empty:
+            pass
+        
+        # Um único insert por ciclo, independente de quantas linhas chegaram
+        if linhas:
+            self.txt_logs.insert("end", "".join(linhas))
+            excesso = int(self.txt_logs.index("end-1c").split(".")[0]) - MAX_LINHAS_LOG
+            if excesso > 0:
+                self.txt_logs.delete("1.0", f"{excesso + 1}.0")
+            self.txt_logs.see("end")
+        
+        if progresso is not None:
+            self._atualizar_progresso(*progresso[1:])
+        
+        if fim is not None:
+            self._finalizar_processamento(fim)
+        elif vigia is not None:
+            self._atualizar_pela_vigia(vigia)
+        
+        self.after(INTERVALO_FILA_MS, self._drenar_fila)
+    
+    def _atualizar_progresso(self, feitos, total, arquivo):
+        """Atualiza barra, arquivo atual, taxa (arquivos/s) e tempo restante"""
+        decorrido = time.monotonic() - self.inicio_processamento
+        taxa = feitos / decorrido if decorrido > 0 else 0
+        restante = (total - feitos) / taxa if taxa > 0 else 0
+        minutos, segundos = divmod(int(restante), 60)
+        
+        self.barra_progresso.set(feitos / total if total else 0)
+        self.lbl_progresso.configure(
+            text=f"{feitos}/{total} arquivos | {taxa:.1f} arq/s | restante {minutos:02d}:{segundos:02d}"
+        )
+        self.lbl_arquivo_atual.configure(text=arquivo)
     
     def selecionar_pasta(self):
         """Seleciona pasta para processamento"""
@@ -212,181 +651,331 @@ class SistemaRET(ctk.CTk):
             )
             self.log(f"Pasta selecionada: {pasta}")
     
-    def extrair_dados_pdf(self, caminho_pdf):
-        """Extrai informações estruturadas do PDF"""
-        dados = {
-            'arquivo': os.path.basename(caminho_pdf),
-            'caminho': caminho_pdf,
-            'tipo_encargo': self._identificar_tipo(caminho_pdf),
-            'empresa': self._extrair_empresa(caminho_pdf),
-            'nota_tipo': self._extrair_tipo_nota(caminho_pdf),
-            'numero_nd': '',
-            'data_vencimento': '',
-            'valor_total': 0.0,
-            'quantidade': 0.0,
-            'valor_unitario': 0.0,
-            'valores_encontrados': []
-        }
+    def processar(self):
+        """Processa todos os PDFs da pasta selecionada (em segundo plano)"""
+        if not self.pasta_selecionada:
+            messagebox.showwarning("Aviso", "Selecione uma pasta primeiro!")
+            return
         
-        try:
-            with pdfplumber.open(caminho_pdf) as pdf:
-                texto_completo = ''
-                
-                for pagina in pdf.pages:
-                    texto = pagina.extract_text()
-                    if texto:
-                        texto_completo += texto + '\n'
-                
-                # Extrair número ND
-                nd_match = re.search(r'ND\s*[:\-]?\s*(\d+)', texto_completo, re.IGNORECASE)
-                if nd_match:
-                    dados['numero_nd'] = nd_match.group(1)
-                
-                # Extrair data
-                data_match = re.search(r'(\d{2}[/-]\d{2}[/-]\d{4})', texto_completo)
-                if data_match:
-                    dados['data_vencimento'] = data_match.group(1)
-                
-                # Extrair valores
-                padroes_valores = [
-                    r'R\$\s*(\d{1,3}(?:\.\d{3})*(?:,\d{2})?)',
-                    r'€\s*(\d{1,3}(?:\.\d{3})*(?:,\d{2})?)',
-                    r'(\d{1,3}(?:\.\d{3})*,\d{2})',
-                ]
-                
-                for padrao in padroes_valores:
-                    matches = re.findall(padrao, texto_completo)
-                    for match in matches:
-                        valor_str = match.replace('.', '').replace(',', '.')
-                        try:
-                            valor = float(valor_str)
-                            if valor > 0:
-                                dados['valores_encontrados'].append(valor)
-                        except:
-                            pass
-                
-                # Calcular valores principais
-                if dados['valores_encontrados']:
-                    dados['valor_total'] = max(dados['valores_encontrados'])
-                    
-                    # Tentar encontrar quantidade
-                    qt_match = re.search(r'(?:QT|Quantidade)[:\s]*(\d+(?:[.,]\d+)?)', texto_completo, re.IGNORECASE)
-                    if qt_match:
-                        dados['quantidade'] = float(qt_match.group(1).replace(',', '.'))
-                    
-                    if dados['quantidade'] > 0:
-                        dados['valor_unitario'] = dados['valor_total'] / dados['quantidade']
-                
-        except Exception as e:
-            self.log(f"Erro ao processar {caminho_pdf}: {e}")
+        if self.thread_processamento is not None and self.thread_processamento.is_alive():
+            return
         
-        return dados
+        self.log("="*60)
+        self.log("INICIANDO PROCESSAMENTO")
+        self.log("="*60)
+        
+        self.evento_cancelar.clear()
+        self.inicio_processamento = time.monotonic()
+        self.barra_progresso.set(0)
+        self.lbl_progresso.configure(text="Listando PDFs...")
+        self.lbl_arquivo_atual.configure(text="")
+        self.btn_processar.configure(state="disabled")
+        self.btn_consultar.configure(state="disabled")
+        self.btn_cancelar.configure(state="normal")
+        
+        self.thread_processamento = threading.Thread(
+            target=self._executar_processamento,
+            args=(self.pasta_selecionada, self.var_incremental.get()),
+            daemon=True
+        )
+        self.thread_processamento.start()
     
-    def _identificar_tipo(self, caminho):
-        """Identifica tipo de encargo pela pasta"""
-        if 'EAT' in caminho.upper():
-            return 'EAT'
-        elif 'PENALIDADE' in caminho.upper():
-            return 'Penalidades'
-        elif 'TOP' in caminho.upper():
-            return 'TOP'
-        return 'Outros'
+    def _filtro_consulta(self):
+        """FiltroConsulta dos campos da Consulta ao Banco (ValueError se a data for inválida)"""
+        from ret.consulta import FiltroConsulta, condicoes
+        
+        tipo = self.cmb_tipo.get()
+        nota = self.cmb_nota.get()
+        filtro = FiltroConsulta(
+            empresa=self.ent_empresa.get().strip() or None,
+            tipo_encargo=None if tipo == TODOS_TIPOS else tipo,
+            nota_tipo=None if nota == TODAS_NOTAS else nota,
+            inicio=self.ent_de.get().strip() or None,
+            fim=self.ent_ate.get().strip() or None
+        )
+        condicoes(filtro)  # valida as datas antes de iniciar a consulta
+        return filtro
     
-    def _extrair_empresa(self, caminho):
-        """Extrai nome da empresa do nome do arquivo"""
-        nome = os.path.basename(caminho).upper()
-        empresas_conhecidas = [
-            'COPERGAS', 'AMBEV', 'CBA', 'CERVEJARIA', 'DEXCO', 'GERDAU',
-            'INDORAMA', 'INGREDION', 'KLABIN', 'MONDELEZ', 'NISSIN', 'VETRUS',
-            'M DIAS BRANCO', 'PETROBRAS', 'GALP'
-        ]
-        
-        for empresa in empresas_conhecidas:
-            if empresa in nome:
-                return empresa
-        
-        return 'N/A'
+    def carregar_banco(self):
+        """Exibe os dados do RET_dados.db (com os filtros), sem reprocessar os PDFs"""
+        if self.thread_processamento is not None and self.thread_processamento.is_alive():
+            return
+        
+        db_path = os.path.join(self.pasta_selecionada, NOME_BANCO) if self.pasta_selecionada else None
+        if db_path is None or not os.path.isfile(db_path):
+            db_path = filedialog.askopenfilename(
+                title="Selecione o banco RET",
+                filetypes=[("Banco SQLite", "*.db"), ("Todos os arquivos", "*.*")]
+            )
+            if not db_path:
+                return
+            # Salvar/exportar passam a usar a pasta do banco
+            self.pasta_selecionada = os.path.dirname(db_path)
+            self.lbl_pasta.configure(text=f"Pasta: {self.pasta_selecionada}", text_color="#4CAF50")
+        
+        try:
+            filtro = self._filtro_consulta()
+        except ValueError as e:
+            messagebox.showwarning("Aviso", str(e))
+            return
+        self._iniciar_consulta(db_path, filtro)
     
-    def _extrair_tipo_nota(self, caminho):
-        """Identifica se é Nota Débito ou Crédito"""
-        nome = os.path.basename(caminho).upper()
+    def _iniciar_consulta(self, db_path, filtro):
+        """Dispara a thread da consulta ao banco"""
+        self.inicio_processamento = time.monotonic()
+        self.lbl_progresso.configure(text="Consultando o banco...")
+        self.btn_processar.configure(state="disabled")
+        self.btn_consultar.configure(state="disabled")
         
-        if 'ND' in nome or 'DEBITO' in nome or 'DÉBITO' in nome:
-            return 'Débito'
-        elif 'NC' in nome or 'CREDITO' in nome or 'CRÉDITO' in nome:
-            return 'Crédito'
+        self.thread_processamento = threading.Thread(
+            target=self._executar_consulta,
+            args=(db_path, filtro),
+            daemon=True
+        )
+        self.thread_processamento.start()
+    
+    def _executar_consulta(self, db_path, filtro):
+        """Corpo da thread da consulta: resumos e contagens pelo SQLite, sem ler as linhas"""
+        from ret.consulta import descrever
         
-        return 'N/A'
+        metricas = MetricasExecucao()
+        try:
+            with metricas.etapa('consulta'):
+                resultados, sem_valores, tabela = self._ler_banco(db_path, filtro)
+            self.log(f"[OK] Banco consultado: {db_path}")
+            self.fila_eventos.put(('fim', resultados, sem_valores, metricas, False, descrever(filtro), tabela))
+        except Exception as e:
+            self.log(f"[ERRO] Falha na consulta: {e}")
+            self.fila_eventos.put(('erro', e))
     
-    def processar(self):
-        """Processa todos os PDFs da pasta selecionada"""
+    def _ler_banco(self, db_path, filtro=None):
+        """Resumos, registros sem valor e tabela do banco (threads de consulta e processamento)
+
+        Os resumos vêm de GROUP BY (ResumoBanco) e a tabela lê só a janela
+        exibida (ModeloTabelaBanco): as linhas do banco não são carregadas.
+        """
+        from ret.cambio import obter_cambio
+        from ret.consulta import SEM_FILTRO, ResumoBanco, registros_sem_valores
+        from ret.tabela import ModeloTabelaBanco
+        
+        filtro = filtro or SEM_FILTRO
+        taxa = obter_cambio()
+        resumo = ResumoBanco(db_path, filtro, taxa)
+        sem_valores = registros_sem_valores(db_path, filtro)
+        tabela = ModeloTabelaBanco(db_path, filtro, taxa)
+        return resumo, sem_valores, tabela
+    
+    def alternar_vigia(self):
+        """Liga/desliga o modo vigia na pasta selecionada"""
+        if not self.var_vigia.get():
+            self.evento_parar_vigia.set()
+            self.log("Encerrando o vigia...")
+            return
         if not self.pasta_selecionada:
+            self.var_vigia.set(False)
             messagebox.showwarning("Aviso", "Selecione uma pasta primeiro!")
             return
         
-        self.log("="*60)
-        self.log("INICIANDO PROCESSAMENTO")
-        self.log("="*60)
+        self.evento_parar_vigia = threading.Event()
+        self.thread_vigia = threading.Thread(
+            target=self._executar_vigia,
+            args=(self.pasta_selecionada, self.evento_parar_vigia),
+            name='ret-vigia',
+            daemon=True
+        )
+        self.thread_vigia.start()
+    
+    def _executar_vigia(self, pasta, parar):
+        """Corpo da thread do vigia: a cada lote gravado pede a atualização da tabela"""
+        from ret.vigia import vigiar
+        
+        db_path = os.path.join(pasta, NOME_BANCO)
         
-        self.dados_processados = []
-        arquivos_processados = 0
-        
-        for raiz, _, ficheiros in os.walk(self.pasta_selecionada):
-            for ficheiro in ficheiros:
-                if ficheiro.lower().endswith('.pdf'):
-                    caminho_completo = os.path.join(raiz, ficheiro)
-                    
-                    self.log(f"[PDF] Processando: {ficheiro}")
-                    
-                    dados_pdf = self.extrair_dados_pdf(caminho_completo)
-                    
-                    if dados_pdf['valores_encontrados']:
-                        self.dados_processados.append(dados_pdf)
-                        self.log(f"   [OK] {len(dados_pdf['valores_encontrados'])} valores")
-                    else:
-                        self.dados_processados.append(dados_pdf)
-                        self.log(f"   [AVISO] Sem valores")
-                    
-                    arquivos_processados += 1
+        def ao_atualizar(resultado):
+            if resultado['novos'] + resultado['alterados'] + resultado['removidos']:
+                self.fila_eventos.put(('vigia', db_path))
+        
+        cache = None
+        try:
+            cache = CacheExtracao() if USAR_CACHE_EXTRACAO else None
+            vigiar(
+                pasta,
+                db_path,
+                log=self.log,
+                parar=parar,
+                ao_atualizar=ao_atualizar,
+                regras=REGRAS_DESCOBERTA,
+                workers=WORKERS_EXTRACAO,
+                cache=cache,
+                estrategia=ESTRATEGIA_PAGINAS,
+                limites=LIMITES_EXTRACAO
+            )
+        except Exception as e:
+            self.log(f"[ERRO] Falha no vigia: {e}")
+        finally:
+            if cache is not None:
+                cache.fechar()
+    
+    def _atualizar_pela_vigia(self, db_path):
+        """Reexibe o banco depois de uma gravação do vigia (ou ao fim do que estiver em andamento)"""
+        if self.thread_processamento is not None and self.thread_processamento.is_alive():
+            self.vigia_pendente = db_path
+            return
+        try:
+            filtro = self._filtro_consulta()
+        except ValueError:
+            return
+        self._iniciar_consulta(db_path, filtro)
+    
+    def cancelar(self):
+        """Pede a interrupção do processamento em andamento"""
+        if self.thread_processamento is not None and self.thread_processamento.is_alive():
+            self.evento_cancelar.set()
+            self.btn_cancelar.configure(state="disabled")
+            self.log("Cancelando... (aguardando os arquivos em andamento)")
+    
+    def _executar_processamento(self, pasta, incremental):
+        """Corpo da thread de processamento: não acessa widgets, só publica eventos"""
+        def progresso(feitos, total, dados):
+            self.fila_eventos.put(('progresso', feitos, total, dados['arquivo']))
+        
+        metricas = MetricasExecucao(PERFIL_EXECUCAO)
+        cache = None
+        try:
+            cache = CacheExtracao() if USAR_CACHE_EXTRACAO else None
+            with metricas.perfilar():
+                resultados, sem_valores, tabela = self._processar(pasta, incremental, cache, progresso, metricas)
+            self.fila_eventos.put(('fim', resultados, sem_valores, metricas, self.evento_cancelar.is_set(), None, tabela))
+        except Exception as e:
+            self.log(f"[ERRO] Falha no processamento: {e}")
+            self.fila_eventos.put(('erro', e))
+        finally:
+            if cache is not None:
+                cache.fechar()
+    
+    def _processar(self, pasta, incremental, cache, progresso, metricas):
+        """Extração e montagem do modelo (thread de processamento)
+
+        Devolve os resultados exibidos (ModeloResultados, ou ResumoBanco no
+        modo incremental), a lista de registros sem valor e o modelo da
+        tabela lido do banco (None quando os registros estão em memória).
+        """
+        from ret.pipeline import DestinoModelo, DestinoSemValores, executar_pipeline
+        from ret.sincronizacao import sincronizar_pasta
+        
+        if incremental:
+            # Extrai só o que mudou e exibe o conteúdo completo do banco
+            db_path = os.path.join(pasta, NOME_BANCO)
+            sincronizar_pasta(
+                pasta,
+                db_path,
+                workers=WORKERS_EXTRACAO,
+                log=self.log,
+                cache=cache,
+                progresso=progresso,
+                cancelar=self.evento_cancelar,
+                estrategia=ESTRATEGIA_PAGINAS,
+                metricas=metricas,
+                limites=LIMITES_EXTRACAO,
+                regras=REGRAS_DESCOBERTA
+            )
+            self.log(f"[OK] Banco atualizado: {db_path}")
+            with metricas.etapa('carregar_db'):
+                return self._ler_banco(db_path)
+        else:
+            # Registros em lotes, direto para o modelo colunar: a lista de
+            # dicionários da extração não é mantida em memória
+            modelo = DestinoModelo()
+            destino_sem_valores = DestinoSemValores()
+            executar_pipeline(
+                pasta,
+                [modelo, destino_sem_valores],
+                log=self.log,
+                metricas=metricas,
+                workers=WORKERS_EXTRACAO,
+                cache=cache,
+                progresso=progresso,
+                cancelar=self.evento_cancelar,
+                estrategia=ESTRATEGIA_PAGINAS,
+                limites=LIMITES_EXTRACAO,
+                regras=REGRAS_DESCOBERTA
+            )
+            resultados = modelo.resultados()
+            sem_valores = destino_sem_valores.registros
+        # Resumos calculados aqui, fora da thread da interface
+        with metricas.etapa('modelo'):
+            resultados.totais()
+            resultados.por_tipo()
+            resultados.debito_credito()
+        return resultados, sem_valores, None
+    
+    def _finalizar_processamento(self, evento):
+        """Recebe o resultado da thread e exibe (executado na thread da interface)"""
+        self.btn_processar.configure(state="normal")
+        self.btn_consultar.configure(state="normal")
+        self.btn_cancelar.configure(state="disabled")
+        self.lbl_arquivo_atual.configure(text="")
+        
+        if evento[0] == 'erro':
+            self.lbl_progresso.configure(text="Falha no processamento")
+            messagebox.showerror("Erro", f"Erro no processamento: {evento[1]}")
+            return
+        
+        _, resultados, sem_valores, metricas, cancelado, consulta, tabela = evento
+        decorrido = time.monotonic() - self.inicio_processamento
+        self.lbl_progresso.configure(
+            text=f"{'Cancelado' if cancelado else 'Concluído'} em {decorrido:.1f}s"
+        )
+        if not cancelado:
+            self.barra_progresso.set(1)
+        
+        self.resultados = resultados
+        self.sem_valores = sem_valores
+        self.tabela = tabela
+        self.metricas = metricas
+        arquivos_processados = len(self.resultados)
         
         # Processar resultados
-        self._mostrar_resultados(arquivos_processados)
+        self._mostrar_resultados(arquivos_processados, consulta)
+        
+        if self.vigia_pendente is not None:
+            db_path, self.vigia_pendente = self.vigia_pendente, None
+            self._atualizar_pela_vigia(db_path)
     
-    def _mostrar_resultados(self, total_arquivos):
-        """Exibe resultados do processamento"""
-        # Sempre atualizar a aba Sem Valores (mesmo quando nenhum foi processado)
+    def _mostrar_resultados(self, total_arquivos, consulta=None):
+        """Exibe resultados do processamento (ou da consulta ao banco, descrita em 'consulta')"""
+        # Sempre atualizar as abas Sem Valores e Performance (mesmo quando nenhum foi processado)
         self._mostrar_sem_valores()
+        self._mostrar_performance()
         
-        if not self.dados_processados:
-            messagebox.showwarning("Aviso", "Nenhum PDF foi processado! Verifique a pasta e os tipos de encargo selecionados.")
+        if not self.resultados:
+            if self.tabela is not None:
+                # Nada a exibir: a tabela anterior continua, a do banco é fechada
+                self.tabela.fechar()
+                self.tabela = None
+            if consulta is not None:
+                messagebox.showwarning("Aviso", f"Nenhum registro no banco para o filtro:\n{consulta}")
+            else:
+                messagebox.showwarning("Aviso", "Nenhum PDF foi processado! Verifique a pasta e os tipos de encargo selecionados.")
             return
         
-        # Calcular estatísticas
-        total_geral = sum(d['valor_total'] for d in self.dados_processados)
-        com_valores = len([d for d in self.dados_processados if d['valor_total'] > 0])
-        
-        # Converter para Reais (BRL)
-        total_geral_brl = total_geral * TAXA_EUR_BRL
+        # Estatísticas já calculadas no modelo (valores convertidos para Reais)
+        totais = self.resultados.totais()
+        total_geral_brl = totais['total_geral_brl']
+        com_valores = totais['com_valores']
+        notas = self.resultados.debito_credito()
         
         # Atualizar total
-        self.lbl_total.configure(text=f"R$ {total_geral_brl:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-        
-        # Resumo por tipo
-        resumo_tipos = {}
-        for d in self.dados_processados:
-            tipo = d['tipo_encargo']
-            if tipo not in resumo_tipos:
-                resumo_tipos[tipo] = {'count': 0, 'total': 0}
-            resumo_tipos[tipo]['count'] += 1
-            resumo_tipos[tipo]['total'] += d['valor_total']
+        self.lbl_total.configure(text=formatar_brl(total_geral_brl))
         
         # Atualizar aba resumo
         for widget in self.frame_resumo.winfo_children():
             widget.destroy()
         
-        total_brl_fmt = f"R$ {total_geral_brl:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        total_brl_fmt = formatar_brl(total_geral_brl)
+        titulo = "ESTATÍSTICAS DO PROCESSAMENTO" if consulta is None else f"CONSULTA AO BANCO\nFiltro: {consulta}"
         stats_text = f"""
-ESTATÍSTICAS DO PROCESSAMENTO
+{titulo}
 
 Total de PDFs: {total_arquivos}
 PDFs com valores: {com_valores}
@@ -395,13 +984,20 @@ Valor Total: {total_brl_fmt}
 RESUMO POR TIPO:
 """
         
-        for tipo, stats in resumo_tipos.items():
-            total_tipo_brl = stats['total'] * TAXA_EUR_BRL
-            total_tipo_fmt = f"R$ {total_tipo_brl:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-            stats_text += f"\n{tipo}:\n"
-            stats_text += f"  - Arquivos: {stats['count']}\n"
+        for linha in self.resultados.por_tipo().itertuples():
+            total_tipo_fmt = formatar_brl(linha.valor_total_brl)
+            stats_text += f"\n{linha.Index}:\n"
+            stats_text += f"  - Arquivos: {linha.arquivos}\n"
             stats_text += f"  - Total: {total_tipo_fmt}\n"
         
+        stats_text += f"""
+DÉBITO x CRÉDITO:
+
+  - Notas de Débito: {formatar_brl(notas['debito'])}
+  - Notas de Crédito: {formatar_brl(notas['credito'])}
+  - Saldo: {formatar_brl(notas['saldo'])}
+"""
+        
         ctk.CTkLabel(
             self.frame_resumo,
             text=stats_text,
@@ -412,72 +1008,35 @@ RESUMO POR TIPO:
         # Atualizar aba de dados detalhados
         self._mostrar_dados_detalhados()
         
+        if consulta is not None:
+            self.log(f"CONSULTA CONCLUÍDA - {total_arquivos} registros ({consulta})")
+            return
+        
         self.log("="*60)
         self.log(f"PROCESSAMENTO CONCLUÍDO - {total_arquivos} arquivos")
         self.log("="*60)
         
-        total_msg = f"R$ {total_geral_brl:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        messagebox.showinfo("Sucesso", f"Processados {total_arquivos} PDFs!\nTotal: {total_msg}")
+        messagebox.showinfo("Sucesso", f"Processados {total_arquivos} PDFs!\nTotal: {total_brl_fmt}")
     
     def _mostrar_dados_detalhados(self):
-        """Mostra tabela com dados detalhados"""
-        for widget in self.frame_dados.winfo_children():
-            widget.destroy()
-        
-        # Cabeçalho
-        header = ctk.CTkFrame(self.frame_dados, fg_color="#2c3e50")
-        header.pack(fill="x", pady=(0, 5))
-        
-        colunas = [
-            ("Tipo", 80), ("Empresa", 150), ("Nota", 80),
-            ("Nº", 100), ("Vencimento", 100), ("Valor Total", 120),
-            ("QT", 80), ("Valor Unit.", 100)
-        ]
-        
-        for txt, w in colunas:
-            ctk.CTkLabel(
-                header, 
-                text=txt, 
-                width=w,
-                font=("Roboto", 11, "bold")
-            ).pack(side="left", padx=2)
-        
-        # Dados (valores em Reais na exibição)
-        for d in self.dados_processados[:50]:  # Limitar para não sobrecarregar
-            row = ctk.CTkFrame(self.frame_dados, fg_color="#34495e")
-            row.pack(fill="x", pady=1)
-            v_total_brl = d['valor_total'] * TAXA_EUR_BRL
-            v_unit_brl = d['valor_unitario'] * TAXA_EUR_BRL
-            valores = [
-                (d['tipo_encargo'], 80),
-                (d['empresa'], 150),
-                (d['nota_tipo'], 80),
-                (d['numero_nd'], 100),
-                (d['data_vencimento'], 100),
-                (f"{v_total_brl:.2f}", 120),
-                (f"{d['quantidade']:.2f}", 80),
-                (f"{v_unit_brl:.2f}", 100)
-            ]
-            
-            for val, w in valores:
-                ctk.CTkLabel(
-                    row,
-                    text=str(val),
-                    width=w,
-                    font=("Roboto", 10)
-                ).pack(side="left", padx=2)
+        """Mostra todos os registros na tabela virtual (valores em Reais)"""
+        if self.tabela is not None:
+            self.tabela_dados.definir_modelo(self.tabela)
+        else:
+            self.tabela_dados.definir_registros(self.resultados)
     
     def _mostrar_sem_valores(self):
         """Preenche a aba Sem Valores com os PDFs processados nos quais não foi extraído nenhum valor"""
         self.txt_sem_valores.delete("1.0", "end")
-        if not self.dados_processados:
+        if not self.resultados:
             self.txt_sem_valores.insert("end", "Nenhum processamento realizado.\nSelecione a pasta e clique em PROCESSAR PDFs.")
             return
-        sem_valores = [d for d in self.dados_processados if not d.get('valores_encontrados') or d.get('valor_total', 0) == 0]
+        sem_valores = self.sem_valores
         if not sem_valores:
             self.txt_sem_valores.insert("end", "Nenhum arquivo sem valores.\n\nTodos os PDFs processados tiveram pelo menos um valor extraído.")
             return
-        self.txt_sem_valores.insert("end", f"ARQUIVOS SEM VALORES ({len(sem_valores)})\n")
+        falhas = sum(1 for d in sem_valores if d.get('falha'))
+        self.txt_sem_valores.insert("end", f"ARQUIVOS SEM VALORES ({len(sem_valores)}, {falhas} com falha na extração)\n")
         self.txt_sem_valores.insert("end", "PDFs lidos nos quais não foi possível extrair valores (valor total = 0):\n")
         self.txt_sem_valores.insert("end", "=" * 60 + "\n\n")
         for i, d in enumerate(sem_valores, 1):
@@ -485,55 +1044,64 @@ RESUMO POR TIPO:
             caminho = d.get("caminho", "")
             tipo = d.get("tipo_encargo", "")
             self.txt_sem_valores.insert("end", f"{i:4}. [{tipo}] {arquivo}\n")
-            self.txt_sem_valores.insert("end", f"      Nenhum valor extraído\n")
+            if d.get("falha"):
+                motivo = DESCRICAO_FALHAS.get(d["falha"], d["falha"])
+                detalhe = f" - {d['erro']}" if d.get("erro") else ""
+                self.txt_sem_valores.insert("end", f"      Falha: {motivo}{detalhe}\n")
+            else:
+                self.txt_sem_valores.insert("end", f"      Nenhum valor extraído\n")
             self.txt_sem_valores.insert("end", f"      {caminho}\n\n")
         self.txt_sem_valores.see("1.0")
     
-    def salvar_db(self):
-        """Salva dados no banco de dados SQLite"""
-        if not self.dados_processados:
+    def _mostrar_performance(self):
+        """Preenche a aba Performance com as métricas da última execução"""
+        self.txt_performance.delete("1.0", "end")
+        if self.metricas is None:
+            self.txt_performance.insert("end", "Nenhum processamento realizado.")
+            return
+        self.txt_performance.insert("end", self.metricas.texto())
+        self.txt_performance.see("1.0")
+    
+    def exportar_metricas(self):
+        """Grava as métricas da última execução em JSON lines, na pasta processada"""
+        if self.metricas is None:
             messagebox.showwarning("Aviso", "Processe os PDFs primeiro!")
             return
         
         try:
-            db_path = os.path.join(self.pasta_selecionada, 'RET_dados.db')
-            conexao = sqlite3.connect(db_path)
-            cursor = conexao.cursor()
-            
-            # Criar tabela
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS dados_ret (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    tipo_encargo TEXT,
-                    empresa TEXT,
-                    nota_tipo TEXT,
-                    numero_nd TEXT,
-                    data_vencimento TEXT,
-                    valor_total REAL,
-                    quantidade REAL,
-                    valor_unitario REAL,
-                    arquivo TEXT,
-                    caminho TEXT,
-                    data_processamento TEXT
-                )
-            ''')
+            metricas_path = os.path.join(self.pasta_selecionada, NOME_METRICAS)
+            self.metricas.exportar_jsonl(metricas_path)
             
-            # Inserir dados
-            for d in self.dados_processados:
-                cursor.execute('''
-                    INSERT INTO dados_ret (
-                        tipo_encargo, empresa, nota_tipo, numero_nd,
-                        data_vencimento, valor_total, quantidade, valor_unitario,
-                        arquivo, caminho, data_processamento
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    d['tipo_encargo'], d['empresa'], d['nota_tipo'], d['numero_nd'],
-                    d['data_vencimento'], d['valor_total'], d['quantidade'], d['valor_unitario'],
-                    d['arquivo'], d['caminho'], datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                ))
+            self.log(f"[OK] Métricas gravadas em: {metricas_path}")
+            messagebox.showinfo("Sucesso", f"Relatório de desempenho exportado!\n{metricas_path}")
             
-            conexao.commit()
-            conexao.close()
+        except Exception as e:
+            self.log(f"[ERRO] Falha ao exportar as métricas: {e}")
+            messagebox.showerror("Erro", f"Erro ao exportar as métricas: {e}")
+    
+    def salvar_db(self):
+        """Salva dados no banco de dados SQLite"""
+        if not self.resultados:
+            messagebox.showwarning("Aviso", "Processe os PDFs primeiro!")
+            return
+        
+        try:
+            from ret.banco import iterar_resultados, salvar_dados
+            db_path = os.path.join(self.pasta_selecionada, NOME_BANCO)
+            origem = getattr(self.resultados, 'db_path', None)
+            if origem is not None and os.path.abspath(origem) == os.path.abspath(db_path):
+                messagebox.showinfo("Aviso", f"Os dados exibidos já estão no banco!\n{db_path}")
+                return
+            with self.metricas.etapa('salvar_db'):
+                if origem is None:
+                    salvar_dados(self.resultados, db_path)
+                else:
+                    # Resultados de outro banco: copiados em lotes
+                    from ret.consulta import condicoes
+                    onde, parametros = condicoes(self.resultados.filtro)
+                    for modelo in iterar_resultados(origem, self.resultados.taxa, onde, parametros):
+                        salvar_dados(modelo, db_path)
+            self._mostrar_performance()
             
             self.log(f"[OK] Dados salvos em: {db_path}")
             messagebox.showinfo("Sucesso", f"Dados salvos no banco!\n{db_path}")
@@ -544,135 +1112,23 @@ RESUMO POR TIPO:
     
     def exportar_excel(self):
         """Exporta dados para Excel formatado"""
-        if not self.dados_processados:
+        if not self.resultados:
             messagebox.showwarning("Aviso", "Processe os PDFs primeiro!")
             return
         
         try:
-            excel_path = os.path.join(self.pasta_selecionada, 'RET_Relatorio.xlsx')
-            
-            # Criar DataFrame
-            df = pd.DataFrame([{
-                'Tipo de Encargo': d['tipo_encargo'],
-                'Empresa': d['empresa'],
-                'Nota Débito/Crédito': d['nota_tipo'],
-                'Nº': d['numero_nd'],
-                'Data Vencimento': d['data_vencimento'],
-                'Valor Total': d['valor_total'],
-                'QT': d['quantidade'],
-                'Valor Unitário': d['valor_unitario'],
-                'Arquivo': d['arquivo']
-            } for d in self.dados_processados])
-            
-            # Criar workbook com formatação
-            wb = Workbook()
-            ws_dados = wb.active
-            ws_dados.title = "Dados Completos"
-            
-            # Estilos
-            header_fill = PatternFill(start_color="1F4788", end_color="1F4788", fill_type="solid")
-            header_font = Font(bold=True, color="FFFFFF", size=12)
-            border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-            
-            # Adicionar dados
-            for r_idx, row in enumerate(dataframe_to_rows(df, index=False, header=True), 1):
-                for c_idx, value in enumerate(row, 1):
-                    cell = ws_dados.cell(row=r_idx, column=c_idx, value=value)
-                    cell.border = border
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-                    
-                    if r_idx == 1:  # Header
-                        cell.fill = header_fill
-                        cell.font = header_font
-                    else:
-                        if c_idx in [6, 7, 8]:  # Colunas numéricas
-                            if isinstance(value, (int, float)):
-                                cell.number_format = '#,##0.00'
-            
-            # Ajustar larguras
-            ws_dados.column_dimensions['A'].width = 20
-            ws_dados.column_dimensions['B'].width = 25
-            ws_dados.column_dimensions['C'].width = 20
-            ws_dados.column_dimensions['D'].width = 15
-            ws_dados.column_dimensions['E'].width = 18
-            ws_dados.column_dimensions['F'].width = 15
-            ws_dados.column_dimensions['G'].width = 12
-            ws_dados.column_dimensions['H'].width = 15
-            ws_dados.column_dimensions['I'].width = 40
-            
-            # ABA RESUMO POR TIPO
-            ws_resumo = wb.create_sheet("Resumo por Tipo")
-            
-            resumo = df.groupby('Tipo de Encargo').agg({
-                'Valor Total': 'sum',
-                'QT': 'sum',
-                'Arquivo': 'count'
-            }).rename(columns={'Arquivo': 'Quantidade de Arquivos'}).reset_index()
-            
-            for r_idx, row in enumerate(dataframe_to_rows(resumo, index=False, header=True), 1):
-                for c_idx, value in enumerate(row, 1):
-                    cell = ws_resumo.cell(row=r_idx, column=c_idx, value=value)
-                    cell.border = border
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-                    
-                    if r_idx == 1:
-                        cell.fill = header_fill
-                        cell.font = header_font
-                    else:
-                        if c_idx > 1:
-                            if isinstance(value, (int, float)):
-                                cell.number_format = '#,##0.00'
-            
-            ws_resumo.column_dimensions['A'].width = 25
-            ws_resumo.column_dimensions['B'].width = 18
-            ws_resumo.column_dimensions['C'].width = 15
-            ws_resumo.column_dimensions['D'].width = 25
-            
-            # ABA RESUMO GERAL
-            ws_geral = wb.create_sheet("Resumo Geral")
-            
-            total_geral = df['Valor Total'].sum()
-            total_qt = df['QT'].sum()
-            total_arquivos = len(df)
-            
-            total_geral_brl = total_geral * TAXA_EUR_BRL
-            dados_geral = [
-                ['RESUMO GERAL DO PROCESSAMENTO', ''],
-                ['', ''],
-                ['Métrica', 'Valor'],
-                ['Total de PDFs Processados', total_arquivos],
-                ['Quantidade Total (QT)', total_qt],
-                ['Valor Total (R$)', total_geral_brl],
-                ['', ''],
-                ['Data do Processamento', datetime.now().strftime('%Y-%m-%d %H:%M:%S')]
-            ]
-            
-            for r_idx, row in enumerate(dados_geral, 1):
-                for c_idx, value in enumerate(row, 1):
-                    cell = ws_geral.cell(row=r_idx, column=c_idx, value=value)
-                    if r_idx == 1:
-                        cell.font = Font(bold=True, size=16, color="1F4788")
-                    elif r_idx == 3:
-                        cell.fill = header_fill
-                        cell.font = header_font
-                    else:
-                        cell.alignment = Alignment(horizontal='left', vertical='center')
-                        if c_idx == 2 and isinstance(value, (int, float)):
-                            cell.number_format = '#,##0.00'
-                # Mesclar célula do título só depois de escrever toda a linha (evita MergedCell read-only)
-                if r_idx == 1:
-                    ws_geral.merge_cells('A1:B1')
-            
-            ws_geral.column_dimensions['A'].width = 30
-            ws_geral.column_dimensions['B'].width = 25
-            
-            # Salvar
-            wb.save(excel_path)
+            from ret.excel import exportar_excel
+            excel_path = os.path.join(self.pasta_selecionada, NOME_EXCEL)
+            with self.metricas.etapa('exportar_excel'):
+                if getattr(self.resultados, 'db_path', None) is None:
+                    exportar_excel(self.resultados, excel_path)
+                else:
+                    # Resultados do banco: o relatório é lido de lá, em lotes
+                    from ret.consulta import exportar_consulta
+                    exportar_consulta(
+                        self.resultados.db_path, excel_path, self.resultados.filtro, self.resultados.taxa
+                    )
+            self._mostrar_performance()
             
             self.log(f"[OK] Excel criado: {excel_path}")
             messagebox.showinfo("Sucesso", f"Excel exportado com sucesso!\n{excel_path}")
@@ -0,0 +1 @@
+"""Benchmarks do processamento de RET e gerador de acervo sintético de PDFs"""
@@ -0,0 +1,186 @@
+"""Gerador de um acervo sintético de PDFs no formato das notas de RET
+
+Os PDFs são escritos diretamente (PDF 1.4 com fonte Helvetica padrão),
+sem depender de bibliotecas de geração. A estrutura de pastas imita a
+real (EAT / Penalidades / TOP com subpastas por mês) e os nomes seguem o
+padrão EMPRESA_ND_numero.pdf / EMPRESA_NC_numero.pdf, com as empresas
+reconhecidas por ret.extracao.
+
+Uso:
+    python -m benchmarks.corpus <destino> --arquivos 1000 [--paginas 1-3] [--semente 0]
+
+Um manifesto (corpus.json) com a quantidade de arquivos e de páginas é
+gravado no destino; o benchmark o usa para calcular páginas/s.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+from ret.empresas import EMPRESAS_CONHECIDAS
+
+NOME_MANIFESTO = 'corpus.json'
+
+# (pasta do tipo de encargo, sigla usada no nome da subpasta mensal)
+TIPOS_ENCARGO = [('EAT', 'EAT'), ('Penalidades', 'PEN'), ('TOP', 'TOP')]
+
+MESES = ['jan', 'fev', 'mar', 'abr', 'mai', 'jun', 'jul', 'ago', 'set', 'out', 'nov', 'dez']
+
+LINHAS_ANEXO = [
+    'Demonstrativo de apuração do período',
+    'Ponto de entrega {ponto:04d} - volume {volume:,.2f}',
+    'Ajuste contratual {ajuste},{centavos:02d}',
+    'Referência interna {ref}',
+]
+
+
+def _texto_pdf(linha):
+    """Escapa uma linha para um literal de string do PDF"""
+    return linha.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def escrever_pdf(caminho, paginas):
+    """Grava um PDF com uma página por lista de linhas em 'paginas'"""
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    filhos = []
+    for linhas in paginas:
+        numero_pagina = len(objetos) + 1
+        filhos.append(f"{numero_pagina} 0 R")
+        objetos.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {numero_pagina + 1} 0 R >>".encode()
+        )
+        conteudo = "BT /F1 11 Tf 50 800 Td 14 TL " + " ".join(
+            f"({_texto_pdf(linha)}) '" for linha in linhas
+        ) + " ET"
+        conteudo = conteudo.encode('cp1252', errors='replace')
+        objetos.append(b"<< /Length %d >>\nstream\n" % len(conteudo) + conteudo + b"\nendstream")
+    objetos[1] = f"<< /Type /Pages /Kids [{' '.join(filhos)}] /Count {len(paginas)} >>".encode()
+
+    saida = bytearray(b"%PDF-1.4\n")
+    posicoes = []
+    for numero, objeto in enumerate(objetos, 1):
+        posicoes.append(len(saida))
+        saida += b"%d 0 obj\n" % numero + objeto + b"\nendobj\n"
+    inicio_xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    saida += b"".join(b"%010d 00000 n \n" % posicao for posicao in posicoes)
+    saida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, inicio_xref)
+
+    with open(caminho, 'wb') as f:
+        f.write(saida)
+
+
+def _valor_br(valor):
+    """1234.5 -> '1.234,50'"""
+    return f"{valor:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+
+
+def _paginas_nota(rng, numero_nd, credito, vencimento, total_paginas):
+    """Linhas de cada página de uma nota (a primeira com os campos extraídos)"""
+    quantidade = rng.randint(1, 5000)
+    unitario = rng.uniform(0.5, 80.0)
+    total = quantidade * unitario
+    primeira = [
+        "NOTA DE CREDITO" if credito else "NOTA DE DEBITO",
+        f"ND: {numero_nd}",
+        f"Vencimento {vencimento:%d/%m/%Y}",
+        f"QT: {quantidade}",
+        f"Valor unitario R$ {_valor_br(unitario)}",
+        f"Total € {_valor_br(total)}",
+    ]
+    paginas = [primeira]
+    for _ in range(total_paginas - 1):
+        paginas.append([
+            modelo.format(
+                ponto=rng.randint(1, 9999), volume=rng.uniform(10, 10000),
+                ajuste=rng.randint(0, 999), centavos=rng.randint(0, 99), ref=rng.randint(10**5, 10**6)
+            )
+            for modelo in LINHAS_ANEXO
+            for _ in range(8)
+        ])
+    return paginas
+
+
+def gerar_corpus(destino, arquivos, paginas=(1, 3), semente=0, proporcao_credito=0.3):
+    """Gera 'arquivos' PDFs em destino/RET e devolve o manifesto
+
+    'paginas' é o intervalo (mínimo, máximo) de páginas por PDF. A mesma
+    semente gera sempre o mesmo acervo.
+    """
+    rng = random.Random(semente)
+    raiz = os.path.join(destino, 'RET')
+    inicio = date(2024, 1, 1)
+    total_paginas = 0
+
+    for i in range(arquivos):
+        pasta_tipo, sigla = TIPOS_ENCARGO[i % len(TIPOS_ENCARGO)]
+        vencimento = inicio + timedelta(days=rng.randint(0, 729))
+        subpasta = f"{vencimento.month:02d} {sigla} {MESES[vencimento.month - 1]}-{vencimento:%y}"
+        pasta = os.path.join(raiz, pasta_tipo, subpasta)
+        os.makedirs(pasta, exist_ok=True)
+
+        credito = rng.random() < proporcao_credito
+        empresa = rng.choice(EMPRESAS_CONHECIDAS)
+        nome = f"{empresa}_{'NC' if credito else 'ND'}_{i:06d}.pdf"
+        quantidade_paginas = rng.randint(paginas[0], paginas[1])
+        total_paginas += quantidade_paginas
+
+        escrever_pdf(
+            os.path.join(pasta, nome),
+            _paginas_nota(rng, 100000 + i, credito, vencimento, quantidade_paginas)
+        )
+
+    manifesto = {
+        'arquivos': arquivos,
+        'paginas': total_paginas,
+        'paginas_por_pdf': list(paginas),
+        'semente': semente,
+        'pasta': raiz,
+    }
+    with open(os.path.join(destino, NOME_MANIFESTO), 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, indent=2)
+    return manifesto
+
+
+def carregar_manifesto(destino):
+    """Lê o manifesto de um acervo já gerado (None se não existir)"""
+    try:
+        with open(os.path.join(destino, NOME_MANIFESTO), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def intervalo_paginas(texto):
+    """'2' -> (2, 2); '1-3' -> (1, 3)"""
+    minimo, _, maximo = texto.partition('-')
+    minimo = int(minimo)
+    maximo = int(maximo or minimo)
+    if minimo < 1 or maximo < minimo:
+        raise argparse.ArgumentTypeError(f"intervalo de páginas inválido: {texto}")
+    return minimo, maximo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera um acervo sintético de PDFs de RET")
+    parser.add_argument("destino", help="Diretório de saída (o acervo fica em destino/RET)")
+    parser.add_argument("--arquivos", type=int, default=100, help="Quantidade de PDFs")
+    parser.add_argument("--paginas", type=intervalo_paginas, default=(1, 3),
+                        help="Páginas por PDF: N ou MIN-MAX (padrão: 1-3)")
+    parser.add_argument("--semente", type=int, default=0, help="Semente do gerador aleatório")
+    args = parser.parse_args(argv)
+
+    manifesto = gerar_corpus(args.destino, args.arquivos, args.paginas, args.semente)
+    print(f"{manifesto['arquivos']} PDFs ({manifesto['paginas']} páginas) em {manifesto['pasta']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""Benchmark do processamento: extração, modelo, banco e Excel
+
+Para cada tamanho de acervo (padrão: 100, 1.000 e 10.000 PDFs) gera, ou
+reaproveita, um acervo sintético (benchmarks/corpus.py) e mede em um
+processo separado, para que o pico de memória de um tamanho não contamine
+o do outro:
+- extrair_dados_pdf: tempo médio por arquivo, sequencial (amostra);
+- processar: processar_pasta com o pool de processos, sem cache;
+- processar_cache: processar_pasta com o cache de extração já preenchido
+  (só com --cache);
+- modelo: montagem do ModeloResultados e dos resumos;
+- salvar_db: gravação no SQLite;
+- exportar_excel: geração do relatório.
+
+Relata arquivos/s, páginas/s e pico de RSS (processo principal e workers)
+e grava tudo em JSON. Com --comparar, mostra a variação em relação a uma
+execução anterior.
+
+Uso:
+    python -m benchmarks.executar [--tamanhos 100 1000 10000] [--workers N]
+                                  [--saida resultado.json] [--comparar base.json]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.corpus import carregar_manifesto, gerar_corpus, intervalo_paginas
+
+try:
+    import resource
+except ImportError:
+    # Windows: sem getrusage, o pico de memória não é medido
+    resource = None
+
+TAMANHOS_PADRAO = [100, 1000, 10000]
+AMOSTRA_EXTRACAO = 50
+DIRETORIO_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultados')
+
+
+def pico_rss_mb(quem='proprio'):
+    """Pico de memória residente (MB) do processo ou de seus filhos já encerrados"""
+    if resource is None:
+        return None
+    alvo = resource.RUSAGE_SELF if quem == 'proprio' else resource.RUSAGE_CHILDREN
+    pico = resource.getrusage(alvo).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(pico / divisor, 1)
+
+
+class Cronometro:
+    """Acumula o tempo de cada etapa: with cronometro('etapa'): ..."""
+
+    def __init__(self):
+        self.etapas = {}
+        self._etapa = None
+
+    def __call__(self, etapa):
+        self._etapa = etapa
+        return self
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.etapas[self._etapa] = round(time.perf_counter() - self._inicio, 4)
+        return False
+
+
+def preparar_corpus(diretorio, tamanho, paginas, semente):
+    """Gera o acervo do tamanho pedido, ou reaproveita um idêntico já gerado"""
+    destino = os.path.join(diretorio, f"{tamanho}_p{paginas[0]}-{paginas[1]}_s{semente}")
+    manifesto = carregar_manifesto(destino)
+    if manifesto and manifesto['arquivos'] == tamanho:
+        return manifesto
+    shutil.rmtree(destino, ignore_errors=True)
+    return gerar_corpus(destino, tamanho, paginas, semente)
+
+
+def medir(manifesto, workers=None, usar_cache=False):
+    """Executa as etapas sobre um acervo e devolve as métricas (no processo atual)"""
+    from ret.agregacao import ModeloResultados
+    from ret.banco import salvar_dados
+    from ret.cache import CacheExtracao
+    from ret.excel import exportar_excel
+    from ret.extracao import extrair_dados_pdf
+    from ret.motor import listar_pdfs, numero_workers, processar_pasta
+
+    pasta = manifesto['pasta']
+    cronometro = Cronometro()
+    sem_log = lambda mensagem: None
+
+    with tempfile.TemporaryDirectory(prefix='ret_bench_') as temporario:
+        amostra = listar_pdfs(pasta)[:AMOSTRA_EXTRACAO]
+        with cronometro('extrair_dados_pdf'):
+            for caminho in amostra:
+                extrair_dados_pdf(caminho)
+        extracao_ms = cronometro.etapas['extrair_dados_pdf'] * 1000 / max(len(amostra), 1)
+
+        with cronometro('processar'):
+            dados = processar_pasta(pasta, workers=workers, log=sem_log)
+
+        if usar_cache:
+            cache = CacheExtracao(os.path.join(temporario, 'cache'))
+            try:
+                processar_pasta(pasta, workers=workers, log=sem_log, cache=cache)
+                with cronometro('processar_cache'):
+                    processar_pasta(pasta, workers=workers, log=sem_log, cache=cache)
+            finally:
+                cache.fechar()
+
+        with cronometro('modelo'):
+            resultados = ModeloResultados.de_registros(dados)
+            resultados.totais()
+            resultados.por_tipo()
+            resultados.por_empresa()
+            resultados.por_mes()
+            resultados.debito_credito()
+
+        with cronometro('salvar_db'):
+            salvar_dados(resultados, os.path.join(temporario, 'bench.db'))
+
+        with cronometro('exportar_excel'):
+            exportar_excel(resultados, os.path.join(temporario, 'bench.xlsx'))
+
+    segundos = cronometro.etapas['processar']
+    return {
+        'arquivos': manifesto['arquivos'],
+        'paginas': manifesto['paginas'],
+        'workers': numero_workers(workers),
+        'registros_com_erro': sum(1 for d in dados if d['erro']),
+        'etapas_s': cronometro.etapas,
+        'extrair_dados_pdf_ms_por_arquivo': round(extracao_ms, 2),
+        'arquivos_por_s': round(manifesto['arquivos'] / segundos, 1) if segundos else None,
+        'paginas_por_s': round(manifesto['paginas'] / segundos, 1) if segundos else None,
+        'rss_pico_mb': pico_rss_mb('proprio'),
+        'rss_pico_workers_mb': pico_rss_mb('filhos'),
+    }
+
+
+def medir_em_subprocesso(manifesto, args):
+    """Roda medir() em um processo novo (pico de RSS isolado por tamanho)"""
+    comando = [sys.executable, '-m', 'benchmarks.executar', '--interno', manifesto['pasta']]
+    if args.workers:
+        comando += ['--workers', str(args.workers)]
+    if args.cache:
+        comando.append('--cache')
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    saida = subprocess.run(comando, cwd=raiz, capture_output=True, text=True, check=True)
+    return json.loads(saida.stdout)
+
+
+def comparar(atual, base):
+    """Imprime a variação de tempo por etapa em relação a uma execução anterior"""
+    anteriores = {r['arquivos']: r for r in base['resultados']}
+    for resultado in atual['resultados']:
+        anterior = anteriores.get(resultado['arquivos'])
+        if anterior is None:
+            continue
+        print(f"\n{resultado['arquivos']} arquivos (vs. {base['data']}):")
+        for etapa, segundos in resultado['etapas_s'].items():
+            antes = anterior['etapas_s'].get(etapa)
+            if antes:
+                variacao = (segundos - antes) / antes * 100
+                print(f"  {etapa:<18} {antes:>9.3f}s -> {segundos:>9.3f}s  ({variacao:+.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do processamento de PDFs de RET")
+    parser.add_argument("--tamanhos", type=int, nargs='+', default=TAMANHOS_PADRAO,
+                        help="Quantidades de PDFs medidas (padrão: 100 1000 10000)")
+    parser.add_argument("--paginas", type=intervalo_paginas, default=(1, 3),
+                        help="Páginas por PDF: N ou MIN-MAX (padrão: 1-3)")
+    parser.add_argument("--semente", type=int, default=0, help="Semente do acervo sintético")
+    parser.add_argument("--workers", type=int, default=None, help="Processos de extração (padrão: todos os núcleos)")
+    parser.add_argument("--cache", action="store_true", help="Mede também o processamento com o cache preenchido")
+    parser.add_argument("--dir-corpus", default=os.path.join(tempfile.gettempdir(), 'ret_benchmark'),
+                        help="Onde os acervos sintéticos são gerados/reaproveitados")
+    parser.add_argument("--saida", help="Arquivo JSON do resultado (padrão: benchmarks/resultados/<data>.json)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparação")
+    parser.add_argument("--interno", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.interno:
+        # Execução de um único tamanho, chamada por medir_em_subprocesso
+        manifesto = carregar_manifesto(os.path.dirname(args.interno))
+        print(json.dumps(medir(manifesto, args.workers, args.cache)))
+        return 0
+
+    resultado = {
+        'data': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'paginas_por_pdf': list(args.paginas),
+        'resultados': [],
+    }
+
+    for tamanho in args.tamanhos:
+        manifesto = preparar_corpus(args.dir_corpus, tamanho, args.paginas, args.semente)
+        medida = medir_em_subprocesso(manifesto, args)
+        resultado['resultados'].append(medida)
+        etapas = ", ".join(f"{etapa} {segundos:.2f}s" for etapa, segundos in medida['etapas_s'].items())
+        print(f"{tamanho:>6} PDFs: {medida['arquivos_por_s']} arquivos/s, {medida['paginas_por_s']} páginas/s, "
+              f"RSS {medida['rss_pico_mb']} MB (workers {medida['rss_pico_workers_mb']} MB) | {etapas}")
+
+    saida = args.saida
+    if not saida:
+        os.makedirs(DIRETORIO_RESULTADOS, exist_ok=True)
+        saida = os.path.join(DIRETORIO_RESULTADOS, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"Resultado salvo em: {saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            comparar(resultado, json.load(f))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
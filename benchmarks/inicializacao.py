@@ -0,0 +1,121 @@
+"""Benchmark da inicialização: tempo até a interface estar pronta para uso
+
+Mede, em processos novos (importação a frio, sem módulos já carregados):
+- interpretador: python -c pass (descontado dos demais);
+- importacao: import do módulo (padrão: Somatorio_De_Ret);
+- janela: importação + criação da janela + primeiro desenho (só com
+  --janela, exige um display).
+
+Com -X importtime, mostra também quanto cada pacote (pandas, pdfplumber,
+openpyxl, customtkinter...) pesa na importação e quais módulos pesados
+foram carregados.
+
+Uso:
+    python -m benchmarks.inicializacao [--modulo Somatorio_De_Ret] [--repeticoes 5]
+                                       [--janela] [--top 15] [--saida resultado.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos cuja presença após a importação indica uma importação antecipada
+MODULOS_PESADOS = ('pandas', 'numpy', 'pdfplumber', 'pdfminer', 'PyPDF2', 'openpyxl', 'sqlite3')
+
+SCRIPT_JANELA = (
+    "import {modulo} as m\n"
+    "app = m.SistemaRET()\n"
+    "app.update()\n"
+    "app.destroy()\n"
+)
+
+
+def cronometrar(codigo, opcoes=()):
+    """Roda 'codigo' em um interpretador novo e devolve (segundos, stderr)"""
+    comando = [sys.executable, *opcoes, '-c', codigo]
+    inicio = time.perf_counter()
+    saida = subprocess.run(comando, cwd=RAIZ, capture_output=True, text=True)
+    segundos = time.perf_counter() - inicio
+    if saida.returncode != 0:
+        raise RuntimeError(saida.stderr.strip().splitlines()[-1] if saida.stderr.strip() else 'falhou')
+    return segundos, saida.stderr
+
+
+def mediana(codigo, repeticoes):
+    """Mediana do tempo de 'repeticoes' execuções"""
+    return statistics.median(cronometrar(codigo)[0] for _ in range(repeticoes))
+
+
+def tempos_importacao(stderr):
+    """Lê a saída de -X importtime: (tempo próprio por pacote, módulos carregados), em ms"""
+    por_pacote = {}
+    modulos = set()
+    for linha in stderr.splitlines():
+        if not linha.startswith('import time:'):
+            continue
+        try:
+            proprio, _, nome = linha[len('import time:'):].split('|')
+            proprio = int(proprio)
+        except ValueError:
+            continue  # cabeçalho
+        nome = nome.strip()
+        modulos.add(nome)
+        pacote = nome.split('.')[0]
+        por_pacote[pacote] = por_pacote.get(pacote, 0) + proprio / 1000
+    return por_pacote, modulos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da inicialização da interface")
+    parser.add_argument("--modulo", default="Somatorio_De_Ret", help="Módulo importado (padrão: Somatorio_De_Ret)")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Execuções por medida (vale a mediana)")
+    parser.add_argument("--janela", action="store_true", help="Mede também a criação da janela (exige display)")
+    parser.add_argument("--top", type=int, default=15, help="Pacotes listados no detalhamento")
+    parser.add_argument("--saida", help="Grava o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    interpretador = mediana("pass", args.repeticoes)
+    importacao = mediana(f"import {args.modulo}", args.repeticoes)
+    resultado = {
+        'modulo': args.modulo,
+        'python': sys.version.split()[0],
+        'interpretador_s': round(interpretador, 4),
+        'importacao_s': round(importacao - interpretador, 4),
+    }
+    print(f"Interpretador:  {interpretador:.3f}s")
+    print(f"Importação:     {importacao - interpretador:.3f}s (além do interpretador)")
+
+    if args.janela:
+        try:
+            janela = mediana(SCRIPT_JANELA.format(modulo=args.modulo), args.repeticoes)
+        except RuntimeError as e:
+            print(f"Janela:         não medida ({e})")
+        else:
+            resultado['janela_s'] = round(janela - interpretador, 4)
+            print(f"Janela pronta:  {janela - interpretador:.3f}s (além do interpretador)")
+
+    _, stderr = cronometrar(f"import {args.modulo}", ('-X', 'importtime'))
+    por_pacote, modulos = tempos_importacao(stderr)
+    pesados = [m for m in MODULOS_PESADOS if m in modulos]
+    resultado['importtime_ms'] = {p: round(ms, 1) for p, ms in sorted(por_pacote.items(), key=lambda i: -i[1])}
+    resultado['modulos_pesados'] = pesados
+
+    print(f"\nImportação por pacote (-X importtime, {sum(por_pacote.values()):.0f} ms no total):")
+    for pacote, ms in list(resultado['importtime_ms'].items())[:args.top]:
+        print(f"  {pacote:<24} {ms:>8.1f} ms")
+    print(f"\nMódulos pesados carregados: {', '.join(pesados) or 'nenhum'}")
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"Resultado salvo em: {args.saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Núcleo de processamento do Sistema RET (sem dependência de interface gráfica)"""
@@ -0,0 +1,7 @@
+"""Permite executar o modo linha de comando com: python -m ret"""
+import sys
+
+from ret.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+"""Agendador de tarefas: várias pastas (clientes) sincronizadas em uma execução
+
+Cada tarefa (Tarefa) é uma pasta com suas opções: regras de arquivos,
+estratégia de páginas, banco e Excel próprios. executar_tarefas roda a
+fila com:
+- limites globais: um único pool de extração (e um de OCR), dividido por
+  todas as tarefas, e no máximo 'simultaneas' tarefas ao mesmo tempo;
+  enquanto uma tarefa varre a pasta ou grava o banco, as outras mantêm o
+  pool ocupado;
+- estado por tarefa (tabela tarefas do banco consolidado): pendente,
+  executando, concluida, falhou ou cancelada, com o andamento (feitos /
+  pendentes) e as contagens da sincronização;
+- retomada: cada tarefa é uma sincronização (ret/sincronizacao.py), que
+  grava em pontos de controle os arquivos concluídos. Com retomar=True a
+  última rodada continua: as tarefas concluídas são puladas e as demais
+  recomeçam do último ponto de controle;
+- banco consolidado: ao fim de cada tarefa, os registros do banco da pasta
+  substituem os da pasta no consolidado (mesmo esquema do RET_dados.db,
+  então 'python -m ret report' funciona sobre todos os clientes).
+
+Formato da lista de tarefas (CSV com ';', uma pasta por linha, '#'
+comenta; cliente e exclusões são opcionais, exclusões separadas por '|'):
+    pasta;cliente;excluir
+    /dados/clientes/ACME/RET;ACME;backup*|EAT/2023*
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from ret.banco import CAMPOS_LEITURA, abrir_banco
+from ret.config import NOME_BANCO
+from ret.descoberta import REGRAS_PADRAO
+from ret.extracao import ESTRATEGIA_PADRAO
+from ret.metricas import MetricasExecucao
+from ret.motor import criar_executor, criar_executor_ocr
+from ret.sincronizacao import sincronizar_pasta
+from ret.supervisao import LIMITES_PADRAO
+
+PENDENTE = 'pendente'
+EXECUTANDO = 'executando'
+CONCLUIDA = 'concluida'
+FALHOU = 'falhou'
+CANCELADA = 'cancelada'
+
+# Tarefas executadas ao mesmo tempo (todas dividem o mesmo pool de extração)
+TAREFAS_SIMULTANEAS = 2
+
+# Intervalo mínimo (s) entre as gravações do andamento de uma tarefa
+INTERVALO_ANDAMENTO_S = 5.0
+
+# cliente: nome exibido (padrão: nome da pasta); db_path: banco da pasta
+# (padrão: RET_dados.db dentro dela); xlsx_path: Excel exportado ao fim
+# (None não exporta)
+Tarefa = namedtuple(
+    'Tarefa', 'pasta cliente db_path xlsx_path regras estrategia',
+    defaults=(None, None, None, REGRAS_PADRAO, ESTRATEGIA_PADRAO)
+)
+
+COLUNAS_CONSOLIDADO = CAMPOS_LEITURA + ('data_processamento',)
+
+COLUNAS_ESTADO = (
+    'rodada', 'pasta', 'cliente', 'db_path', 'estado', 'inicio', 'fim',
+    'feitos', 'pendentes', 'novos', 'alterados', 'removidos', 'erros', 'mensagem'
+)
+
+
+def normalizar_tarefa(tarefa):
+    """Tarefa com caminho absoluto, cliente e banco preenchidos"""
+    pasta = os.path.abspath(tarefa.pasta)
+    return tarefa._replace(
+        pasta=pasta,
+        cliente=tarefa.cliente or os.path.basename(pasta),
+        db_path=tarefa.db_path or os.path.join(pasta, NOME_BANCO)
+    )
+
+
+def ler_tarefas(caminho, regras=REGRAS_PADRAO, estrategia=ESTRATEGIA_PADRAO, nome_excel=None):
+    """Lê a lista de tarefas (pasta;cliente;excluir)
+
+    'regras' e 'estrategia' valem para todas as tarefas; as exclusões da
+    linha se somam às de 'regras'. Com 'nome_excel', cada tarefa exporta o
+    Excel com esse nome dentro da própria pasta.
+    """
+    tarefas = []
+    base = os.path.dirname(os.path.abspath(caminho))
+    with open(caminho, encoding='utf-8-sig') as f:
+        for linha in f:
+            linha = linha.strip()
+            if not linha or linha.startswith('#'):
+                continue
+            partes = [parte.strip() for parte in linha.split(';')] + ['', '']
+            pasta, cliente, excluir = partes[:3]
+            if not pasta or pasta.lower() == 'pasta':
+                continue  # linha vazia ou cabeçalho
+            # Caminhos relativos partem da pasta da lista
+            pasta = os.path.join(base, os.path.expanduser(pasta))
+            excluir = tuple(e.strip() for e in excluir.split('|') if e.strip())
+            tarefas.append(Tarefa(
+                pasta, cliente or None,
+                xlsx_path=os.path.join(pasta, nome_excel) if nome_excel else None,
+                regras=regras._replace(excluir=regras.excluir + excluir),
+                estrategia=estrategia
+            ))
+    return tarefas
+
+
+def abrir_consolidado(caminho):
+    """Abre o banco consolidado (esquema do RET_dados.db mais a tabela tarefas)"""
+    conexao = abrir_banco(caminho)
+    conexao.execute('''
+        CREATE TABLE IF NOT EXISTS tarefas (
+            rodada INTEGER,
+            pasta TEXT,
+            cliente TEXT,
+            db_path TEXT,
+            estado TEXT,
+            inicio TEXT,
+            fim TEXT,
+            feitos INTEGER DEFAULT 0,
+            pendentes INTEGER DEFAULT 0,
+            novos INTEGER DEFAULT 0,
+            alterados INTEGER DEFAULT 0,
+            removidos INTEGER DEFAULT 0,
+            erros INTEGER DEFAULT 0,
+            mensagem TEXT DEFAULT '',
+            PRIMARY KEY (rodada, pasta)
+        )
+    ''')
+    conexao.commit()
+    return conexao
+
+
+def estado_tarefas(caminho, rodada=None):
+    """Estado das tarefas de uma rodada (padrão: a última), como dicionários"""
+    conexao = abrir_consolidado(caminho)
+    try:
+        if rodada is None:
+            rodada = conexao.execute('SELECT MAX(rodada) FROM tarefas').fetchone()[0]
+        cursor = conexao.execute(
+            f"SELECT {', '.join(COLUNAS_ESTADO)} FROM tarefas WHERE rodada = ? ORDER BY rowid", (rodada,)
+        )
+        return [dict(zip(COLUNAS_ESTADO, linha)) for linha in cursor]
+    finally:
+        conexao.close()
+
+
+def consolidar(conexao, pasta, db_path):
+    """Substitui no consolidado os registros da pasta pelos do banco dela (uma transação)"""
+    colunas = ', '.join(COLUNAS_CONSOLIDADO)
+    conexao.execute('ATTACH DATABASE ? AS origem', (db_path,))
+    try:
+        with conexao:
+            # Faixa [pasta/, pasta0): usa o índice (caminho, numero_nd)
+            conexao.execute(
+                'DELETE FROM dados_ret WHERE caminho >= ? AND caminho < ?',
+                (pasta + os.sep, pasta + chr(ord(os.sep) + 1))
+            )
+            cursor = conexao.execute(
+                f'INSERT OR REPLACE INTO dados_ret ({colunas}) SELECT {colunas} FROM origem.dados_ret'
+            )
+        return cursor.rowcount
+    finally:
+        conexao.execute('DETACH DATABASE origem')
+
+
+class _Rodada:
+    """Tabela tarefas de uma rodada, compartilhada pelas threads das tarefas"""
+
+    def __init__(self, caminho, tarefas, retomar):
+        # Esquema criado/migrado antes; a conexão da rodada é usada por várias threads
+        abrir_consolidado(caminho).close()
+        self.conexao = sqlite3.connect(caminho, timeout=30, check_same_thread=False)
+        self.trava = threading.Lock()
+
+        ultima = self.conexao.execute('SELECT MAX(rodada) FROM tarefas').fetchone()[0]
+        concluidas = set()
+        if retomar and ultima is not None:
+            self.numero = ultima
+            concluidas = {pasta for pasta, in self.conexao.execute(
+                'SELECT pasta FROM tarefas WHERE rodada = ? AND estado = ?', (ultima, CONCLUIDA)
+            )}
+        else:
+            self.numero = (ultima or 0) + 1
+
+        self.pendentes = [t for t in tarefas if t.pasta not in concluidas]
+        self.puladas = len(tarefas) - len(self.pendentes)
+        with self.trava, self.conexao:
+            self.conexao.executemany(
+                'INSERT INTO tarefas (rodada, pasta, cliente, db_path, estado) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (rodada, pasta) DO UPDATE SET estado = excluded.estado, mensagem = \'\'',
+                [(self.numero, t.pasta, t.cliente, t.db_path, PENDENTE) for t in self.pendentes]
+            )
+
+    def atualizar(self, tarefa, **campos):
+        """Grava campos do estado de uma tarefa"""
+        with self.trava, self.conexao:
+            self.conexao.execute(
+                f"UPDATE tarefas SET {', '.join(f'{campo} = ?' for campo in campos)} "
+                'WHERE rodada = ? AND pasta = ?',
+                (*campos.values(), self.numero, tarefa.pasta)
+            )
+
+    def consolidar(self, tarefa):
+        """Copia para o consolidado os registros da tarefa"""
+        with self.trava:
+            return consolidar(self.conexao, tarefa.pasta, tarefa.db_path)
+
+    def fechar(self):
+        self.conexao.close()
+
+
+def _agora():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def executar_tarefas(tarefas, consolidado, workers=None, simultaneas=TAREFAS_SIMULTANEAS, log=print,
+                     cache=None, limites=LIMITES_PADRAO, retomar=False, parar=None, ao_concluir=None,
+                     taxa=None):
+    """Executa a fila de tarefas e mantém o banco consolidado
+
+    'workers' e 'limites' valem para o pool de extração único, dividido
+    por todas as tarefas; 'simultaneas' limita as tarefas em andamento.
+    'cache' (CacheExtracao) é compartilhado. parar (threading.Event)
+    interrompe as tarefas em andamento entre um arquivo e outro: o que já
+    foi extraído fica gravado e as tarefas interrompidas ficam como
+    canceladas, para retomar=True. ao_concluir(estado) recebe o estado
+    final de cada tarefa. 'taxa' é usada no Excel das tarefas.
+    Devolve o estado final das tarefas executadas (dicionários).
+    """
+    from ret.consulta import exportar_consulta
+
+    tarefas = [normalizar_tarefa(t) for t in tarefas]
+    rodada = _Rodada(consolidado, tarefas, retomar)
+    if rodada.puladas:
+        log(f"Rodada {rodada.numero}: {rodada.puladas} tarefas já concluídas foram puladas")
+    log(f"Rodada {rodada.numero}: {len(rodada.pendentes)} tarefas, até {simultaneas} ao mesmo tempo")
+
+    executor = criar_executor(workers, limites)
+    com_ocr = [t.estrategia.ocr for t in rodada.pendentes if t.estrategia.ocr]
+    executor_ocr = criar_executor_ocr(max(com_ocr, key=lambda ocr: ocr.workers)) if com_ocr else None
+
+    def executar(tarefa):
+        if parar is not None and parar.is_set():
+            return _finalizar(tarefa, CANCELADA, mensagem='Não iniciada')
+
+        def log_tarefa(mensagem):
+            log(f"[{tarefa.cliente}] {mensagem}")
+
+        ultimo_andamento = 0.0
+
+        def progresso(feitos, total, dados):
+            nonlocal ultimo_andamento
+            if feitos == total or time.monotonic() - ultimo_andamento >= INTERVALO_ANDAMENTO_S:
+                ultimo_andamento = time.monotonic()
+                rodada.atualizar(tarefa, feitos=feitos, pendentes=total)
+
+        rodada.atualizar(tarefa, estado=EXECUTANDO, inicio=_agora(), fim=None, feitos=0, mensagem='')
+        try:
+            if not os.path.isdir(tarefa.pasta):
+                raise FileNotFoundError(f"Pasta não encontrada: {tarefa.pasta}")
+            resultado = sincronizar_pasta(
+                tarefa.pasta, tarefa.db_path, workers=workers, log=log_tarefa, cache=cache,
+                progresso=progresso, cancelar=parar, estrategia=tarefa.estrategia,
+                metricas=MetricasExecucao(), limites=limites, regras=tarefa.regras,
+                executor=executor, executor_ocr=executor_ocr
+            )
+            contagens = {
+                'novos': resultado['novos'], 'alterados': resultado['alterados'],
+                'removidos': resultado['removidos'],
+                'erros': sum(1 for erro in resultado['dados'].coluna('erro') if erro),
+                'feitos': len(resultado['dados']),
+            }
+            registros = rodada.consolidar(tarefa)
+            log_tarefa(f"{registros} registros no consolidado")
+            if tarefa.xlsx_path:
+                exportar_consulta(tarefa.db_path, tarefa.xlsx_path, taxa=taxa)
+                log_tarefa(f"[OK] Excel criado: {tarefa.xlsx_path}")
+        except Exception as e:
+            log_tarefa(f"[ERRO] {e}")
+            return _finalizar(tarefa, FALHOU, mensagem=str(e))
+
+        if parar is not None and parar.is_set():
+            return _finalizar(tarefa, CANCELADA, mensagem='Interrompida', **contagens)
+        return _finalizar(tarefa, CONCLUIDA, **contagens)
+
+    def _finalizar(tarefa, estado, **campos):
+        rodada.atualizar(tarefa, estado=estado, fim=_agora(), **campos)
+        final = dict(campos, cliente=tarefa.cliente, pasta=tarefa.pasta, estado=estado)
+        if ao_concluir is not None:
+            ao_concluir(final)
+        return final
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, simultaneas), thread_name_prefix='ret-tarefa') as threads:
+            return list(threads.map(executar, rodada.pendentes))
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        if executor_ocr is not None:
+            executor_ocr.shutdown(wait=True, cancel_futures=True)
+        rodada.fechar()
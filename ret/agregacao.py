@@ -0,0 +1,225 @@
+"""Modelo colunar dos resultados e resumos vetorizados
+
+ModeloResultados guarda os registros em um DataFrame tipado (categorias
+para tipo de encargo, empresa e tipo de nota; float64 para os valores) e
+calcula cada resumo uma única vez, com operações vetorizadas: totais,
+por tipo, por empresa, por mês de vencimento e o saldo débito x crédito.
+A interface, o banco e o Excel consomem o mesmo modelo, sem refazer as
+contas cada um por conta própria.
+
+ResumoIncremental oferece os mesmos resumos somando lote a lote (usado
+pelo pipeline em streaming, ret/pipeline.py), com memória proporcional à
+quantidade de grupos e não à de registros.
+"""
+import pandas as pd
+
+from ret.cambio import obter_cambio
+from ret.empresas import NOTA_CREDITO, NOTA_DEBITO
+
+COLUNAS_CATEGORIA = ('tipo_encargo', 'empresa', 'nota_tipo')
+COLUNAS_VALOR = ('valor_total', 'quantidade', 'valor_unitario')
+COLUNAS_TEXTO = ('numero_nd', 'data_vencimento', 'arquivo', 'caminho', 'erro', 'falha')
+COLUNAS = COLUNAS_CATEGORIA + COLUNAS_VALOR + COLUNAS_TEXTO
+
+
+def taxas_por_data(vencimentos, taxa):
+    """Taxa EUR → R$ de cada vencimento: número fixo ou TabelaCambio (por data)"""
+    if hasattr(taxa, 'taxas'):
+        return taxa.taxas(vencimentos).to_numpy()
+    return float(taxa)
+
+
+class _Resumos:
+    """Resumo no formato de dicionários, comum ao modelo e ao resumo incremental"""
+
+    def resumo(self):
+        """Totais e resumo por tipo no formato de dicionários (calcular_resumo)"""
+        resumo = dict(self.totais())
+        resumo['por_tipo'] = {
+            linha.Index: {
+                'count': int(linha.arquivos),
+                'total': float(linha.valor_total),
+                'total_brl': float(linha.valor_total_brl),
+            }
+            for linha in self.por_tipo().itertuples()
+        }
+        return resumo
+
+
+class ModeloResultados(_Resumos):
+    """Registros do processamento em formato colunar, com os resumos calculados sob demanda"""
+
+    def __init__(self, df, taxa=None):
+        """Monta o modelo a partir de um DataFrame com as COLUNAS
+
+        'taxa' é um número fixo, uma TabelaCambio (cotação de cada
+        vencimento) ou None para o câmbio configurado (ret/cambio.py).
+        """
+        if taxa is None:
+            taxa = obter_cambio()
+
+        df = df.reindex(columns=COLUNAS)
+        for coluna in COLUNAS_CATEGORIA:
+            df[coluna] = df[coluna].fillna('').astype(str).astype('category')
+        for coluna in COLUNAS_VALOR:
+            # Colunas já em float64 sem lacunas (LoteRegistros) são usadas sem cópia
+            if df[coluna].dtype != 'float64' or df[coluna].hasnans:
+                df[coluna] = pd.to_numeric(df[coluna], errors='coerce').fillna(0.0).astype('float64')
+        for coluna in COLUNAS_TEXTO:
+            df[coluna] = df[coluna].fillna('').astype(str)
+
+        # Vencimento como data (DD/MM/AAAA ou DD-MM-AAAA); textos inválidos viram NaT
+        df['vencimento'] = pd.to_datetime(
+            df['data_vencimento'].str.replace('-', '/', regex=False),
+            format='%d/%m/%Y', errors='coerce'
+        )
+
+        df['taxa'] = taxas_por_data(df['vencimento'], taxa)
+        df['valor_total_brl'] = df['valor_total'] * df['taxa']
+        df['valor_unitario_brl'] = df['valor_unitario'] * df['taxa']
+
+        self.df = df
+        self.taxa = taxa
+        self._resumos = {}
+
+    @classmethod
+    def de_registros(cls, registros, taxa=None):
+        """Monta o modelo a partir dos registros (dicts) da extração ou do banco"""
+        return cls(pd.DataFrame(list(registros), columns=list(COLUNAS)), taxa)
+
+    def __len__(self):
+        return len(self.df)
+
+    def _calcular(self, nome, funcao):
+        """Calcula o resumo 'nome' uma única vez"""
+        if nome not in self._resumos:
+            self._resumos[nome] = funcao()
+        return self._resumos[nome]
+
+    def _agrupar(self, por):
+        """Arquivos, valor total, QT e valor em R$ por grupo"""
+        return self.df.groupby(por, observed=True, sort=True).agg(
+            arquivos=('valor_total', 'size'),
+            valor_total=('valor_total', 'sum'),
+            quantidade=('quantidade', 'sum'),
+            valor_total_brl=('valor_total_brl', 'sum'),
+        )
+
+    def totais(self):
+        """Totais gerais: arquivos, com valores, QT e valor (EUR e R$)"""
+        def calcular():
+            df = self.df
+            return {
+                'total_arquivos': len(df),
+                'com_valores': int((df['valor_total'] > 0).sum()),
+                'total_qt': float(df['quantidade'].sum()),
+                'total_geral': float(df['valor_total'].sum()),
+                'total_geral_brl': float(df['valor_total_brl'].sum()),
+            }
+        return self._calcular('totais', calcular)
+
+    def por_tipo(self):
+        """Resumo por tipo de encargo (DataFrame indexado pelo tipo)"""
+        return self._calcular('por_tipo', lambda: self._agrupar('tipo_encargo'))
+
+    def por_empresa(self):
+        """Resumo por empresa (DataFrame indexado pela empresa)"""
+        return self._calcular('por_empresa', lambda: self._agrupar('empresa'))
+
+    def por_mes(self):
+        """Resumo por mês de vencimento (registros sem data ficam de fora)"""
+        def calcular():
+            meses = self.df['vencimento'].dt.to_period('M').rename('mes')
+            return self._agrupar(meses)
+        return self._calcular('por_mes', calcular)
+
+    def debito_credito(self):
+        """Débitos, créditos e saldo (débitos - créditos), em R$"""
+        def calcular():
+            somas = self.df.groupby('nota_tipo', observed=True)['valor_total_brl'].sum()
+            debito = float(somas.get(NOTA_DEBITO, 0.0))
+            credito = float(somas.get(NOTA_CREDITO, 0.0))
+            return {'debito': debito, 'credito': credito, 'saldo': debito - credito}
+        return self._calcular('debito_credito', calcular)
+
+    def linhas(self, campos):
+        """Tuplas com os valores dos campos pedidos, linha a linha (na ordem do modelo)"""
+        return zip(*(self.df[campo].tolist() for campo in campos))
+
+    def datas_iso(self):
+        """data_vencimento em AAAA-MM-DD (textos não reconhecidos ficam como estão)"""
+        # Fatiamento de texto: bem mais rápido que dt.strftime em muitas linhas
+        datas = self.df['data_vencimento']
+        iso = datas.str[6:10] + '-' + datas.str[3:5] + '-' + datas.str[0:2]
+        return iso.where(self.df['vencimento'].notna(), datas)
+
+
+def _somar_grupos(acumulado, parcial):
+    """Soma dois resumos agrupados (as linhas de grupos iguais se juntam)"""
+    if parcial.index.dtype == 'category':
+        parcial = parcial.set_axis(parcial.index.astype(str))
+    if acumulado is None:
+        return parcial
+    return pd.concat([acumulado, parcial]).groupby(level=0, sort=True).sum()
+
+
+class ResumoIncremental(_Resumos):
+    """Os resumos do ModeloResultados, acumulados lote a lote
+
+    receber(modelo) soma os resumos de um lote (um ModeloResultados); os
+    métodos de consulta têm os mesmos nomes e formatos do modelo.
+    """
+
+    GRUPOS = ('por_tipo', 'por_empresa', 'por_mes')
+    nome = 'resumo'  # etapa medida quando usado como destino do pipeline
+
+    def __init__(self):
+        self._totais = {
+            'total_arquivos': 0, 'com_valores': 0, 'total_qt': 0.0, 'total_geral': 0.0, 'total_geral_brl': 0.0
+        }
+        self._notas = {'debito': 0.0, 'credito': 0.0}
+        self._grupos = dict.fromkeys(self.GRUPOS)
+
+    def receber(self, modelo):
+        """Soma os resumos de um lote"""
+        for chave, valor in modelo.totais().items():
+            self._totais[chave] += valor
+        notas = modelo.debito_credito()
+        self._notas['debito'] += notas['debito']
+        self._notas['credito'] += notas['credito']
+        for nome in self.GRUPOS:
+            self._grupos[nome] = _somar_grupos(self._grupos[nome], getattr(modelo, nome)())
+
+    def fechar(self):
+        pass
+
+    def _grupo(self, nome):
+        tabela = self._grupos[nome]
+        if tabela is None:
+            return pd.DataFrame({
+                'arquivos': pd.Series(dtype='int64'), 'valor_total': pd.Series(dtype='float64'),
+                'quantidade': pd.Series(dtype='float64'), 'valor_total_brl': pd.Series(dtype='float64'),
+            })
+        tabela = tabela.copy()
+        tabela['arquivos'] = tabela['arquivos'].astype('int64')
+        return tabela
+
+    def totais(self):
+        """Totais gerais: arquivos, com valores, QT e valor (EUR e R$)"""
+        return dict(self._totais)
+
+    def por_tipo(self):
+        """Resumo por tipo de encargo"""
+        return self._grupo('por_tipo')
+
+    def por_empresa(self):
+        """Resumo por empresa"""
+        return self._grupo('por_empresa')
+
+    def por_mes(self):
+        """Resumo por mês de vencimento"""
+        return self._grupo('por_mes')
+
+    def debito_credito(self):
+        """Débitos, créditos e saldo (débitos - créditos), em R$"""
+        return dict(self._notas, saldo=self._notas['debito'] - self._notas['credito'])
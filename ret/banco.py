@@ -0,0 +1,353 @@
+"""Camada de armazenamento SQLite (RET_dados.db)
+
+- Esquema versionado por PRAGMA user_version: cada migração em MIGRACOES
+  roda uma única vez, em ordem, inclusive sobre bancos criados por versões
+  anteriores do sistema;
+- WAL e pragmas ajustados para gravação em lote;
+- gravação com executemany em uma única transação;
+- data_vencimento guardada em ISO (AAAA-MM-DD), para que filtros por
+  período usem o índice; na leitura volta ao formato DD/MM/AAAA.
+"""
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+from ret.agregacao import ModeloResultados
+from ret.registro import LoteRegistros
+
+SQL_UPSERT = '''
+    INSERT INTO dados_ret (
+        tipo_encargo, empresa, nota_tipo, numero_nd,
+        data_vencimento, valor_total, quantidade, valor_unitario,
+        arquivo, caminho, data_processamento, falha
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (caminho, numero_nd) DO UPDATE SET
+        tipo_encargo = excluded.tipo_encargo,
+        empresa = excluded.empresa,
+        nota_tipo = excluded.nota_tipo,
+        data_vencimento = excluded.data_vencimento,
+        valor_total = excluded.valor_total,
+        quantidade = excluded.quantidade,
+        valor_unitario = excluded.valor_unitario,
+        arquivo = excluded.arquivo,
+        data_processamento = excluded.data_processamento,
+        falha = excluded.falha
+'''
+
+SQL_MANIFESTO = (
+    'INSERT OR REPLACE INTO arquivos_ret '
+    '(caminho, tamanho, mtime_ns, hash, ultimo_processamento) VALUES (?, ?, ?, ?, ?)'
+)
+
+CAMPOS_LEITURA = (
+    'tipo_encargo', 'empresa', 'nota_tipo', 'numero_nd', 'data_vencimento',
+    'valor_total', 'quantidade', 'valor_unitario', 'arquivo', 'caminho', 'falha'
+)
+
+RE_DATA_BR = re.compile(r'^(\d{2})[/-](\d{2})[/-](\d{4})$')
+RE_DATA_ISO = re.compile(r'^(\d{4})-(\d{2})-(\d{2})$')
+
+
+def data_iso(data):
+    """Converte DD/MM/AAAA (ou DD-MM-AAAA) em AAAA-MM-DD; outros textos ficam como estão"""
+    m = RE_DATA_BR.match(data or '')
+    if m:
+        return f"{m.group(3)}-{m.group(2)}-{m.group(1)}"
+    return data
+
+
+def data_br(data):
+    """Converte AAAA-MM-DD em DD/MM/AAAA (formato exibido na interface e no Excel)"""
+    m = RE_DATA_ISO.match(data or '')
+    if m:
+        return f"{m.group(3)}/{m.group(2)}/{m.group(1)}"
+    return data
+
+
+def _migracao_1(cursor):
+    """Tabela original dados_ret"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS dados_ret (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo_encargo TEXT,
+            empresa TEXT,
+            nota_tipo TEXT,
+            numero_nd TEXT,
+            data_vencimento TEXT,
+            valor_total REAL,
+            quantidade REAL,
+            valor_unitario REAL,
+            arquivo TEXT,
+            caminho TEXT,
+            data_processamento TEXT
+        )
+    ''')
+
+
+def _migracao_2(cursor):
+    """Chave única (caminho, numero_nd) e manifesto de arquivos"""
+    # Bancos antigos, que inseriam tudo de novo a cada gravação, têm as
+    # duplicatas removidas (fica a gravação mais recente) antes do índice
+    existe_chave = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_dados_ret_chave'"
+    ).fetchone()
+    if not existe_chave:
+        cursor.execute('''
+            DELETE FROM dados_ret WHERE id NOT IN (
+                SELECT MAX(id) FROM dados_ret GROUP BY caminho, numero_nd
+            )
+        ''')
+        cursor.execute('CREATE UNIQUE INDEX idx_dados_ret_chave ON dados_ret (caminho, numero_nd)')
+
+    # Manifesto dos PDFs já processados (usado pela sincronização incremental)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS arquivos_ret (
+            caminho TEXT PRIMARY KEY,
+            tamanho INTEGER,
+            mtime_ns INTEGER,
+            hash TEXT,
+            ultimo_processamento TEXT
+        )
+    ''')
+
+
+def _migracao_3(cursor):
+    """Datas em ISO e índices para os filtros por empresa, tipo e vencimento"""
+    cursor.execute('''
+        UPDATE dados_ret
+        SET data_vencimento = substr(data_vencimento, 7, 4) || '-' ||
+                              substr(data_vencimento, 4, 2) || '-' ||
+                              substr(data_vencimento, 1, 2)
+        WHERE data_vencimento GLOB '[0-9][0-9][/-][0-9][0-9][/-][0-9][0-9][0-9][0-9]'
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_dados_ret_empresa ON dados_ret (empresa)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_dados_ret_tipo ON dados_ret (tipo_encargo)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_dados_ret_vencimento ON dados_ret (data_vencimento)')
+
+
+def _migracao_4(cursor):
+    """Motivo da falha de extração (timeout, oom, corrupt; vazio = extraído)"""
+    cursor.execute("ALTER TABLE dados_ret ADD COLUMN falha TEXT NOT NULL DEFAULT ''")
+
+
+def _migracao_5(cursor):
+    """Índice de cobertura para os resumos agregados em SQL (ret/consulta.py)"""
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_dados_ret_resumo ON dados_ret (
+            tipo_encargo, empresa, nota_tipo, data_vencimento, valor_total, quantidade
+        )
+    ''')
+
+
+# (versão, migração): novas alterações de esquema entram no fim da lista
+MIGRACOES = [
+    (1, _migracao_1),
+    (2, _migracao_2),
+    (3, _migracao_3),
+    (4, _migracao_4),
+    (5, _migracao_5),
+]
+
+
+def migrar(conexao):
+    """Aplica as migrações pendentes, cada uma em sua própria transação"""
+    versao_atual = conexao.execute('PRAGMA user_version').fetchone()[0]
+    for versao, migracao in MIGRACOES:
+        if versao <= versao_atual:
+            continue
+        with conexao:
+            migracao(conexao.cursor())
+            conexao.execute(f'PRAGMA user_version = {versao}')
+
+
+def abrir_banco(db_path):
+    """Abre o banco com os pragmas de desempenho e o esquema atualizado"""
+    conexao = sqlite3.connect(db_path, timeout=30)
+    conexao.execute('PRAGMA journal_mode=WAL')
+    conexao.execute('PRAGMA synchronous=NORMAL')
+    conexao.execute('PRAGMA temp_store=MEMORY')
+    conexao.execute('PRAGMA cache_size=-20000')
+    migrar(conexao)
+    return conexao
+
+
+def _linhas(dados_processados, agora):
+    """Converte os registros (lista, LoteRegistros ou ModeloResultados) nas tuplas do INSERT"""
+    if isinstance(dados_processados, ModeloResultados):
+        df = dados_processados.df
+        yield from zip(
+            df['tipo_encargo'].tolist(), df['empresa'].tolist(), df['nota_tipo'].tolist(),
+            df['numero_nd'].tolist(), dados_processados.datas_iso().tolist(),
+            df['valor_total'].tolist(), df['quantidade'].tolist(), df['valor_unitario'].tolist(),
+            df['arquivo'].tolist(), df['caminho'].tolist(), [agora] * len(df), df['falha'].tolist()
+        )
+        return
+
+    if isinstance(dados_processados, LoteRegistros):
+        for (tipo, empresa, nota, numero, data, total, qt, unitario,
+             arquivo, caminho, falha) in dados_processados.tuplas(CAMPOS_LEITURA):
+            yield (tipo, empresa, nota, numero, data_iso(data), total, qt, unitario,
+                   arquivo, caminho, agora, falha)
+        return
+
+    for d in dados_processados:
+        yield (
+            d['tipo_encargo'], d['empresa'], d['nota_tipo'], d['numero_nd'],
+            data_iso(d['data_vencimento']), d['valor_total'], d['quantidade'], d['valor_unitario'],
+            d['arquivo'], d['caminho'], agora, d.get('falha', '')
+        )
+
+
+def gravar_registros(conexao, dados_processados):
+    """Insere ou atualiza (upsert) os registros pela chave (caminho, numero_nd)
+
+    Não abre transação própria: quem chama decide o escopo (with conexao).
+    """
+    agora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    cursor = conexao.executemany(SQL_UPSERT, _linhas(dados_processados, agora))
+    return cursor.rowcount
+
+
+def _caminhos_e_erros(dados_processados):
+    """Pares (caminho, erro) dos registros (lista, LoteRegistros ou ModeloResultados)"""
+    if isinstance(dados_processados, ModeloResultados):
+        df = dados_processados.df
+        return zip(df['caminho'].tolist(), df['erro'].tolist())
+    if isinstance(dados_processados, LoteRegistros):
+        return dados_processados.tuplas(('caminho', 'erro'))
+    return ((d['caminho'], d.get('erro', '')) for d in dados_processados)
+
+
+def gravar_manifesto(conexao, assinaturas, agora=None):
+    """Grava as entradas do manifesto ({caminho: (tamanho, mtime_ns, hash)})
+
+    Não abre transação própria, como gravar_registros.
+    """
+    agora = agora or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    conexao.executemany(SQL_MANIFESTO, [
+        (caminho,) + tuple(assinatura) + (agora,) for caminho, assinatura in assinaturas.items()
+    ])
+
+
+def substituir_registros(conexao, dados_processados, assinaturas=None):
+    """Troca os registros dos arquivos processados pelos novos e atualiza o manifesto
+
+    Os registros antigos de cada arquivo saem antes do upsert: um arquivo
+    cujo ND mudou não deixa a linha do ND anterior para trás. Com
+    'assinaturas' ({caminho: (tamanho, mtime_ns, hash)}), os arquivos
+    extraídos sem erro entram no manifesto (arquivos_ret), e a
+    sincronização seguinte (ret/sincronizacao.py) não os extrai de novo;
+    os com erro ficam de fora, para nova tentativa. Não abre transação
+    própria. Devolve a quantidade de registros gravados.
+    """
+    caminhos = {}
+    for caminho, erro in _caminhos_e_erros(dados_processados):
+        caminhos[caminho] = caminhos.get(caminho, False) or bool(erro)
+    conexao.executemany('DELETE FROM dados_ret WHERE caminho = ?', [(caminho,) for caminho in caminhos])
+    gravados = gravar_registros(conexao, dados_processados)
+    if assinaturas is not None:
+        gravar_manifesto(conexao, {
+            caminho: assinaturas[caminho] for caminho, com_erro in caminhos.items()
+            if not com_erro and caminho in assinaturas
+        })
+    return gravados
+
+
+def assinaturas_arquivos(caminhos):
+    """{caminho: (tamanho, mtime_ns, hash)} dos arquivos que ainda podem ser lidos"""
+    from ret.cache import hash_arquivo
+
+    assinaturas = {}
+    for caminho in caminhos:
+        try:
+            st = os.stat(caminho)
+            assinaturas[caminho] = (st.st_size, st.st_mtime_ns, hash_arquivo(caminho))
+        except OSError:
+            pass  # sem entrada no manifesto: a próxima sincronização o extrai
+    return assinaturas
+
+
+def salvar_dados(dados_processados, db_path):
+    """Salva os registros no banco SQLite (uma transação) e devolve a quantidade gravada
+
+    Aceita uma lista de registros, um LoteRegistros ou um ModeloResultados.
+    Os registros antigos dos mesmos arquivos são substituídos e o manifesto
+    é gravado na mesma transação (veja substituir_registros).
+    """
+    assinaturas = assinaturas_arquivos({caminho for caminho, _ in _caminhos_e_erros(dados_processados)})
+    conexao = abrir_banco(db_path)
+    try:
+        with conexao:
+            gravados = substituir_registros(conexao, dados_processados, assinaturas)
+    finally:
+        conexao.close()
+
+    return gravados
+
+
+def iterar_dados(db_path):
+    """Percorre os registros gravados um a um (no formato da extração), sem carregar tudo"""
+    conexao = abrir_banco(db_path)
+    try:
+        cursor = conexao.execute(f'''
+            SELECT {', '.join(CAMPOS_LEITURA)}
+            FROM dados_ret ORDER BY caminho, numero_nd
+        ''')
+        for linha in cursor:
+            d = dict(zip(CAMPOS_LEITURA, linha))
+            d['data_vencimento'] = data_br(d['data_vencimento'])
+            # A lista de candidatos não é gravada; o valor total a representa
+            d['valores_encontrados'] = [d['valor_total']] if d['valor_total'] else []
+            d['erro'] = ''
+            yield d
+    finally:
+        conexao.close()
+
+
+def carregar_dados(db_path):
+    """Lê os registros gravados, no mesmo formato produzido pela extração"""
+    return list(iterar_dados(db_path))
+
+
+def _sql_leitura(onde):
+    """SELECT dos registros, com a condição 'onde' opcional"""
+    filtro = f"WHERE {onde} " if onde else ""
+    return f"SELECT {', '.join(CAMPOS_LEITURA)} FROM dados_ret {filtro}ORDER BY caminho, numero_nd"
+
+
+def _modelo_do_banco(df, taxa):
+    """ModeloResultados de linhas lidas do banco (datas de volta a DD/MM/AAAA)"""
+    datas = df['data_vencimento'].fillna('')
+    br = datas.str[8:10] + '/' + datas.str[5:7] + '/' + datas.str[0:4]
+    df['data_vencimento'] = br.where(datas.str.fullmatch(r'\d{4}-\d{2}-\d{2}'), datas)
+    return ModeloResultados(df, taxa)
+
+
+def carregar_resultados(db_path, taxa=None, onde='', parametros=()):
+    """Lê os registros gravados direto para um ModeloResultados (leitura colunar)
+
+    'onde' é uma condição SQL opcional, com '?' para os 'parametros'
+    (montada por ret/consulta.py a partir de um FiltroConsulta).
+    """
+    conexao = abrir_banco(db_path)
+    try:
+        df = pd.read_sql_query(_sql_leitura(onde), conexao, params=tuple(parametros))
+    finally:
+        conexao.close()
+    return _modelo_do_banco(df, taxa)
+
+
+def iterar_resultados(db_path, taxa=None, onde='', parametros=(), tamanho_lote=500):
+    """Como carregar_resultados, em ModeloResultados de até 'tamanho_lote' linhas"""
+    conexao = abrir_banco(db_path)
+    try:
+        lotes = pd.read_sql_query(
+            _sql_leitura(onde), conexao, params=tuple(parametros), chunksize=tamanho_lote
+        )
+        for df in lotes:
+            yield _modelo_do_banco(df, taxa)
+    finally:
+        conexao.close()
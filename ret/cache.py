@@ -0,0 +1,275 @@
+"""Cache persistente da extração, indexado pelo conteúdo (hash) dos PDFs
+
+Cada PDF é identificado pelo SHA-256 do seu conteúdo. Para não ler o
+arquivo inteiro a cada execução, o par (tamanho, mtime) do caminho fica
+guardado: se não mudou, o hash conhecido é reaproveitado; se mudou, o
+hash é recalculado (um arquivo apenas "tocado" continua sendo um acerto).
+Quem já calculou o hash (a sincronização, ret/sincronizacao.py) o repassa
+a obter(), e o arquivo não é lido de novo.
+
+Para cada conteúdo e versão do texto (VERSAO_TEXTO + estratégia de
+páginas) são guardados o texto extraído e os campos analisados, com a
+VERSAO_PARSER de ret.extracao. A chave é o par (hash, versão do texto):
+tarefas com estratégias diferentes (ret/agendador.py) sobre os mesmos
+PDFs têm cada uma a sua entrada, sem sobrescrever a da outra:
+- entrada com o parser atual: o registro sai direto do cache;
+- só o parser mudou: o texto em cache é reanalisado, sem abrir o PDF;
+- sem entrada (conteúdo novo ou texto de outra versão): o PDF é extraído.
+
+O tamanho total é limitado; ao ultrapassar o limite, as entradas menos
+usadas recentemente (LRU) são descartadas.
+
+Uma mesma instância pode ser usada por várias threads (as tarefas
+simultâneas do agendador, ret/agendador.py): o acesso ao banco é
+serializado por uma trava.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from ret.config import DIRETORIO_CACHE, LIMITE_CACHE_MB
+from ret.empresas import completar_pelo_texto
+from ret.extracao import (
+    ESTRATEGIA_PADRAO, SEPARADOR_PAGINAS, VERSAO_PARSER, analisar_paginas,
+    campos_conteudo, dados_vazios, versao_texto
+)
+
+NOME_ARQUIVO_CACHE = 'extracao.db'
+
+# Versão do esquema do banco do cache (PRAGMA user_version)
+VERSAO_ESQUEMA = 1
+
+# Acessos (LRU) e gravações acumulados antes de gravar/confirmar no banco
+LOTE_ACESSOS = 500
+LOTE_GRAVACOES = 200
+
+
+def hash_arquivo(caminho, tamanho_bloco=1024 * 1024):
+    """Calcula o SHA-256 do conteúdo do arquivo
+
+    Lido em blocos, sem mmap: o hash roda no processo principal, onde um
+    arquivo truncado durante o mapeamento (SIGBUS) derrubaria o programa.
+    """
+    h = hashlib.sha256()
+    bloco = bytearray(tamanho_bloco)
+    visao = memoryview(bloco)
+    with open(caminho, 'rb') as f:
+        while True:
+            lidos = f.readinto(bloco)
+            if not lidos:
+                break
+            h.update(visao[:lidos])
+    return h.hexdigest()
+
+
+class CacheExtracao:
+    """Cache em SQLite do texto e dos campos extraídos de cada PDF"""
+
+    def __init__(self, diretorio=None, limite_mb=LIMITE_CACHE_MB):
+        diretorio = diretorio or DIRETORIO_CACHE
+        os.makedirs(diretorio, exist_ok=True)
+        self.caminho_db = os.path.join(diretorio, NOME_ARQUIVO_CACHE)
+        self.limite_bytes = int(limite_mb * 1024 * 1024)
+        self.acertos = 0
+        self.reanalisados = 0
+        self.faltas = 0
+        self._acessos = {}
+        self._gravacoes = 0
+        self._trava = threading.Lock()
+
+        self.conexao = sqlite3.connect(self.caminho_db, check_same_thread=False)
+        self.conexao.execute('PRAGMA journal_mode=WAL')
+        self.conexao.execute('PRAGMA synchronous=NORMAL')
+        self.conexao.execute('''
+            CREATE TABLE IF NOT EXISTS arquivos (
+                caminho TEXT PRIMARY KEY,
+                tamanho INTEGER,
+                mtime_ns INTEGER,
+                hash TEXT
+            )
+        ''')
+        self._migrar()
+        self._total_bytes = self.conexao.execute(
+            'SELECT COALESCE(SUM(bytes), 0) FROM conteudo'
+        ).fetchone()[0]
+        if self._total_bytes > self.limite_bytes:
+            self._despejar()
+
+    def _migrar(self):
+        """Cria a tabela conteudo com a chave (hash, versao_texto)
+
+        Caches de versões anteriores, com a chave só pelo hash, têm as
+        entradas copiadas para a tabela nova (a versão passa a texto).
+        """
+        if self.conexao.execute('PRAGMA user_version').fetchone()[0] >= VERSAO_ESQUEMA:
+            return
+        with self.conexao:
+            antiga = self.conexao.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'conteudo'"
+            ).fetchone()
+            if antiga:
+                self.conexao.execute('DROP INDEX IF EXISTS idx_conteudo_acesso')
+                self.conexao.execute('ALTER TABLE conteudo RENAME TO conteudo_antigo')
+            self.conexao.execute('''
+                CREATE TABLE conteudo (
+                    hash TEXT,
+                    versao_texto TEXT,
+                    texto TEXT,
+                    versao_parser TEXT,
+                    dados TEXT,
+                    bytes INTEGER,
+                    ultimo_acesso REAL,
+                    PRIMARY KEY (hash, versao_texto)
+                )
+            ''')
+            self.conexao.execute('CREATE INDEX idx_conteudo_acesso ON conteudo (ultimo_acesso)')
+            if antiga:
+                self.conexao.execute('''
+                    INSERT INTO conteudo
+                    SELECT hash, CAST(versao_texto AS TEXT), texto, versao_parser, dados, bytes, ultimo_acesso
+                    FROM conteudo_antigo
+                ''')
+                self.conexao.execute('DROP TABLE conteudo_antigo')
+            self.conexao.execute(f'PRAGMA user_version = {VERSAO_ESQUEMA}')
+
+    def _hash(self, caminho, assinatura=None):
+        """Obtém o hash do arquivo, recalculando só se tamanho/mtime mudaram
+
+        Com 'assinatura' (tamanho, mtime_ns, hash) já calculada por quem
+        chama, o arquivo não é lido. O hash é calculado fora da trava.
+        """
+        if assinatura is not None:
+            tamanho, mtime_ns, h = assinatura
+        else:
+            st = os.stat(caminho)
+            tamanho, mtime_ns = st.st_size, st.st_mtime_ns
+            with self._trava:
+                linha = self.conexao.execute(
+                    'SELECT tamanho, mtime_ns, hash FROM arquivos WHERE caminho = ?', (caminho,)
+                ).fetchone()
+            if linha and linha[0] == tamanho and linha[1] == mtime_ns:
+                return linha[2]
+            h = hash_arquivo(caminho)
+
+        with self._trava:
+            self.conexao.execute(
+                'INSERT OR REPLACE INTO arquivos (caminho, tamanho, mtime_ns, hash) VALUES (?, ?, ?, ?)',
+                (caminho, tamanho, mtime_ns, h)
+            )
+        return h
+
+    def obter(self, caminho, estrategia=ESTRATEGIA_PADRAO, assinatura=None):
+        """Procura o PDF no cache
+
+        Devolve (dados, chave): dados é o registro pronto ou None se o PDF
+        precisa ser extraído; chave deve ser repassada a gravar().
+        'assinatura' (tamanho, mtime_ns, hash) evita ler o arquivo de novo
+        quando quem chama já calculou o hash (ret/sincronizacao.py).
+        """
+        try:
+            h = self._hash(caminho, assinatura)
+        except OSError:
+            return None, None
+        with self._trava:
+            return self._obter(caminho, (h, versao_texto(estrategia)))
+
+    def _obter(self, caminho, chave):
+        linha = self.conexao.execute(
+            'SELECT texto, versao_parser, dados FROM conteudo WHERE hash = ? AND versao_texto = ?',
+            chave
+        ).fetchone()
+        if not linha:
+            self.faltas += 1
+            return None, chave
+
+        texto, versao_parser, dados_json = linha
+        dados = dados_vazios(caminho)
+
+        if versao_parser == VERSAO_PARSER:
+            dados.update(json.loads(dados_json))
+            # Empresa e nota dependem do caminho: as que o nome não trouxe vêm da primeira página
+            completar_pelo_texto(dados, texto.split(SEPARADOR_PAGINAS, 1)[0])
+            self.acertos += 1
+            self._registrar_acesso(chave)
+        else:
+            # Padrões mudaram: reaproveita o texto e só refaz a análise
+            analisar_paginas(dados, texto.split(SEPARADOR_PAGINAS))
+            self._salvar(chave, texto, dados)
+            self.reanalisados += 1
+
+        return dados, chave
+
+    def gravar(self, chave, dados):
+        """Guarda o resultado de uma extração (dados['texto'] é removido do registro)"""
+        texto = dados.pop('texto', None)
+        if chave is None or texto is None or dados.get('erro'):
+            return
+        with self._trava:
+            self._salvar(chave, texto, dados)
+
+    def _salvar(self, chave, texto, dados):
+        """Grava/atualiza a entrada do conteúdo e aplica o limite de tamanho"""
+        h, versao = chave
+        dados_json = json.dumps(campos_conteudo(dados))
+        tamanho = len(texto.encode('utf-8')) + len(dados_json)
+
+        anterior = self.conexao.execute(
+            'SELECT bytes FROM conteudo WHERE hash = ? AND versao_texto = ?', chave
+        ).fetchone()
+        if anterior:
+            self._total_bytes -= anterior[0]
+
+        self.conexao.execute(
+            'INSERT OR REPLACE INTO conteudo '
+            '(hash, versao_texto, texto, versao_parser, dados, bytes, ultimo_acesso) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (h, versao, texto, VERSAO_PARSER, dados_json, tamanho, time.time())
+        )
+        self._total_bytes += tamanho
+
+        if self._total_bytes > self.limite_bytes:
+            self._despejar()
+
+        self._gravacoes += 1
+        if self._gravacoes >= LOTE_GRAVACOES:
+            self.conexao.commit()
+            self._gravacoes = 0
+
+    def _registrar_acesso(self, chave):
+        """Acumula acessos para atualizar o LRU em lote"""
+        self._acessos[chave] = time.time()
+        if len(self._acessos) >= LOTE_ACESSOS:
+            self._gravar_acessos()
+
+    def _gravar_acessos(self):
+        if self._acessos:
+            self.conexao.executemany(
+                'UPDATE conteudo SET ultimo_acesso = ? WHERE hash = ? AND versao_texto = ?',
+                [(instante,) + chave for chave, instante in self._acessos.items()]
+            )
+            self._acessos = {}
+
+    def _despejar(self):
+        """Remove as entradas menos usadas até ficar em 90% do limite"""
+        self._gravar_acessos()
+        alvo = self.limite_bytes * 0.9
+        cursor = self.conexao.execute(
+            'SELECT hash, versao_texto, bytes FROM conteudo ORDER BY ultimo_acesso'
+        )
+        remover = []
+        for h, versao, tamanho in cursor:
+            if self._total_bytes <= alvo:
+                break
+            remover.append((h, versao))
+            self._total_bytes -= tamanho
+        self.conexao.executemany('DELETE FROM conteudo WHERE hash = ? AND versao_texto = ?', remover)
+
+    def fechar(self):
+        """Grava as pendências e fecha o banco do cache"""
+        with self._trava:
+            self._gravar_acessos()
+            self.conexao.commit()
+            self.conexao.close()
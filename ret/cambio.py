@@ -0,0 +1,133 @@
+"""Taxas de câmbio EUR → BRL por data, lidas de um arquivo local
+
+O arquivo (CSV ou SQLite) traz uma cotação por dia útil. Cada valor é
+convertido pela cotação do seu vencimento ou, se não houver cotação nesse
+dia (fim de semana, feriado), pela do dia útil anterior: uma junção
+"as-of" (pandas.merge_asof, direção backward) feita de uma vez para todas
+as datas distintas do lote. Datas já resolvidas ficam em memória, e as
+tabelas carregadas ficam em cache enquanto o arquivo não muda.
+
+Sem arquivo de cotações (ou para datas ausentes/anteriores à primeira
+cotação) vale a taxa fixa TAXA_EUR_BRL. Tudo funciona offline.
+
+Formato do CSV (separador ',' ou ';', decimal '.' ou ','):
+    data,taxa
+    2025-12-15,6.3123
+    16/12/2025;6,2988
+Formato SQLite: tabela 'cambio' com as colunas data e taxa.
+"""
+import os
+import sqlite3
+
+import pandas as pd
+
+from ret.config import ARQUIVO_CAMBIO, TAXA_EUR_BRL
+
+EXTENSOES_SQLITE = ('.db', '.sqlite', '.sqlite3')
+
+# Tabelas carregadas: {caminho: ((tamanho, mtime_ns), TabelaCambio)}
+_TABELAS = {}
+
+
+def _datas(coluna):
+    """Converte textos AAAA-MM-DD ou DD/MM/AAAA (DD-MM-AAAA) em datas"""
+    texto = coluna.astype(str).str.strip()
+    iso = pd.to_datetime(texto, format='%Y-%m-%d', errors='coerce')
+    br = pd.to_datetime(texto.str.replace('-', '/', regex=False), format='%d/%m/%Y', errors='coerce')
+    return iso.fillna(br)
+
+
+def _taxas(coluna):
+    """Converte as cotações em float, aceitando vírgula decimal"""
+    if coluna.dtype == object or pd.api.types.is_string_dtype(coluna):
+        coluna = coluna.astype(str).str.strip().str.replace(',', '.', regex=False)
+    return pd.to_numeric(coluna, errors='coerce')
+
+
+class TabelaCambio:
+    """Cotações EUR → BRL indexadas por data, com conversão vetorizada"""
+
+    def __init__(self, datas, taxas, taxa_padrao=TAXA_EUR_BRL):
+        cotacoes = pd.DataFrame({'data': _datas(pd.Series(datas)), 'taxa': _taxas(pd.Series(taxas))})
+        cotacoes = cotacoes.dropna()
+        cotacoes = cotacoes[cotacoes['taxa'] > 0]
+        cotacoes['data'] = cotacoes['data'].astype('datetime64[ns]')
+        cotacoes = cotacoes.sort_values('data').drop_duplicates('data', keep='last')
+
+        self.cotacoes = cotacoes.reset_index(drop=True)
+        self.taxa_padrao = taxa_padrao
+        # Datas já resolvidas: {data: taxa}
+        self._resolvidas = pd.Series(dtype='float64', index=pd.DatetimeIndex([], dtype='datetime64[ns]'))
+
+    @classmethod
+    def de_csv(cls, caminho, taxa_padrao=TAXA_EUR_BRL):
+        """Lê um CSV com as colunas data e taxa (ou as duas primeiras colunas)"""
+        df = pd.read_csv(caminho, sep=None, engine='python', dtype=str)
+        colunas = {c.strip().lower(): c for c in df.columns}
+        data = colunas.get('data', df.columns[0])
+        taxa = colunas.get('taxa', df.columns[1])
+        return cls(df[data], df[taxa], taxa_padrao)
+
+    @classmethod
+    def de_sqlite(cls, caminho, taxa_padrao=TAXA_EUR_BRL):
+        """Lê a tabela 'cambio' (data, taxa) de um banco SQLite"""
+        conexao = sqlite3.connect(caminho)
+        try:
+            df = pd.read_sql_query('SELECT data, taxa FROM cambio', conexao)
+        finally:
+            conexao.close()
+        return cls(df['data'], df['taxa'], taxa_padrao)
+
+    def __len__(self):
+        return len(self.cotacoes)
+
+    def _resolver(self, datas):
+        """Cotação de cada data distinta ainda não resolvida (uma junção as-of)"""
+        novas = pd.DataFrame({'data': datas}).sort_values('data')
+        juncao = pd.merge_asof(novas, self.cotacoes, on='data', direction='backward')
+        resolvidas = pd.Series(juncao['taxa'].to_numpy(), index=pd.DatetimeIndex(juncao['data']))
+        if len(self._resolvidas):
+            self._resolvidas = pd.concat([self._resolvidas, resolvidas])
+        else:
+            self._resolvidas = resolvidas
+
+    def taxas(self, datas):
+        """Taxa de cada data (Series alinhada às datas; sem cotação = taxa padrão)"""
+        datas = pd.Series(datas).astype('datetime64[ns]')
+        if not len(self.cotacoes):
+            return pd.Series(self.taxa_padrao, index=datas.index, dtype='float64')
+
+        distintas = pd.Series(datas.dropna().unique()).astype('datetime64[ns]')
+        faltam = distintas[~distintas.isin(self._resolvidas.index)]
+        if len(faltam):
+            self._resolver(faltam)
+
+        return datas.map(self._resolvidas).astype('float64').fillna(self.taxa_padrao)
+
+    def taxa(self, data):
+        """Taxa de uma única data (datetime, AAAA-MM-DD ou DD/MM/AAAA)"""
+        return float(self.taxas(_datas(pd.Series([data])))[0])
+
+
+def carregar_cambio(caminho, taxa_padrao=TAXA_EUR_BRL):
+    """Carrega a tabela do arquivo (CSV ou SQLite), reaproveitando a já carregada se ele não mudou"""
+    st = os.stat(caminho)
+    versao = (st.st_size, st.st_mtime_ns)
+    carregada = _TABELAS.get(caminho)
+    if carregada is not None and carregada[0] == versao and carregada[1].taxa_padrao == taxa_padrao:
+        return carregada[1]
+
+    if caminho.lower().endswith(EXTENSOES_SQLITE):
+        tabela = TabelaCambio.de_sqlite(caminho, taxa_padrao)
+    else:
+        tabela = TabelaCambio.de_csv(caminho, taxa_padrao)
+    _TABELAS[caminho] = (versao, tabela)
+    return tabela
+
+
+def obter_cambio(caminho=None):
+    """Tabela de cotações configurada ou, se não houver arquivo, a taxa fixa TAXA_EUR_BRL"""
+    caminho = caminho or ARQUIVO_CAMBIO
+    if caminho and os.path.isfile(caminho):
+        return carregar_cambio(caminho)
+    return TAXA_EUR_BRL
@@ -0,0 +1,144 @@
+"""Extrator de campos em passada única sobre o texto das páginas
+
+Todos os padrões registrados são combinados em uma única expressão
+regular (alternativas nomeadas), compilada uma vez. Cada página é
+percorrida uma só vez com finditer, e cada trecho do texto pertence a no
+máximo um campo: na mesma posição vence o padrão registrado primeiro, e
+um trecho consumido por um campo não é reaproveitado por outro. Isso
+evita, por exemplo, que "R$ 1.234,56" seja contado como valor duas vezes
+(pelo padrão de R$ e pelo padrão de número com vírgula).
+
+Campos registrados com consumir=False casam sem consumir o texto (como
+lookahead): o trecho continua disponível para os demais. É o caso da
+quantidade: em "Quantidade 1.234,56" o número também é um valor, como
+nas buscas separadas da versão anterior.
+
+Novos campos (CNPJ, período, contrato...) são adicionados com
+registrar_campo(), sem uma nova varredura do texto.
+"""
+import hashlib
+import re
+from collections import namedtuple
+
+# Ocorrência de um campo no texto, já convertida para o tipo do campo
+Ocorrencia = namedtuple('Ocorrencia', 'campo valor pagina inicio fim')
+
+DefinicaoCampo = namedtuple(
+    'DefinicaoCampo', 'nome padrao conversor ignorar_caixa multiplo consumir', defaults=(True,)
+)
+
+
+def numero_br(texto):
+    """Converte '1.234,56' em 1234.56"""
+    try:
+        return float(texto.replace('.', '').replace(',', '.'))
+    except ValueError:
+        return None
+
+
+def numero_decimal(texto):
+    """Converte '12,5' ou '12.5' em 12.5"""
+    try:
+        return float(texto.replace(',', '.'))
+    except ValueError:
+        return None
+
+
+class ExtratorCampos:
+    """Conjunto de campos compilados em uma única expressão regular"""
+
+    def __init__(self):
+        self.definicoes = []
+        self._regex = None
+        self._grupos = {}
+
+    def registrar_campo(self, nome, padrao, conversor=str, ignorar_caixa=False, multiplo=False,
+                        consumir=True):
+        """Registra um padrão para o campo 'nome'
+
+        O padrão deve ter exatamente um grupo de captura (o valor do campo).
+        Vários padrões podem alimentar o mesmo campo; a ordem de registro
+        define a prioridade quando dois padrões casam na mesma posição.
+        multiplo=True guarda todas as ocorrências; senão só a primeira.
+        consumir=False deixa o trecho casado disponível para os outros campos.
+        """
+        if re.compile(padrao).groups != 1:
+            raise ValueError(f"O padrão do campo '{nome}' deve ter exatamente um grupo de captura")
+        self.definicoes.append(DefinicaoCampo(nome, padrao, conversor, ignorar_caixa, multiplo, consumir))
+        self._regex = None
+
+    def _compilar(self):
+        """Monta a expressão combinada: (?P<c0>...)|(?P<c1>...)|...
+
+        Os campos que não consomem o texto viram lookaheads e vêm antes:
+        casam vazio na posição e, em seguida, os demais ainda podem casar
+        a partir dela.
+        """
+        alternativas = []
+        ordem = sorted(enumerate(self.definicoes), key=lambda item: item[1].consumir)
+        for i, definicao in ordem:
+            padrao = f"(?i:{definicao.padrao})" if definicao.ignorar_caixa else definicao.padrao
+            if definicao.consumir:
+                alternativas.append(f"(?P<c{i}>{padrao})")
+            else:
+                alternativas.append(f"(?=(?P<c{i}>{padrao}))")
+        self._regex = re.compile('|'.join(alternativas))
+        # Grupo de captura do valor = grupo externo da alternativa + 1
+        self._grupos = {
+            f"c{i}": (definicao, self._regex.groupindex[f"c{i}"] + 1)
+            for i, definicao in enumerate(self.definicoes)
+        }
+
+    def assinatura(self):
+        """Identifica o conjunto de campos (usada na versão do cache de extração)"""
+        chave = repr([
+            (d.nome, d.padrao, d.ignorar_caixa, d.multiplo) + (() if d.consumir else (False,))
+            for d in self.definicoes
+        ])
+        return hashlib.sha1(chave.encode('utf-8')).hexdigest()[:12]
+
+    def ocorrencias(self, paginas):
+        """Percorre as páginas uma única vez, gerando as ocorrências em ordem"""
+        if self._regex is None:
+            self._compilar()
+        grupos = self._grupos
+        for num_pagina, texto in enumerate(paginas, 1):
+            if not texto:
+                continue
+            for m in self._regex.finditer(texto):
+                definicao, grupo = grupos[m.lastgroup]
+                valor = definicao.conversor(m.group(grupo))
+                if valor is not None:
+                    yield Ocorrencia(definicao.nome, valor, num_pagina, m.start(grupo), m.end(grupo))
+
+    def extrair(self, paginas):
+        """Devolve {campo: valor} (ou lista de valores, para campos múltiplos)"""
+        multiplos = {d.nome for d in self.definicoes if d.multiplo}
+        resultado = {nome: [] for nome in multiplos}
+        for ocorrencia in self.ocorrencias(paginas):
+            if ocorrencia.campo in multiplos:
+                resultado[ocorrencia.campo].append(ocorrencia.valor)
+            elif ocorrencia.campo not in resultado:
+                resultado[ocorrencia.campo] = ocorrencia.valor
+        return resultado
+
+
+def criar_extrator_padrao():
+    """Extrator com os campos das notas de RET (ND, vencimento, QT e valores)"""
+    extrator = ExtratorCampos()
+    extrator.registrar_campo('numero_nd', r'ND\s*[:\-]?\s*(\d+)', ignorar_caixa=True)
+    extrator.registrar_campo('data_vencimento', r'(\d{2}[/-]\d{2}[/-]\d{4})')
+    # A quantidade não consome o número: "Quantidade 1.234,56" também é um valor
+    extrator.registrar_campo('quantidade', r'(?:QT|Quantidade)[:\s]*(\d+(?:[.,]\d+)?)',
+                             conversor=numero_decimal, ignorar_caixa=True, consumir=False)
+    extrator.registrar_campo('valores_encontrados', r'R\$\s*(\d{1,3}(?:\.\d{3})*(?:,\d{2})?)',
+                             conversor=numero_br, multiplo=True)
+    extrator.registrar_campo('valores_encontrados', r'€\s*(\d{1,3}(?:\.\d{3})*(?:,\d{2})?)',
+                             conversor=numero_br, multiplo=True)
+    extrator.registrar_campo('valores_encontrados', r'(\d{1,3}(?:\.\d{3})*,\d{2})',
+                             conversor=numero_br, multiplo=True)
+    return extrator
+
+
+# Extrator usado pela extração dos PDFs; registre aqui campos adicionais
+EXTRATOR = criar_extrator_padrao()
@@ -0,0 +1,523 @@
+"""Modo linha de comando (sem interface gráfica) para execuções em lote
+
+Uso:
+    python -m ret process <pasta> [--db] [--xlsx] [--workers N]
+    python -m ret sync <pasta> [--xlsx] [--workers N]
+    python -m ret report <pasta ou banco> [--empresa X] [--tipo T] [--mes MM/AAAA] [--xlsx-path A]
+    python -m ret watch <pasta> [--xlsx] [--espera S] [--varredura]
+    python -m ret batch <lista de pastas> [--consolidado DB] [--simultaneas N] [--retomar]
+    python -m ret status <banco consolidado>
+
+Este módulo não importa customtkinter nem tkinter, podendo rodar em
+servidores sem display (cron, agendador de tarefas).
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+from ret.agendador import TAREFAS_SIMULTANEAS, estado_tarefas, executar_tarefas, ler_tarefas
+from ret.agregacao import ResumoIncremental
+from ret.cache import CacheExtracao
+from ret.cambio import obter_cambio
+from ret.config import (
+    DIRETORIO_CACHE, LIMITE_MEMORIA_PDF_MB, NOME_BANCO, NOME_CONSOLIDADO, NOME_EXCEL, TIMEOUT_PDF_S
+)
+from ret.consulta import FiltroConsulta, ResumoBanco, descrever, exportar_consulta, periodo_do_mes
+from ret.descoberta import RegrasDescoberta
+from ret.extracao import MODOS_PAGINAS, EstrategiaPaginas
+from ret.leitura import MODO_AUTO, MODOS_LEITURA
+from ret.metricas import MODOS_PERFIL, MetricasExecucao
+from ret.ocr import NOME_CACHE_OCR, ConfigOCR, tesseract_disponivel
+from ret.pipeline import DestinoBanco, DestinoExcel, DestinoSemValores, executar_pipeline
+from ret.resumo import formatar_brl
+from ret.sincronizacao import sincronizar_pasta
+from ret.supervisao import DESCRICAO_FALHAS, LimitesExtracao
+from ret.vigia import ESPERA_ESTAVEL_S, INTERVALO_VARREDURA_S, vigiar
+
+
+def _criar_log(silencioso):
+    """Cria a função de log do terminal (mesmo formato da aba Logs)"""
+    def log(mensagem):
+        if silencioso:
+            return
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        # Uma única escrita por linha: as tarefas do lote registram de várias threads
+        sys.stderr.write(f"[{timestamp}] {mensagem}\n")
+        sys.stderr.flush()
+    return log
+
+
+def _ocr(args):
+    """Configuração do OCR (None sem --ocr ou sem o Tesseract instalado)"""
+    if not args.ocr:
+        return None
+    config = ConfigOCR(
+        workers=max(1, args.ocr_workers),
+        idioma=args.ocr_idioma,
+        resolucao=args.ocr_resolucao,
+        cache=None if args.no_cache else os.path.join(args.cache_dir or DIRETORIO_CACHE, NOME_CACHE_OCR)
+    )
+    if not tesseract_disponivel(config):
+        print("[AVISO] Tesseract não encontrado no PATH: OCR desativado", file=sys.stderr)
+        return None
+    return config
+
+
+def _estrategia(args):
+    """Monta a estratégia de leitura de páginas a partir dos argumentos"""
+    return EstrategiaPaginas(
+        modo=args.paginas,
+        max_paginas=args.max_paginas,
+        incluir_ultima=args.ultima_pagina,
+        rapido=args.rapido,
+        ocr=_ocr(args),
+        leitura=args.leitura
+    )
+
+
+def _regras(args):
+    """Regras de inclusão/exclusão de arquivos a partir dos argumentos"""
+    return RegrasDescoberta(
+        incluir=tuple(args.incluir or ('*.pdf',)),
+        excluir=tuple(args.excluir or ()),
+        ignorar_ocultos=not args.ocultos
+    )
+
+
+def _limites(args):
+    """Limites de tempo e memória por PDF (0 desativa)"""
+    return LimitesExtracao(args.timeout or None, args.limite_memoria or None)
+
+
+def _imprimir_falhas(registros):
+    """Lista os PDFs cuja extração falhou, com o motivo"""
+    falhas = [d for d in registros if d.get('falha')]
+    if falhas:
+        print(f"Falhas de extração: {len(falhas)}")
+        for d in falhas:
+            print(f"  [{DESCRICAO_FALHAS.get(d['falha'], d['falha'])}] {d['caminho']}")
+
+
+def _exportar_metricas(args, metricas, log):
+    """Mostra a divisão CPU / espera de E/S e grava o relatório de métricas (--metricas)"""
+    cpu, espera, percentual = metricas.divisao_es()
+    if cpu or espera:
+        log(f"Extração (soma dos workers): CPU {cpu:.2f}s | espera de E/S {espera:.2f}s ({percentual:.1f}%)")
+    if not args.metricas:
+        return
+    try:
+        metricas.exportar_jsonl(args.metricas)
+        log(f"[OK] Métricas gravadas em: {args.metricas}")
+    except OSError as e:
+        print(f"[ERRO] Falha ao gravar as métricas: {e}", file=sys.stderr)
+
+
+def comando_process(args):
+    """Processa a pasta e grava os resultados pedidos"""
+    log = _criar_log(args.quiet)
+    
+    if not os.path.isdir(args.pasta):
+        print(f"[ERRO] Pasta não encontrada: {args.pasta}", file=sys.stderr)
+        return 2
+    
+    log("INICIANDO PROCESSAMENTO")
+    metricas = MetricasExecucao(args.perfil)
+    with metricas.perfilar():
+        codigo = _processar(args, log, metricas)
+    _exportar_metricas(args, metricas, log)
+    return codigo
+
+
+def _processar(args, log, metricas):
+    """Corpo de comando_process (executado dentro do perfil, se houver)
+
+    Os registros passam em lotes pelo pipeline (ret/pipeline.py): resumo,
+    banco e Excel são alimentados durante a extração, sem guardar a lista.
+    """
+    resumo = ResumoIncremental()
+    sem_valores = DestinoSemValores()
+    destinos = [resumo, sem_valores]
+    banco = excel = None
+    if args.db:
+        banco = DestinoBanco(args.db_path or os.path.join(args.pasta, NOME_BANCO))
+        destinos.append(banco)
+    if args.xlsx:
+        excel = DestinoExcel(args.xlsx_path or os.path.join(args.pasta, NOME_EXCEL), resumo)
+        destinos.append(excel)
+    
+    cache = None if args.no_cache else CacheExtracao(args.cache_dir)
+    try:
+        processados = executar_pipeline(
+            args.pasta, destinos, log=log, metricas=metricas, taxa=obter_cambio(args.cambio),
+            workers=args.workers, cache=cache, estrategia=_estrategia(args),
+            limites=_limites(args), regras=_regras(args)
+        )
+    finally:
+        if cache is not None:
+            cache.fechar()
+    
+    if not processados:
+        print("[AVISO] Nenhum PDF foi processado!", file=sys.stderr)
+        return 1
+    
+    totais = resumo.totais()
+    notas = resumo.debito_credito()
+    print(f"Total de PDFs: {totais['total_arquivos']}")
+    print(f"PDFs com valores: {totais['com_valores']}")
+    print(f"Valor Total: {formatar_brl(totais['total_geral_brl'])}")
+    for linha in resumo.por_tipo().itertuples():
+        print(f"  {linha.Index}: {linha.arquivos} arquivos, {formatar_brl(linha.valor_total_brl)}")
+    print(f"Saldo Débito - Crédito: {formatar_brl(notas['saldo'])}")
+    _imprimir_falhas(sem_valores.registros)
+    
+    codigo = 0
+    
+    if banco is not None:
+        if banco.erro is None:
+            log(f"[OK] Dados salvos em: {banco.db_path}")
+        else:
+            print(f"[ERRO] Falha ao salvar: {banco.erro}", file=sys.stderr)
+            codigo = 3
+    
+    if excel is not None:
+        if excel.erro is None:
+            log(f"[OK] Excel criado: {excel.excel_path}")
+        else:
+            print(f"[ERRO] Falha ao exportar: {excel.erro}", file=sys.stderr)
+            codigo = 3
+    
+    return codigo
+
+
+def comando_sync(args):
+    """Sincroniza a pasta com o banco, extraindo só os PDFs novos/alterados"""
+    log = _criar_log(args.quiet)
+    
+    if not os.path.isdir(args.pasta):
+        print(f"[ERRO] Pasta não encontrada: {args.pasta}", file=sys.stderr)
+        return 2
+    
+    db_path = args.db_path or os.path.join(args.pasta, NOME_BANCO)
+    log("INICIANDO SINCRONIZAÇÃO")
+    metricas = MetricasExecucao(args.perfil)
+    cache = None if args.no_cache else CacheExtracao(args.cache_dir)
+    try:
+        with metricas.perfilar():
+            resultado = sincronizar_pasta(
+                args.pasta, db_path, workers=args.workers, log=log, cache=cache, estrategia=_estrategia(args),
+                metricas=metricas, limites=_limites(args), regras=_regras(args)
+            )
+    finally:
+        if cache is not None:
+            cache.fechar()
+        _exportar_metricas(args, metricas, log)
+    
+    print(f"Novos: {resultado['novos']}")
+    print(f"Alterados: {resultado['alterados']}")
+    print(f"Removidos: {resultado['removidos']}")
+    print(f"Inalterados: {resultado['inalterados']}")
+    _imprimir_falhas(resultado['dados'])
+    log(f"[OK] Banco atualizado: {db_path}")
+    
+    if args.xlsx:
+        excel_path = args.xlsx_path or os.path.join(args.pasta, NOME_EXCEL)
+        try:
+            exportar_consulta(db_path, excel_path, taxa=obter_cambio(args.cambio))
+            log(f"[OK] Excel criado: {excel_path}")
+        except Exception as e:
+            print(f"[ERRO] Falha ao exportar: {e}", file=sys.stderr)
+            return 3
+    
+    return 0
+
+
+def comando_watch(args):
+    """Fica vigiando a pasta e grava no banco cada PDF novo/alterado/removido (até Ctrl+C)"""
+    log = _criar_log(args.quiet)
+    
+    if not os.path.isdir(args.pasta):
+        print(f"[ERRO] Pasta não encontrada: {args.pasta}", file=sys.stderr)
+        return 2
+    
+    db_path = args.db_path or os.path.join(args.pasta, NOME_BANCO)
+    excel_path = args.xlsx_path or os.path.join(args.pasta, NOME_EXCEL)
+    taxa = obter_cambio(args.cambio)
+    
+    def ao_atualizar(resultado):
+        if not resultado['novos'] + resultado['alterados'] + resultado['removidos']:
+            return
+        notas = ResumoBanco(db_path, taxa=taxa).debito_credito()
+        print(f"[{datetime.now():%H:%M:%S}] Novos: {resultado['novos']} | Alterados: {resultado['alterados']} | "
+              f"Removidos: {resultado['removidos']} | Saldo Débito - Crédito: {formatar_brl(notas['saldo'])}",
+              flush=True)
+        _imprimir_falhas(resultado['dados'])
+        if args.xlsx:
+            try:
+                exportar_consulta(db_path, excel_path, taxa=taxa)
+                log(f"[OK] Excel atualizado: {excel_path}")
+            except Exception as e:
+                print(f"[ERRO] Falha ao exportar: {e}", file=sys.stderr)
+    
+    # SIGTERM (systemd, kill) encerra como o Ctrl+C: o lote em andamento é gravado
+    parar = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: parar.set())
+    
+    log("INICIANDO VIGIA (Ctrl+C encerra)")
+    cache = None if args.no_cache else CacheExtracao(args.cache_dir)
+    try:
+        vigiar(
+            args.pasta, db_path, log=log, parar=parar, ao_atualizar=ao_atualizar, regras=_regras(args),
+            espera=args.espera, intervalo=args.intervalo, varredura=args.varredura,
+            workers=args.workers, cache=cache, estrategia=_estrategia(args), limites=_limites(args)
+        )
+    finally:
+        if cache is not None:
+            cache.fechar()
+    return 0
+
+
+def _imprimir_tarefas(estados):
+    """Tabela com o estado de cada tarefa"""
+    for estado in estados:
+        linha = (f"  [{estado['estado']:<10}] {estado['cliente']}: {estado.get('feitos') or 0} extraídos, "
+                 f"{estado.get('novos') or 0} novos, {estado.get('alterados') or 0} alterados, "
+                 f"{estado.get('removidos') or 0} removidos, {estado.get('erros') or 0} com erro")
+        if estado.get('mensagem'):
+            linha += f" ({estado['mensagem']})"
+        print(linha)
+
+
+def comando_batch(args):
+    """Sincroniza várias pastas (uma tarefa por pasta) e mantém o banco consolidado"""
+    log = _criar_log(args.quiet)
+    
+    if not os.path.isfile(args.lista):
+        print(f"[ERRO] Lista de pastas não encontrada: {args.lista}", file=sys.stderr)
+        return 2
+    try:
+        tarefas = ler_tarefas(
+            args.lista, _regras(args), _estrategia(args), NOME_EXCEL if args.xlsx else None
+        )
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"[ERRO] Falha ao ler a lista de pastas: {e}", file=sys.stderr)
+        return 2
+    if not tarefas:
+        print("[AVISO] Nenhuma pasta na lista!", file=sys.stderr)
+        return 1
+    
+    consolidado = args.consolidado or os.path.join(os.path.dirname(os.path.abspath(args.lista)), NOME_CONSOLIDADO)
+    
+    # SIGTERM encerra como o Ctrl+C: o extraído fica gravado para --retomar
+    parar = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: parar.set())
+    
+    log(f"INICIANDO LOTE: {len(tarefas)} pastas")
+    taxa = obter_cambio(args.cambio)
+    cache = None if args.no_cache else CacheExtracao(args.cache_dir)
+    try:
+        estados = executar_tarefas(
+            tarefas, consolidado, workers=args.workers, simultaneas=args.simultaneas, log=log,
+            cache=cache, limites=_limites(args), retomar=args.retomar, parar=parar,
+            taxa=taxa
+        )
+    except KeyboardInterrupt:
+        parar.set()
+        print("[AVISO] Lote interrompido: use --retomar para continuar", file=sys.stderr)
+        return 1
+    finally:
+        if cache is not None:
+            cache.fechar()
+    
+    _imprimir_tarefas(estados)
+    notas = ResumoBanco(consolidado, taxa=taxa).debito_credito()
+    print(f"Saldo Débito - Crédito (consolidado): {formatar_brl(notas['saldo'])}")
+    log(f"[OK] Banco consolidado: {consolidado}")
+    return 0 if all(estado['estado'] == 'concluida' for estado in estados) else 3
+
+
+def comando_status(args):
+    """Estado das tarefas da última rodada (ou da indicada) do banco consolidado"""
+    if not os.path.isfile(args.consolidado):
+        print(f"[ERRO] Banco não encontrado: {args.consolidado}", file=sys.stderr)
+        return 2
+    estados = estado_tarefas(args.consolidado, args.rodada)
+    if not estados:
+        print("[AVISO] Nenhuma tarefa registrada", file=sys.stderr)
+        return 1
+    print(f"Rodada {estados[0]['rodada']}: {len(estados)} tarefas")
+    _imprimir_tarefas(estados)
+    return 0
+
+
+def _filtro(args):
+    """FiltroConsulta dos argumentos do report (ValueError se a data/mês for inválido)"""
+    inicio, fim = args.de, args.ate
+    if args.mes:
+        inicio, fim = periodo_do_mes(args.mes)
+    return FiltroConsulta(args.empresa, args.tipo, args.nota, inicio, fim)
+
+
+def comando_report(args):
+    """Totais e resumos do banco (sem ler os PDFs), com filtros; opcionalmente o Excel"""
+    db_path = args.origem
+    if os.path.isdir(db_path):
+        db_path = os.path.join(db_path, NOME_BANCO)
+    if not os.path.isfile(db_path):
+        print(f"[ERRO] Banco não encontrado: {db_path}", file=sys.stderr)
+        return 2
+    
+    try:
+        filtro = _filtro(args)
+        inicio = time.perf_counter()
+        resumo = ResumoBanco(db_path, filtro, obter_cambio(args.cambio))
+        decorrido = time.perf_counter() - inicio
+    except ValueError as e:
+        print(f"[ERRO] {e}", file=sys.stderr)
+        return 2
+    
+    totais = resumo.totais()
+    print(f"Filtro: {descrever(filtro)}")
+    print(f"Registros: {totais['total_arquivos']} ({totais['com_valores']} com valores)")
+    print(f"Valor Total: {formatar_brl(totais['total_geral_brl'])}")
+    grupos = {'tipo': resumo.por_tipo, 'empresa': resumo.por_empresa, 'mes': resumo.por_mes}[args.por]
+    for linha in grupos().itertuples():
+        print(f"  {linha.Index}: {linha.arquivos} registros, {formatar_brl(linha.valor_total_brl)}")
+    notas = resumo.debito_credito()
+    print(f"Débitos: {formatar_brl(notas['debito'])} | Créditos: {formatar_brl(notas['credito'])}")
+    print(f"Saldo Débito - Crédito: {formatar_brl(notas['saldo'])}")
+    print(f"Consulta em {decorrido * 1000:.1f} ms")
+    
+    if args.xlsx_path:
+        try:
+            exportar_consulta(db_path, args.xlsx_path, filtro, resumo.taxa)
+            print(f"[OK] Excel criado: {args.xlsx_path}")
+        except Exception as e:
+            print(f"[ERRO] Falha ao exportar: {e}", file=sys.stderr)
+            return 3
+    
+    return 0
+
+
+def _argumentos_pasta(p):
+    """Pasta processada e caminhos alternativos do banco e do Excel"""
+    p.add_argument("pasta", help="Pasta raiz (RET) com os PDFs")
+    p.add_argument("--db-path", help="Caminho alternativo do banco (padrão: dentro da pasta)")
+    p.add_argument("--xlsx-path", help="Caminho alternativo do Excel (padrão: dentro da pasta)")
+
+
+def _argumentos_comuns(p):
+    """Argumentos compartilhados pelos subcomandos de processamento"""
+    p.add_argument("--xlsx", action="store_true", help=f"Exporta o relatório Excel ({NOME_EXCEL})")
+    p.add_argument("--incluir", action="append", metavar="GLOB",
+                   help="Arquivos incluídos (pode repetir; padrão: *.pdf). Com '/', vale o caminho relativo")
+    p.add_argument("--excluir", action="append", metavar="GLOB",
+                   help="Arquivos ou pastas ignorados (pode repetir), ex.: 'backup*' ou 'EAT/2023*'")
+    p.add_argument("--ocultos", action="store_true",
+                   help="Percorre também pastas/arquivos ocultos, temporários e de sistema")
+    p.add_argument("--workers", type=int, default=None, help="Processos de extração (padrão: todos os núcleos)")
+    p.add_argument("--no-cache", action="store_true", help="Ignora o cache de extração (relê todos os PDFs)")
+    p.add_argument("--cache-dir", help="Diretório do cache de extração (padrão: ~/.ret_cache)")
+    p.add_argument("--paginas", choices=MODOS_PAGINAS, default="todas",
+                   help="Páginas lidas: todas, as primeiras (--max-paginas) ou até completar ND/data/valores")
+    p.add_argument("--max-paginas", type=int, default=None, help="Limite de páginas lidas por PDF")
+    p.add_argument("--ultima-pagina", action="store_true", help="Lê também a última página (totais)")
+    p.add_argument("--rapido", action="store_true",
+                   help="Tenta antes o texto do PyPDF2 e só usa o pdfplumber se faltar algum campo")
+    p.add_argument("--leitura", choices=MODOS_LEITURA, default=MODO_AUTO,
+                   help="Leitura dos PDFs: buffer (leitura única), mmap (mapeamento; um PDF alterado "
+                        "durante a leitura derruba o worker), arquivo (leitura comum) ou auto "
+                        "(padrão: buffer, mmap só nos workers supervisionados)")
+    p.add_argument("--ocr", action="store_true",
+                   help="OCR (Tesseract) das páginas sem camada de texto, como notas escaneadas")
+    p.add_argument("--ocr-workers", type=int, default=ConfigOCR().workers,
+                   help="Processos do pool de OCR, separado do de extração (padrão: %(default)s)")
+    p.add_argument("--ocr-idioma", default=ConfigOCR().idioma,
+                   help="Idiomas do Tesseract, como 'por' ou 'por+eng' (padrão: %(default)s)")
+    p.add_argument("--ocr-resolucao", type=int, default=ConfigOCR().resolucao,
+                   help="DPI da renderização das páginas para o OCR (padrão: %(default)s)")
+    p.add_argument("--cambio", help="Arquivo de cotações EUR→BRL por data, CSV ou SQLite "
+                                    "(padrão: ~/.ret_cambio.csv; sem arquivo usa a taxa fixa)")
+    p.add_argument("--metricas", metavar="ARQUIVO",
+                   help="Grava o relatório de desempenho (JSON lines: etapas, arquivos, perfil)")
+    p.add_argument("--perfil", choices=MODOS_PERFIL,
+                   help="Captura um perfil do processo principal (para incluir a extração: "
+                        "--workers 1 --timeout 0 --limite-memoria 0)")
+    p.add_argument("--timeout", type=float, default=TIMEOUT_PDF_S,
+                   help=f"Tempo limite (s) de cada PDF; 0 desativa (padrão: {TIMEOUT_PDF_S})")
+    p.add_argument("--limite-memoria", type=float, default=LIMITE_MEMORIA_PDF_MB,
+                   help=f"Memória máxima (MB) do worker em cada PDF; 0 desativa (padrão: {LIMITE_MEMORIA_PDF_MB})")
+    p.add_argument("-q", "--quiet", action="store_true", help="Não mostra o log de progresso")
+
+
+def criar_parser():
+    """Monta o parser de argumentos da linha de comando"""
+    parser = argparse.ArgumentParser(
+        prog="python -m ret",
+        description="Sistema RET - processamento de PDFs sem interface gráfica"
+    )
+    sub = parser.add_subparsers(dest="comando", required=True)
+    
+    p_process = sub.add_parser("process", help="Processa todos os PDFs de uma pasta")
+    _argumentos_pasta(p_process)
+    _argumentos_comuns(p_process)
+    p_process.add_argument("--db", action="store_true", help=f"Salva os dados no banco SQLite ({NOME_BANCO})")
+    p_process.set_defaults(funcao=comando_process)
+    
+    p_sync = sub.add_parser("sync", help="Atualiza o banco processando só PDFs novos/alterados")
+    _argumentos_pasta(p_sync)
+    _argumentos_comuns(p_sync)
+    p_sync.set_defaults(funcao=comando_sync)
+    
+    p_watch = sub.add_parser("watch", help="Fica vigiando a pasta e atualiza o banco assim que os PDFs chegam")
+    _argumentos_pasta(p_watch)
+    _argumentos_comuns(p_watch)
+    p_watch.add_argument("--espera", type=float, default=ESPERA_ESTAVEL_S,
+                         help=f"Segundos sem mudança antes de ler um PDF recém-gravado (padrão: {ESPERA_ESTAVEL_S:g})")
+    p_watch.add_argument("--varredura", action="store_true",
+                         help="Usa varreduras periódicas em vez do inotify (ex.: pastas de rede)")
+    p_watch.add_argument("--intervalo", type=float, default=INTERVALO_VARREDURA_S,
+                         help=f"Segundos entre varreduras no modo --varredura (padrão: {INTERVALO_VARREDURA_S:g})")
+    p_watch.set_defaults(funcao=comando_watch)
+    
+    p_batch = sub.add_parser("batch", help="Sincroniza várias pastas (clientes) com um pool de extração comum")
+    p_batch.add_argument("lista", help="Arquivo com as pastas, uma por linha: pasta;cliente;excluir")
+    _argumentos_comuns(p_batch)
+    p_batch.add_argument("--consolidado",
+                         help=f"Banco consolidado de todas as pastas (padrão: {NOME_CONSOLIDADO} ao lado da lista)")
+    p_batch.add_argument("--simultaneas", type=int, default=TAREFAS_SIMULTANEAS,
+                         help="Pastas processadas ao mesmo tempo (padrão: %(default)s)")
+    p_batch.add_argument("--retomar", action="store_true",
+                         help="Continua a última rodada: pula as pastas concluídas e retoma as demais")
+    p_batch.set_defaults(funcao=comando_batch)
+    
+    p_status = sub.add_parser("status", help="Estado das pastas da última execução em lote")
+    p_status.add_argument("consolidado", help="Banco consolidado (RET_consolidado.db)")
+    p_status.add_argument("--rodada", type=int, help="Rodada consultada (padrão: a última)")
+    p_status.set_defaults(funcao=comando_status)
+    
+    p_report = sub.add_parser("report", help="Totais e resumos a partir do banco, sem reprocessar os PDFs")
+    p_report.add_argument("origem", help=f"Banco SQLite ou pasta que contém o {NOME_BANCO}")
+    p_report.add_argument("--empresa", action="append", help="Filtra pela empresa (pode repetir)")
+    p_report.add_argument("--tipo", action="append", help="Filtra pelo tipo de encargo: EAT, Penalidades, TOP (pode repetir)")
+    p_report.add_argument("--nota", choices=("Débito", "Crédito"), help="Filtra pelo tipo de nota")
+    p_report.add_argument("--de", help="Vencimento a partir de (DD/MM/AAAA)")
+    p_report.add_argument("--ate", help="Vencimento até (DD/MM/AAAA)")
+    p_report.add_argument("--mes", help="Vencimentos de um mês (MM/AAAA); substitui --de/--ate")
+    p_report.add_argument("--por", choices=("tipo", "empresa", "mes"), default="tipo",
+                          help="Agrupamento listado (padrão: tipo)")
+    p_report.add_argument("--xlsx-path", help="Gera também o relatório Excel dos registros filtrados")
+    p_report.add_argument("--cambio", help="Arquivo de cotações EUR→BRL por data, CSV ou SQLite "
+                                           "(padrão: ~/.ret_cambio.csv; sem arquivo usa a taxa fixa)")
+    p_report.set_defaults(funcao=comando_report)
+    
+    return parser
+
+
+def main(argv=None):
+    """Ponto de entrada da linha de comando"""
+    args = criar_parser().parse_args(argv)
+    return args.funcao(args)
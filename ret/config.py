@@ -0,0 +1,39 @@
+"""Parâmetros compartilhados pela interface gráfica e pelo modo linha de comando"""
+import os
+
+# Taxa de câmbio EUR → BRL (ajuste conforme a cotação desejada). Usada quando
+# não há arquivo de cotações ou a data do vencimento não tem cotação.
+TAXA_EUR_BRL = 6.0
+
+# Cotações diárias EUR → BRL (CSV ou SQLite, veja ret/cambio.py). A variável
+# de ambiente RET_CAMBIO permite indicar outro arquivo.
+ARQUIVO_CAMBIO = os.environ.get(
+    'RET_CAMBIO', os.path.join(os.path.expanduser('~'), '.ret_cambio.csv')
+)
+
+# Dicionário de empresas (apelidos e CNPJs, veja ret/empresas.py). A
+# variável de ambiente RET_EMPRESAS permite indicar outro arquivo.
+ARQUIVO_EMPRESAS = os.environ.get(
+    'RET_EMPRESAS', os.path.join(os.path.expanduser('~'), '.ret_empresas.csv')
+)
+
+# Nomes dos arquivos gerados dentro da pasta processada
+NOME_BANCO = 'RET_dados.db'
+NOME_EXCEL = 'RET_Relatorio.xlsx'
+NOME_METRICAS = 'RET_metricas.jsonl'
+
+# Banco consolidado das execuções em lote de várias pastas (ret/agendador.py)
+NOME_CONSOLIDADO = 'RET_consolidado.db'
+
+# Cache de extração (texto e campos de cada PDF, indexados pelo conteúdo).
+# A variável de ambiente RET_CACHE_DIR permite mudar o diretório.
+DIRETORIO_CACHE = os.environ.get(
+    'RET_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.ret_cache')
+)
+LIMITE_CACHE_MB = 512
+
+# Limites de cada PDF na extração supervisionada (ret/supervisao.py): um
+# arquivo que passe do tempo (s) ou da memória residente (MB) tem o worker
+# encerrado e é registrado com o motivo da falha. None desativa o limite.
+TIMEOUT_PDF_S = 120
+LIMITE_MEMORIA_PDF_MB = 1536
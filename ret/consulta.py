@@ -0,0 +1,240 @@
+"""Consultas e relatórios sobre o RET_dados.db, sem reprocessar os PDFs
+
+FiltroConsulta escolhe os registros: empresa, tipo de encargo e tipo de
+nota (um valor ou uma lista de valores; None = todos) e o período de
+vencimento (inicio/fim, inclusivos; DD/MM/AAAA, AAAA-MM-DD ou date).
+
+- consultar: os registros filtrados como ModeloResultados (tabela da
+  interface, Excel);
+- registros_sem_valores: os registros sem valor extraído (aba Sem Valores);
+- ResumoBanco: os resumos do ModeloResultados (totais, por tipo, por
+  empresa, por mês, débito x crédito) calculados por GROUP BY no SQLite,
+  sem ler as linhas: só os grupos (tipo, empresa, nota, vencimento) vêm
+  para o Python, onde entram as cotações por data;
+- exportar_consulta: o relatório Excel direto do banco, lido em lotes.
+
+Os filtros usam os índices de empresa, tipo e vencimento, e os resumos o
+índice de cobertura idx_dados_ret_resumo (migração 5 de ret/banco.py).
+"""
+import re
+from collections import namedtuple
+from datetime import date
+
+import pandas as pd
+
+from ret.agregacao import COLUNAS_CATEGORIA, NOTA_CREDITO, NOTA_DEBITO, _Resumos, taxas_por_data
+from ret.banco import abrir_banco, carregar_resultados, data_iso, iterar_resultados
+from ret.cambio import obter_cambio
+
+FiltroConsulta = namedtuple(
+    'FiltroConsulta', 'empresa tipo_encargo nota_tipo inicio fim',
+    defaults=(None, None, None, None, None)
+)
+SEM_FILTRO = FiltroConsulta()
+
+# Campos aceitos em valores_distintos (listas de escolha da interface)
+CAMPOS_DISTINTOS = COLUNAS_CATEGORIA
+
+RE_MES = re.compile(r'^(?:(\d{2})/(\d{4})|(\d{4})-(\d{2}))$')
+
+
+def _data(valor):
+    """Data do filtro em AAAA-MM-DD (ValueError se não for uma data)"""
+    if isinstance(valor, date):
+        return valor.strftime('%Y-%m-%d')
+    iso = data_iso(str(valor).strip())
+    try:
+        date.fromisoformat(iso)
+    except ValueError:
+        raise ValueError(f"Data inválida: {valor} (use DD/MM/AAAA)") from None
+    return iso
+
+
+def periodo_do_mes(mes):
+    """(inicio, fim) de um mês informado como MM/AAAA ou AAAA-MM"""
+    m = RE_MES.match(mes.strip())
+    if not m:
+        raise ValueError(f"Mês inválido: {mes} (use MM/AAAA)")
+    ano, numero = (int(m.group(2)), int(m.group(1))) if m.group(1) else (int(m.group(3)), int(m.group(4)))
+    if not 1 <= numero <= 12:
+        raise ValueError(f"Mês inválido: {mes} (use MM/AAAA)")
+    proximo = date(ano + numero // 12, numero % 12 + 1, 1)
+    return date(ano, numero, 1), date.fromordinal(proximo.toordinal() - 1)
+
+
+def condicoes(filtro=SEM_FILTRO):
+    """Condição SQL (sem o WHERE) e parâmetros do filtro; ('', []) sem filtro"""
+    partes, parametros = [], []
+    for campo in ('empresa', 'tipo_encargo', 'nota_tipo'):
+        valor = getattr(filtro, campo)
+        if valor is None or valor == '':
+            continue
+        valores = [valor] if isinstance(valor, str) else list(valor)
+        if not valores:
+            continue
+        partes.append(f"{campo} IN ({', '.join('?' * len(valores))})")
+        parametros += valores
+    if filtro.inicio:
+        partes.append("data_vencimento >= ?")
+        parametros.append(_data(filtro.inicio))
+    if filtro.fim:
+        partes.append("data_vencimento <= ?")
+        parametros.append(_data(filtro.fim))
+    return ' AND '.join(partes), parametros
+
+
+def descrever(filtro):
+    """Texto curto do filtro (logs e relatórios)"""
+    partes = []
+    for campo, rotulo in (('empresa', 'Empresa'), ('tipo_encargo', 'Tipo'), ('nota_tipo', 'Nota')):
+        valor = getattr(filtro, campo)
+        if valor:
+            partes.append(f"{rotulo}: {valor if isinstance(valor, str) else ', '.join(valor)}")
+    if filtro.inicio or filtro.fim:
+        inicio, fim = (
+            valor.strftime('%d/%m/%Y') if isinstance(valor, date) else (valor or '...')
+            for valor in (filtro.inicio, filtro.fim)
+        )
+        partes.append(f"Vencimento: {inicio} a {fim}")
+    return ' | '.join(partes) or 'Todos os registros'
+
+
+def consultar(db_path, filtro=SEM_FILTRO, taxa=None):
+    """Registros do banco que atendem ao filtro, como ModeloResultados"""
+    onde, parametros = condicoes(filtro)
+    return carregar_resultados(db_path, taxa, onde, parametros)
+
+
+def valores_distintos(db_path, campo):
+    """Valores gravados de um campo de categoria (ordenados), para as listas de filtro"""
+    if campo not in CAMPOS_DISTINTOS:
+        raise ValueError(f"Campo sem lista de valores: {campo}")
+    conexao = abrir_banco(db_path)
+    try:
+        linhas = conexao.execute(
+            f"SELECT DISTINCT {campo} FROM dados_ret WHERE {campo} IS NOT NULL AND {campo} != '' ORDER BY 1"
+        ).fetchall()
+    finally:
+        conexao.close()
+    return [valor for valor, in linhas]
+
+
+def registros_sem_valores(db_path, filtro=SEM_FILTRO):
+    """Registros filtrados com valor total = 0, como dicionários (aba Sem Valores)
+
+    O banco não guarda a mensagem de erro da extração, só o motivo da
+    falha: 'erro' vem vazio.
+    """
+    onde, parametros = condicoes(filtro)
+    conexao = abrir_banco(db_path)
+    try:
+        linhas = conexao.execute(
+            "SELECT arquivo, caminho, tipo_encargo, falha FROM dados_ret "
+            f"WHERE COALESCE(valor_total, 0) = 0{f' AND {onde}' if onde else ''} "
+            "ORDER BY caminho, numero_nd",
+            parametros
+        ).fetchall()
+    finally:
+        conexao.close()
+    return [
+        {'arquivo': arquivo, 'caminho': caminho, 'tipo_encargo': tipo, 'erro': '', 'falha': falha}
+        for arquivo, caminho, tipo, falha in linhas
+    ]
+
+
+class ResumoBanco(_Resumos):
+    """Os resumos do ModeloResultados, agregados pelo SQLite
+
+    Uma única consulta agrupa por tipo, empresa, nota e vencimento; os
+    resumos pedidos depois somam esses grupos (poucos, mesmo com muitos
+    registros). Os métodos têm os mesmos nomes e formatos do modelo.
+    """
+
+    SQL_GRUPOS = '''
+        SELECT tipo_encargo, empresa, nota_tipo, data_vencimento,
+               COUNT(*) AS arquivos,
+               SUM(valor_total > 0) AS com_valores,
+               TOTAL(valor_total) AS valor_total,
+               TOTAL(quantidade) AS quantidade
+        FROM dados_ret {onde}
+        GROUP BY tipo_encargo, empresa, nota_tipo, data_vencimento
+    '''
+
+    def __init__(self, db_path, filtro=SEM_FILTRO, taxa=None):
+        if taxa is None:
+            taxa = obter_cambio()
+        onde, parametros = condicoes(filtro)
+        conexao = abrir_banco(db_path)
+        try:
+            grupos = pd.read_sql_query(
+                self.SQL_GRUPOS.format(onde=f"WHERE {onde}" if onde else ''), conexao, params=tuple(parametros)
+            )
+        finally:
+            conexao.close()
+
+        for campo in COLUNAS_CATEGORIA:
+            grupos[campo] = grupos[campo].fillna('').astype(str)
+        for campo in ('arquivos', 'com_valores'):
+            grupos[campo] = grupos[campo].fillna(0).astype('int64')
+        vencimentos = pd.to_datetime(grupos['data_vencimento'], format='%Y-%m-%d', errors='coerce')
+        # Dentro de um grupo o vencimento é o mesmo: a soma em R$ usa a cotação do dia
+        grupos['valor_total_brl'] = grupos['valor_total'] * taxas_por_data(vencimentos, taxa)
+        grupos['mes'] = vencimentos.dt.to_period('M')
+        self.grupos = grupos
+        self.db_path = db_path
+        self.filtro = filtro
+        self.taxa = taxa
+
+    def __len__(self):
+        return int(self.grupos['arquivos'].sum())
+
+    def _agrupar(self, por):
+        return self.grupos.groupby(por, sort=True).agg(
+            arquivos=('arquivos', 'sum'),
+            valor_total=('valor_total', 'sum'),
+            quantidade=('quantidade', 'sum'),
+            valor_total_brl=('valor_total_brl', 'sum'),
+        )
+
+    def totais(self):
+        """Totais gerais: arquivos, com valores, QT e valor (EUR e R$)"""
+        grupos = self.grupos
+        return {
+            'total_arquivos': int(grupos['arquivos'].sum()),
+            'com_valores': int(grupos['com_valores'].sum()),
+            'total_qt': float(grupos['quantidade'].sum()),
+            'total_geral': float(grupos['valor_total'].sum()),
+            'total_geral_brl': float(grupos['valor_total_brl'].sum()),
+        }
+
+    def por_tipo(self):
+        """Resumo por tipo de encargo"""
+        return self._agrupar('tipo_encargo')
+
+    def por_empresa(self):
+        """Resumo por empresa"""
+        return self._agrupar('empresa')
+
+    def por_mes(self):
+        """Resumo por mês de vencimento (registros sem data ficam de fora)"""
+        return self._agrupar('mes')
+
+    def debito_credito(self):
+        """Débitos, créditos e saldo (débitos - créditos), em R$"""
+        somas = self.grupos.groupby('nota_tipo')['valor_total_brl'].sum()
+        debito = float(somas.get(NOTA_DEBITO, 0.0))
+        credito = float(somas.get(NOTA_CREDITO, 0.0))
+        return {'debito': debito, 'credito': credito, 'saldo': debito - credito}
+
+
+def exportar_consulta(db_path, excel_path, filtro=SEM_FILTRO, taxa=None, tamanho_lote=500):
+    """Gera o relatório Excel dos registros filtrados, lendo o banco em lotes"""
+    from ret.excel import EscritorExcel
+
+    if taxa is None:
+        taxa = obter_cambio()
+    onde, parametros = condicoes(filtro)
+    escritor = EscritorExcel(excel_path)
+    for modelo in iterar_resultados(db_path, taxa, onde, parametros, tamanho_lote):
+        escritor.escrever(modelo)
+    return escritor.finalizar(ResumoBanco(db_path, filtro, taxa))
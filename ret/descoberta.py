@@ -0,0 +1,261 @@
+"""Descoberta dos PDFs: varredura com os.scandir, regras e tipo de encargo
+
+descobrir() percorre a pasta com os.scandir e entrega cada PDF assim que
+ele é encontrado, já com tamanho, mtime e tipo de encargo (o stat vem da
+própria varredura). A ordem é a mesma da lista completa ordenada pelo
+caminho, sem precisar montar a lista antes.
+
+Regras (RegrasDescoberta):
+- incluir / excluir: padrões glob, sem diferenciar maiúsculas. Um padrão
+  sem '/' vale para o nome do arquivo ou da pasta ('*.pdf', 'rascunho*');
+  com '/', para o caminho relativo à raiz ('EAT/2023*/*', '*/backup').
+  Uma pasta que case com 'excluir' não é percorrida;
+- ignorar_ocultos: pula pastas e arquivos ocultos (iniciados por '.' ou
+  com o atributo oculto do Windows), temporários (~$...) e pastas de
+  sistema (lixeira, __MACOSX...).
+
+O tipo de encargo sai do nome das pastas (não do nome do arquivo), da
+mais interna para a raiz: a pasta "12 EAT dez-25" ou "EAT" indica EAT,
+mas "STOP" ou "Desktop" não indicam TOP.
+"""
+import fnmatch
+import os
+import queue
+import re
+import stat
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+ArquivoEncontrado = namedtuple('ArquivoEncontrado', 'caminho tamanho mtime_ns tipo_encargo')
+
+RegrasDescoberta = namedtuple(
+    'RegrasDescoberta', 'incluir excluir ignorar_ocultos',
+    defaults=(('*.pdf',), (), True)
+)
+REGRAS_PADRAO = RegrasDescoberta()
+
+# Pastas de sistema/temporárias nunca percorridas (comparadas em minúsculas)
+PASTAS_IGNORADAS = frozenset({
+    '$recycle.bin', 'system volume information', '__macosx', '.trash', '.trashes', '@eadir',
+})
+
+# Prefixos de arquivos/pastas temporários (bloqueio do Office, LibreOffice)
+PREFIXOS_TEMPORARIOS = ('~$', '.~lock')
+
+# Tipo de encargo por palavra inteira no nome da pasta (vale a que aparecer primeiro).
+# Só letras emendadas impedem o casamento: dígitos e pontuação separam
+# palavras ("EAT2024", "PENALIDADES_2025"), como em ret/empresas.py
+TIPOS_POR_PASTA = [
+    ('EAT', ('EAT',)),
+    ('Penalidades', ('PENALIDADE', 'PENALIDADES')),
+    ('TOP', ('TOP',)),
+]
+TIPO_OUTROS = 'Outros'
+
+# Um grupo por tipo: m.lastindex indica a posição em TIPOS_POR_PASTA
+_RE_TIPO = re.compile('|'.join(
+    rf"(?<![A-Z])({'|'.join(palavras)})(?![A-Z])" for _, palavras in TIPOS_POR_PASTA
+))
+
+
+def _tipo_da_pasta(nome):
+    """Tipo indicado pelo nome de uma pasta (None se nenhum)"""
+    m = _RE_TIPO.search(nome.upper())
+    return TIPOS_POR_PASTA[m.lastindex - 1][0] if m else None
+
+
+@lru_cache(maxsize=4096)
+def tipo_por_pasta(pasta):
+    """Tipo de encargo de uma pasta: o da pasta mais interna que indique um"""
+    while True:
+        pasta, nome = os.path.split(pasta)
+        if not nome:
+            return TIPO_OUTROS
+        tipo = _tipo_da_pasta(nome)
+        if tipo:
+            return tipo
+
+
+def classificar_tipo(caminho):
+    """Tipo de encargo de um arquivo pelas pastas do caminho"""
+    return tipo_por_pasta(os.path.dirname(caminho))
+
+
+def _compilar(padroes):
+    """(regex dos padrões de nome, regex dos padrões de caminho) ou None"""
+    nomes = [fnmatch.translate(p) for p in padroes if '/' not in p]
+    caminhos = [fnmatch.translate(p.strip('/')) for p in padroes if '/' in p]
+    compilar = lambda partes: re.compile('|'.join(partes), re.IGNORECASE).match if partes else None
+    return compilar(nomes), compilar(caminhos)
+
+
+@lru_cache(maxsize=32)
+def _regras_compiladas(regras):
+    """(incluir, excluir) compilados de um RegrasDescoberta"""
+    return _compilar(regras.incluir), _compilar(regras.excluir)
+
+
+def _casa(compilado, nome, relativo):
+    """Indica se o nome ou o caminho relativo casa com algum padrão"""
+    por_nome, por_caminho = compilado
+    return bool((por_nome and por_nome(nome)) or (por_caminho and por_caminho(relativo)))
+
+
+def _oculto(entrada):
+    """Entrada oculta, temporária ou de sistema"""
+    if _nome_ignorado(entrada.name):
+        return True
+    if os.name == 'nt':
+        # No Windows o stat vem da própria listagem (sem chamada extra)
+        return bool(entrada.stat(follow_symlinks=False).st_file_attributes & stat.FILE_ATTRIBUTE_HIDDEN)
+    return False
+
+
+def _nome_ignorado(nome):
+    """Nome oculto ou temporário (o atributo oculto do Windows fica com _oculto)"""
+    return nome.startswith('.') or nome.startswith(PREFIXOS_TEMPORARIOS)
+
+
+def aceitar(raiz, caminho, regras=REGRAS_PADRAO, pasta=False):
+    """Indica se um caminho avulso dentro de 'raiz' entraria na varredura de descobrir
+
+    Aplica as mesmas regras às pastas do caminho e ao arquivo (ou à pasta,
+    com pasta=True). Usado por quem recebe caminhos sem percorrer a árvore
+    (modo vigia, ret/vigia.py).
+    """
+    incluir, excluir = _regras_compiladas(regras)
+    rel = os.path.relpath(caminho, raiz)
+    if rel == os.curdir:
+        return pasta
+    if rel == os.pardir or rel.startswith(os.pardir + os.sep):
+        return False
+
+    partes = rel.split(os.sep)
+    relativo = ''
+    for i, nome in enumerate(partes):
+        relativo = f"{relativo}/{nome}" if relativo else nome
+        e_pasta = pasta or i < len(partes) - 1
+        if regras.ignorar_ocultos and (
+            _nome_ignorado(nome) or (e_pasta and nome.lower() in PASTAS_IGNORADAS)
+        ):
+            return False
+        if _casa(excluir, nome, relativo):
+            return False
+    return pasta or _casa(incluir, partes[-1], relativo)
+
+
+def dentro_de(caminho, pastas):
+    """Indica se o caminho é uma das pastas (ou entradas) ou está debaixo de alguma"""
+    return any(caminho == pasta or caminho.startswith(pasta.rstrip(os.sep) + os.sep) for pasta in pastas)
+
+
+def descobrir(pasta, regras=REGRAS_PADRAO, relativo='', ilegiveis=None):
+    """Gera os ArquivoEncontrado da pasta (recursivamente), um a um, em ordem
+
+    Pastas sem permissão de leitura (ou que sumiram durante a varredura)
+    são puladas, como em os.walk. Com 'ilegiveis' (dict), cada pasta ou
+    entrada que não pôde ser lida é registrada nele ({caminho: erro}):
+    quem compara com um manifesto (ret/sincronizacao.py) não deve tomar
+    por removido o que está debaixo delas.
+    'relativo' é o caminho de 'pasta' dentro da raiz a que as regras se
+    referem (para varrer só uma subpasta, como 'EAT/12 EAT dez-25').
+    """
+    incluir, excluir = _regras_compiladas(regras)
+
+    def registrar(caminho, erro):
+        if ilegiveis is not None:
+            ilegiveis[caminho] = erro.strerror or str(erro)
+
+    def percorrer(diretorio, relativo):
+        try:
+            with os.scandir(diretorio) as it:
+                entradas = list(it)
+        except OSError as e:
+            registrar(diretorio, e)
+            return
+
+        itens = []
+        for entrada in entradas:
+            try:
+                # Links para pastas não são seguidos (como em os.walk)
+                e_pasta = entrada.is_dir(follow_symlinks=False)
+                if regras.ignorar_ocultos and _oculto(entrada):
+                    continue
+            except OSError as e:
+                registrar(entrada.path, e)
+                continue
+            # Pastas ordenadas como "nome/" para manter a ordem do caminho completo
+            itens.append((entrada.name + os.sep if e_pasta else entrada.name, e_pasta, entrada))
+        itens.sort()
+
+        for _, e_pasta, entrada in itens:
+            nome = entrada.name
+            rel = f"{relativo}/{nome}" if relativo else nome
+            if e_pasta:
+                if regras.ignorar_ocultos and nome.lower() in PASTAS_IGNORADAS:
+                    continue
+                if _casa(excluir, nome, rel):
+                    continue
+                yield from percorrer(entrada.path, rel)
+            elif _casa(incluir, nome, rel) and not _casa(excluir, nome, rel):
+                try:
+                    st = entrada.stat()
+                except OSError as e:
+                    registrar(entrada.path, e)
+                    continue
+                yield ArquivoEncontrado(entrada.path, st.st_size, st.st_mtime_ns, tipo_por_pasta(diretorio))
+
+    yield from percorrer(pasta, relativo.replace(os.sep, '/').strip('/'))
+
+
+class Descoberta:
+    """Varredura em segundo plano: os arquivos são consumidos enquanto a busca continua
+
+    Itera os ArquivoEncontrado na ordem de descobrir(); 'total' é a
+    quantidade encontrada até agora, 'concluida' indica o fim da busca e
+    'segundos' a duração da varredura.
+    """
+
+    _FIM = object()
+
+    def __init__(self, pasta, regras=REGRAS_PADRAO):
+        self.total = 0
+        self.segundos = None
+        self.concluida = threading.Event()
+        self._fila = queue.Queue()
+        self._erro = None
+        self._parar = False
+        self._thread = threading.Thread(
+            target=self._varrer, args=(pasta, regras), name='ret-descoberta', daemon=True
+        )
+        self._thread.start()
+
+    def _varrer(self, pasta, regras):
+        inicio = time.perf_counter()
+        try:
+            for arquivo in descobrir(pasta, regras):
+                if self._parar:
+                    break
+                self.total += 1
+                self._fila.put(arquivo)
+        except Exception as e:
+            self._erro = e
+        finally:
+            self.segundos = time.perf_counter() - inicio
+            self.concluida.set()
+            self._fila.put(self._FIM)
+
+    def __iter__(self):
+        while True:
+            arquivo = self._fila.get()
+            if arquivo is self._FIM:
+                if self._erro is not None:
+                    raise self._erro
+                return
+            yield arquivo
+
+    def parar(self):
+        """Interrompe a varredura (cancelamento)"""
+        self._parar = True
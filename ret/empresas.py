@@ -0,0 +1,260 @@
+"""Classificação da empresa e do tipo de nota (débito/crédito) de um PDF
+
+As empresas vêm de um dicionário: para cada uma, os apelidos pelos quais
+aparece no nome do arquivo ou no texto da nota e os CNPJs. Valem as
+EMPRESAS_PADRAO mais as do arquivo ARQUIVO_EMPRESAS (ret/config.py), lido
+e compilado uma vez por execução (usar_dicionario, chamado ao criar o pool
+de extração em ret/motor.py, que o repassa aos workers).
+
+Todos os apelidos e CNPJs são compilados em uma única expressão regular,
+com os apelidos em árvore de prefixos (os que começam igual dividem o
+mesmo ramo), de modo que o custo de uma busca quase não cresce com o
+tamanho do dicionário. Os apelidos só casam como palavras inteiras ('CBA'
+não casa dentro de outra palavra; dígitos, '_', '-', '.' e espaço separam
+palavras, de modo que 'COPERGAS2024' e 'ND123' são reconhecidos) e, entre
+apelidos que começam no mesmo ponto, vence o mais longo ('CERVEJARIA
+AMBEV' antes de 'CERVEJARIA').
+
+Ordem de decisão:
+1. o nome do arquivo (o primeiro apelido ou CNPJ conhecido, da esquerda
+   para a direita); o resultado fica memorizado por caminho;
+2. se o nome não identificar, o texto da primeira página: um CNPJ
+   conhecido vence; senão, o primeiro apelido.
+O tipo de nota segue a mesma ordem: ND/NC, DEBITO/CREDITO como palavras
+no nome (também NOTADEBITO, NOTA_DE_CREDITO...) e, no texto, "NOTA DE
+DÉBITO"/"NOTA DE CRÉDITO".
+
+Formato do arquivo (CSV com ';', uma empresa por linha, '#' comenta;
+apelidos e CNPJs separados por '|'; o nome já vale como apelido):
+    empresa;apelidos;cnpjs
+    AMBEV;CERVEJARIA AMBEV|AMBEV S.A.;07.526.557/0001-00
+"""
+import os
+import re
+import unicodedata
+from collections import namedtuple
+from functools import lru_cache
+
+from ret.config import ARQUIVO_EMPRESAS
+
+NAO_IDENTIFICADO = 'N/A'
+NOTA_DEBITO = 'Débito'
+NOTA_CREDITO = 'Crédito'
+
+Empresa = namedtuple('Empresa', 'nome apelidos cnpjs', defaults=((), ()))
+Classificacao = namedtuple('Classificacao', 'empresa nota_tipo')
+
+# Empresas reconhecidas sem arquivo de configuração
+EMPRESAS_CONHECIDAS = [
+    'COPERGAS', 'AMBEV', 'CBA', 'CERVEJARIA', 'DEXCO', 'GERDAU',
+    'INDORAMA', 'INGREDION', 'KLABIN', 'MONDELEZ', 'NISSIN', 'VETRUS',
+    'M DIAS BRANCO', 'PETROBRAS', 'GALP'
+]
+EMPRESAS_PADRAO = tuple(Empresa(nome) for nome in EMPRESAS_CONHECIDAS) + (
+    Empresa('AMBEV', ('CERVEJARIA AMBEV',)),
+)
+
+# Separadores entre as palavras de um apelido (no nome do arquivo ou no texto)
+SEPARADOR = r'[\s_.\-]+'
+RE_SEPARADORES = re.compile(SEPARADOR)
+RE_NAO_DIGITO = re.compile(r'\D')
+PADRAO_CNPJ = r'(?<!\d)(?P<cnpj>\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2})(?!\d)'
+
+# Só letras impedem o casamento: números colados (ND123, COPERGAS2024) separam palavras
+RE_NOTA_NOME = re.compile(
+    r'(?<![A-Z])(?:NOTA[\s_.\-]*(?:DE[\s_.\-]*)?)?(?:(ND|DEBITOS?)|(NC|CREDITOS?))(?![A-Z])'
+)
+RE_NOTA_TEXTO = re.compile(
+    rf'(?<![A-Z])NOTA{SEPARADOR}(?:DE{SEPARADOR})?(?:(DEBITO)|(CREDITO))(?![A-Z])'
+)
+
+# Dicionário em uso neste processo (veja usar_dicionario)
+_DICIONARIO = None
+
+
+def normalizar(texto):
+    """Texto em maiúsculas e sem acentos (a forma comparada pelas expressões)"""
+    texto = texto.upper()
+    if texto.isascii():
+        return texto
+    return ''.join(
+        c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c)
+    )
+
+
+def _chave(apelido):
+    """Forma canônica de um apelido: normalizado, palavras separadas por um espaço"""
+    return RE_SEPARADORES.sub(' ', normalizar(apelido)).strip()
+
+
+def _padrao_arvore(no):
+    """Expressão regular de um nó da árvore de prefixos ('' marca o fim de um apelido)
+
+    O fim de um apelido fica como ramo opcional guloso: o apelido mais
+    longo é tentado primeiro e, se não fechar uma palavra, a busca volta
+    ao mais curto.
+    """
+    ramos = [
+        (SEPARADOR if letra == ' ' else re.escape(letra)) + _padrao_arvore(filho)
+        for letra, filho in sorted(no.items()) if letra
+    ]
+    if not ramos:
+        return ''
+    corpo = ramos[0] if len(ramos) == 1 else f"(?:{'|'.join(ramos)})"
+    return f"(?:{corpo})?" if '' in no else corpo
+
+
+def padrao_apelidos(chaves):
+    """Expressão regular (texto) que casa qualquer uma das chaves, em árvore de prefixos"""
+    raiz = {}
+    for chave in chaves:
+        no = raiz
+        for letra in chave:
+            no = no.setdefault(letra, {})
+        no[''] = {}
+    return _padrao_arvore(raiz)
+
+
+class DicionarioEmpresas:
+    """Apelidos e CNPJs das empresas compilados em uma única expressão regular"""
+
+    def __init__(self, empresas):
+        self.por_apelido = {}
+        self.por_cnpj = {}
+        for empresa in empresas:
+            for apelido in (empresa.nome, *empresa.apelidos):
+                chave = _chave(apelido)
+                if chave:
+                    self.por_apelido.setdefault(chave, empresa.nome)
+            for cnpj in empresa.cnpjs:
+                digitos = RE_NAO_DIGITO.sub('', cnpj)
+                if len(digitos) == 14:
+                    self.por_cnpj.setdefault(digitos, empresa.nome)
+
+        partes = []
+        if self.por_apelido:
+            partes.append(rf"(?<![A-Z])(?P<apelido>{padrao_apelidos(self.por_apelido)})(?![A-Z])")
+        if self.por_cnpj:
+            partes.append(PADRAO_CNPJ)
+        self.regex = re.compile('|'.join(partes)) if partes else None
+
+    def __len__(self):
+        return len(set(self.por_apelido.values()) | set(self.por_cnpj.values()))
+
+    def _empresa(self, m):
+        """Empresa de uma ocorrência (None para um CNPJ fora do dicionário)"""
+        if m.group('apelido') is not None:
+            return self.por_apelido.get(_chave(m.group('apelido')))
+        return self.por_cnpj.get(RE_NAO_DIGITO.sub('', m.group('cnpj')))
+
+    def no_nome(self, nome):
+        """Primeira empresa citada no nome do arquivo (apelido ou CNPJ), ou None"""
+        if self.regex is None:
+            return None
+        for m in self.regex.finditer(normalizar(nome)):
+            empresa = self._empresa(m)
+            if empresa:
+                return empresa
+        return None
+
+    def no_texto(self, texto):
+        """Empresa citada no texto: a do primeiro CNPJ conhecido ou, sem ele, a do primeiro apelido"""
+        if self.regex is None or not texto:
+            return None
+        primeiro_apelido = None
+        for m in self.regex.finditer(normalizar(texto)):
+            empresa = self._empresa(m)
+            if not empresa:
+                continue
+            if m.group('apelido') is None:
+                return empresa
+            if primeiro_apelido is None:
+                primeiro_apelido = empresa
+                if not self.por_cnpj:
+                    break
+        return primeiro_apelido
+
+
+def ler_empresas(caminho):
+    """Lê as empresas de um arquivo no formato empresa;apelidos;cnpjs"""
+    empresas = []
+    with open(caminho, encoding='utf-8-sig') as f:
+        for linha in f:
+            linha = linha.strip()
+            if not linha or linha.startswith('#'):
+                continue
+            partes = [parte.strip() for parte in linha.split(';')] + ['', '']
+            nome, apelidos, cnpjs = partes[:3]
+            if not nome or nome.lower() == 'empresa':
+                continue  # linha vazia ou cabeçalho
+            empresas.append(Empresa(
+                nome,
+                tuple(a.strip() for a in apelidos.split('|') if a.strip()),
+                tuple(c.strip() for c in cnpjs.split('|') if c.strip()),
+            ))
+    return empresas
+
+
+def carregar_dicionario(caminho=ARQUIVO_EMPRESAS):
+    """DicionarioEmpresas com as empresas padrão e as do arquivo (se existir)"""
+    empresas = list(EMPRESAS_PADRAO)
+    if caminho:
+        try:
+            empresas += ler_empresas(caminho)
+        except (OSError, UnicodeDecodeError):
+            pass
+    return DicionarioEmpresas(empresas)
+
+
+def usar_dicionario(dicionario):
+    """Define o dicionário usado pela classificação neste processo
+
+    Chamado uma vez por execução (e em cada worker, como initializer do
+    pool): a classificação de cada arquivo não consulta mais o arquivo de
+    configuração.
+    """
+    global _DICIONARIO
+    _DICIONARIO = dicionario
+    _classificar_nome.cache_clear()
+
+
+def dicionario_empresas():
+    """Dicionário em uso; sem usar_dicionario, é carregado na primeira chamada"""
+    if _DICIONARIO is None:
+        usar_dicionario(carregar_dicionario())
+    return _DICIONARIO
+
+
+@lru_cache(maxsize=65536)
+def _classificar_nome(caminho, dicionario):
+    nome = os.path.basename(caminho)
+    empresa = dicionario.no_nome(nome) or NAO_IDENTIFICADO
+    m = RE_NOTA_NOME.search(normalizar(nome))
+    if not m:
+        nota = NAO_IDENTIFICADO
+    else:
+        nota = NOTA_DEBITO if m.group(1) else NOTA_CREDITO
+    return Classificacao(empresa, nota)
+
+
+def classificar_nome(caminho, dicionario=None):
+    """Classificacao (empresa, nota_tipo) pelo nome do arquivo, memorizada por caminho"""
+    if dicionario is None:
+        dicionario = dicionario_empresas()
+    return _classificar_nome(caminho, dicionario)
+
+
+def completar_pelo_texto(dados, texto, dicionario=None):
+    """Preenche empresa e tipo de nota que o nome do arquivo não identificou
+
+    'texto' é o da primeira página; o registro é alterado e devolvido.
+    """
+    if dados.get('empresa', NAO_IDENTIFICADO) == NAO_IDENTIFICADO:
+        if dicionario is None:
+            dicionario = dicionario_empresas()
+        dados['empresa'] = dicionario.no_texto(texto) or NAO_IDENTIFICADO
+    if dados.get('nota_tipo', NAO_IDENTIFICADO) == NAO_IDENTIFICADO and texto:
+        m = RE_NOTA_TEXTO.search(normalizar(texto))
+        if m:
+            dados['nota_tipo'] = NOTA_DEBITO if m.group(1) else NOTA_CREDITO
+    return dados
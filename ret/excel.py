@@ -0,0 +1,219 @@
+"""Exportação dos registros para o relatório Excel formatado
+
+A planilha é gravada em modo streaming (Workbook(write_only=True)): as
+linhas vão direto para o arquivo, sem manter as células em memória. Os
+estilos são estilos nomeados compartilhados, criados uma única vez por
+arquivo. Os resumos vêm prontos do ModeloResultados (ret/agregacao.py),
+o mesmo usado pela interface.
+"""
+from datetime import datetime
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+
+from ret.agregacao import ModeloResultados
+
+# (cabeçalho, campo do registro, largura da coluna, numérica)
+COLUNAS_DADOS = [
+    ('Tipo de Encargo', 'tipo_encargo', 20, False),
+    ('Empresa', 'empresa', 25, False),
+    ('Nota Débito/Crédito', 'nota_tipo', 20, False),
+    ('Nº', 'numero_nd', 15, False),
+    ('Data Vencimento', 'data_vencimento', 18, False),
+    ('Valor Total', 'valor_total', 15, True),
+    ('QT', 'quantidade', 12, True),
+    ('Valor Unitário', 'valor_unitario', 15, True),
+    ('Arquivo', 'arquivo', 40, False),
+]
+
+LETRAS = 'ABCDEFGHI'
+
+
+def _criar_estilos(wb):
+    """Registra os estilos nomeados usados no relatório"""
+    border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    centro = Alignment(horizontal='center', vertical='center')
+
+    cabecalho = NamedStyle(name='ret_cabecalho')
+    cabecalho.fill = PatternFill(start_color="1F4788", end_color="1F4788", fill_type="solid")
+    cabecalho.font = Font(bold=True, color="FFFFFF", size=12)
+    cabecalho.border = border
+    cabecalho.alignment = centro
+
+    celula = NamedStyle(name='ret_celula')
+    celula.border = border
+    celula.alignment = centro
+
+    numero = NamedStyle(name='ret_numero')
+    numero.border = border
+    numero.alignment = centro
+    numero.number_format = '#,##0.00'
+
+    titulo = NamedStyle(name='ret_titulo')
+    titulo.font = Font(bold=True, size=16, color="1F4788")
+
+    rotulo = NamedStyle(name='ret_rotulo')
+    rotulo.alignment = Alignment(horizontal='left', vertical='center')
+
+    rotulo_numero = NamedStyle(name='ret_rotulo_numero')
+    rotulo_numero.alignment = Alignment(horizontal='left', vertical='center')
+    rotulo_numero.number_format = '#,##0.00'
+
+    cabecalho_geral = NamedStyle(name='ret_cabecalho_geral')
+    cabecalho_geral.fill = cabecalho.fill
+    cabecalho_geral.font = cabecalho.font
+
+    for estilo in (cabecalho, celula, numero, titulo, rotulo, rotulo_numero, cabecalho_geral):
+        wb.add_named_style(estilo)
+
+
+def _celula(ws, valor, estilo):
+    """Cria uma célula do modo streaming com um estilo nomeado"""
+    cell = WriteOnlyCell(ws, value=valor)
+    cell.style = estilo
+    return cell
+
+
+class _LinhaReutilizavel:
+    """Células pré-estilizadas reaproveitadas a cada linha
+
+    No modo streaming a linha é serializada dentro de append(), então as
+    mesmas células podem receber os valores da linha seguinte: nenhuma
+    célula nem atribuição de estilo é criada por registro.
+    """
+
+    def __init__(self, ws, numericas):
+        self.numericas = numericas
+        self.texto = [_celula(ws, None, 'ret_celula') for _ in numericas]
+        self.numero = [_celula(ws, None, 'ret_numero') for _ in numericas]
+
+    def montar(self, valores):
+        linha = []
+        for i, valor in enumerate(valores):
+            # Formato numérico só para números nas colunas numéricas
+            if self.numericas[i] and isinstance(valor, (int, float)):
+                cell = self.numero[i]
+            else:
+                cell = self.texto[i]
+            cell.value = valor
+            linha.append(cell)
+        return linha
+
+
+def _aba_resumo(wb, titulo_aba, titulo_grupo, tabela, largura_grupo=25):
+    """Aba com um resumo agrupado (tipo, empresa, mês...) do ModeloResultados"""
+    ws = wb.create_sheet(titulo_aba)
+    for letra, largura in zip('ABCDE', (largura_grupo, 18, 15, 25, 20)):
+        ws.column_dimensions[letra].width = largura
+
+    ws.append([
+        _celula(ws, titulo, 'ret_cabecalho')
+        for titulo in (titulo_grupo, 'Valor Total', 'QT', 'Quantidade de Arquivos', 'Valor Total (R$)')
+    ])
+    for grupo, arquivos, valor, qt, valor_brl in zip(
+        tabela.index.astype(str).tolist(), tabela['arquivos'].tolist(), tabela['valor_total'].tolist(),
+        tabela['quantidade'].tolist(), tabela['valor_total_brl'].tolist()
+    ):
+        ws.append([
+            _celula(ws, grupo, 'ret_celula'),
+            _celula(ws, valor, 'ret_numero'),
+            _celula(ws, qt, 'ret_numero'),
+            _celula(ws, arquivos, 'ret_numero'),
+            _celula(ws, valor_brl, 'ret_numero'),
+        ])
+
+
+class EscritorExcel:
+    """Relatório gravado em partes: linhas de dados lote a lote, resumos no fim
+
+    escrever() acrescenta as linhas de um ModeloResultados à aba Dados
+    Completos (o modo streaming as manda para um arquivo temporário, sem
+    guardá-las) e finalizar(resumos) grava as abas de resumo e salva. Os
+    resumos podem ser um ModeloResultados ou um ResumoIncremental.
+    """
+
+    def __init__(self, excel_path):
+        self.excel_path = excel_path
+        self.wb = Workbook(write_only=True)
+        _criar_estilos(self.wb)
+
+        # ABA DADOS COMPLETOS
+        self.ws_dados = self.wb.create_sheet("Dados Completos")
+        for letra, (_, _, largura, _) in zip(LETRAS, COLUNAS_DADOS):
+            self.ws_dados.column_dimensions[letra].width = largura
+
+        self.ws_dados.append([_celula(self.ws_dados, titulo, 'ret_cabecalho') for titulo, _, _, _ in COLUNAS_DADOS])
+
+        self.campos = [campo for _, campo, _, _ in COLUNAS_DADOS]
+        self.linha = _LinhaReutilizavel(self.ws_dados, [numerica for _, _, _, numerica in COLUNAS_DADOS])
+
+    def escrever(self, resultados):
+        """Acrescenta as linhas de um ModeloResultados"""
+        ws_dados, linha = self.ws_dados, self.linha
+        for valores in resultados.linhas(self.campos):
+            ws_dados.append(linha.montar(valores))
+
+    def finalizar(self, resumos):
+        """Grava as abas de resumo e salva o arquivo"""
+        wb = self.wb
+
+        # ABAS DE RESUMO
+        _aba_resumo(wb, "Resumo por Tipo", 'Tipo de Encargo', resumos.por_tipo())
+        _aba_resumo(wb, "Resumo por Empresa", 'Empresa', resumos.por_empresa(), largura_grupo=35)
+        _aba_resumo(wb, "Resumo por Mês", 'Mês de Vencimento', resumos.por_mes(), largura_grupo=20)
+
+        # ABA RESUMO GERAL
+        ws_geral = wb.create_sheet("Resumo Geral")
+        ws_geral.column_dimensions['A'].width = 30
+        ws_geral.column_dimensions['B'].width = 25
+        ws_geral.merged_cells.add('A1:B1')
+
+        totais = resumos.totais()
+        notas = resumos.debito_credito()
+        dados_geral = [
+            ['RESUMO GERAL DO PROCESSAMENTO', ''],
+            ['', ''],
+            ['Métrica', 'Valor'],
+            ['Total de PDFs Processados', totais['total_arquivos']],
+            ['Quantidade Total (QT)', totais['total_qt']],
+            ['Valor Total (R$)', totais['total_geral_brl']],
+            ['Notas de Débito (R$)', notas['debito']],
+            ['Notas de Crédito (R$)', notas['credito']],
+            ['Saldo Débito - Crédito (R$)', notas['saldo']],
+            ['', ''],
+            ['Data do Processamento', datetime.now().strftime('%Y-%m-%d %H:%M:%S')]
+        ]
+
+        for r_idx, row in enumerate(dados_geral, 1):
+            if r_idx == 1:
+                estilos = ['ret_titulo', 'ret_titulo']
+            elif r_idx == 3:
+                estilos = ['ret_cabecalho_geral', 'ret_cabecalho_geral']
+            else:
+                estilos = ['ret_rotulo', 'ret_rotulo_numero' if isinstance(row[1], (int, float)) else 'ret_rotulo']
+            ws_geral.append([_celula(ws_geral, valor, estilo) for valor, estilo in zip(row, estilos)])
+
+        # Salvar
+        wb.save(self.excel_path)
+        return self.excel_path
+
+
+def exportar_excel(resultados, excel_path, taxa=None):
+    """Exporta os resultados para um Excel com as abas de dados e resumos
+
+    'resultados' é um ModeloResultados; uma lista (ou outro iterável) de
+    registros também é aceita e convertida com a taxa informada (None =
+    câmbio configurado, veja ret/cambio.py).
+    """
+    if not isinstance(resultados, ModeloResultados):
+        resultados = ModeloResultados.de_registros(resultados, taxa)
+
+    escritor = EscritorExcel(excel_path)
+    escritor.escrever(resultados)
+    return escritor.finalizar(resultados)
@@ -0,0 +1,321 @@
+"""Extração de dados estruturados dos PDFs de RET
+
+pdfplumber e PyPDF2 são importados na primeira leitura de um PDF, e não
+ao importar o módulo: a interface abre sem pagar essa importação.
+"""
+import os
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+from ret.campos import EXTRATOR
+from ret.descoberta import classificar_tipo
+from ret.empresas import classificar_nome, completar_pelo_texto
+from ret.leitura import MODO_AUTO, abrir_pdf
+from ret.metricas import cronometrar
+from ret.supervisao import FALHA_CORROMPIDO, FALHA_MEMORIA
+
+# Separa as páginas no texto guardado pelo cache de extração
+SEPARADOR_PAGINAS = '\f'
+
+# Versões usadas para invalidar o cache de extração:
+# - VERSAO_TEXTO: incrementar ao mudar a forma de ler o texto do PDF
+# - VERSAO_PARSER: muda sozinha quando os campos do EXTRATOR mudam
+#   (incrementar o sufixo ao mudar a lógica de analisar_paginas)
+VERSAO_TEXTO = 2
+VERSAO_PARSER = EXTRATOR.assinatura() + '-2'
+
+# Campos que uma nota precisa ter para a leitura ser considerada completa
+CAMPOS_OBRIGATORIOS = ('numero_nd', 'data_vencimento', 'valores_encontrados')
+
+# Quais páginas ler de cada PDF:
+# - modo 'todas': todas as páginas (padrão)
+# - modo 'primeiras': as max_paginas primeiras páginas
+# - modo 'completar': página a página até achar os CAMPOS_OBRIGATORIOS
+#   (no máximo max_paginas, se informado)
+# - incluir_ultima: lê também a última página (onde costumam estar os totais)
+# - rapido: tenta antes a camada de texto do PyPDF2, mais leve, e só usa o
+#   pdfplumber se faltar algum campo obrigatório
+# - ocr: ConfigOCR (ret/ocr.py) para ler pelo Tesseract as páginas sem
+#   camada de texto (notas escaneadas); None desativa
+# - leitura: como o arquivo chega ao parser ('auto', 'mmap', 'buffer' ou
+#   'arquivo', veja ret/leitura.py); não muda o texto nem a versão do cache
+EstrategiaPaginas = namedtuple(
+    'EstrategiaPaginas', 'modo max_paginas incluir_ultima rapido ocr leitura',
+    defaults=('todas', None, False, False, None, MODO_AUTO)
+)
+ESTRATEGIA_PADRAO = EstrategiaPaginas()
+MODOS_PAGINAS = ('todas', 'primeiras', 'completar')
+
+
+def versao_texto(estrategia=ESTRATEGIA_PADRAO):
+    """Versão do texto guardado no cache (depende da estratégia de páginas)"""
+    if estrategia._replace(leitura=MODO_AUTO) == ESTRATEGIA_PADRAO:
+        return str(VERSAO_TEXTO)
+    versao = f"{VERSAO_TEXTO}-{estrategia.modo}-{estrategia.max_paginas}-" \
+             f"{int(estrategia.incluir_ultima)}-{int(estrategia.rapido)}"
+    if estrategia.ocr:
+        # O texto guardado inclui o do OCR, que depende do idioma e da resolução
+        versao += f"-ocr-{estrategia.ocr.idioma}-{estrategia.ocr.resolucao}"
+    return versao
+
+
+# Campos do registro que dependem do caminho do arquivo (e não do conteúdo)
+CAMPOS_CAMINHO = (
+    'arquivo', 'caminho', 'tipo_encargo', 'empresa', 'nota_tipo', 'erro', 'falha', 'texto', 'metricas'
+)
+
+
+def campos_conteudo(dados):
+    """Campos do registro extraídos do conteúdo do PDF (os que o cache guarda)"""
+    return {campo: valor for campo, valor in dados.items() if campo not in CAMPOS_CAMINHO}
+
+
+def dados_vazios(caminho_pdf):
+    """Cria o registro base de um PDF, antes da extração"""
+    return {
+        'arquivo': os.path.basename(caminho_pdf),
+        'caminho': caminho_pdf,
+        'tipo_encargo': identificar_tipo(caminho_pdf),
+        'empresa': extrair_empresa(caminho_pdf),
+        'nota_tipo': extrair_tipo_nota(caminho_pdf),
+        'numero_nd': '',
+        'data_vencimento': '',
+        'valor_total': 0.0,
+        'quantidade': 0.0,
+        'valor_unitario': 0.0,
+        'valores_encontrados': [],
+        'erro': '',
+        'falha': ''
+    }
+
+
+def _campos_completos(encontrados):
+    """Indica se todos os campos obrigatórios já foram encontrados"""
+    return all(encontrados.get(campo) for campo in CAMPOS_OBRIGATORIOS)
+
+
+def _selecionar_paginas(total, ler_pagina, estrategia, lidas=None):
+    """Lê as páginas escolhidas pela estratégia, parando cedo se possível
+
+    Se 'lidas' (lista) for passada, recebe o número (base 0) de cada
+    página devolvida, na mesma ordem.
+    """
+    if estrategia.modo not in MODOS_PAGINAS:
+        raise ValueError(f"Modo de páginas inválido: {estrategia.modo}")
+    
+    limite = total
+    if estrategia.modo != 'todas' and estrategia.max_paginas:
+        limite = min(total, estrategia.max_paginas)
+    
+    paginas = {}
+    encontrados = {}
+    for i in range(limite):
+        paginas[i] = ler_pagina(i)
+        if estrategia.modo == 'completar':
+            for campo, valor in EXTRATOR.extrair([paginas[i]]).items():
+                encontrados[campo] = encontrados.get(campo) or valor
+            if _campos_completos(encontrados):
+                break
+    
+    if estrategia.incluir_ultima and total and (total - 1) not in paginas:
+        paginas[total - 1] = ler_pagina(total - 1)
+    
+    if lidas is not None:
+        lidas[:] = sorted(paginas)
+    return [paginas[i] for i in sorted(paginas)]
+
+
+@lru_cache(maxsize=None)
+def _leitor_pypdf():
+    """PdfReader do PyPDF2, importado no primeiro uso (None se não instalado)"""
+    try:
+        from PyPDF2 import PdfReader
+    except ImportError:  # PyPDF2 é opcional: sem ele o caminho rápido é ignorado
+        return None
+    return PdfReader
+
+
+def _ler_com_pdfplumber(fonte, estrategia, metricas, lidas=None):
+    """Texto das páginas pelo pdfplumber (layout completo); 'fonte' é o caminho ou um fluxo"""
+    import pdfplumber
+
+    metricas['leitor'] = 'pdfplumber'
+    with cronometrar(metricas, 'abrir_ms'):
+        if not isinstance(fonte, str):
+            fonte.seek(0)
+        pdf = pdfplumber.open(fonte)
+    with pdf:
+        with cronometrar(metricas, 'abrir_ms'):
+            total = len(pdf.pages)
+        metricas['paginas_total'] = total
+        
+        def ler_pagina(i):
+            with cronometrar(metricas, 'texto_ms'):
+                pagina = pdf.pages[i]
+                texto = pagina.extract_text() or ''
+                # Libera os objetos da página (anexos longos pesam na memória)
+                pagina.close()
+            return texto
+        
+        return _selecionar_paginas(total, ler_pagina, estrategia, lidas)
+
+
+def _ler_com_pypdf(fonte, estrategia, metricas, lidas=None):
+    """Texto das páginas pela camada de texto do PyPDF2 (mais rápida); 'fonte' é o caminho ou um fluxo"""
+    metricas['leitor'] = 'pypdf'
+    with cronometrar(metricas, 'abrir_ms'):
+        leitor = _leitor_pypdf()(fonte)
+        total = len(leitor.pages)
+    metricas['paginas_total'] = total
+    
+    def ler_pagina(i):
+        with cronometrar(metricas, 'texto_ms'):
+            return leitor.pages[i].extract_text() or ''
+    
+    return _selecionar_paginas(total, ler_pagina, estrategia, lidas)
+
+
+def extrair_texto_pdf(caminho_pdf, estrategia=ESTRATEGIA_PADRAO, metricas=None, lidas=None):
+    """Lê o texto das páginas do PDF (lista com uma string por página)
+
+    Se 'metricas' (dict) for passado, recebe o leitor usado, o total de
+    páginas, o modo de leitura do arquivo e os tempos (ms) de leitura,
+    abertura e extração do texto; 'lidas' (lista) recebe o número de cada
+    página devolvida. O arquivo é lido uma vez (ret/leitura.py) e o mesmo
+    conteúdo serve aos dois leitores.
+    """
+    if metricas is None:
+        metricas = {}
+    
+    with abrir_pdf(caminho_pdf, estrategia.leitura, metricas) as fonte:
+        if estrategia.rapido and _leitor_pypdf() is not None:
+            try:
+                paginas = _ler_com_pypdf(fonte, estrategia, metricas, lidas)
+                if _campos_completos(EXTRATOR.extrair(paginas)):
+                    return paginas
+            except Exception:
+                pass  # PDFs que o PyPDF2 não lê seguem para o pdfplumber
+        
+        return _ler_com_pdfplumber(fonte, estrategia, metricas, lidas)
+
+
+def analisar_paginas(dados, paginas):
+    """Preenche os campos do registro a partir do texto das páginas"""
+    campos = EXTRATOR.extrair(paginas)
+    valores = [valor for valor in campos.pop('valores_encontrados', []) if valor > 0]
+    quantidade = campos.pop('quantidade', 0.0)
+    
+    # ND, data e campos adicionais registrados no extrator
+    dados.update(campos)
+    dados['valores_encontrados'] = valores
+
+    # Empresa e tipo de nota que o nome do arquivo não trouxe
+    completar_pelo_texto(dados, paginas[0] if paginas else '')
+    
+    # Calcular valores principais
+    if valores:
+        dados['valor_total'] = max(valores)
+        dados['quantidade'] = quantidade
+        
+        if dados['quantidade'] > 0:
+            dados['valor_unitario'] = dados['valor_total'] / dados['quantidade']
+    
+    return dados
+
+
+def extrair_dados_pdf(caminho_pdf, manter_texto=False, estrategia=ESTRATEGIA_PADRAO):
+    """Extrai informações estruturadas do PDF
+
+    Nunca propaga exceções: em caso de falha o registro volta com o campo
+    'erro' preenchido e o motivo em 'falha' ('corrupt' ou 'oom', veja
+    ret/supervisao.py), para que um arquivo ruim não interrompa o lote.
+    Com manter_texto=True o texto lido fica em dados['texto'], com as
+    páginas separadas por SEPARADOR_PAGINAS (usado pelo cache de extração).
+    Tamanho, páginas e tempos de cada fase ficam em dados['metricas']
+    (veja ret/metricas.py).
+    """
+    dados = dados_vazios(caminho_pdf)
+    metricas = {'origem': 'extracao', 'bytes': 0, 'paginas': 0}
+    inicio = time.perf_counter()
+    inicio_cpu = time.thread_time()
+    
+    try:
+        metricas['bytes'] = os.path.getsize(caminho_pdf)
+        lidas = []
+        paginas = extrair_texto_pdf(caminho_pdf, estrategia, metricas, lidas)
+        metricas['paginas'] = len(paginas)
+        with cronometrar(metricas, 'regex_ms'):
+            analisar_paginas(dados, paginas)
+        if estrategia.ocr:
+            _marcar_sem_texto(dados, paginas, lidas)
+        if manter_texto or dados.get('paginas_sem_texto'):
+            dados['texto'] = SEPARADOR_PAGINAS.join(paginas)
+    except MemoryError:
+        dados['erro'] = "Memória esgotada ao ler o PDF"
+        dados['falha'] = FALHA_MEMORIA
+    except Exception as e:
+        dados['erro'] = str(e)
+        dados['falha'] = FALHA_CORROMPIDO
+    
+    metricas['total_ms'] = (time.perf_counter() - inicio) * 1000
+    # O que não foi CPU desta thread é espera: disco/rede (inclusive faltas de página do mmap)
+    metricas['cpu_ms'] = min((time.thread_time() - inicio_cpu) * 1000, metricas['total_ms'])
+    metricas['espera_ms'] = metricas['total_ms'] - metricas['cpu_ms']
+    for chave in ('leitura_ms', 'abrir_ms', 'texto_ms', 'regex_ms', 'cpu_ms', 'espera_ms', 'total_ms'):
+        if chave in metricas:
+            metricas[chave] = round(metricas[chave], 2)
+    dados['metricas'] = metricas
+    
+    return dados
+
+
+def _marcar_sem_texto(dados, paginas, lidas):
+    """Anota as páginas sem camada de texto para o OCR: [[posição na lista, página], ...]"""
+    from ret.ocr import pagina_sem_texto
+
+    sem_texto = [[posicao, indice] for posicao, (indice, texto) in enumerate(zip(lidas, paginas))
+                 if pagina_sem_texto(texto)]
+    if sem_texto:
+        dados['paginas_sem_texto'] = sem_texto
+
+
+def aplicar_ocr(dados, textos, metricas_ocr, manter_texto=False):
+    """Refaz a análise do registro com o texto do OCR das páginas sem texto
+
+    'textos' ({página: texto}) e 'metricas_ocr' (por página) vêm de
+    ocr.reconhecer_paginas. O texto completo fica em dados['texto'] só com
+    manter_texto=True (cache de extração).
+    """
+    sem_texto = dados.pop('paginas_sem_texto', None) or []
+    paginas = dados.pop('texto', '').split(SEPARADOR_PAGINAS)
+    for posicao, indice in sem_texto:
+        if indice in textos and posicao < len(paginas):
+            paginas[posicao] = textos[indice]
+    if textos:
+        analisar_paginas(dados, paginas)
+    if manter_texto:
+        dados['texto'] = SEPARADOR_PAGINAS.join(paginas)
+
+    metricas = dados.setdefault('metricas', {})
+    ocr_ms = sum(pagina.get('total_ms', 0.0) for pagina in metricas_ocr)
+    metricas['paginas_ocr'] = len(metricas_ocr)
+    metricas['ocr_ms'] = round(ocr_ms, 2)
+    metricas['total_ms'] = round(metricas.get('total_ms', 0.0) + ocr_ms, 2)
+    metricas['ocr'] = metricas_ocr
+    return dados
+
+
+def identificar_tipo(caminho):
+    """Identifica tipo de encargo pelas pastas do caminho (veja ret/descoberta.py)"""
+    return classificar_tipo(caminho)
+
+
+def extrair_empresa(caminho):
+    """Extrai nome da empresa do nome do arquivo (veja ret/empresas.py)"""
+    return classificar_nome(caminho).empresa
+
+
+def extrair_tipo_nota(caminho):
+    """Identifica se é Nota Débito ou Crédito pelo nome do arquivo"""
+    return classificar_nome(caminho).nota_tipo
@@ -0,0 +1,288 @@
+"""Leitura dos PDFs: mapeamento em memória, leitura em bloco e pré-leitura
+
+O parser recebe o conteúdo do PDF como um fluxo em memória (FluxoMemoria),
+sem as várias leituras pequenas ao disco de um arquivo bufferizado. O
+parser ainda recebe cópias (bytes) dos trechos que lê; o que se evita é
+ler o arquivo inteiro para um buffer à parte (mmap) e realocar esse
+buffer a cada arquivo (modo 'buffer'):
+- 'mmap': arquivos locais são mapeados em memória; as páginas do arquivo
+  vêm do cache do sistema operacional, sem cópia para um buffer próprio;
+- 'buffer': o arquivo é lido de uma vez (readinto) para um buffer
+  reutilizado pela thread (arquivos acima de LIMITE_BUFFER_THREAD usam um
+  buffer só deles, liberado ao fim). É o modo de pastas de rede (SMB,
+  NFS), onde cada falta de página do mmap viraria uma leitura pequena
+  pela rede, e de arquivos pequenos;
+- 'arquivo': o caminho vai direto para o parser (leitura bufferizada);
+- 'auto' (padrão): 'buffer'. Só nos workers supervisionados
+  (ret/supervisao.py, depois de permitir_mmap) passa a 'mmap' em arquivos
+  locais grandes.
+Um arquivo truncado ou substituído enquanto está mapeado derruba o
+processo com SIGBUS, que não vira exceção: fora da supervisão isso
+quebraria o pool inteiro (ou encerraria a interface, com um único worker).
+Sob supervisão, o worker morto é trocado e o PDF falha como 'corrupt'.
+Forçar 'mmap' fora dela é uma escolha explícita de quem chama.
+Com o PyPDF2 (EstrategiaPaginas.rapido) o mesmo conteúdo serve aos dois
+leitores, sem ler o arquivo de novo.
+
+PreLeitura antecipa, em uma thread, a leitura dos próximos arquivos da
+fila (posix_fadvise WILLNEED nos locais; leitura em blocos nos de rede)
+enquanto os workers ainda estão no arquivo anterior.
+"""
+import io
+import mmap
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+MODO_AUTO = 'auto'
+MODO_MMAP = 'mmap'
+MODO_BUFFER = 'buffer'
+MODO_ARQUIVO = 'arquivo'
+MODOS_LEITURA = (MODO_AUTO, MODO_MMAP, MODO_BUFFER, MODO_ARQUIVO)
+
+# Abaixo disto (bytes) uma leitura única custa menos que mapear o arquivo
+LIMITE_MMAP = 256 * 1024
+
+# O modo 'auto' só mapeia arquivos em processos onde a morte do worker é
+# tratada (permitir_mmap, chamado pelos workers supervisionados)
+_MMAP_AUTOMATICO = False
+
+# Arquivos lidos antecipadamente, à frente do que os workers processam
+PREBUSCA_ARQUIVOS = 8
+BLOCO_PREBUSCA = 1024 * 1024
+
+# Sistemas de arquivos de rede (tipo em /proc/self/mounts)
+TIPOS_REDE = frozenset({
+    'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', '9p', 'afs', 'ceph', 'glusterfs',
+    'fuse.sshfs', 'fuse.rclone', 'davfs',
+})
+
+# Buffer reutilizado por thread no modo 'buffer'. Arquivos maiores que o
+# limite (bytes) usam um buffer avulso: um PDF grande não deixa o worker
+# com essa memória presa até o fim (ret/supervisao.py limita a memória)
+_LOCAL = threading.local()
+LIMITE_BUFFER_THREAD = 16 * 1024 * 1024
+
+
+class FluxoMemoria(io.RawIOBase):
+    """Fluxo somente leitura sobre um buffer (mmap ou bytearray)
+
+    O buffer não é copiado por inteiro: read() devolve uma cópia (bytes)
+    só do trecho pedido e readinto() copia o trecho direto para o destino
+    do chamador; seek/tell são aritmética sobre o buffer.
+    """
+
+    def __init__(self, buffer, tamanho=None):
+        super().__init__()
+        self._visao = memoryview(buffer)
+        if tamanho is not None:
+            self._visao = self._visao[:tamanho]
+        self._posicao = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._posicao
+
+    def seek(self, deslocamento, origem=io.SEEK_SET):
+        if origem == io.SEEK_CUR:
+            deslocamento += self._posicao
+        elif origem == io.SEEK_END:
+            deslocamento += len(self._visao)
+        if deslocamento < 0:
+            raise ValueError("Posição negativa")
+        self._posicao = deslocamento
+        return self._posicao
+
+    def read(self, tamanho=-1):
+        inicio = self._posicao
+        fim = len(self._visao) if tamanho is None or tamanho < 0 else min(inicio + tamanho, len(self._visao))
+        if fim <= inicio:
+            return b''
+        self._posicao = fim
+        return self._visao[inicio:fim].tobytes()
+
+    def readinto(self, destino):
+        destino = memoryview(destino).cast('B')
+        inicio = self._posicao
+        fim = min(inicio + len(destino), len(self._visao))
+        if fim <= inicio:
+            return 0
+        destino[:fim - inicio] = self._visao[inicio:fim]
+        self._posicao = fim
+        return fim - inicio
+
+    def close(self):
+        # Libera o buffer (o mmap só fecha sem visões abertas)
+        if not self.closed:
+            self._visao.release()
+        super().close()
+
+
+@lru_cache(maxsize=1)
+def _montagens_rede():
+    """Pontos de montagem de rede (Linux), do mais longo ao mais curto"""
+    try:
+        with open('/proc/self/mounts', encoding='utf-8', errors='replace') as f:
+            linhas = [linha.split() for linha in f]
+    except OSError:
+        return ()
+    pontos = [
+        partes[1].replace('\\040', ' ') for partes in linhas
+        if len(partes) > 2 and partes[2] in TIPOS_REDE
+    ]
+    return tuple(sorted(pontos, key=len, reverse=True))
+
+
+@lru_cache(maxsize=1024)
+def _pasta_em_rede(pasta):
+    if os.name == 'nt':
+        if pasta.startswith('\\\\'):
+            return True
+        try:
+            import ctypes
+            raiz = os.path.splitdrive(pasta)[0] + '\\'
+            return ctypes.windll.kernel32.GetDriveTypeW(raiz) == 4  # DRIVE_REMOTE
+        except (AttributeError, OSError):
+            return False
+    return any(pasta == ponto or pasta.startswith(ponto.rstrip('/') + '/') for ponto in _montagens_rede())
+
+
+def em_rede(caminho):
+    """Indica se o arquivo está em uma pasta de rede"""
+    return _pasta_em_rede(os.path.dirname(os.path.abspath(caminho)))
+
+
+def permitir_mmap():
+    """Deixa o modo 'auto' mapear os arquivos locais grandes neste processo
+
+    Só para processos cuja morte (SIGBUS) é tratada por quem os criou,
+    como os workers de ret/supervisao.py.
+    """
+    global _MMAP_AUTOMATICO
+    _MMAP_AUTOMATICO = True
+
+
+def escolher_modo(caminho, tamanho, modo=MODO_AUTO):
+    """Modo efetivo de leitura de um arquivo"""
+    if modo != MODO_AUTO:
+        return modo
+    if not _MMAP_AUTOMATICO or tamanho < LIMITE_MMAP or em_rede(caminho):
+        return MODO_BUFFER
+    return MODO_MMAP
+
+
+def _buffer_da_thread(tamanho):
+    """Buffer reutilizável da thread, com ao menos 'tamanho' bytes
+
+    Acima de LIMITE_BUFFER_THREAD devolve um buffer avulso, que não fica
+    com a thread.
+    """
+    if tamanho > LIMITE_BUFFER_THREAD:
+        return bytearray(tamanho)
+    buffer = getattr(_LOCAL, 'buffer', None)
+    if buffer is None or len(buffer) < tamanho:
+        # Cresce com folga para não realocar a cada arquivo um pouco maior
+        buffer = bytearray(min(max(tamanho, 2 * len(buffer or b'')), LIMITE_BUFFER_THREAD))
+        _LOCAL.buffer = buffer
+    return buffer
+
+
+@contextmanager
+def abrir_pdf(caminho, modo=MODO_AUTO, metricas=None):
+    """Conteúdo do PDF para o parser: FluxoMemoria (mmap/buffer) ou o próprio caminho
+
+    Com 'metricas' (dict), registra o modo usado ('leitura') e o tempo (ms)
+    de mapear/ler o arquivo ('leitura_ms').
+    """
+    inicio = time.perf_counter()
+    if modo == MODO_ARQUIVO:
+        if metricas is not None:
+            metricas['leitura'] = MODO_ARQUIVO
+        yield caminho
+        return
+
+    with open(caminho, 'rb') as f:
+        tamanho = os.fstat(f.fileno()).st_size
+        efetivo = escolher_modo(caminho, tamanho, modo)
+        mapa = None
+        if efetivo == MODO_MMAP and tamanho:
+            mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            fluxo = FluxoMemoria(mapa)
+        else:
+            efetivo = MODO_BUFFER
+            buffer = _buffer_da_thread(tamanho)
+            lidos = f.readinto(memoryview(buffer)[:tamanho]) if tamanho else 0
+            fluxo = FluxoMemoria(buffer, lidos)
+
+    if metricas is not None:
+        metricas['leitura'] = efetivo
+        metricas['leitura_ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+    try:
+        yield fluxo
+    finally:
+        fluxo.close()
+        if mapa is not None:
+            mapa.close()
+
+
+def _antecipar(caminho, scratch):
+    """Traz o arquivo para o cache do sistema operacional"""
+    with open(caminho, 'rb') as f:
+        if hasattr(os, 'posix_fadvise') and not em_rede(caminho):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+            return
+        # Sem fadvise (ou em rede, onde ele pode não ter efeito): leitura em blocos
+        while f.readinto(scratch):
+            pass
+
+
+class PreLeitura:
+    """Thread que lê antecipadamente os próximos arquivos da fila de extração
+
+    agendar() nunca bloqueia: com a fila cheia (o disco não acompanha) o
+    arquivo é simplesmente lido pelo worker, como sem a pré-leitura.
+    """
+
+    _FIM = object()
+
+    def __init__(self, quantidade=PREBUSCA_ARQUIVOS):
+        self.antecipados = 0
+        self._fila = queue.Queue(maxsize=max(1, quantidade))
+        self._thread = threading.Thread(target=self._executar, name='ret-preleitura', daemon=True)
+        self._thread.start()
+
+    def _executar(self):
+        scratch = bytearray(BLOCO_PREBUSCA)
+        while True:
+            caminho = self._fila.get()
+            if caminho is self._FIM:
+                return
+            try:
+                _antecipar(caminho, scratch)
+                self.antecipados += 1
+            except OSError:
+                pass  # o worker reporta o erro ao abrir o arquivo
+
+    def agendar(self, caminho):
+        try:
+            self._fila.put_nowait(caminho)
+        except queue.Full:
+            pass
+
+    def encerrar(self):
+        """Descarta o que falta antecipar e encerra a thread"""
+        try:
+            while True:
+                self._fila.get_nowait()
+        except queue.Empty:
+            pass
+        self._fila.put(self._FIM)
+        self._thread.join()
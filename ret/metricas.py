@@ -0,0 +1,243 @@
+"""Instrumentação do processamento: tempos por etapa, métricas por arquivo e perfil
+
+Cada PDF extraído volta com dados['metricas'] (preenchido no próprio
+worker por extrair_dados_pdf):
+    bytes, paginas (lidas), paginas_total, leitor, origem ('extracao' ou
+    'cache'), leitura (modo de ret/leitura.py) e os tempos em ms:
+    leitura_ms, abrir_ms, texto_ms, regex_ms, total_ms. O tempo de leitura
+    e análise (sem o OCR) é dividido em cpu_ms (CPU do worker) e espera_ms
+    (o restante: espera de disco/rede).
+Com OCR (ret/ocr.py), também paginas_ocr, ocr_ms e, em 'ocr', os tempos
+de cada página (render_ms, tesseract_ms, total_ms, cache).
+
+MetricasExecucao acumula esses dados e o tempo de cada etapa do lote
+(listagem, extração, modelo, banco, Excel...), opcionalmente com um perfil
+cProfile ou tracemalloc do processo principal, e exporta tudo como um
+relatório JSON lines (um objeto por linha: execucao, etapa, arquivo,
+perfil).
+"""
+import cProfile
+import heapq
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+# Modos de perfil aceitos por MetricasExecucao(perfil=...)
+MODOS_PERFIL = ('cprofile', 'tracemalloc')
+
+# Linhas do perfil guardadas no relatório
+LINHAS_PERFIL = 25
+
+# Métricas por arquivo guardadas para o relatório: além disso só entram nas
+# somas e na lista dos mais lentos, para a memória não crescer com o acervo
+LIMITE_ARQUIVOS = 10000
+QUANTIDADE_LENTOS = 50
+
+TEMPOS_EXTRACAO = ('leitura_ms', 'abrir_ms', 'texto_ms', 'regex_ms', 'ocr_ms', 'cpu_ms', 'espera_ms', 'total_ms')
+
+
+@contextmanager
+def cronometrar(metricas, chave):
+    """Soma em metricas[chave] o tempo (ms) do bloco"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        metricas[chave] = metricas.get(chave, 0.0) + (time.perf_counter() - inicio) * 1000
+
+
+class MetricasExecucao:
+    """Tempos por etapa, contadores e métricas por arquivo de uma execução"""
+
+    def __init__(self, perfil=None):
+        if perfil is not None and perfil not in MODOS_PERFIL:
+            raise ValueError(f"Modo de perfil inválido: {perfil}")
+        self.perfil = perfil
+        self.inicio = datetime.now()
+        self.etapas = {}
+        self.contadores = {
+            'arquivos': 0, 'paginas': 0, 'bytes': 0, 'erros': 0, 'cache': 0, 'paginas_ocr': 0
+        }
+        self.arquivos = []
+        self.arquivos_omitidos = 0
+        self._somas = dict.fromkeys(TEMPOS_EXTRACAO, 0.0)
+        self._lentos = []
+        self.relatorio_perfil = None
+
+    @contextmanager
+    def etapa(self, nome):
+        """Mede uma etapa do lote (etapas repetidas são somadas)"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.etapas[nome] = self.etapas.get(nome, 0.0) + time.perf_counter() - inicio
+
+    def iterar(self, nome, iteravel):
+        """Itera somando na etapa só o tempo gasto para produzir cada item
+
+        O tempo em que o consumidor trabalha entre um item e outro (gravar,
+        exportar...) fica de fora, para não ser contado duas vezes.
+        """
+        iterador = iter(iteravel)
+        while True:
+            inicio = time.perf_counter()
+            try:
+                item = next(iterador)
+            except StopIteration:
+                return
+            finally:
+                self.etapas[nome] = self.etapas.get(nome, 0.0) + time.perf_counter() - inicio
+            yield item
+
+    def registrar_arquivo(self, dados):
+        """Acumula as métricas de um PDF processado"""
+        metricas = dados.get('metricas') or {}
+        self.contadores['arquivos'] += 1
+        self.contadores['paginas'] += metricas.get('paginas', 0)
+        self.contadores['bytes'] += metricas.get('bytes', 0)
+        self.contadores['paginas_ocr'] += metricas.get('paginas_ocr', 0)
+        if dados.get('erro'):
+            self.contadores['erros'] += 1
+        if metricas.get('origem') == 'cache':
+            self.contadores['cache'] += 1
+        for chave in TEMPOS_EXTRACAO:
+            self._somas[chave] += metricas.get(chave, 0.0)
+
+        registro = dict(metricas, caminho=dados['caminho'], erro=dados.get('erro', ''))
+        if len(self.arquivos) < LIMITE_ARQUIVOS:
+            self.arquivos.append(registro)
+        else:
+            self.arquivos_omitidos += 1
+        item = (registro.get('total_ms', 0.0), self.contadores['arquivos'], registro)
+        if len(self._lentos) < QUANTIDADE_LENTOS:
+            heapq.heappush(self._lentos, item)
+        else:
+            heapq.heappushpop(self._lentos, item)
+
+    def mais_lentos(self, quantidade=20):
+        """Arquivos com maior tempo total de extração (até QUANTIDADE_LENTOS)"""
+        return [registro for _, _, registro in heapq.nlargest(quantidade, self._lentos)]
+
+    def tempos_extracao(self):
+        """Soma, em ms, de cada tempo de TEMPOS_EXTRACAO em todos os arquivos (tempo dos workers)"""
+        return dict(self._somas)
+
+    def divisao_es(self):
+        """Tempo dos workers dividido em CPU e espera de E/S: (cpu_s, espera_s, % de espera)"""
+        cpu, espera = self._somas['cpu_ms'] / 1000, self._somas['espera_ms'] / 1000
+        total = cpu + espera
+        return cpu, espera, (espera / total * 100 if total else 0.0)
+
+    @contextmanager
+    def perfilar(self):
+        """Captura o perfil do bloco conforme o modo escolhido (nada se perfil=None)
+
+        O perfil cobre só o processo principal: para incluir a extração dos
+        PDFs, use um único worker (a extração roda então no mesmo processo).
+        """
+        if self.perfil == 'cprofile':
+            perfilador = cProfile.Profile()
+            perfilador.enable()
+            try:
+                yield
+            finally:
+                perfilador.disable()
+                saida = io.StringIO()
+                pstats.Stats(perfilador, stream=saida).sort_stats('cumulative').print_stats(LINHAS_PERFIL)
+                self.relatorio_perfil = saida.getvalue()
+        elif self.perfil == 'tracemalloc':
+            ja_ativo = tracemalloc.is_tracing()
+            if not ja_ativo:
+                tracemalloc.start()
+            try:
+                yield
+            finally:
+                foto = tracemalloc.take_snapshot()
+                _, pico = tracemalloc.get_traced_memory()
+                if not ja_ativo:
+                    tracemalloc.stop()
+                linhas = [f"Pico de memória rastreada: {pico / 1024 / 1024:.1f} MB"]
+                linhas += [str(estatistica) for estatistica in foto.statistics('lineno')[:LINHAS_PERFIL]]
+                self.relatorio_perfil = "\n".join(linhas)
+        else:
+            yield
+
+    def resumo(self):
+        """Visão geral da execução (primeira linha do relatório)"""
+        duracao = sum(self.etapas.values())
+        extracao = self.etapas.get('extracao', 0.0)
+        return {
+            'tipo': 'execucao',
+            'inicio': self.inicio.strftime('%Y-%m-%d %H:%M:%S'),
+            'duracao_s': round(duracao, 4),
+            'perfil': self.perfil,
+            **self.contadores,
+            'arquivos_omitidos': self.arquivos_omitidos,
+            'arquivos_por_s': round(self.contadores['arquivos'] / extracao, 2) if extracao else None,
+            'paginas_por_s': round(self.contadores['paginas'] / extracao, 2) if extracao else None,
+            **{chave: round(valor, 1) for chave, valor in self.tempos_extracao().items()},
+            'espera_pct': round(self.divisao_es()[2], 1),
+        }
+
+    def linhas_relatorio(self):
+        """Objetos do relatório, um por linha: execucao, etapas, arquivos e perfil"""
+        yield self.resumo()
+        for nome, segundos in self.etapas.items():
+            yield {'tipo': 'etapa', 'etapa': nome, 'segundos': round(segundos, 4)}
+        for metricas in self.arquivos:
+            yield {'tipo': 'arquivo', **metricas}
+        if self.relatorio_perfil:
+            yield {'tipo': 'perfil', 'modo': self.perfil, 'texto': self.relatorio_perfil}
+
+    def texto(self, quantidade=20):
+        """Relatório legível: etapas, tempos da extração, arquivos mais lentos e perfil"""
+        resumo = self.resumo()
+        duracao = resumo['duracao_s']
+        linhas = [
+            "DESEMPENHO DA EXECUÇÃO",
+            "",
+            f"Arquivos: {resumo['arquivos']} ({resumo['cache']} do cache, {resumo['erros']} com erro)",
+            f"Páginas lidas: {resumo['paginas']}",
+            f"Volume lido: {resumo['bytes'] / 1024 / 1024:.1f} MB",
+            f"Arquivos/s: {resumo['arquivos_por_s'] or '-'}   Páginas/s: {resumo['paginas_por_s'] or '-'}",
+            "",
+            "ETAPAS:",
+        ]
+        for nome, segundos in self.etapas.items():
+            percentual = segundos / duracao * 100 if duracao else 0.0
+            linhas.append(f"  {nome:<16} {segundos:>9.3f}s  {percentual:5.1f}%")
+        linhas.append(f"  {'total':<16} {duracao:>9.3f}s")
+        linhas += [
+            "",
+            "EXTRAÇÃO (soma dos workers):",
+            f"  leitura    {resumo['leitura_ms'] / 1000:>9.3f}s",
+            f"  abrir PDF  {resumo['abrir_ms'] / 1000:>9.3f}s",
+            f"  texto      {resumo['texto_ms'] / 1000:>9.3f}s",
+            f"  regex      {resumo['regex_ms'] / 1000:>9.3f}s",
+            f"  OCR        {resumo['ocr_ms'] / 1000:>9.3f}s  ({resumo['paginas_ocr']} páginas)",
+            f"  CPU        {resumo['cpu_ms'] / 1000:>9.3f}s",
+            f"  espera E/S {resumo['espera_ms'] / 1000:>9.3f}s  ({resumo['espera_pct']:.1f}% do tempo dos workers)",
+            "",
+            f"ARQUIVOS MAIS LENTOS ({min(quantidade, len(self._lentos))}):",
+        ]
+        for metricas in self.mais_lentos(quantidade):
+            linhas.append(
+                f"  {metricas.get('total_ms', 0.0):>9.1f} ms  {metricas.get('paginas', 0):>3} pág  "
+                f"{metricas.get('bytes', 0) / 1024:>8.1f} KB  {metricas.get('leitor', metricas.get('origem', '')):<10} "
+                f"{metricas['caminho']}"
+            )
+        if self.relatorio_perfil:
+            linhas += ["", f"PERFIL ({self.perfil}):", self.relatorio_perfil]
+        return "\n".join(linhas)
+
+    def exportar_jsonl(self, caminho):
+        """Grava o relatório em JSON lines e devolve o caminho"""
+        with open(caminho, 'w', encoding='utf-8') as f:
+            for linha in self.linhas_relatorio():
+                f.write(json.dumps(linha, ensure_ascii=False) + "\n")
+        return caminho
@@ -0,0 +1,342 @@
+"""Motor de extração paralela: distribui os PDFs por um pool de processos"""
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+
+from ret.descoberta import REGRAS_PADRAO, Descoberta, descobrir
+from ret.empresas import carregar_dicionario, usar_dicionario
+from ret.extracao import ESTRATEGIA_PADRAO, aplicar_ocr, dados_vazios, extrair_dados_pdf
+from ret.leitura import PREBUSCA_ARQUIVOS, PreLeitura
+from ret.metricas import MetricasExecucao
+from ret.supervisao import LIMITES_PADRAO, ExecutorSupervisionado, FalhaExtracao
+
+# Tarefas em voo por worker: mantém os núcleos ocupados sem enfileirar o lote inteiro
+TAREFAS_POR_WORKER = 4
+
+
+def numero_workers(workers=None):
+    """Resolve a quantidade de workers (None ou <= 0 = todos os núcleos)"""
+    if not workers or workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def listar_pdfs(pasta, regras=REGRAS_PADRAO):
+    """Lista os PDFs da pasta (recursivamente) em ordem determinística"""
+    return [arquivo.caminho for arquivo in descobrir(pasta, regras)]
+
+
+class _ExecutorLocal:
+    """Executor síncrono usado quando há um único worker (sem criar processos)"""
+
+    def submit(self, funcao, *args):
+        futuro = Future()
+        try:
+            futuro.set_result(funcao(*args))
+        except Exception as e:
+            futuro.set_exception(e)
+        return futuro
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def _resultado(futuro, caminho):
+    """Obtém o resultado de uma tarefa, isolando falhas do próprio worker"""
+    try:
+        return futuro.result()
+    except FalhaExtracao as e:
+        dados = dados_vazios(caminho)
+        dados['erro'] = str(e)
+        dados['falha'] = e.motivo
+        return dados
+    except Exception as e:
+        dados = dados_vazios(caminho)
+        dados['erro'] = f"Falha no worker: {e}"
+        return dados
+
+
+def criar_executor_ocr(ocr):
+    """Pool supervisionado do OCR (ConfigOCR, ret/ocr.py), separado do pool de extração; None sem OCR"""
+    if not ocr:
+        return None
+    from ret.ocr import iniciar_worker, limites_ocr
+    return ExecutorSupervisionado(max(1, ocr.workers), limites_ocr(ocr), initializer=iniciar_worker)
+
+
+def _aplicar_ocr(futuros, dados, manter_texto):
+    """Junta ao registro o resultado do OCR das páginas sem texto
+
+    'futuros' traz (índice da página, futuro) de cada página enviada ao
+    pool. Se uma página foi interrompida pela supervisão e o registro
+    ficou sem valor, a falha dela vai para o registro (erro e motivo).
+    """
+    textos, metricas_ocr, falha = {}, [], None
+    for indice, futuro in futuros:
+        try:
+            textos_pagina, metricas_pagina = futuro.result()
+        except FalhaExtracao as e:
+            textos_pagina, metricas_pagina = {}, [{'pagina': indice + 1, 'erro': str(e), 'falha': e.motivo}]
+            falha = falha or e
+        except Exception as e:
+            textos_pagina, metricas_pagina = {}, [{'pagina': indice + 1, 'erro': f"Falha no OCR: {e}"}]
+        textos.update(textos_pagina)
+        metricas_ocr.extend(metricas_pagina)
+    aplicar_ocr(dados, textos, metricas_ocr, manter_texto)
+    if falha is not None and not dados['valor_total'] and not dados['erro']:
+        dados['erro'] = f"OCR: {falha}"
+        dados['falha'] = falha.motivo
+    return dados
+
+
+def criar_executor(workers=None, limites=LIMITES_PADRAO):
+    """Pool de extração: supervisionado com limites, local com um worker, de processos nos demais
+
+    O dicionário de empresas (ret/empresas.py) é lido aqui, uma vez por
+    pool, e entregue aos workers: a classificação de cada PDF não volta ao
+    arquivo de configuração.
+    """
+    workers = numero_workers(workers)
+    dicionario = carregar_dicionario()
+    usar_dicionario(dicionario)
+    if any(limites):
+        return ExecutorSupervisionado(workers, limites, initializer=usar_dicionario, initargs=(dicionario,))
+    # Sem ganho em criar processos para um único worker
+    if workers == 1:
+        return _ExecutorLocal()
+    return ProcessPoolExecutor(max_workers=workers, initializer=usar_dicionario, initargs=(dicionario,))
+
+
+def extrair_arquivos(caminhos, workers=None, funcao=extrair_dados_pdf, cache=None,
+                     estrategia=ESTRATEGIA_PADRAO, limites=LIMITES_PADRAO,
+                     executor=None, executor_ocr=None, assinaturas=None):
+    """Extrai os PDFs em paralelo e devolve os resultados na ordem de entrada
+
+    É um gerador: os resultados saem assim que o arquivo seguinte na ordem
+    fica pronto, e no máximo workers * TAREFAS_POR_WORKER arquivos ficam
+    pendentes ao mesmo tempo, de modo que 'caminhos' pode ser consumido
+    preguiçosamente.
+
+    Com um CacheExtracao, os PDFs já conhecidos saem direto do cache e só
+    os demais são enviados ao pool; 'assinaturas' ({caminho: (tamanho,
+    mtime_ns, hash)}) traz os hashes já calculados por quem chama, para o
+    cache não ler os arquivos de novo. 'estrategia' (EstrategiaPaginas)
+    define quais páginas de cada PDF são lidas.
+
+    Com 'limites' (LimitesExtracao), cada PDF roda sob tempo e memória
+    limitados (ret/supervisao.py): o que passar do limite volta com 'erro'
+    e o motivo em 'falha', sem travar os arquivos seguintes.
+
+    Os PDFs enviados ao pool e ainda na fila são lidos antecipadamente
+    (ret/leitura.py, até PREBUSCA_ARQUIVOS) enquanto os workers trabalham
+    nos anteriores.
+
+    Com estrategia.ocr, as páginas sem texto de cada PDF extraído seguem,
+    uma tarefa por página, para um segundo pool supervisionado
+    (ret/ocr.py), e o registro só sai depois do OCR;
+    enquanto isso o pool de extração continua com os arquivos seguintes.
+
+    'executor' e 'executor_ocr' permitem usar pools já criados (vindos de
+    criar_executor e criar_executor_ocr), divididos entre várias chamadas
+    simultâneas (ret/agendador.py): 'workers' passa a limitar só as
+    tarefas em voo desta chamada, 'limites' fica com quem criou o pool e,
+    no fim, só as tarefas desta chamada são canceladas.
+    """
+    workers = numero_workers(workers)
+
+    if estrategia != ESTRATEGIA_PADRAO:
+        funcao = partial(funcao, estrategia=estrategia)
+    if cache is not None:
+        funcao = partial(funcao, manter_texto=True)
+
+    proprio = executor is None
+    if proprio:
+        executor = criar_executor(workers, limites)
+    proprio_ocr = executor_ocr is None
+    if proprio_ocr:
+        executor_ocr = criar_executor_ocr(estrategia.ocr)
+    elif not estrategia.ocr:
+        executor_ocr = None
+    # Com o executor local a extração é imediata: não há fila a antecipar
+    preleitura = None if isinstance(executor, _ExecutorLocal) else PreLeitura(PREBUSCA_ARQUIVOS)
+
+    limite = workers * TAREFAS_POR_WORKER
+    # Registros já extraídos à espera do OCR também contam, para a fila não crescer sem limite
+    limite_pendentes = 2 * limite
+    # Entradas: [caminho, futuro da extração, dados, chave do cache, [(página, futuro do OCR)]]
+    pendentes = deque()
+    em_voo = 0
+
+    def receber(entrada):
+        """Recebe a extração concluída e, se houver páginas sem texto, envia ao OCR"""
+        nonlocal em_voo
+        caminho, futuro = entrada[0], entrada[1]
+        em_voo -= 1
+        dados = _resultado(futuro, caminho)
+        entrada[1], entrada[2] = None, dados
+        if executor_ocr is not None and dados.get('paginas_sem_texto') and not dados['erro']:
+            from ret.ocr import reconhecer_paginas
+            ocr = estrategia.ocr
+            indices = [indice for _, indice in dados['paginas_sem_texto']][:ocr.max_paginas]
+            entrada[4] = [
+                (indice, executor_ocr.submit(reconhecer_paginas, caminho, [indice], ocr)) for indice in indices
+            ]
+        else:
+            dados.pop('paginas_sem_texto', None)
+            if cache is None:
+                dados.pop('texto', None)
+
+    def pronta(entrada):
+        if entrada[1] is not None:
+            if not entrada[1].done():
+                return False
+            receber(entrada)
+        return entrada[4] is None or all(futuro.done() for _, futuro in entrada[4])
+
+    def proximo():
+        entrada = pendentes.popleft()
+        if entrada[1] is not None:
+            receber(entrada)
+        _, _, dados, chave, futuros_ocr = entrada
+        if futuros_ocr is not None:
+            _aplicar_ocr(futuros_ocr, dados, manter_texto=cache is not None)
+            # Páginas com OCR falho não vão para o cache: serão tentadas de novo
+            if any('erro' in pagina for pagina in dados['metricas'].get('ocr', ())):
+                dados.pop('texto', None)
+        # Só os extraídos têm chave (os que vieram do cache, não)
+        if chave is not None:
+            cache.gravar(chave, dados)
+        return dados
+
+    try:
+        for caminho in caminhos:
+            inicio = time.perf_counter()
+            if cache is None:
+                dados, chave = None, None
+            else:
+                dados, chave = cache.obter(caminho, estrategia, assinaturas and assinaturas.get(caminho))
+            if dados is not None:
+                dados['metricas'] = {
+                    'origem': 'cache', 'total_ms': round((time.perf_counter() - inicio) * 1000, 2)
+                }
+                pendentes.append([caminho, None, dados, None, None])
+            else:
+                pendentes.append([caminho, executor.submit(funcao, caminho), None, chave, None])
+                em_voo += 1
+                if preleitura is not None:
+                    preleitura.agendar(caminho)
+
+            # Extrações concluídas seguem logo para o OCR, sem esperar a vez na ordem
+            if executor_ocr is not None:
+                for entrada in pendentes:
+                    if entrada[1] is not None and entrada[1].done():
+                        receber(entrada)
+
+            # Libera os resultados já prontos na ordem e limita as tarefas em voo
+            while pendentes and (
+                pronta(pendentes[0]) or em_voo >= limite or len(pendentes) >= limite_pendentes
+            ):
+                yield proximo()
+
+        while pendentes:
+            yield proximo()
+    finally:
+        # Também executado se o consumidor abandonar o gerador (cancelamento)
+        if preleitura is not None:
+            preleitura.encerrar()
+        if proprio:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if proprio_ocr and executor_ocr is not None:
+            executor_ocr.shutdown(wait=True, cancel_futures=True)
+        # Pools divididos continuam: só as tarefas desta chamada são descartadas
+        for entrada in pendentes:
+            if entrada[1] is not None:
+                entrada[1].cancel()
+            for _, futuro in entrada[4] or ():
+                futuro.cancel()
+
+
+def iterar_pasta(pasta, workers=None, log=print, cache=None, progresso=None, cancelar=None,
+                 estrategia=ESTRATEGIA_PADRAO, metricas=None, limites=LIMITES_PADRAO,
+                 regras=REGRAS_PADRAO):
+    """Gera os registros dos PDFs da pasta, um a um, na ordem dos caminhos
+
+    A pasta é varrida em segundo plano (ret/descoberta.py, conforme as
+    'regras') e a extração começa no primeiro PDF encontrado, sem esperar
+    o fim da varredura. Nada é acumulado: cada registro sai assim que fica
+    pronto (veja ret/pipeline.py).
+
+    progresso(feitos, total, dados) é chamado a cada arquivo concluído
+    (total é a quantidade encontrada até o momento) e cancelar
+    (threading.Event) interrompe o lote entre um arquivo e outro.
+    Com um MetricasExecucao, a etapa 'extracao' (que inclui a varredura) e
+    as métricas de cada arquivo são registradas nele. 'limites' vai para
+    extrair_arquivos.
+    """
+    if metricas is None:
+        metricas = MetricasExecucao()
+    feitos = 0
+
+    descoberta = Descoberta(pasta, regras)
+    anunciada = False
+
+    def anunciar():
+        nonlocal anunciada
+        anunciada = True
+        log(f"{descoberta.total} PDFs encontrados ({descoberta.segundos:.2f}s de varredura)")
+
+    resultados = extrair_arquivos(
+        (arquivo.caminho for arquivo in descoberta),
+        workers=workers, cache=cache, estrategia=estrategia, limites=limites
+    )
+    try:
+        for dados_pdf in metricas.iterar('extracao', resultados):
+            if not anunciada and descoberta.concluida.is_set():
+                anunciar()
+
+            log(f"[PDF] Processado: {dados_pdf['arquivo']}")
+
+            if dados_pdf['erro']:
+                log(f"Erro ao processar {dados_pdf['caminho']}: {dados_pdf['erro']}")
+
+            if dados_pdf['valores_encontrados']:
+                log(f"   [OK] {len(dados_pdf['valores_encontrados'])} valores")
+            else:
+                log(f"   [AVISO] Sem valores")
+
+            feitos += 1
+            metricas.registrar_arquivo(dados_pdf)
+            yield dados_pdf
+
+            if progresso is not None:
+                progresso(feitos, descoberta.total, dados_pdf)
+            if cancelar is not None and cancelar.is_set():
+                log("[AVISO] Processamento cancelado")
+                break
+    finally:
+        # Encerra a varredura e o pool e descarta as tarefas pendentes
+        descoberta.parar()
+        resultados.close()
+
+    if not anunciada and descoberta.concluida.is_set():
+        anunciar()
+
+    if cache is not None:
+        log(f"Cache: {cache.acertos} reaproveitados, {cache.reanalisados} reanalisados, "
+            f"{cache.faltas} extraídos")
+
+
+def processar_pasta(pasta, workers=None, log=print, cache=None, progresso=None, cancelar=None,
+                    estrategia=ESTRATEGIA_PADRAO, metricas=None, limites=LIMITES_PADRAO,
+                    regras=REGRAS_PADRAO):
+    """Processa todos os PDFs da pasta e devolve a lista de registros
+
+    Mesmos parâmetros de iterar_pasta; se cancelada, a lista devolvida
+    contém só o que já foi processado.
+    """
+    return list(iterar_pasta(
+        pasta, workers=workers, log=log, cache=cache, progresso=progresso, cancelar=cancelar,
+        estrategia=estrategia, metricas=metricas, limites=limites, regras=regras
+    ))
@@ -0,0 +1,182 @@
+"""OCR das páginas sem camada de texto (notas escaneadas)
+
+Opcional: liga com EstrategiaPaginas(ocr=ConfigOCR(...)) e exige o
+Tesseract instalado (o executável 'tesseract' no PATH, com o idioma
+pedido). Só as páginas em que o pdfplumber não achou texto passam por
+aqui:
+- a extração marca essas páginas (dados['paginas_sem_texto']) e o motor
+  (ret/motor.py) as envia, uma tarefa por página, a um pool supervisionado
+  próprio (ret/supervisao.py), com ConfigOCR.workers processos de
+  prioridade reduzida, separado do pool de extração: notas escaneadas não
+  seguram as demais;
+- uma página que passe de limites_ocr (renderização travada, memória) tem
+  o worker encerrado e fica com a falha ('timeout', 'oom'; 'corrupt' se o
+  worker morrer) nas métricas; um worker novo assume as páginas seguintes;
+- cada página é renderizada pelo pdfplumber (pypdfium2 → imagem Pillow)
+  e o Tesseract roda como subprocesso, com tempo limite e uma thread;
+- o texto fica em cache (ocr.db, SQLite) indexado pelo hash da imagem
+  renderizada e do idioma: a mesma página, em outro arquivo ou em uma
+  nova versão do PDF, não passa de novo pelo Tesseract;
+- os tempos de cada página (render_ms, tesseract_ms, total_ms) vão para
+  as métricas do arquivo (ret/metricas.py).
+"""
+import hashlib
+import io
+import os
+import shutil
+import sqlite3
+import subprocess
+import time
+from collections import namedtuple
+
+from ret.config import DIRETORIO_CACHE, LIMITE_MEMORIA_PDF_MB
+from ret.supervisao import LimitesExtracao
+
+NOME_CACHE_OCR = 'ocr.db'
+
+# workers: processos do pool de OCR; idioma: idiomas do Tesseract ('por',
+# 'por+eng'); resolucao: DPI da renderização; max_paginas: páginas com OCR
+# por PDF; timeout_s: limite do Tesseract por página; cache: arquivo
+# SQLite do cache de OCR (None desativa)
+ConfigOCR = namedtuple(
+    'ConfigOCR', 'workers idioma resolucao max_paginas timeout_s cache comando',
+    defaults=(1, 'por', 300, 10, 60, os.path.join(DIRETORIO_CACHE, NOME_CACHE_OCR), 'tesseract')
+)
+
+# Páginas com menos caracteres que isto (sem contar espaços) vão para o OCR
+MIN_CARACTERES_TEXTO = 1
+
+# Tempo (s) somado ao timeout_s do Tesseract no limite de cada página:
+# abrir o PDF e renderizar a página
+MARGEM_RENDER_S = 30
+
+# Aumento de 'nice' dos processos de OCR (POSIX): a extração tem prioridade
+PRIORIDADE_OCR = 5
+
+# Conexão com o cache de OCR, uma por processo: (caminho, conexao)
+_CACHE = None
+
+
+def tesseract_disponivel(config=ConfigOCR()):
+    """Indica se o executável do Tesseract foi encontrado"""
+    return shutil.which(config.comando) is not None
+
+
+def limites_ocr(config):
+    """LimitesExtracao de cada tarefa (uma página) do pool de OCR"""
+    return LimitesExtracao(config.timeout_s + MARGEM_RENDER_S, LIMITE_MEMORIA_PDF_MB)
+
+
+def pagina_sem_texto(texto):
+    """Indica se a página não tem camada de texto aproveitável"""
+    return len(''.join(texto.split())) < MIN_CARACTERES_TEXTO
+
+
+def iniciar_worker():
+    """Inicializador dos processos de OCR: prioridade reduzida"""
+    if hasattr(os, 'nice'):
+        try:
+            os.nice(PRIORIDADE_OCR)
+        except OSError:
+            pass
+
+
+def _conexao_cache(caminho):
+    """Conexão (por processo) com o cache de OCR, criando a tabela"""
+    global _CACHE
+    if _CACHE is not None and _CACHE[0] == caminho:
+        return _CACHE[1]
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    conexao = sqlite3.connect(caminho, timeout=30)
+    conexao.execute('PRAGMA journal_mode=WAL')
+    conexao.execute('PRAGMA synchronous=NORMAL')
+    conexao.execute('''
+        CREATE TABLE IF NOT EXISTS paginas (
+            hash TEXT PRIMARY KEY,
+            texto TEXT,
+            criado REAL
+        )
+    ''')
+    conexao.commit()
+    _CACHE = (caminho, conexao)
+    return conexao
+
+
+def hash_pagina(imagem, config):
+    """Hash da página renderizada (pixels, tamanho, modo) e do idioma do OCR"""
+    h = hashlib.sha256()
+    h.update(f"{config.idioma}|{imagem.mode}|{imagem.size}".encode())
+    h.update(imagem.tobytes())
+    return h.hexdigest()
+
+
+def executar_tesseract(imagem, config):
+    """Texto da imagem pelo Tesseract (PNG pela entrada padrão, texto pela saída)"""
+    png = io.BytesIO()
+    imagem.save(png, format='PNG')
+    # Uma thread por Tesseract: o paralelismo vem do pool, não do OpenMP
+    ambiente = dict(os.environ, OMP_THREAD_LIMIT='1')
+    saida = subprocess.run(
+        [config.comando, 'stdin', 'stdout', '-l', config.idioma],
+        input=png.getvalue(), capture_output=True, timeout=config.timeout_s, env=ambiente
+    )
+    if saida.returncode != 0:
+        erro = saida.stderr.decode('utf-8', 'replace').strip().splitlines()
+        raise RuntimeError(erro[-1] if erro else f"tesseract saiu com código {saida.returncode}")
+    return saida.stdout.decode('utf-8', 'replace')
+
+
+def reconhecer_paginas(caminho_pdf, indices, config):
+    """OCR das páginas 'indices' (base 0) do PDF, no processo do pool de OCR
+
+    Devolve ({indice: texto}, [métricas por página]). Uma página que falhe
+    (tempo esgotado, Tesseract ausente) fica sem texto e com 'erro' nas
+    suas métricas; as demais seguem.
+    """
+    import pdfplumber
+
+    conexao = _conexao_cache(config.cache) if config.cache else None
+    textos = {}
+    metricas = []
+    with pdfplumber.open(caminho_pdf) as pdf:
+        for indice in indices[:config.max_paginas]:
+            inicio = time.perf_counter()
+            pagina_metricas = {'pagina': indice + 1, 'cache': False}
+            try:
+                pagina = pdf.pages[indice]
+                inicio_render = time.perf_counter()
+                imagem = pagina.to_image(resolution=config.resolucao).original.convert('L')
+                pagina.close()
+                pagina_metricas['render_ms'] = (time.perf_counter() - inicio_render) * 1000
+
+                chave = hash_pagina(imagem, config)
+                linha = conexao.execute(
+                    'SELECT texto FROM paginas WHERE hash = ?', (chave,)
+                ).fetchone() if conexao else None
+                if linha:
+                    texto = linha[0]
+                    pagina_metricas['cache'] = True
+                else:
+                    inicio_ocr = time.perf_counter()
+                    texto = executar_tesseract(imagem, config)
+                    pagina_metricas['tesseract_ms'] = (time.perf_counter() - inicio_ocr) * 1000
+                    if conexao is not None:
+                        with conexao:
+                            conexao.execute(
+                                'INSERT OR REPLACE INTO paginas (hash, texto, criado) VALUES (?, ?, ?)',
+                                (chave, texto, time.time())
+                            )
+                textos[indice] = texto
+                pagina_metricas['caracteres'] = len(texto)
+            except subprocess.TimeoutExpired:
+                pagina_metricas['erro'] = f"OCR excedeu {config.timeout_s}s"
+            except Exception as e:
+                pagina_metricas['erro'] = str(e)
+            pagina_metricas['total_ms'] = (time.perf_counter() - inicio) * 1000
+            for chave_tempo in ('render_ms', 'tesseract_ms', 'total_ms'):
+                if chave_tempo in pagina_metricas:
+                    pagina_metricas[chave_tempo] = round(pagina_metricas[chave_tempo], 2)
+            metricas.append(pagina_metricas)
+    return textos, metricas
@@ -0,0 +1,191 @@
+"""Pipeline em streaming: descoberta → extração → normalização → destinos
+
+Os registros não são acumulados: cada PDF extraído (motor.iterar_pasta)
+entra em um LoteRegistros (ret/registro.py: colunas compactas, sem o
+texto nem as métricas) de até TAMANHO_LOTE registros e cada lote, já
+como ModeloResultados, é entregue aos destinos:
+- ResumoIncremental (ret/agregacao.py): totais e resumos somados lote a lote;
+- DestinoBanco: upsert no SQLite e manifesto, uma transação por lote;
+- DestinoExcel: linhas gravadas em streaming, resumos no fechamento;
+- DestinoSemValores: só os registros sem valor (e as falhas de extração);
+- DestinoModelo: guarda os lotes em formato colunar para a interface.
+
+Sem DestinoModelo, o pico de memória não depende do tamanho do acervo:
+fica limitado a um lote mais as tarefas em voo no pool de extração.
+
+Um destino é qualquer objeto com receber(modelo), fechar() e um 'nome'
+(a etapa em que seu tempo é medido). Se um destino falhar, ele é
+desligado (o erro fica em destino.erro) e os demais continuam.
+"""
+import pandas as pd
+
+from ret.agregacao import COLUNAS, ModeloResultados
+from ret.banco import abrir_banco, assinaturas_arquivos, substituir_registros
+from ret.cambio import obter_cambio
+from ret.metricas import MetricasExecucao
+from ret.motor import iterar_pasta
+from ret.registro import LoteRegistros
+
+# Registros por lote entregue aos destinos
+TAMANHO_LOTE = 500
+
+# Campos guardados para a aba Sem Valores
+CAMPOS_SEM_VALORES = ('arquivo', 'caminho', 'tipo_encargo', 'erro', 'falha')
+
+
+def em_lotes(registros, tamanho=TAMANHO_LOTE):
+    """Agrupa os registros em LoteRegistros de até 'tamanho' itens"""
+    lote = LoteRegistros()
+    for registro in registros:
+        lote.adicionar(registro)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = LoteRegistros()
+    if len(lote):
+        yield lote
+
+
+class DestinoBanco:
+    """Grava cada lote no banco (upsert), em uma transação por lote
+
+    O banco só é aberto (e criado) quando chega o primeiro lote. Os
+    registros antigos dos arquivos do lote são substituídos e o manifesto
+    (arquivos_ret) é gravado na mesma transação: uma sincronização depois
+    de um processamento completo só extrai o que mudou.
+    """
+
+    nome = 'salvar_db'
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conexao = None
+        self.gravados = 0
+        self.erro = None
+
+    def receber(self, modelo):
+        if self.conexao is None:
+            self.conexao = abrir_banco(self.db_path)
+        assinaturas = assinaturas_arquivos(set(modelo.df['caminho'].tolist()))
+        try:
+            with self.conexao:
+                self.gravados += substituir_registros(self.conexao, modelo, assinaturas)
+        except Exception:
+            # O destino é desligado pelo pipeline: a conexão não será mais usada
+            self.conexao.close()
+            raise
+
+    def fechar(self):
+        if self.conexao is not None:
+            self.conexao.close()
+
+
+class DestinoExcel:
+    """Escreve as linhas de cada lote no relatório; os resumos entram no fechamento
+
+    'resumos' (em geral o ResumoIncremental do mesmo pipeline) fornece as
+    abas de resumo. Sem nenhum lote, o arquivo não é gerado.
+    """
+
+    nome = 'exportar_excel'
+
+    def __init__(self, excel_path, resumos):
+        self.excel_path = excel_path
+        self.resumos = resumos
+        self.escritor = None
+        self.erro = None
+
+    def receber(self, modelo):
+        if self.escritor is None:
+            from ret.excel import EscritorExcel
+            self.escritor = EscritorExcel(self.excel_path)
+        self.escritor.escrever(modelo)
+
+    def fechar(self):
+        if self.escritor is not None:
+            self.escritor.finalizar(self.resumos)
+
+
+class DestinoSemValores:
+    """Guarda só os registros sem valor extraído (valor total = 0)"""
+
+    nome = 'sem_valores'
+
+    def __init__(self):
+        self.registros = []
+        self.erro = None
+
+    def receber(self, modelo):
+        df = modelo.df
+        sem_valor = df.loc[df['valor_total'] == 0, list(CAMPOS_SEM_VALORES)]
+        self.registros.extend(sem_valor.to_dict('records'))
+
+    def fechar(self):
+        pass
+
+
+class DestinoModelo:
+    """Junta os lotes em um único ModeloResultados (tabela da interface)
+
+    Guarda só as colunas tipadas de cada lote, sem os registros originais;
+    o modelo completo é montado uma vez, em resultados().
+    """
+
+    nome = 'tabela'
+
+    def __init__(self, taxa=None):
+        self.taxa = taxa
+        self._partes = []
+        self.erro = None
+
+    def receber(self, modelo):
+        self._partes.append(modelo.df[list(COLUNAS)])
+
+    def fechar(self):
+        pass
+
+    def resultados(self):
+        if not self._partes:
+            return ModeloResultados.de_registros([], self.taxa)
+        df = pd.concat(self._partes, ignore_index=True)
+        self._partes = [df]
+        return ModeloResultados(df, self.taxa)
+
+
+def executar_pipeline(pasta, destinos, log=print, metricas=None, taxa=None,
+                      tamanho_lote=TAMANHO_LOTE, **opcoes):
+    """Processa a pasta entregando os registros aos destinos, lote a lote
+
+    'opcoes' são repassadas a motor.iterar_pasta (workers, cache,
+    progresso, cancelar, estrategia, limites, regras). Devolve a
+    quantidade de registros processados.
+    """
+    if metricas is None:
+        metricas = MetricasExecucao()
+    if taxa is None:
+        taxa = obter_cambio()
+
+    ativos = list(destinos)
+    processados = 0
+    registros = iterar_pasta(pasta, log=log, metricas=metricas, **opcoes)
+    for lote in em_lotes(registros, tamanho_lote):
+        processados += len(lote)
+        with metricas.etapa('modelo'):
+            modelo = lote.para_modelo(taxa)
+        for destino in list(ativos):
+            try:
+                with metricas.etapa(destino.nome):
+                    destino.receber(modelo)
+            except Exception as e:
+                log(f"[ERRO] {type(destino).__name__}: {e}")
+                destino.erro = e
+                ativos.remove(destino)
+
+    for destino in ativos:
+        try:
+            with metricas.etapa(destino.nome):
+                destino.fechar()
+        except Exception as e:
+            log(f"[ERRO] {type(destino).__name__}: {e}")
+            destino.erro = e
+
+    return processados
@@ -0,0 +1,135 @@
+"""Representação compacta dos registros extraídos
+
+Cada PDF volta da extração como um dicionário (onze chaves de texto e a
+lista de valores candidatos). Para guardar centenas de milhares deles:
+- Registro: um registro com __slots__ (sem dicionário por instância), os
+  campos de categoria internados (sys.intern: uma única cópia de "EAT",
+  de cada empresa...) e os valores candidatos em um array('d');
+- LoteRegistros: vários registros em colunas (uma lista por campo de
+  texto, um array('d') por campo numérico e os candidatos de todos os
+  registros em um único array). Converte para pandas sem copiar as
+  colunas numéricas (para_dataframe, usado pelo modelo e pelo Excel) e
+  para tuplas (tuplas, usado na gravação do banco).
+
+Os dois aceitam o acesso dos dicionários (registro['campo'],
+registro.get('campo')), e o texto lido e as métricas da extração ficam
+de fora.
+"""
+import sys
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from ret.agregacao import COLUNAS, COLUNAS_CATEGORIA, COLUNAS_TEXTO, COLUNAS_VALOR, ModeloResultados
+
+CAMPOS_REGISTRO = COLUNAS + ('valores_encontrados',)
+
+
+def _internar(valor):
+    """Texto de categoria compartilhado entre os registros ('' se ausente)"""
+    return sys.intern(str(valor)) if valor else ''
+
+
+class Registro:
+    """Registro de um PDF com __slots__ e os candidatos em array('d')"""
+
+    __slots__ = CAMPOS_REGISTRO
+
+    def __init__(self, dados):
+        """Monta o registro a partir do dicionário da extração (ou de outro Registro)"""
+        for campo in COLUNAS_CATEGORIA:
+            setattr(self, campo, _internar(dados.get(campo)))
+        for campo in COLUNAS_TEXTO:
+            setattr(self, campo, dados.get(campo) or '')
+        for campo in COLUNAS_VALOR:
+            setattr(self, campo, float(dados.get(campo) or 0.0))
+        self.valores_encontrados = array('d', dados.get('valores_encontrados') or ())
+
+    def __getitem__(self, campo):
+        try:
+            return getattr(self, campo)
+        except AttributeError:
+            raise KeyError(campo) from None
+
+    def get(self, campo, padrao=None):
+        return getattr(self, campo, padrao)
+
+    def como_dict(self):
+        """Registro no formato de dicionário da extração"""
+        dados = {campo: getattr(self, campo) for campo in COLUNAS}
+        dados['valores_encontrados'] = self.valores_encontrados.tolist()
+        return dados
+
+    def __repr__(self):
+        return f"Registro({self.caminho!r}, {self.numero_nd!r}, {self.valor_total!r})"
+
+
+class LoteRegistros:
+    """Registros em formato colunar
+
+    As colunas numéricas são array('d') e os candidatos de todos os
+    registros ficam juntos em 'valores'; os do registro i estão em
+    valores[inicios[i]:inicios[i + 1]]. Depois de para_dataframe() o lote
+    não deve receber novos registros (o DataFrame usa a mesma memória).
+    """
+
+    def __init__(self, registros=()):
+        self.textos = {campo: [] for campo in COLUNAS_CATEGORIA + COLUNAS_TEXTO}
+        self.numeros = {campo: array('d') for campo in COLUNAS_VALOR}
+        self.valores = array('d')
+        self.inicios = array('q', [0])
+        for registro in registros:
+            self.adicionar(registro)
+
+    def adicionar(self, dados):
+        """Acrescenta um registro (dicionário da extração ou Registro)"""
+        for campo in COLUNAS_CATEGORIA:
+            self.textos[campo].append(_internar(dados.get(campo)))
+        for campo in COLUNAS_TEXTO:
+            self.textos[campo].append(dados.get(campo) or '')
+        for campo in COLUNAS_VALOR:
+            self.numeros[campo].append(float(dados.get(campo) or 0.0))
+        self.valores.extend(dados.get('valores_encontrados') or ())
+        self.inicios.append(len(self.valores))
+
+    def __len__(self):
+        return len(self.inicios) - 1
+
+    def coluna(self, campo):
+        """Valores de um campo, na ordem dos registros"""
+        if campo == 'valores_encontrados':
+            return [self.candidatos(i) for i in range(len(self))]
+        return self.textos[campo] if campo in self.textos else self.numeros[campo]
+
+    def candidatos(self, i):
+        """Valores candidatos do registro i"""
+        return self.valores[self.inicios[i]:self.inicios[i + 1]]
+
+    def registro(self, i):
+        """Registro i como um Registro"""
+        dados = {campo: self.coluna(campo)[i] for campo in COLUNAS}
+        dados['valores_encontrados'] = self.candidatos(i)
+        return Registro(dados)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.registro(i)
+
+    def tuplas(self, campos):
+        """Uma tupla por registro com os campos pedidos (ex.: parâmetros do INSERT)"""
+        return zip(*(self.coluna(campo) for campo in campos))
+
+    def para_dataframe(self):
+        """DataFrame com as COLUNAS; as numéricas apontam para os arrays do lote"""
+        colunas = {}
+        for campo in COLUNAS:
+            if campo in self.numeros:
+                colunas[campo] = np.frombuffer(self.numeros[campo], dtype=np.float64)
+            else:
+                colunas[campo] = self.textos[campo]
+        return pd.DataFrame(colunas, columns=list(COLUNAS), copy=False)
+
+    def para_modelo(self, taxa=None):
+        """ModeloResultados do lote"""
+        return ModeloResultados(self.para_dataframe(), taxa)
@@ -0,0 +1,22 @@
+"""Estatísticas do processamento e formatação de valores em Reais"""
+
+# Separadores do formato americano trocados pelos brasileiros em uma só passada
+_SEPARADORES_BR = str.maketrans({',': '.', '.': ','})
+
+
+def formatar_brl(valor):
+    """Formata um valor no padrão brasileiro: R$ 1.234,56"""
+    return "R$ " + f"{valor:,.2f}".translate(_SEPARADORES_BR)
+
+
+def calcular_resumo(dados_processados, taxa=None):
+    """Calcula totais gerais e por tipo de encargo (valores convertidos para BRL)
+
+    Aceita um ModeloResultados ou uma lista de registros.
+    """
+    # Importado aqui: formatar_brl não precisa do pandas
+    from ret.agregacao import ModeloResultados
+
+    if not isinstance(dados_processados, ModeloResultados):
+        dados_processados = ModeloResultados.de_registros(dados_processados, taxa)
+    return dados_processados.resumo()
@@ -0,0 +1,271 @@
+"""Sincronização incremental de uma pasta com o banco RET_dados.db
+
+O banco guarda um manifesto (tabela arquivos_ret) com tamanho, mtime e
+hash de cada PDF já processado. A cada sincronização:
+- PDFs novos ou com conteúdo alterado são extraídos e gravados (upsert);
+- PDFs só "tocados" (mtime mudou, hash igual) apenas atualizam o manifesto;
+- PDFs que sumiram da pasta têm seus registros removidos; os que estão
+  em pastas que a varredura não conseguiu ler (rede fora, permissão) são
+  mantidos como estão.
+
+Assim o custo de uma execução diária é proporcional ao que mudou, e não
+ao tamanho do arquivo histórico. Os extraídos são gravados em pontos de
+controle (a cada CHECKPOINT_ARQUIVOS arquivos ou CHECKPOINT_S segundos),
+registros e manifesto na mesma transação: se o processo cair no meio, a
+próxima execução retoma do último ponto, sem extrair de novo o que já
+foi gravado. sincronizar_arquivos faz o mesmo só para
+uma lista de caminhos (os avisados pelo modo vigia, ret/vigia.py), sem
+varrer a pasta.
+"""
+import os
+import time
+
+from ret.banco import abrir_banco, gravar_manifesto, substituir_registros
+from ret.cache import hash_arquivo
+from ret.extracao import ESTRATEGIA_PADRAO
+from ret.metricas import MetricasExecucao
+from ret.descoberta import REGRAS_PADRAO, ArquivoEncontrado, dentro_de, descobrir
+from ret.motor import extrair_arquivos
+from ret.registro import LoteRegistros
+from ret.supervisao import LIMITES_PADRAO
+
+
+# Caminhos por consulta com IN (...), abaixo do limite de parâmetros do SQLite
+LOTE_CONSULTA = 500
+
+# Pontos de controle da gravação: o que vier primeiro
+CHECKPOINT_ARQUIVOS = 200
+CHECKPOINT_S = 30.0
+
+
+def _carregar_manifesto(conexao, caminhos=None):
+    """Lê o manifesto: {caminho: (tamanho, mtime_ns, hash)}
+
+    Com 'caminhos', só as entradas desses arquivos.
+    """
+    sql = 'SELECT caminho, tamanho, mtime_ns, hash FROM arquivos_ret'
+    if caminhos is None:
+        return {caminho: (tamanho, mtime_ns, h) for caminho, tamanho, mtime_ns, h in conexao.execute(sql)}
+
+    manifesto = {}
+    caminhos = list(caminhos)
+    for i in range(0, len(caminhos), LOTE_CONSULTA):
+        parte = caminhos[i:i + LOTE_CONSULTA]
+        for caminho, tamanho, mtime_ns, h in conexao.execute(
+            f"{sql} WHERE caminho IN ({', '.join('?' * len(parte))})", parte
+        ):
+            manifesto[caminho] = (tamanho, mtime_ns, h)
+    return manifesto
+
+
+def _gravados(conexao, caminhos):
+    """Quais dos caminhos têm registros em dados_ret"""
+    gravados = set()
+    caminhos = list(caminhos)
+    for i in range(0, len(caminhos), LOTE_CONSULTA):
+        parte = caminhos[i:i + LOTE_CONSULTA]
+        gravados.update(caminho for caminho, in conexao.execute(
+            f"SELECT DISTINCT caminho FROM dados_ret WHERE caminho IN ({', '.join('?' * len(parte))})", parte
+        ))
+    return gravados
+
+
+class _Comparacao:
+    """Arquivos classificados pelo manifesto: novos, alterados, tocados e inalterados"""
+
+    def __init__(self):
+        self.novos = []
+        self.alterados = []
+        self.tocados = []
+        self.removidos = []
+        self.inalterados = 0
+        self.info = {}
+
+    def comparar(self, arquivo, anterior, log):
+        """Classifica um ArquivoEncontrado pela entrada anterior do manifesto (ou None)"""
+        caminho = arquivo.caminho
+        if anterior and anterior[0] == arquivo.tamanho and anterior[1] == arquivo.mtime_ns:
+            self.inalterados += 1
+            return
+
+        try:
+            h = hash_arquivo(caminho)
+        except OSError as e:
+            log(f"Erro ao ler {caminho}: {e}")
+            return
+        self.info[caminho] = (arquivo.tamanho, arquivo.mtime_ns, h)
+        if anterior is None:
+            self.novos.append(caminho)
+        elif anterior[2] == h:
+            self.tocados.append(caminho)
+        else:
+            self.alterados.append(caminho)
+
+    def anunciar(self, log):
+        log(f"Novos: {len(self.novos)} | Alterados: {len(self.alterados)} | "
+            f"Removidos: {len(self.removidos)} | Inalterados: {self.inalterados + len(self.tocados)}")
+
+    def resumo(self, dados_processados):
+        return {
+            'novos': len(self.novos),
+            'alterados': len(self.alterados),
+            'removidos': len(self.removidos),
+            'inalterados': self.inalterados + len(self.tocados),
+            'dados': dados_processados
+        }
+
+
+def _gravar(conexao, lote, info, removidos=(), tocados=()):
+    """Grava em uma transação os registros de um lote e as entradas do manifesto"""
+    with conexao:
+        conexao.executemany('DELETE FROM dados_ret WHERE caminho = ?', [(caminho,) for caminho in removidos])
+        conexao.executemany('DELETE FROM arquivos_ret WHERE caminho = ?', [(caminho,) for caminho in removidos])
+        # Registros antigos dos reextraídos saem antes do upsert; os com erro
+        # ficam fora do manifesto para nova tentativa
+        substituir_registros(conexao, lote, info)
+        gravar_manifesto(conexao, {caminho: info[caminho] for caminho in tocados})
+
+
+def _aplicar(conexao, comparacao, log, progresso, cancelar, metricas, **extracao):
+    """Extrai os novos/alterados e grava registros e manifesto em pontos de controle
+
+    'extracao' vai para extrair_arquivos. Removidos e tocados são gravados
+    antes da extração. Devolve os registros extraídos (LoteRegistros).
+    """
+    info = comparacao.info
+    pendentes = comparacao.novos + comparacao.alterados
+
+    with metricas.etapa('gravacao'):
+        _gravar(conexao, LoteRegistros(), info, comparacao.removidos, comparacao.tocados)
+
+    # Registros compactos: os de toda a execução e os do ponto de controle em aberto
+    dados_processados = LoteRegistros()
+    lote = LoteRegistros()
+    ultimo_checkpoint = time.monotonic()
+    # Os hashes da comparação vão para o cache, que não lê os arquivos de novo
+    resultados = extrair_arquivos(pendentes, assinaturas=info, **extracao)
+    try:
+        for dados_pdf in metricas.iterar('extracao', resultados):
+            log(f"[PDF] Processado: {dados_pdf['arquivo']}")
+            if dados_pdf['erro']:
+                log(f"Erro ao processar {dados_pdf['caminho']}: {dados_pdf['erro']}")
+            dados_processados.adicionar(dados_pdf)
+            lote.adicionar(dados_pdf)
+            metricas.registrar_arquivo(dados_pdf)
+
+            if len(lote) >= CHECKPOINT_ARQUIVOS or time.monotonic() - ultimo_checkpoint >= CHECKPOINT_S:
+                with metricas.etapa('gravacao'):
+                    _gravar(conexao, lote, info)
+                lote = LoteRegistros()
+                ultimo_checkpoint = time.monotonic()
+
+            if progresso is not None:
+                progresso(len(dados_processados), len(pendentes), dados_pdf)
+            if cancelar is not None and cancelar.is_set():
+                log("[AVISO] Sincronização cancelada (o restante fica para a próxima execução)")
+                break
+    finally:
+        resultados.close()
+
+    with metricas.etapa('gravacao'):
+        _gravar(conexao, lote, info)
+    return dados_processados
+
+
+def sincronizar_pasta(pasta, db_path, workers=None, log=print, cache=None,
+                      progresso=None, cancelar=None, estrategia=ESTRATEGIA_PADRAO, metricas=None,
+                      limites=LIMITES_PADRAO, regras=REGRAS_PADRAO, executor=None, executor_ocr=None):
+    """Processa apenas os PDFs novos/alterados e atualiza o banco
+
+    Devolve um resumo com as contagens de novos, alterados, removidos e
+    inalterados, e em 'dados' os registros extraídos nesta execução
+    (LoteRegistros).
+    progresso/cancelar funcionam como em processar_pasta; se cancelada, a
+    sincronização grava o que já foi extraído e o restante fica pendente
+    para a próxima execução. 'metricas' (MetricasExecucao) recebe as
+    etapas comparacao (manifesto e varredura), extracao e gravacao.
+    'limites', 'executor' e 'executor_ocr' vão para extrair_arquivos e
+    'regras' (RegrasDescoberta) define quais arquivos da pasta entram.
+    """
+    if metricas is None:
+        metricas = MetricasExecucao()
+    conexao = abrir_banco(db_path)
+    try:
+        comparacao = _Comparacao()
+        presentes = set()
+        ilegiveis = {}
+
+        with metricas.etapa('comparacao'):
+            manifesto = _carregar_manifesto(conexao)
+            # Tamanho e mtime vêm da própria varredura (sem um stat por arquivo)
+            for arquivo in descobrir(pasta, regras, ilegiveis=ilegiveis):
+                presentes.add(arquivo.caminho)
+                comparacao.comparar(arquivo, manifesto.get(arquivo.caminho), log)
+
+        log(f"{len(presentes)} PDFs encontrados")
+        ausentes = [caminho for caminho in manifesto if caminho not in presentes]
+        if ilegiveis:
+            # O que não pôde ser lido agora não sumiu: fica para a próxima execução
+            mantidos = [caminho for caminho in ausentes if dentro_de(caminho, ilegiveis)]
+            for caminho, erro in sorted(ilegiveis.items()):
+                log(f"[AVISO] Não foi possível ler {caminho}: {erro}")
+            if mantidos:
+                log(f"[AVISO] {len(mantidos)} arquivos do manifesto mantidos (pastas não lidas)")
+            ausentes = [caminho for caminho in ausentes if not dentro_de(caminho, ilegiveis)]
+        comparacao.removidos = ausentes
+        comparacao.anunciar(log)
+
+        dados_processados = _aplicar(
+            conexao, comparacao, log, progresso, cancelar, metricas, workers=workers, cache=cache,
+            estrategia=estrategia, limites=limites, executor=executor, executor_ocr=executor_ocr
+        )
+    finally:
+        conexao.close()
+
+    return comparacao.resumo(dados_processados)
+
+
+def sincronizar_arquivos(caminhos, db_path, workers=None, log=print, cache=None,
+                         progresso=None, cancelar=None, estrategia=ESTRATEGIA_PADRAO, metricas=None,
+                         limites=LIMITES_PADRAO, executor=None, executor_ocr=None):
+    """Como sincronizar_pasta, só para os caminhos informados (sem varrer a pasta)
+
+    Quem chama já filtrou os caminhos pelas regras da pasta. Um caminho
+    que não existe mais tem seus registros removidos; os demais são
+    comparados com o manifesto. Devolve o mesmo resumo de
+    sincronizar_pasta.
+    """
+    if metricas is None:
+        metricas = MetricasExecucao()
+    caminhos = sorted(set(caminhos))
+    conexao = abrir_banco(db_path)
+    try:
+        comparacao = _Comparacao()
+        ausentes = []
+
+        with metricas.etapa('comparacao'):
+            manifesto = _carregar_manifesto(conexao, caminhos)
+            for caminho in caminhos:
+                try:
+                    st = os.stat(caminho)
+                except FileNotFoundError:
+                    ausentes.append(caminho)
+                    continue
+                except OSError as e:
+                    log(f"Erro ao ler {caminho}: {e}")
+                    continue
+                arquivo = ArquivoEncontrado(caminho, st.st_size, st.st_mtime_ns, None)
+                comparacao.comparar(arquivo, manifesto.get(caminho), log)
+
+            gravados = _gravados(conexao, ausentes) if ausentes else set()
+            comparacao.removidos = [c for c in ausentes if c in manifesto or c in gravados]
+        comparacao.anunciar(log)
+
+        dados_processados = _aplicar(
+            conexao, comparacao, log, progresso, cancelar, metricas, workers=workers, cache=cache,
+            estrategia=estrategia, limites=limites, executor=executor, executor_ocr=executor_ocr
+        )
+    finally:
+        conexao.close()
+
+    return comparacao.resumo(dados_processados)
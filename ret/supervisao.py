@@ -0,0 +1,335 @@
+"""Extração supervisionada: tempo e memória limitados por PDF
+
+Um PDF malformado ou uma digitalização enorme pode travar o pdfplumber ou
+consumir memória sem limite. ExecutorSupervisionado roda cada arquivo em
+um processo worker e, enquanto ele trabalha, confere o tempo decorrido e a
+memória própria do processo (a residente sem as páginas de arquivos
+mapeados: um PDF aberto com mmap, ret/leitura.py, não conta no limite).
+Se um limite é excedido, ou se o worker morre no meio do arquivo, o
+processo é encerrado, a tarefa falha com FalhaExtracao (motivo 'timeout',
+'oom' ou 'corrupt') e um worker novo assume a vaga: o restante do lote
+segue normalmente.
+
+A medição usa /proc no Linux e a API do Windows; nos demais
+sistemas só o tempo limite (e MemoryError dentro do worker) é aplicado.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import CancelledError, Future
+from multiprocessing.connection import wait
+
+from ret.config import LIMITE_MEMORIA_PDF_MB, TIMEOUT_PDF_S
+from ret.leitura import permitir_mmap
+
+# Motivos de falha gravados em dados['falha']
+FALHA_TIMEOUT = 'timeout'
+FALHA_MEMORIA = 'oom'
+FALHA_CORROMPIDO = 'corrupt'
+
+DESCRICAO_FALHAS = {
+    FALHA_TIMEOUT: 'Tempo limite excedido',
+    FALHA_MEMORIA: 'Limite de memória excedido',
+    FALHA_CORROMPIDO: 'PDF corrompido ou ilegível',
+}
+
+# Limites de cada PDF (None desativa o limite). Sem nenhum limite a
+# extração volta a rodar sem supervisão.
+LimitesExtracao = namedtuple(
+    'LimitesExtracao', 'timeout_s memoria_mb',
+    defaults=(TIMEOUT_PDF_S, LIMITE_MEMORIA_PDF_MB)
+)
+LIMITES_PADRAO = LimitesExtracao()
+SEM_LIMITES = LimitesExtracao(None, None)
+
+# Intervalo (s) entre as verificações de tempo e memória dos workers
+INTERVALO_VERIFICACAO = 0.05
+
+# Espera (s) pelo encerramento normal de um worker antes de matá-lo
+ESPERA_ENCERRAMENTO = 1.0
+
+
+class FalhaExtracao(Exception):
+    """Tarefa interrompida pela supervisão (ou pelo próprio worker) com um motivo"""
+
+    def __init__(self, motivo, mensagem):
+        super().__init__(motivo, mensagem)
+        self.motivo = motivo
+        self.mensagem = mensagem
+
+    def __str__(self):
+        return self.mensagem
+
+
+if os.name == 'nt':
+    import ctypes
+    from ctypes import wintypes
+
+    class _ContadoresMemoria(ctypes.Structure):
+        # PROCESS_MEMORY_COUNTERS_EX
+        _fields_ = [
+            ('cb', wintypes.DWORD),
+            ('PageFaultCount', wintypes.DWORD),
+            ('PeakWorkingSetSize', ctypes.c_size_t),
+            ('WorkingSetSize', ctypes.c_size_t),
+            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+            ('PagefileUsage', ctypes.c_size_t),
+            ('PeakPagefileUsage', ctypes.c_size_t),
+            ('PrivateUsage', ctypes.c_size_t),
+        ]
+
+    _kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    _kernel32.OpenProcess.restype = wintypes.HANDLE
+    _ACESSO_CONSULTA = 0x1000 | 0x0010  # QUERY_LIMITED_INFORMATION | VM_READ
+
+    def rss_mb(pid):
+        """Memória privada (MB) do processo, sem arquivos mapeados, ou None se não for possível medir"""
+        handle = _kernel32.OpenProcess(_ACESSO_CONSULTA, False, pid)
+        if not handle:
+            return None
+        try:
+            contadores = _ContadoresMemoria()
+            contadores.cb = ctypes.sizeof(contadores)
+            if not _kernel32.K32GetProcessMemoryInfo(handle, ctypes.byref(contadores), contadores.cb):
+                return None
+            return contadores.PrivateUsage / 1024 / 1024
+        finally:
+            _kernel32.CloseHandle(handle)
+else:
+    try:
+        _TAMANHO_PAGINA = os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        _TAMANHO_PAGINA = 4096
+
+    def rss_mb(pid):
+        """Memória residente anônima (MB) do processo, ou None se não for possível medir
+
+        statm traz as páginas residentes (campo 2) e, delas, as compartilhadas
+        ou de arquivos mapeados (campo 3), que ficam de fora.
+        """
+        try:
+            with open(f'/proc/{pid}/statm', 'rb') as f:
+                campos = f.read().split()
+            return (int(campos[1]) - int(campos[2])) * _TAMANHO_PAGINA / 1024 / 1024
+        except (OSError, ValueError, IndexError):
+            return None
+
+
+def _laco_worker(conexao, initializer=None, initargs=()):
+    """Processo worker: executa uma tarefa por vez até receber None
+
+    Aqui a morte do processo (inclusive por SIGBUS de um PDF mapeado que
+    mudou no disco) vira falha da tarefa, então a leitura automática pode
+    usar mmap (ret/leitura.py).
+    """
+    permitir_mmap()
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        try:
+            tarefa = conexao.recv()
+        except (EOFError, OSError):
+            return
+        if tarefa is None:
+            return
+        funcao, args = tarefa
+        try:
+            resposta = (True, funcao(*args))
+        except MemoryError:
+            resposta = (False, FalhaExtracao(FALHA_MEMORIA, "Memória esgotada no worker"))
+        except Exception as e:
+            resposta = (False, FalhaExtracao(FALHA_CORROMPIDO, f"Falha no worker: {e}"))
+        conexao.send(resposta)
+
+
+class _Worker:
+    """Um processo worker e a tarefa que ele está executando"""
+
+    def __init__(self, contexto, initializer=None, initargs=()):
+        self.conexao, filho = contexto.Pipe()
+        self.processo = contexto.Process(
+            target=_laco_worker, args=(filho, initializer, initargs), daemon=True
+        )
+        self.processo.start()
+        filho.close()
+        self.futuro = None
+        self.inicio = None
+
+    def encerrar(self, forcar=False):
+        """Pede o encerramento (ou mata o processo, com forcar=True)"""
+        if not forcar:
+            try:
+                self.conexao.send(None)
+            except OSError:
+                forcar = True
+            else:
+                self.processo.join(ESPERA_ENCERRAMENTO)
+                forcar = self.processo.is_alive()
+        if forcar:
+            self.processo.kill()
+            self.processo.join()
+        self.conexao.close()
+
+
+class ExecutorSupervisionado:
+    """Pool de processos com tempo e memória limitados por tarefa
+
+    Tem a interface usada de ProcessPoolExecutor (submit/shutdown e
+    initializer/initargs, executado em cada worker novo, inclusive nos que
+    substituem os encerrados). Um thread supervisor entrega uma tarefa por
+    vez a cada worker, recolhe os resultados e aplica os limites; um worker
+    encerrado por ter excedido um limite é substituído na próxima tarefa.
+    """
+
+    def __init__(self, max_workers, limites=LIMITES_PADRAO, initializer=None, initargs=()):
+        self.limites = limites
+        self._initializer = initializer
+        self._initargs = initargs
+        self._contexto = multiprocessing.get_context()
+        self._workers = [None] * max_workers
+        self._fila = deque()
+        self._trava = threading.Lock()
+        self._encerrar = False
+        self._cancelar = False
+        # Pipe usado só para acordar o supervisor quando chega tarefa ou encerramento
+        self._acordar_leitura, self._acordar_escrita = multiprocessing.Pipe(duplex=False)
+        self._supervisor = threading.Thread(target=self._supervisionar, name='ret-supervisor', daemon=True)
+        self._supervisor.start()
+
+    def submit(self, funcao, *args):
+        futuro = Future()
+        with self._trava:
+            if self._encerrar:
+                raise RuntimeError("Executor já encerrado")
+            self._fila.append((futuro, funcao, args))
+        self._acordar()
+        return futuro
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        with self._trava:
+            self._encerrar = True
+            if cancel_futures:
+                self._cancelar = True
+                while self._fila:
+                    self._fila.popleft()[0].cancel()
+        self._acordar()
+        if wait:
+            self._supervisor.join()
+
+    def _acordar(self):
+        try:
+            self._acordar_escrita.send_bytes(b'')
+        except OSError:
+            pass
+
+    def _despachar(self):
+        """Entrega as tarefas da fila aos workers livres (criando-os se preciso)"""
+        for i, worker in enumerate(self._workers):
+            if worker is not None and worker.futuro is not None:
+                continue
+            while self._fila:
+                futuro, funcao, args = self._fila.popleft()
+                if futuro.set_running_or_notify_cancel():
+                    break
+            else:
+                return
+            if worker is None:
+                worker = self._workers[i] = _Worker(self._contexto, self._initializer, self._initargs)
+            try:
+                worker.conexao.send((funcao, args))
+            except Exception as e:
+                futuro.set_exception(FalhaExtracao(FALHA_CORROMPIDO, f"Falha ao enviar a tarefa: {e}"))
+                self._descartar(i, forcar=True)
+                continue
+            worker.futuro = futuro
+            worker.inicio = time.monotonic()
+
+    def _descartar(self, i, forcar):
+        """Encerra o worker da vaga i; a vaga recebe um processo novo na próxima tarefa"""
+        worker = self._workers[i]
+        self._workers[i] = None
+        worker.encerrar(forcar)
+
+    def _falhar(self, i, motivo, mensagem):
+        """Mata o worker da vaga i e conclui a tarefa dele com a falha"""
+        futuro = self._workers[i].futuro
+        self._descartar(i, forcar=True)
+        futuro.set_exception(FalhaExtracao(motivo, mensagem))
+
+    def _receber(self, i):
+        """Conclui a tarefa da vaga i com a resposta do worker (ou com a morte dele)"""
+        worker = self._workers[i]
+        try:
+            sucesso, valor = worker.conexao.recv()
+        except (EOFError, OSError):
+            worker.processo.join(ESPERA_ENCERRAMENTO)
+            codigo = worker.processo.exitcode
+            # SIGKILL sem pedido nosso: em geral o OOM killer do sistema
+            motivo = FALHA_MEMORIA if codigo == -9 else FALHA_CORROMPIDO
+            self._falhar(i, motivo, f"Worker encerrado inesperadamente (código {codigo})")
+            return
+        futuro = worker.futuro
+        worker.futuro = None
+        if sucesso:
+            futuro.set_result(valor)
+        else:
+            futuro.set_exception(valor)
+            if valor.motivo == FALHA_MEMORIA:
+                self._descartar(i, forcar=True)
+
+    def _verificar_limites(self):
+        """Encerra os workers que passaram do tempo ou da memória permitidos"""
+        timeout, memoria = self.limites
+        agora = time.monotonic()
+        for i, worker in enumerate(self._workers):
+            if worker is None or worker.futuro is None:
+                continue
+            if timeout and agora - worker.inicio > timeout:
+                self._falhar(i, FALHA_TIMEOUT, f"Tempo limite de {timeout:g}s excedido")
+                continue
+            if memoria:
+                rss = rss_mb(worker.processo.pid)
+                if rss is not None and rss > memoria:
+                    self._falhar(i, FALHA_MEMORIA, f"Limite de memória de {memoria:g} MB excedido ({rss:.0f} MB)")
+
+    def _interromper_tarefas(self):
+        """Cancelamento: mata os workers ocupados em vez de esperar seus arquivos"""
+        for i, worker in enumerate(self._workers):
+            if worker is not None and worker.futuro is not None:
+                futuro = worker.futuro
+                self._descartar(i, forcar=True)
+                futuro.set_exception(CancelledError())
+
+    def _supervisionar(self):
+        try:
+            while True:
+                with self._trava:
+                    if self._cancelar:
+                        self._interromper_tarefas()
+                    self._despachar()
+                    ocupados = {
+                        worker.conexao: i for i, worker in enumerate(self._workers)
+                        if worker is not None and worker.futuro is not None
+                    }
+                    if self._encerrar and not ocupados and not self._fila:
+                        return
+
+                prontos = wait(list(ocupados) + [self._acordar_leitura], timeout=INTERVALO_VERIFICACAO)
+                for conexao in prontos:
+                    if conexao is self._acordar_leitura:
+                        while self._acordar_leitura.poll():
+                            self._acordar_leitura.recv_bytes()
+                    else:
+                        self._receber(ocupados[conexao])
+                self._verificar_limites()
+        finally:
+            for i, worker in enumerate(self._workers):
+                if worker is not None:
+                    self._descartar(i, forcar=worker.futuro is not None)
+            self._acordar_leitura.close()
+            self._acordar_escrita.close()
@@ -0,0 +1,352 @@
+"""Modelo da tabela "Dados Detalhados" (ordenação, filtro e janela visível)
+
+A interface mostra só as linhas que cabem na tela. ModeloTabela guarda
+as colunas exibidas (uma lista por campo, lidas de um ModeloResultados
+ou de dicionários) e mantém a ordem e o filtro como listas de índices;
+linhas() formata só as linhas pedidas. As ordens por coluna e os textos
+usados no filtro (estes, sim, formatados para todas as linhas) são
+calculados uma vez e reaproveitados enquanto os registros não mudam.
+
+ModeloTabelaBanco oferece a mesma interface sobre o RET_dados.db:
+ordena, filtra e conta no SQLite, e só a janela pedida é lida.
+"""
+from collections import namedtuple
+
+from ret.config import TAXA_EUR_BRL
+
+# tipo: 'texto', 'numero' ou 'data' (DD/MM/AAAA); reais: valor convertido de EUR para R$
+ColunaTabela = namedtuple('ColunaTabela', 'titulo campo largura tipo reais')
+
+COLUNAS_TABELA = [
+    ColunaTabela('Tipo', 'tipo_encargo', 80, 'texto', False),
+    ColunaTabela('Empresa', 'empresa', 150, 'texto', False),
+    ColunaTabela('Nota', 'nota_tipo', 80, 'texto', False),
+    ColunaTabela('Nº', 'numero_nd', 100, 'texto', False),
+    ColunaTabela('Vencimento', 'data_vencimento', 100, 'data', False),
+    ColunaTabela('Valor Total', 'valor_total', 120, 'numero', True),
+    ColunaTabela('QT', 'quantidade', 80, 'numero', False),
+    ColunaTabela('Valor Unit.', 'valor_unitario', 100, 'numero', True),
+]
+
+
+def _chaves_data(valores):
+    """DD/MM/AAAA -> AAAAMMDD (ordenável como texto); datas ausentes vão para o fim"""
+    return [v[6:] + v[3:5] + v[:2] if v and len(v) == 10 else '\uffff' for v in valores]
+
+
+class ModeloTabela:
+    """Registros com ordenação e filtro por coluna, acessados por janelas
+
+    Tudo fica em memória, proporcional à quantidade de registros: os
+    valores das colunas exibidas e, calculados na primeira vez que são
+    usados (ou em preparar()), a ordem de cada coluna e o texto minúsculo
+    de cada linha usado pelo filtro.
+    """
+
+    def __init__(self, registros=(), colunas=COLUNAS_TABELA, taxa=TAXA_EUR_BRL):
+        self.colunas = colunas
+        self.taxa = taxa
+        self.coluna_ordem = None
+        self.decrescente = False
+        self.definir_registros(registros)
+
+    def definir_registros(self, registros, taxas=None):
+        """Troca os registros exibidos (mantém a coluna de ordenação)
+
+        'registros' é um ModeloResultados (só as colunas exibidas são
+        copiadas, e a taxa vem do próprio modelo) ou uma lista de
+        dicionários. 'taxas' traz a taxa EUR → R$ de cada registro (mesma
+        ordem); sem ela vale a taxa fixa.
+        """
+        campos = {coluna.campo for coluna in self.colunas}
+        df = getattr(registros, 'df', None)
+        if df is not None:
+            self.valores = {campo: df[campo].tolist() for campo in campos}
+            self.total = len(df)
+            if taxas is None:
+                taxas = df['taxa']
+        else:
+            registros = list(registros)
+            self.valores = {campo: [r.get(campo) for r in registros] for campo in campos}
+            self.total = len(registros)
+        self.taxas = None if taxas is None else list(taxas)
+        self._formatadores = [self._formatador(c) for c in self.colunas]
+        self._ordens = {}
+        self._textos = {}
+        self.texto_filtro = ''
+        self.coluna_filtro = None
+        self._atualizar()
+
+    def __len__(self):
+        return len(self.visiveis)
+
+    def _formatador(self, coluna):
+        """Função índice do registro -> texto exibido na coluna"""
+        valores = self.valores[coluna.campo]
+
+        if coluna.tipo != 'numero':
+            def formatar(i):
+                valor = valores[i]
+                return '' if valor is None else str(valor)
+        elif coluna.reais and self.taxas is not None:
+            taxas = self.taxas
+
+            def formatar(i):
+                valor = valores[i]
+                return '' if valor is None else f"{valor * taxas[i]:.2f}"
+        else:
+            fator = self.taxa if coluna.reais else 1
+
+            def formatar(i):
+                valor = valores[i]
+                return '' if valor is None else f"{valor * fator:.2f}"
+        return formatar
+
+    def _ordem(self, indice_coluna):
+        """Índices dos registros em ordem crescente da coluna (calculado uma vez)"""
+        # Referências locais: se os registros forem trocados durante o cálculo
+        # (preparar() em outra thread), o resultado vai para o cache antigo
+        ordens, colunas = self._ordens, self.valores
+        ordem = ordens.get(indice_coluna)
+        if ordem is None:
+            coluna = self.colunas[indice_coluna]
+            valores = colunas[coluna.campo]
+            if coluna.tipo == 'numero' and coluna.reais and self.taxas is not None:
+                # Ordena pelo valor exibido: com taxa por data, a ordem em EUR difere
+                chaves = [float('inf') if v is None else v * t for v, t in zip(valores, self.taxas)]
+            elif coluna.tipo == 'numero':
+                chaves = [float('inf') if v is None else v for v in valores]
+            elif coluna.tipo == 'data':
+                chaves = _chaves_data(valores)
+            else:
+                chaves = ['' if v is None else str(v).lower() for v in valores]
+            ordem = sorted(range(len(chaves)), key=chaves.__getitem__)
+            ordens[indice_coluna] = ordem
+        return ordem
+
+    def _texto(self, indice_coluna):
+        """Texto exibido (minúsculo) de cada registro na coluna, para o filtro
+
+        Com indice_coluna None, as colunas da linha vêm juntas, separadas por
+        um caractere nulo, para que um termo não case atravessando duas colunas.
+        """
+        cache, total, formatadores = self._textos, self.total, self._formatadores
+        textos = cache.get(indice_coluna)
+        if textos is None:
+            indices = range(total)
+            if indice_coluna is None:
+                textos = ['\x00'.join([f(i) for f in formatadores]).lower() for i in indices]
+            else:
+                formatar = formatadores[indice_coluna]
+                textos = [formatar(i).lower() for i in indices]
+            cache[indice_coluna] = textos
+        return textos
+
+    def preparar(self):
+        """Calcula antecipadamente as ordens e o texto do filtro geral
+
+        Pode rodar em uma thread logo após carregar os registros: assim
+        ordenar e filtrar na interface não recalculam nada depois.
+        """
+        for indice_coluna in range(len(self.colunas)):
+            self._ordem(indice_coluna)
+        self._texto(None)
+
+    def _atualizar(self):
+        """Recalcula a lista de índices visíveis (ordem + filtro)"""
+        if self.coluna_ordem is None:
+            ordem = range(self.total)
+        else:
+            ordem = self._ordem(self.coluna_ordem)
+        if self.decrescente:
+            ordem = ordem[::-1]
+
+        texto = self.texto_filtro
+        if not texto:
+            self.visiveis = ordem
+            return
+
+        textos = self._texto(self.coluna_filtro)
+        aceitos = bytearray(len(textos))
+        for i, t in enumerate(textos):
+            if texto in t:
+                aceitos[i] = 1
+        self.visiveis = [i for i in ordem if aceitos[i]]
+
+    def ordenar(self, indice_coluna, decrescente=None):
+        """Ordena pela coluna; sem 'decrescente', clicar de novo inverte a ordem"""
+        if decrescente is None:
+            decrescente = self.coluna_ordem == indice_coluna and not self.decrescente
+        self.coluna_ordem = indice_coluna
+        self.decrescente = decrescente
+        self._atualizar()
+
+    def filtrar(self, texto, indice_coluna=None):
+        """Mantém só as linhas cuja coluna (ou qualquer coluna, se None) contém 'texto'"""
+        self.texto_filtro = (texto or '').strip().lower()
+        self.coluna_filtro = indice_coluna
+        self._atualizar()
+
+    def linhas(self, inicio, quantidade):
+        """Valores formatados das linhas visíveis [inicio, inicio + quantidade)"""
+        formatadores = self._formatadores
+        return [
+            tuple(f(i) for f in formatadores)
+            for i in self.visiveis[inicio:inicio + quantidade]
+        ]
+
+
+# Vencimento gravado no banco em ISO; exibido como DD/MM/AAAA
+_SQL_DATA_ISO = "d.data_vencimento GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+_SQL_DATA_BR = (
+    f"CASE WHEN {_SQL_DATA_ISO} THEN substr(d.data_vencimento, 9, 2) || '/' || "
+    "substr(d.data_vencimento, 6, 2) || '/' || substr(d.data_vencimento, 1, 4) "
+    "ELSE COALESCE(d.data_vencimento, '') END"
+)
+# Chave de ordenação da data: datas ausentes vão para o fim (como em _chaves_data)
+_SQL_DATA_ORDEM = f"CASE WHEN {_SQL_DATA_ISO} THEN d.data_vencimento ELSE char(65535) END"
+
+
+class ModeloTabelaBanco:
+    """A mesma tabela lida direto do RET_dados.db, uma janela por vez
+
+    Ordenação, filtro de texto e contagem são feitos pelo SQLite (ORDER BY,
+    WHERE, LIMIT/OFFSET); só as linhas pedidas por linhas() chegam ao
+    Python. A taxa EUR → R$ de cada vencimento vai para uma tabela
+    temporária (uma linha por data distinta), para que a ordenação e o
+    filtro das colunas em R$ usem os mesmos valores exibidos. O resultado
+    é o do ModeloTabela com os registros do banco, exceto que o filtro
+    ignora maiúsculas só nas letras sem acento (lower do SQLite).
+
+    'filtro' é um FiltroConsulta (ret/consulta.py) e 'taxa' um número
+    fixo, uma TabelaCambio ou None (câmbio configurado).
+    """
+
+    def __init__(self, db_path, filtro=None, taxa=None, colunas=COLUNAS_TABELA):
+        import sqlite3
+
+        from ret.agregacao import taxas_por_data
+        from ret.cambio import obter_cambio
+        from ret.consulta import SEM_FILTRO, condicoes
+
+        import pandas as pd
+
+        if taxa is None:
+            taxa = obter_cambio()
+        self.colunas = colunas
+        self.coluna_ordem = None
+        self.decrescente = False
+        self.texto_filtro = ''
+        self.coluna_filtro = None
+        self._onde, self._parametros = condicoes(filtro or SEM_FILTRO)
+
+        # Usada pela thread da interface depois de criada na da consulta
+        self.conexao = sqlite3.connect(db_path, check_same_thread=False)
+        datas = [data for data, in self.conexao.execute('SELECT DISTINCT data_vencimento FROM dados_ret')]
+        vencimentos = pd.to_datetime(pd.Series(datas, dtype=object), format='%Y-%m-%d', errors='coerce')
+        taxas = pd.Series(taxas_por_data(vencimentos, taxa), index=vencimentos.index, dtype='float64')
+        self.conexao.execute('CREATE TEMP TABLE taxas_tabela (data TEXT PRIMARY KEY, taxa REAL)')
+        self.conexao.executemany(
+            'INSERT INTO taxas_tabela VALUES (?, ?)',
+            [(data, t) for data, t in zip(datas, taxas.tolist()) if data is not None]
+        )
+        self._taxa_padrao = float(getattr(taxa, 'taxa_padrao', taxa))
+
+        self._expressoes = [self._expressao(coluna) for coluna in colunas]
+        self.total = self._contar(self._onde, self._parametros)
+        self._atualizar()
+
+    def _expressao(self, coluna):
+        """Valor SQL da coluna como exibido (números já em R$ quando for o caso)"""
+        campo = f"d.{coluna.campo}"
+        if coluna.tipo == 'data':
+            return _SQL_DATA_BR
+        if coluna.tipo == 'numero':
+            if coluna.reais:
+                return f"COALESCE({campo}, 0) * COALESCE(t.taxa, {self._taxa_padrao!r})"
+            return f"COALESCE({campo}, 0)"
+        return f"COALESCE({campo}, '')"
+
+    def _de(self, onde):
+        """FROM (com a taxa de cada registro) e WHERE da consulta"""
+        filtro = f" WHERE {onde}" if onde else ''
+        return f"FROM dados_ret d LEFT JOIN taxas_tabela t ON t.data = d.data_vencimento{filtro}"
+
+    def _contar(self, onde, parametros):
+        return self.conexao.execute(f"SELECT COUNT(*) {self._de(onde)}", parametros).fetchone()[0]
+
+    def _condicao(self):
+        """Condição SQL (filtro da consulta + texto) e parâmetros"""
+        partes = [self._onde] if self._onde else []
+        parametros = list(self._parametros)
+        if self.texto_filtro:
+            if self.coluna_filtro is None:
+                indices = range(len(self.colunas))
+            else:
+                indices = [self.coluna_filtro]
+            textos = []
+            for i in indices:
+                coluna = self.colunas[i]
+                expressao = self._expressoes[i]
+                if coluna.tipo == 'numero':
+                    expressao = f"printf('%.2f', {expressao})"
+                textos.append(f"instr(lower({expressao}), ?) > 0")
+                parametros.append(self.texto_filtro)
+            partes.append(f"({' OR '.join(textos)})")
+        return ' AND '.join(partes), parametros
+
+    def _ordem(self):
+        """ORDER BY da janela: a coluna escolhida e, no empate, a ordem do banco"""
+        direcao = ' DESC' if self.decrescente else ''
+        chaves = []
+        if self.coluna_ordem is not None:
+            coluna = self.colunas[self.coluna_ordem]
+            if coluna.tipo == 'data':
+                chaves.append(_SQL_DATA_ORDEM)
+            elif coluna.tipo == 'numero':
+                chaves.append(self._expressoes[self.coluna_ordem])
+            else:
+                chaves.append(f"lower({self._expressoes[self.coluna_ordem]})")
+        chaves += ['d.caminho', 'd.numero_nd']
+        return ', '.join(chave + direcao for chave in chaves)
+
+    def _atualizar(self):
+        self._onde_atual, self._parametros_atuais = self._condicao()
+        self._quantidade = self._contar(self._onde_atual, self._parametros_atuais)
+
+    def __len__(self):
+        return self._quantidade
+
+    def preparar(self):
+        """Nada a antecipar: o SQLite ordena e filtra a cada pedido"""
+
+    def ordenar(self, indice_coluna, decrescente=None):
+        """Ordena pela coluna; sem 'decrescente', clicar de novo inverte a ordem"""
+        if decrescente is None:
+            decrescente = self.coluna_ordem == indice_coluna and not self.decrescente
+        self.coluna_ordem = indice_coluna
+        self.decrescente = decrescente
+
+    def filtrar(self, texto, indice_coluna=None):
+        """Mantém só as linhas cuja coluna (ou qualquer coluna, se None) contém 'texto'"""
+        self.texto_filtro = (texto or '').strip().lower()
+        self.coluna_filtro = indice_coluna
+        self._atualizar()
+
+    def linhas(self, inicio, quantidade):
+        """Valores formatados das linhas visíveis [inicio, inicio + quantidade)"""
+        if quantidade <= 0:
+            return []
+        cursor = self.conexao.execute(
+            f"SELECT {', '.join(self._expressoes)} {self._de(self._onde_atual)} "
+            f"ORDER BY {self._ordem()} LIMIT ? OFFSET ?",
+            self._parametros_atuais + [quantidade, max(0, inicio)]
+        )
+        return [
+            tuple(f"{valor:.2f}" if coluna.tipo == 'numero' else str(valor)
+                  for coluna, valor in zip(self.colunas, linha))
+            for linha in cursor
+        ]
+
+    def fechar(self):
+        self.conexao.close()
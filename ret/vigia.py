@@ -0,0 +1,444 @@
+"""Modo vigia: mantém o RET_dados.db atualizado enquanto os PDFs chegam
+
+Em vez de reprocessar a árvore inteira no fechamento do mês, o vigia
+acompanha a pasta RET e grava cada PDF novo, alterado ou removido poucos
+segundos depois da mudança:
+1. sincronização inicial (sincronizar_pasta) para alcançar o estado atual;
+2. observação da pasta:
+   - ObservadorInotify (Linux): inotify via ctypes, um watch por pasta,
+     sem varrer nada enquanto não há mudança;
+   - ObservadorVarredura: nos demais sistemas (ou se o inotify falhar),
+     compara tamanho e mtime de uma varredura a cada INTERVALO_VARREDURA_S;
+3. Estabilizador: um arquivo só segue quando tamanho e mtime ficam
+   parados por ESPERA_ESTAVEL_S e o PDF está completo (termina com
+   %%EOF), para não ler cópias pela metade. Depois de ESPERA_MAXIMA_S
+   ele segue assim mesmo (um PDF truncado vira falha registrada);
+4. os caminhos prontos vão em lote para sincronizar_arquivos (extração no
+   pool, upsert e manifesto em uma transação). O pool de extração (e o
+   do OCR) é criado uma vez e serve a todos os lotes: um PDF avisado não
+   paga a criação dos workers nem a leitura do dicionário de empresas.
+
+Se a fila de eventos do kernel transbordar, ou a pasta raiz sumir e
+voltar, o vigia refaz a sincronização completa.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+
+from ret.descoberta import REGRAS_PADRAO, aceitar, dentro_de, descobrir
+from ret.motor import criar_executor, criar_executor_ocr
+from ret.sincronizacao import sincronizar_arquivos, sincronizar_pasta
+from ret.supervisao import LIMITES_PADRAO
+
+# Tempo (s) que tamanho e mtime precisam ficar parados para o arquivo ser lido
+ESPERA_ESTAVEL_S = 1.0
+# Depois deste tempo (s) um PDF ainda incompleto é lido assim mesmo
+ESPERA_MAXIMA_S = 60.0
+# Intervalo (s) entre varreduras do ObservadorVarredura
+INTERVALO_VARREDURA_S = 2.0
+# Espera máxima (s) por eventos em cada volta do laço (reação ao 'parar')
+INTERVALO_LACO_S = 0.5
+
+# Bytes finais do PDF em que o marcador %%EOF é procurado
+BYTES_FIM_PDF = 1024
+
+# Constantes de <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+
+MASCARA_INOTIFY = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+    IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW
+)
+EVENTO_INOTIFY = struct.Struct('iIII')
+
+
+class Mudancas:
+    """O que um observador viu desde a última leitura
+
+    'arquivos': caminhos de arquivos criados, alterados ou removidos;
+    'pastas': pastas criadas, removidas ou movidas (o conteúdo precisa ser
+    conferido); 'completa': a sincronização completa é necessária.
+    """
+
+    def __init__(self):
+        self.arquivos = set()
+        self.pastas = set()
+        self.completa = False
+
+    def __bool__(self):
+        return bool(self.arquivos or self.pastas or self.completa)
+
+
+def pdf_completo(caminho):
+    """Indica se o PDF já foi gravado até o fim (marcador %%EOF nos bytes finais)"""
+    try:
+        with open(caminho, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - BYTES_FIM_PDF))
+            return b'%%EOF' in f.read()
+    except OSError:
+        return False
+
+
+def _assinatura(caminho):
+    """(tamanho, mtime_ns) do arquivo, ou None se ele não existe"""
+    try:
+        st = os.stat(caminho)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class Estabilizador:
+    """Segura os arquivos avisados até a gravação terminar
+
+    marcar() registra um caminho recém-avisado; prontos() devolve os que
+    ficaram estáveis (ou sumiram: a remoção segue na hora).
+    """
+
+    def __init__(self, espera=ESPERA_ESTAVEL_S, espera_maxima=ESPERA_MAXIMA_S):
+        self.espera = espera
+        self.espera_maxima = espera_maxima
+        # {caminho: [assinatura, parado desde, primeiro aviso]}
+        self._pendentes = {}
+
+    def __len__(self):
+        return len(self._pendentes)
+
+    def marcar(self, caminho, agora=None):
+        agora = time.monotonic() if agora is None else agora
+        pendente = self._pendentes.get(caminho)
+        assinatura = _assinatura(caminho)
+        if pendente is None:
+            self._pendentes[caminho] = [assinatura, agora, agora]
+        elif pendente[0] != assinatura:
+            pendente[0], pendente[1] = assinatura, agora
+
+    def prontos(self, agora=None):
+        """Caminhos estáveis (ou removidos), retirados da espera"""
+        agora = time.monotonic() if agora is None else agora
+        prontos = []
+        for caminho, pendente in list(self._pendentes.items()):
+            assinatura, desde, primeiro = pendente
+            if agora - desde < self.espera:
+                continue
+            atual = _assinatura(caminho)
+            if atual != assinatura:
+                pendente[0], pendente[1] = atual, agora
+                continue
+            if atual is None or pdf_completo(caminho) or agora - primeiro >= self.espera_maxima:
+                prontos.append(caminho)
+                del self._pendentes[caminho]
+            else:
+                pendente[1] = agora
+        return prontos
+
+
+def _carregar_libc():
+    """libc com as funções do inotify, ou None fora do Linux"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class ObservadorInotify:
+    """Eventos do inotify para a pasta e todas as subpastas aceitas pelas regras"""
+
+    def __init__(self, pasta, regras=REGRAS_PADRAO, log=print):
+        self.libc = _carregar_libc()
+        if self.libc is None:
+            raise OSError(errno.ENOSYS, "inotify indisponível")
+        self.pasta = pasta
+        self.regras = regras
+        self.log = log
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        # {wd: pasta} e {pasta: wd}
+        self._pastas = {}
+        self._watches = {}
+        try:
+            self._vigiar_arvore(pasta)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def _vigiar(self, pasta):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(pasta), MASCARA_INOTIFY)
+        if wd < 0:
+            codigo = ctypes.get_errno()
+            if codigo in (errno.ENOSPC, errno.ENOMEM):
+                # Limite de watches (fs.inotify.max_user_watches): o chamador troca para a varredura
+                raise OSError(codigo, f"Limite de watches do inotify atingido em {pasta}")
+            return  # pasta sumiu ou sem permissão: ignorada, como em descobrir
+        self._pastas[wd] = pasta
+        self._watches[pasta] = wd
+
+    def _vigiar_arvore(self, raiz):
+        """Watch na pasta e nas subpastas aceitas (links não são seguidos)"""
+        pilha = [raiz]
+        while pilha:
+            pasta = pilha.pop()
+            self._vigiar(pasta)
+            try:
+                with os.scandir(pasta) as it:
+                    for entrada in it:
+                        if entrada.is_dir(follow_symlinks=False) and \
+                                aceitar(self.pasta, entrada.path, self.regras, pasta=True):
+                            pilha.append(entrada.path)
+            except OSError:
+                continue
+
+    def _esquecer_arvore(self, raiz):
+        """Remove os watches da pasta e das subpastas (pasta movida para fora ou apagada)"""
+        prefixo = raiz + os.sep
+        for pasta in [p for p in self._watches if p == raiz or p.startswith(prefixo)]:
+            wd = self._watches.pop(pasta)
+            self._pastas.pop(wd, None)
+            self.libc.inotify_rm_watch(self.fd, wd)
+
+    def _ler_eventos(self):
+        """Lê tudo o que o kernel acumulou (o descritor é não bloqueante)"""
+        dados = b''
+        while True:
+            try:
+                bloco = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not bloco:
+                break
+            dados += bloco
+        return dados
+
+    def ler(self, timeout):
+        """Mudancas vistas em até 'timeout' segundos"""
+        mudancas = Mudancas()
+        prontos, _, _ = select.select([self.fd], [], [], timeout)
+        if not prontos:
+            return mudancas
+
+        dados = self._ler_eventos()
+        posicao = 0
+        while posicao + EVENTO_INOTIFY.size <= len(dados):
+            wd, mascara, _, tamanho = EVENTO_INOTIFY.unpack_from(dados, posicao)
+            posicao += EVENTO_INOTIFY.size
+            nome = os.fsdecode(dados[posicao:posicao + tamanho].rstrip(b'\0'))
+            posicao += tamanho
+
+            if mascara & IN_Q_OVERFLOW:
+                mudancas.completa = True
+                continue
+            pasta = self._pastas.get(wd)
+            if pasta is None:
+                continue
+            if mascara & IN_IGNORED:
+                self._pastas.pop(wd, None)
+                if self._watches.get(pasta) == wd:
+                    del self._watches[pasta]
+                continue
+            if mascara & (IN_DELETE_SELF | IN_MOVE_SELF):
+                if pasta == self.pasta:
+                    mudancas.completa = True
+                continue
+            if not nome:
+                continue
+
+            caminho = os.path.join(pasta, nome)
+            if mascara & IN_ISDIR:
+                if not aceitar(self.pasta, caminho, self.regras, pasta=True):
+                    continue
+                if mascara & (IN_MOVED_FROM | IN_DELETE):
+                    self._esquecer_arvore(caminho)
+                elif mascara & (IN_CREATE | IN_MOVED_TO):
+                    try:
+                        self._vigiar_arvore(caminho)
+                    except OSError as e:
+                        # Sem watches para a pasta nova: o vigia recomeça (e cai na varredura)
+                        self.log(f"[AVISO] {e.strerror or e}")
+                        mudancas.completa = True
+                mudancas.pastas.add(caminho)
+            elif aceitar(self.pasta, caminho, self.regras):
+                mudancas.arquivos.add(caminho)
+        return mudancas
+
+    def fechar(self):
+        os.close(self.fd)
+
+
+class ObservadorVarredura:
+    """Compara tamanho e mtime de uma varredura completa a cada 'intervalo' segundos"""
+
+    def __init__(self, pasta, regras=REGRAS_PADRAO, intervalo=INTERVALO_VARREDURA_S):
+        self.pasta = pasta
+        self.regras = regras
+        self.intervalo = intervalo
+        self._estado = self._varrer()
+        self._proxima = time.monotonic() + intervalo
+
+    def _varrer(self):
+        ilegiveis = {}
+        estado = {
+            a.caminho: (a.tamanho, a.mtime_ns)
+            for a in descobrir(self.pasta, self.regras, ilegiveis=ilegiveis)
+        }
+        if ilegiveis and getattr(self, '_estado', None):
+            # Pastas que não puderam ser lidas ficam como estavam (não são remoções)
+            estado.update(
+                (caminho, assinatura) for caminho, assinatura in self._estado.items()
+                if caminho not in estado and dentro_de(caminho, ilegiveis)
+            )
+        return estado
+
+    def ler(self, timeout):
+        mudancas = Mudancas()
+        espera = self._proxima - time.monotonic()
+        if espera > timeout:
+            time.sleep(timeout)
+            return mudancas
+        if espera > 0:
+            time.sleep(espera)
+
+        estado = self._varrer()
+        self._proxima = time.monotonic() + self.intervalo
+        for caminho, assinatura in estado.items():
+            if self._estado.get(caminho) != assinatura:
+                mudancas.arquivos.add(caminho)
+        mudancas.arquivos.update(caminho for caminho in self._estado if caminho not in estado)
+        self._estado = estado
+        return mudancas
+
+    def fechar(self):
+        pass
+
+
+def criar_observador(pasta, regras=REGRAS_PADRAO, log=print, intervalo=INTERVALO_VARREDURA_S,
+                     varredura=False):
+    """ObservadorInotify quando possível; senão (ou com varredura=True) ObservadorVarredura"""
+    if not varredura:
+        try:
+            return ObservadorInotify(pasta, regras, log)
+        except OSError as e:
+            log(f"[AVISO] inotify indisponível ({e.strerror or e}); usando varredura a cada {intervalo:g}s")
+    return ObservadorVarredura(pasta, regras, intervalo)
+
+
+def _conteudo_da_pasta(pasta, raiz, regras, db_path):
+    """Arquivos a conferir de uma pasta criada/movida/removida: os do disco e os do manifesto"""
+    from ret.banco import abrir_banco
+
+    relativo = os.path.relpath(pasta, raiz)
+    caminhos = {a.caminho for a in descobrir(pasta, regras, relativo)} if os.path.isdir(pasta) else set()
+    # Faixa [pasta/, pasta0): usa a chave primária do manifesto
+    prefixo = pasta + os.sep
+    conexao = abrir_banco(db_path)
+    try:
+        caminhos.update(caminho for caminho, in conexao.execute(
+            'SELECT caminho FROM arquivos_ret WHERE caminho >= ? AND caminho < ?',
+            (prefixo, pasta + chr(ord(os.sep) + 1))
+        ))
+    finally:
+        conexao.close()
+    return caminhos
+
+
+def _encerrar_executores(opcoes):
+    """Encerra os pools criados pelo vigia"""
+    opcoes['executor'].shutdown(wait=True, cancel_futures=True)
+    if opcoes.get('executor_ocr') is not None:
+        opcoes['executor_ocr'].shutdown(wait=True, cancel_futures=True)
+
+
+def vigiar(pasta, db_path, log=print, parar=None, ao_atualizar=None, regras=REGRAS_PADRAO,
+           espera=ESPERA_ESTAVEL_S, intervalo=INTERVALO_VARREDURA_S, varredura=False, **opcoes):
+    """Mantém o banco sincronizado com a pasta até 'parar' (threading.Event) ser sinalizado
+
+    'opcoes' vão para sincronizar_pasta/sincronizar_arquivos (workers,
+    cache, estrategia, limites, executor, executor_ocr). Sem 'executor',
+    o vigia cria os pools uma vez e os encerra ao terminar. Depois de cada
+    lote gravado, ao_atualizar(resultado) recebe o resumo da sincronização
+    (mesmo formato de sincronizar_pasta). Sem 'parar', roda até
+    KeyboardInterrupt.
+    """
+    proprio = opcoes.get('executor') is None
+    if proprio:
+        estrategia = opcoes.get('estrategia')
+        opcoes['executor'] = criar_executor(opcoes.get('workers'), opcoes.get('limites', LIMITES_PADRAO))
+        opcoes['executor_ocr'] = criar_executor_ocr(getattr(estrategia, 'ocr', None))
+    try:
+        # O observador começa antes da sincronização inicial: nada que chegue durante ela se perde
+        observador = criar_observador(pasta, regras, log, intervalo, varredura)
+    except Exception:
+        if proprio:
+            _encerrar_executores(opcoes)
+        raise
+    estabilizador = Estabilizador(espera)
+    log(f"Vigiando {pasta} ({type(observador).__name__})")
+
+    def sincronizar_tudo():
+        resultado = sincronizar_pasta(pasta, db_path, log=log, regras=regras, **opcoes)
+        if ao_atualizar is not None:
+            ao_atualizar(resultado)
+
+    try:
+        sincronizar_tudo()
+        raiz_ausente = False
+        while parar is None or not parar.is_set():
+            mudancas = observador.ler(INTERVALO_LACO_S)
+
+            # Raiz inacessível (disco de rede caiu): espera voltar, sem apagar os registros
+            if not os.path.isdir(pasta):
+                if not raiz_ausente:
+                    log(f"[AVISO] Pasta indisponível: {pasta} (aguardando)")
+                raiz_ausente = True
+                continue
+            if raiz_ausente or mudancas.completa:
+                raiz_ausente = False
+                log("Sincronização completa da pasta")
+                observador.fechar()
+                observador = criar_observador(pasta, regras, log, intervalo, varredura)
+                sincronizar_tudo()
+                continue
+
+            for caminho in mudancas.arquivos:
+                estabilizador.marcar(caminho)
+            for subpasta in mudancas.pastas:
+                for caminho in _conteudo_da_pasta(subpasta, pasta, regras, db_path):
+                    estabilizador.marcar(caminho)
+
+            prontos = estabilizador.prontos()
+            if prontos:
+                resultado = sincronizar_arquivos(prontos, db_path, log=log, **opcoes)
+                if ao_atualizar is not None:
+                    ao_atualizar(resultado)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        observador.fechar()
+        if proprio:
+            _encerrar_executores(opcoes)
+        log("Vigia encerrado")
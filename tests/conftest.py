@@ -0,0 +1,25 @@
+"""Fixtures comuns: um acervo pequeno de PDFs sintéticos (benchmarks/corpus.py)"""
+import os
+
+import pytest
+
+from benchmarks.corpus import gerar_corpus
+from ret.supervisao import SEM_LIMITES
+
+ARQUIVOS_ACERVO = 12
+
+# Extração no próprio processo: os testes não dependem de criar workers
+OPCOES_EXTRACAO = {'workers': 1, 'limites': SEM_LIMITES, 'log': lambda mensagem: None}
+
+
+@pytest.fixture
+def acervo(tmp_path):
+    """Pasta RET com ARQUIVOS_ACERVO PDFs (sempre os mesmos)"""
+    return gerar_corpus(str(tmp_path), ARQUIVOS_ACERVO, paginas=(1, 2))['pasta']
+
+
+def listar_pdfs(pasta):
+    return sorted(
+        os.path.join(raiz, nome)
+        for raiz, _, nomes in os.walk(pasta) for nome in nomes if nome.endswith('.pdf')
+    )
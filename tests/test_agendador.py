@@ -0,0 +1,85 @@
+"""Agendador de tarefas por cliente (ret/agendador.py)"""
+import os
+import sqlite3
+
+from benchmarks.corpus import gerar_corpus
+from ret.agendador import (
+    CONCLUIDA, FALHOU, Tarefa, estado_tarefas, executar_tarefas, ler_tarefas, normalizar_tarefa,
+)
+from ret.supervisao import SEM_LIMITES
+from tests.conftest import listar_pdfs
+
+OPCOES = {'workers': 1, 'limites': SEM_LIMITES, 'log': lambda mensagem: None, 'taxa': 6.0}
+
+
+def _cliente(tmp_path, nome, arquivos):
+    return gerar_corpus(str(tmp_path / nome), arquivos, paginas=(1, 1), semente=len(nome))['pasta']
+
+
+def _registros_por_pasta(consolidado, pasta):
+    conexao = sqlite3.connect(consolidado)
+    try:
+        return conexao.execute(
+            'SELECT COUNT(*) FROM dados_ret WHERE caminho LIKE ?', (pasta + os.sep + '%',)
+        ).fetchone()[0]
+    finally:
+        conexao.close()
+
+
+def test_ler_tarefas(tmp_path):
+    lista = tmp_path / 'tarefas.csv'
+    lista.write_text(
+        'pasta;cliente;excluir\n'
+        '# comentário\n'
+        'clientes/ACME/RET;ACME;backup*| EAT/2023*\n'
+        '\n'
+        '/dados/BETA/RET\n',
+        encoding='utf-8'
+    )
+    acme, beta = ler_tarefas(str(lista), nome_excel='RET.xlsx')
+    assert acme.pasta == str(tmp_path / 'clientes' / 'ACME' / 'RET') and acme.cliente == 'ACME'
+    assert acme.regras.excluir[-2:] == ('backup*', 'EAT/2023*')
+    assert acme.xlsx_path == os.path.join(acme.pasta, 'RET.xlsx')
+    beta = normalizar_tarefa(beta)
+    assert beta.cliente == 'RET' and beta.db_path == '/dados/BETA/RET/RET_dados.db'
+
+
+def test_rodada_consolida_os_clientes(tmp_path):
+    acme, beta = _cliente(tmp_path, 'ACME', 4), _cliente(tmp_path, 'BETA', 3)
+    consolidado = str(tmp_path / 'consolidado.db')
+    tarefas = [Tarefa(acme, 'ACME', xlsx_path=str(tmp_path / 'acme.xlsx')), Tarefa(beta, 'BETA')]
+
+    finais = executar_tarefas(tarefas, consolidado, **OPCOES)
+    assert [(f['cliente'], f['estado'], f['novos']) for f in finais] == [('ACME', CONCLUIDA, 4), ('BETA', CONCLUIDA, 3)]
+    assert os.path.isfile(tmp_path / 'acme.xlsx')
+    assert _registros_por_pasta(consolidado, acme) == 4 and _registros_por_pasta(consolidado, beta) == 3
+    estados = estado_tarefas(consolidado)
+    assert {e['rodada'] for e in estados} == {1} and all(e['feitos'] == e['pendentes'] for e in estados)
+
+    # Nova rodada: os registros do cliente são substituídos, os dos outros ficam
+    os.remove(listar_pdfs(acme)[0])
+    executar_tarefas(tarefas[:1], consolidado, **OPCOES)
+    assert _registros_por_pasta(consolidado, acme) == 3 and _registros_por_pasta(consolidado, beta) == 3
+    assert estado_tarefas(consolidado)[0]['rodada'] == 2
+
+
+def test_retomar_pula_as_concluidas(tmp_path):
+    acme = _cliente(tmp_path, 'ACME', 2)
+    ausente = str(tmp_path / 'BETA' / 'RET')
+    consolidado = str(tmp_path / 'consolidado.db')
+    tarefas = [Tarefa(acme, 'ACME'), Tarefa(ausente, 'BETA')]
+
+    finais = executar_tarefas(tarefas, consolidado, **OPCOES)
+    assert [f['estado'] for f in finais] == [CONCLUIDA, FALHOU]
+    assert 'Pasta não encontrada' in estado_tarefas(consolidado)[1]['mensagem']
+
+    # A pasta aparece; a rodada continua só com a tarefa que falhou
+    gerar_corpus(str(tmp_path / 'BETA'), 2, paginas=(1, 1), semente=9)
+    concluidas = []
+    finais = executar_tarefas(tarefas, consolidado, retomar=True, ao_concluir=concluidas.append, **OPCOES)
+    assert [f['cliente'] for f in finais] == ['BETA'] and [c['cliente'] for c in concluidas] == ['BETA']
+    estados = estado_tarefas(consolidado)
+    assert [(e['cliente'], e['rodada'], e['estado'], e['mensagem']) for e in estados] == [
+        ('ACME', 1, CONCLUIDA, ''), ('BETA', 1, CONCLUIDA, '')
+    ]
+    assert _registros_por_pasta(consolidado, ausente) == 2
@@ -0,0 +1,110 @@
+"""Banco RET_dados.db: migrações e gravação com upsert (ret/banco.py)"""
+import sqlite3
+
+from ret.banco import MIGRACOES, abrir_banco, carregar_dados, salvar_dados
+from ret.cache import hash_arquivo
+
+
+def _registro(caminho, numero_nd, valor_total, data='05/03/2024'):
+    return {
+        'tipo_encargo': 'EAT', 'empresa': 'GALP', 'nota_tipo': 'Débito', 'numero_nd': numero_nd,
+        'data_vencimento': data, 'valor_total': valor_total, 'quantidade': 10.0,
+        'valor_unitario': valor_total / 10, 'arquivo': caminho.rsplit('/', 1)[-1], 'caminho': caminho,
+    }
+
+
+def _criar_banco_antigo(db_path):
+    """Banco no formato da versão original: sem chave, datas DD/MM/AAAA e duplicatas"""
+    conexao = sqlite3.connect(db_path)
+    conexao.execute('''
+        CREATE TABLE dados_ret (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo_encargo TEXT, empresa TEXT, nota_tipo TEXT, numero_nd TEXT,
+            data_vencimento TEXT, valor_total REAL, quantidade REAL, valor_unitario REAL,
+            arquivo TEXT, caminho TEXT, data_processamento TEXT
+        )
+    ''')
+    linhas = [
+        ('EAT', 'GALP', 'Débito', '1', '05/03/2024', 100.0, 1.0, 100.0, 'a.pdf', '/r/a.pdf', '2024-01-01'),
+        ('EAT', 'GALP', 'Débito', '1', '05/03/2024', 150.0, 1.0, 150.0, 'a.pdf', '/r/a.pdf', '2024-02-01'),
+        ('TOP', 'CBA', 'Crédito', '2', '31-12-2023', 80.0, 2.0, 40.0, 'b.pdf', '/r/b.pdf', '2024-01-01'),
+    ]
+    conexao.executemany(
+        'INSERT INTO dados_ret (tipo_encargo, empresa, nota_tipo, numero_nd, data_vencimento, valor_total, '
+        'quantidade, valor_unitario, arquivo, caminho, data_processamento) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        linhas
+    )
+    conexao.commit()
+    conexao.close()
+
+
+def test_migracao_de_banco_antigo(tmp_path):
+    db_path = str(tmp_path / 'antigo.db')
+    _criar_banco_antigo(db_path)
+
+    conexao = abrir_banco(db_path)
+    try:
+        assert conexao.execute('PRAGMA user_version').fetchone()[0] == MIGRACOES[-1][0]
+        linhas = conexao.execute(
+            'SELECT caminho, valor_total, data_vencimento, falha FROM dados_ret ORDER BY caminho'
+        ).fetchall()
+        indices = {nome for nome, in conexao.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert conexao.execute('SELECT COUNT(*) FROM arquivos_ret').fetchone()[0] == 0
+    finally:
+        conexao.close()
+
+    # Duplicata removida (fica a gravação mais recente) e datas em ISO
+    assert linhas == [('/r/a.pdf', 150.0, '2024-03-05', ''), ('/r/b.pdf', 80.0, '2023-12-31', '')]
+    assert {'idx_dados_ret_chave', 'idx_dados_ret_vencimento', 'idx_dados_ret_resumo'} <= indices
+    # Na leitura as datas voltam ao formato da interface
+    assert [d['data_vencimento'] for d in carregar_dados(db_path)] == ['05/03/2024', '31/12/2023']
+
+
+def test_migracoes_rodam_uma_vez(tmp_path):
+    db_path = str(tmp_path / 'novo.db')
+    abrir_banco(db_path).close()
+    salvar_dados([_registro('/r/a.pdf', '1', 100.0)], db_path)
+    # Reabrir não reaplica migrações nem perde dados
+    abrir_banco(db_path).close()
+    assert len(carregar_dados(db_path)) == 1
+
+
+def test_upsert_pela_chave(tmp_path):
+    db_path = str(tmp_path / 'dados.db')
+    registros = [_registro('/r/a.pdf', '1', 100.0), _registro('/r/b.pdf', '2', 200.0)]
+    assert salvar_dados(registros, db_path) == 2
+    # Mesma chave (caminho, numero_nd): atualiza em vez de duplicar
+    salvar_dados([_registro('/r/a.pdf', '1', 120.0), _registro('/r/a.pdf', '3', 50.0)], db_path)
+
+    dados = carregar_dados(db_path)
+    assert [(d['caminho'], d['numero_nd'], d['valor_total']) for d in dados] == [
+        ('/r/a.pdf', '1', 120.0), ('/r/a.pdf', '3', 50.0), ('/r/b.pdf', '2', 200.0)
+    ]
+
+
+def test_salvar_substitui_os_registros_do_arquivo(tmp_path):
+    db_path = str(tmp_path / 'dados.db')
+    salvar_dados([_registro('/r/a.pdf', '1', 100.0), _registro('/r/b.pdf', '2', 200.0)], db_path)
+    # O ND do arquivo mudou: a linha do ND anterior não fica para trás
+    salvar_dados([_registro('/r/a.pdf', '7', 100.0)], db_path)
+    assert [(d['caminho'], d['numero_nd']) for d in carregar_dados(db_path)] == [
+        ('/r/a.pdf', '7'), ('/r/b.pdf', '2')
+    ]
+
+
+def test_salvar_grava_o_manifesto(tmp_path):
+    pdf = tmp_path / 'a.pdf'
+    pdf.write_bytes(b'%PDF-1.4 conteudo')
+    com_erro = dict(_registro(str(tmp_path / 'b.pdf'), '', 0.0), erro='ilegível')
+    (tmp_path / 'b.pdf').write_bytes(b'%PDF-1.4 ruim')
+    db_path = str(tmp_path / 'dados.db')
+    salvar_dados([_registro(str(pdf), '1', 100.0), com_erro, _registro('/r/sumiu.pdf', '2', 1.0)], db_path)
+
+    conexao = sqlite3.connect(db_path)
+    try:
+        manifesto = conexao.execute('SELECT caminho, tamanho, mtime_ns, hash FROM arquivos_ret').fetchall()
+    finally:
+        conexao.close()
+    # Só o arquivo lido sem erro (e que ainda existe) entra no manifesto
+    st = pdf.stat()
+    assert manifesto == [(str(pdf), st.st_size, st.st_mtime_ns, hash_arquivo(str(pdf)))]
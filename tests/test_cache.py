@@ -0,0 +1,156 @@
+"""Cache de extração por conteúdo (ret/cache.py)"""
+import json
+import os
+import shutil
+import sqlite3
+
+from ret import cache as modulo_cache
+from ret.cache import CacheExtracao, hash_arquivo
+from ret.extracao import VERSAO_PARSER, EstrategiaPaginas, campos_conteudo, extrair_dados_pdf, versao_texto
+from tests.conftest import listar_pdfs
+
+
+def _extrair_e_gravar(cache, caminho):
+    dados, chave = cache.obter(caminho)
+    assert dados is None
+    cache.gravar(chave, extrair_dados_pdf(caminho, manter_texto=True))
+
+
+def test_assinatura_conhecida_nao_le_o_arquivo(acervo, tmp_path, monkeypatch):
+    cache = CacheExtracao(str(tmp_path / 'cache'))
+    caminho = listar_pdfs(acervo)[0]
+    _extrair_e_gravar(cache, caminho)
+    h = hash_arquivo(caminho)
+
+    def proibido(caminho):
+        raise AssertionError('hash recalculado')
+    monkeypatch.setattr(modulo_cache, 'hash_arquivo', proibido)
+    # Outro caminho, mesmo conteúdo: só a assinatura identifica o arquivo
+    dados, _ = cache.obter(caminho + '.copia', assinatura=(1, 1, h))
+    assert dados is not None and cache.acertos == 1
+    cache.fechar()
+
+
+def test_acerto_toque_e_alteracao(acervo, tmp_path):
+    cache = CacheExtracao(str(tmp_path / 'cache'))
+    caminho, outro = listar_pdfs(acervo)[:2]
+    _extrair_e_gravar(cache, caminho)
+
+    dados, _ = cache.obter(caminho)
+    assert dados is not None and dados['valor_total'] > 0
+    assert (cache.acertos, cache.faltas) == (1, 1)
+
+    # Só a data mudou: o hash é o mesmo e continua sendo um acerto
+    st = os.stat(caminho)
+    os.utime(caminho, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert cache.obter(caminho)[0] is not None
+
+    # Conteúdo novo: precisa ser extraído de novo
+    shutil.copyfile(outro, caminho)
+    os.utime(caminho, ns=(st.st_atime_ns, st.st_mtime_ns + 2 * 10**9))
+    dados, chave = cache.obter(caminho)
+    assert dados is None and chave is not None
+    cache.fechar()
+
+
+def test_parser_novo_reanalisa_o_texto(acervo, tmp_path, monkeypatch):
+    cache = CacheExtracao(str(tmp_path / 'cache'))
+    caminho = listar_pdfs(acervo)[0]
+    _extrair_e_gravar(cache, caminho)
+    esperado = extrair_dados_pdf(caminho)
+
+    monkeypatch.setattr(modulo_cache, 'VERSAO_PARSER', 'outra')
+    monkeypatch.setattr(modulo_cache, 'analisar_paginas', contar_chamadas(modulo_cache.analisar_paginas))
+    dados, _ = cache.obter(caminho)
+    assert cache.reanalisados == 1 and modulo_cache.analisar_paginas.chamadas == 1
+    assert dados['valor_total'] == esperado['valor_total']
+    assert dados['numero_nd'] == esperado['numero_nd']
+    cache.fechar()
+
+
+def test_estrategia_diferente_nao_aproveita_o_texto(acervo, tmp_path):
+    cache = CacheExtracao(str(tmp_path / 'cache'))
+    caminho = listar_pdfs(acervo)[0]
+    _extrair_e_gravar(cache, caminho)
+    dados, _ = cache.obter(caminho, EstrategiaPaginas(modo='primeiras', max_paginas=1))
+    assert dados is None and cache.faltas == 2
+    cache.fechar()
+
+
+def test_estrategias_tem_entradas_separadas(acervo, tmp_path):
+    cache = CacheExtracao(str(tmp_path / 'cache'))
+    caminho = listar_pdfs(acervo)[0]
+    primeira = EstrategiaPaginas(modo='primeiras', max_paginas=1)
+    _extrair_e_gravar(cache, caminho)
+    dados, chave = cache.obter(caminho, primeira)
+    assert dados is None
+    cache.gravar(chave, extrair_dados_pdf(caminho, manter_texto=True, estrategia=primeira))
+
+    # Uma não sobrescreve a outra: as duas continuam sendo acertos
+    assert cache.obter(caminho)[0] is not None
+    assert cache.obter(caminho, primeira)[0] is not None
+    assert cache.acertos == 2
+    cache.fechar()
+
+
+def test_cache_antigo_migrado(acervo, tmp_path):
+    diretorio = tmp_path / 'cache'
+    diretorio.mkdir()
+    caminho = listar_pdfs(acervo)[0]
+    h = hash_arquivo(caminho)
+    dados = extrair_dados_pdf(caminho, manter_texto=True)
+    # Esquema anterior: chave só pelo hash, versão do texto como inteiro
+    conexao = sqlite3.connect(str(diretorio / modulo_cache.NOME_ARQUIVO_CACHE))
+    conexao.execute(
+        'CREATE TABLE conteudo (hash TEXT PRIMARY KEY, versao_texto TEXT, texto TEXT, '
+        'versao_parser TEXT, dados TEXT, bytes INTEGER, ultimo_acesso REAL)'
+    )
+    conexao.execute('CREATE INDEX idx_conteudo_acesso ON conteudo (ultimo_acesso)')
+    conexao.execute('INSERT INTO conteudo VALUES (?, ?, ?, ?, ?, ?, ?)', (
+        h, int(versao_texto()), dados.pop('texto'), VERSAO_PARSER,
+        json.dumps(campos_conteudo(dados)), 100, 0.0
+    ))
+    conexao.commit()
+    conexao.close()
+
+    cache = CacheExtracao(str(diretorio))
+    assert cache.obter(caminho)[0]['valor_total'] == dados['valor_total']
+    assert cache._total_bytes == 100
+    cache.fechar()
+
+
+def test_limite_descarta_os_menos_usados(acervo, tmp_path):
+    diretorio = str(tmp_path / 'cache')
+    cache = CacheExtracao(diretorio)
+    caminhos = listar_pdfs(acervo)[:4]
+    for caminho in caminhos:
+        _extrair_e_gravar(cache, caminho)
+    total = cache._total_bytes
+    cache.fechar()
+
+    # Reaberto com um limite menor que o conteúdo: descarta pelo LRU
+    cache = CacheExtracao(diretorio, limite_mb=total * 0.8 / 1024 / 1024)
+    assert cache._total_bytes <= cache.limite_bytes
+    assert cache.obter(caminhos[0])[0] is None
+    assert cache.obter(caminhos[-1])[0] is not None
+    cache.fechar()
+
+
+def test_cache_persiste_entre_instancias(acervo, tmp_path):
+    diretorio = str(tmp_path / 'cache')
+    caminho = listar_pdfs(acervo)[0]
+    cache = CacheExtracao(diretorio)
+    _extrair_e_gravar(cache, caminho)
+    cache.fechar()
+
+    cache = CacheExtracao(diretorio)
+    assert cache.obter(caminho)[0] is not None
+    cache.fechar()
+
+
+def contar_chamadas(funcao):
+    def contada(*args, **kwargs):
+        contada.chamadas += 1
+        return funcao(*args, **kwargs)
+    contada.chamadas = 0
+    return contada
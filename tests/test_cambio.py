@@ -0,0 +1,70 @@
+"""Câmbio EUR → BRL por data (ret/cambio.py)"""
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from ret import cambio
+from ret.cambio import TabelaCambio, carregar_cambio, obter_cambio
+
+
+def _datas(*textos):
+    return pd.to_datetime(pd.Series(textos), format='%Y-%m-%d', errors='coerce')
+
+
+@pytest.fixture
+def tabela():
+    # Sexta e segunda: o fim de semana fica com a cotação de sexta
+    return TabelaCambio(['2025-12-12', '15/12/2025', '2025-12-16'], ['6.10', '6,20', 6.30], taxa_padrao=5.0)
+
+
+def test_cotacao_do_dia_ou_do_dia_util_anterior(tabela):
+    taxas = tabela.taxas(_datas('2025-12-12', '2025-12-13', '2025-12-14', '2025-12-15', '2025-12-31'))
+    assert taxas.tolist() == [6.10, 6.10, 6.10, 6.20, 6.30]
+
+
+def test_sem_cotacao_usa_a_taxa_padrao(tabela):
+    # Antes da primeira cotação e sem data
+    taxas = tabela.taxas(_datas('2025-01-01', 'sem data'))
+    assert taxas.tolist() == [5.0, 5.0]
+    assert TabelaCambio([], []).taxas(_datas('2025-12-15')).tolist() == [cambio.TAXA_EUR_BRL]
+
+
+def test_taxas_alinhadas_e_datas_resolvidas_uma_vez(tabela, monkeypatch):
+    datas = pd.Series(_datas('2025-12-16', '2025-12-13', '2025-12-16').tolist(), index=[7, 3, 5])
+    assert tabela.taxas(datas).to_dict() == {7: 6.30, 3: 6.10, 5: 6.30}
+
+    def proibido(*args, **kwargs):
+        raise AssertionError('junção repetida')
+    monkeypatch.setattr(pd, 'merge_asof', proibido)
+    assert tabela.taxa('13/12/2025') == 6.10
+
+
+def test_linhas_invalidas_descartadas():
+    tabela = TabelaCambio(['2025-12-15', 'ontem', '2025-12-16', '2025-12-16'], ['6.2', '6.3', '0', '6.4'])
+    assert tabela.cotacoes['taxa'].tolist() == [6.2, 6.4]
+
+
+def test_carregar_csv_e_sqlite(tmp_path):
+    csv = tmp_path / 'cambio.csv'
+    csv.write_text('Data;Taxa\n15/12/2025;6,2\n2025-12-16;6.3\n')
+    tabela = carregar_cambio(str(csv))
+    assert tabela.taxa('2025-12-17') == 6.3
+    # Arquivo sem mudança: a mesma tabela (com as datas já resolvidas)
+    assert carregar_cambio(str(csv)) is tabela
+    csv.write_text('data,taxa\n2025-12-15,7.0\n')
+    os.utime(csv, ns=(0, os.stat(csv).st_mtime_ns + 10**9))
+    assert carregar_cambio(str(csv)).taxa('2025-12-17') == 7.0
+
+    banco = tmp_path / 'cambio.db'
+    conexao = sqlite3.connect(str(banco))
+    conexao.execute('CREATE TABLE cambio (data TEXT, taxa REAL)')
+    conexao.execute("INSERT INTO cambio VALUES ('2025-12-15', 6.25)")
+    conexao.commit()
+    conexao.close()
+    assert carregar_cambio(str(banco)).taxa('2025-12-20') == 6.25
+
+
+def test_obter_cambio_sem_arquivo(tmp_path):
+    assert obter_cambio(str(tmp_path / 'nao_existe.csv')) == cambio.TAXA_EUR_BRL
@@ -0,0 +1,98 @@
+"""Extrator de campos em passada única (ret/campos.py)
+
+Compara com as buscas separadas da versão anterior (_extrair_antigo): os
+campos e o valor total têm de ser os mesmos. A única diferença aceita é a
+contagem de valores: um número casado por dois padrões (R$ e número com
+vírgula) era contado duas vezes; agora só uma.
+"""
+import re
+
+import pytest
+
+from ret.campos import EXTRATOR, ExtratorCampos
+from ret.extracao import extrair_texto_pdf
+from tests.conftest import listar_pdfs
+
+PADROES_VALORES_ANTIGOS = [
+    r'R\$\s*(\d{1,3}(?:\.\d{3})*(?:,\d{2})?)',
+    r'€\s*(\d{1,3}(?:\.\d{3})*(?:,\d{2})?)',
+    r'(\d{1,3}(?:\.\d{3})*,\d{2})',
+]
+
+
+def _extrair_antigo(texto_completo):
+    """Campos como a versão anterior os extraía (uma busca por campo)"""
+    campos = {}
+    nd_match = re.search(r'ND\s*[:\-]?\s*(\d+)', texto_completo, re.IGNORECASE)
+    if nd_match:
+        campos['numero_nd'] = nd_match.group(1)
+    data_match = re.search(r'(\d{2}[/-]\d{2}[/-]\d{4})', texto_completo)
+    if data_match:
+        campos['data_vencimento'] = data_match.group(1)
+    valores = []
+    for padrao in PADROES_VALORES_ANTIGOS:
+        for match in re.findall(padrao, texto_completo):
+            valor = float(match.replace('.', '').replace(',', '.'))
+            if valor > 0:
+                valores.append(valor)
+    campos['valores_encontrados'] = valores
+    qt_match = re.search(r'(?:QT|Quantidade)[:\s]*(\d+(?:[.,]\d+)?)', texto_completo, re.IGNORECASE)
+    if qt_match:
+        campos['quantidade'] = float(qt_match.group(1).replace(',', '.'))
+    return campos
+
+
+def _comparavel(campos):
+    """Campos sem a repetição de valores (e o valor total, que decide o registro)"""
+    campos = dict(campos)
+    valores = [valor for valor in campos.pop('valores_encontrados', []) if valor > 0]
+    campos['valores'] = sorted(set(valores))
+    campos['valor_total'] = max(valores) if valores else None
+    return campos
+
+
+TEXTOS = [
+    'Quantidade 1.234,56 Total € 99,00',
+    'QT: 10 Valor R$ 1.234,56 total 2.000,00',
+    'NOTA DE DEBITO\nND: 100042\nVencimento 05/03/2024\nQT: 1500\nValor unitario R$ 12,34\nTotal € 18.510,00',
+    'ND-77 Quantidade:3,5 R$ 10 € 1.000 5,00',
+    'sem campos',
+    '',
+]
+
+
+@pytest.mark.parametrize('texto', TEXTOS)
+def test_paridade_com_a_versao_anterior(texto):
+    assert _comparavel(EXTRATOR.extrair([texto])) == _comparavel(_extrair_antigo(texto))
+
+
+def test_paridade_no_acervo(acervo):
+    for caminho in listar_pdfs(acervo):
+        paginas = extrair_texto_pdf(caminho)
+        novo = _comparavel(EXTRATOR.extrair(paginas))
+        antigo = _comparavel(_extrair_antigo('\n'.join(paginas)))
+        assert novo == antigo, caminho
+
+
+def test_valor_com_dois_padroes_conta_uma_vez():
+    assert EXTRATOR.extrair(['R$ 1.234,56'])['valores_encontrados'] == [1234.56]
+
+
+def test_quantidade_nao_consome_o_valor():
+    campos = EXTRATOR.extrair(['Quantidade 1.234,56 Total € 99,00'])
+    assert campos['valores_encontrados'] == [1234.56, 99.0]
+    assert campos['quantidade'] == 1.234
+
+
+def test_campo_registrado_depois():
+    extrator = ExtratorCampos()
+    extrator.registrar_campo('numero', r'(\d+)', multiplo=True)
+    assert extrator.extrair(['a 1 b 22', 'c 333']) == {'numero': ['1', '22', '333']}
+    assinatura = extrator.assinatura()
+    extrator.registrar_campo('cnpj', r'CNPJ\s*(\d{14})')
+    assert extrator.assinatura() != assinatura
+
+
+def test_padrao_sem_grupo_e_recusado():
+    with pytest.raises(ValueError):
+        ExtratorCampos().registrar_campo('x', r'\d+')
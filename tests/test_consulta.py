@@ -0,0 +1,64 @@
+"""Consultas sobre o banco (ret/consulta.py)"""
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from ret.cambio import TabelaCambio
+from ret.consulta import FiltroConsulta, ResumoBanco, consultar, registros_sem_valores
+from ret.pipeline import DestinoBanco, executar_pipeline
+from tests.conftest import OPCOES_EXTRACAO
+
+# Cotações diferentes por vencimento: os resumos precisam da taxa de cada grupo
+CAMBIO = TabelaCambio(['2024-03-01', '2025-01-10'], [5.5, 6.1], 6.3)
+
+FILTROS = [
+    FiltroConsulta(),
+    FiltroConsulta(nota_tipo='Débito'),
+    FiltroConsulta(tipo_encargo=['EAT', 'TOP'], inicio='01/06/2024'),
+]
+
+
+@pytest.fixture
+def banco(acervo, tmp_path):
+    db_path = str(tmp_path / 'RET_dados.db')
+    executar_pipeline(acervo, [DestinoBanco(db_path)], **OPCOES_EXTRACAO)
+    return db_path
+
+
+@pytest.mark.parametrize('filtro', FILTROS)
+def test_resumo_banco_igual_ao_do_modelo(banco, filtro):
+    modelo = consultar(banco, filtro, CAMBIO)
+    resumo = ResumoBanco(banco, filtro, CAMBIO)
+    assert len(resumo) == len(modelo)
+    assert resumo.totais() == pytest.approx(modelo.totais())
+    assert resumo.debito_credito() == pytest.approx(modelo.debito_credito())
+    for nome in ('por_tipo', 'por_empresa', 'por_mes'):
+        esperado = getattr(modelo, nome)()
+        obtido = getattr(resumo, nome)()
+        pd.testing.assert_frame_equal(obtido[esperado.columns], esperado, check_dtype=False, check_names=False,
+                                      check_index_type=False, check_categorical=False)
+
+
+def test_resumo_banco_sem_registros(banco):
+    resumo = ResumoBanco(banco, FiltroConsulta(empresa='NINGUEM'), CAMBIO)
+    assert len(resumo) == 0
+    assert resumo.totais()['total_geral_brl'] == 0
+    assert resumo.debito_credito() == {'debito': 0.0, 'credito': 0.0, 'saldo': 0.0}
+
+
+def test_registros_sem_valores(banco):
+    conexao = sqlite3.connect(banco)
+    with conexao:
+        caminho, tipo = conexao.execute(
+            "SELECT caminho, tipo_encargo FROM dados_ret WHERE nota_tipo = 'Débito' ORDER BY caminho"
+        ).fetchone()
+        conexao.execute("UPDATE dados_ret SET valor_total = 0, falha = 'timeout' WHERE caminho = ?", (caminho,))
+    conexao.close()
+
+    registros = registros_sem_valores(banco)
+    assert [(r['caminho'], r['tipo_encargo'], r['falha']) for r in registros] == [(caminho, tipo, 'timeout')]
+    assert registros_sem_valores(banco, FiltroConsulta(nota_tipo='Crédito')) == []
+    # Os mesmos registros que o modelo completo tem com valor zero
+    df = consultar(banco).df
+    assert df.loc[df['valor_total'] == 0, 'caminho'].tolist() == [caminho]
@@ -0,0 +1,117 @@
+"""Descoberta dos PDFs e tipo de encargo pela pasta (ret/descoberta.py)
+
+A TABELA compara nomes de pastas com a regra da versão anterior (busca de
+substrings no caminho, reproduzida em _tipo_antigo): toda diferença em
+relação a ela precisa estar listada em MELHORIAS, com o motivo.
+"""
+import os
+
+import pytest
+
+from ret.descoberta import (
+    TIPO_OUTROS, RegrasDescoberta, aceitar, classificar_tipo, descobrir, tipo_por_pasta,
+)
+
+from .conftest import listar_pdfs
+
+
+def _tipo_antigo(caminho):
+    caminho = caminho.upper()
+    if 'EAT' in caminho:
+        return 'EAT'
+    if 'PENALIDADE' in caminho:
+        return 'Penalidades'
+    if 'TOP' in caminho:
+        return 'TOP'
+    return TIPO_OUTROS
+
+
+# (pasta relativa à raiz, tipo)
+TABELA = [
+    ('EAT', 'EAT'),
+    ('EAT/12 EAT dez-25/Extraido', 'EAT'),
+    ('EAT2024', 'EAT'),
+    ('2024EAT', 'EAT'),
+    ('EAT_2024/Extraido', 'EAT'),
+    ('eat-jan', 'EAT'),
+    ('Penalidades', 'Penalidades'),
+    ('PENALIDADES_2025', 'Penalidades'),
+    ('Penalidade 03', 'Penalidades'),
+    ('Penalidades/12 PEN dez-25/Extraido', 'Penalidades'),
+    ('TOP', 'TOP'),
+    ('TOP/12 TOP dez-25', 'TOP'),
+    ('TOP1', 'TOP'),
+    ('Diversos', TIPO_OUTROS),
+    ('PEN', TIPO_OUTROS),
+]
+
+# Diferenças em relação à busca de substrings, todas intencionais
+MELHORIAS = {
+    # 'TOP' dentro de outra palavra não indica o tipo
+    'Desktop/Notas': TIPO_OUTROS,
+    'STOP': TIPO_OUTROS,
+    # 'EAT' dentro de outra palavra também não
+    'THEATRO': TIPO_OUTROS,
+    'Repeat': TIPO_OUTROS,
+    # A pasta mais interna vale mais que a raiz
+    'EAT/12 TOP dez-25': 'TOP',
+}
+
+
+@pytest.mark.parametrize('pasta, esperado', TABELA)
+def test_tipo_como_a_versao_anterior(pasta, esperado):
+    caminho = os.path.join('RET', *pasta.split('/'), 'ND_1.pdf')
+    assert classificar_tipo(caminho) == esperado
+    assert _tipo_antigo(caminho) == esperado
+
+
+@pytest.mark.parametrize('pasta, esperado', sorted(MELHORIAS.items()))
+def test_melhorias_em_relacao_a_versao_anterior(pasta, esperado):
+    caminho = os.path.join('RET', *pasta.split('/'), 'ND_1.pdf')
+    assert classificar_tipo(caminho) == esperado
+    assert _tipo_antigo(caminho) != esperado
+
+
+def test_tipo_vem_da_pasta_e_nao_do_arquivo():
+    assert classificar_tipo(os.path.join('RET', 'Diversos', 'EAT_ND_1.pdf')) == TIPO_OUTROS
+    assert tipo_por_pasta(os.path.join('RET', 'Diversos')) == TIPO_OUTROS
+
+
+def test_descobrir_na_ordem_do_caminho(acervo):
+    encontrados = list(descobrir(acervo))
+    assert [a.caminho for a in encontrados] == listar_pdfs(acervo)
+    for arquivo in encontrados:
+        st = os.stat(arquivo.caminho)
+        assert (arquivo.tamanho, arquivo.mtime_ns) == (st.st_size, st.st_mtime_ns)
+        assert arquivo.tipo_encargo == classificar_tipo(arquivo.caminho)
+
+
+def _arvore(raiz, nomes):
+    for nome in nomes:
+        caminho = os.path.join(raiz, *nome.split('/'))
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        open(caminho, 'wb').close()
+
+
+def _relativos(raiz, regras):
+    return [os.path.relpath(a.caminho, raiz).replace(os.sep, '/') for a in descobrir(raiz, regras)]
+
+
+def test_regras_e_ocultos(tmp_path):
+    raiz = str(tmp_path)
+    _arvore(raiz, [
+        'EAT/a.pdf', 'EAT/b.PDF', 'EAT/c.txt', 'EAT/~$d.pdf', 'EAT/.e.pdf',
+        'EAT/2023 jan/f.pdf', 'backup/g.pdf', '.oculta/h.pdf', '__MACOSX/i.pdf',
+    ])
+    assert _relativos(raiz, RegrasDescoberta()) == [
+        'EAT/2023 jan/f.pdf', 'EAT/a.pdf', 'EAT/b.PDF', 'backup/g.pdf',
+    ]
+    regras = RegrasDescoberta(excluir=('backup', 'EAT/2023*'))
+    assert _relativos(raiz, regras) == ['EAT/a.pdf', 'EAT/b.PDF']
+    assert _relativos(raiz, RegrasDescoberta(ignorar_ocultos=False))[0] == '.oculta/h.pdf'
+
+    assert aceitar(raiz, os.path.join(raiz, 'EAT', 'a.pdf'), regras)
+    assert not aceitar(raiz, os.path.join(raiz, 'EAT', '2023 jan', 'f.pdf'), regras)
+    assert not aceitar(raiz, os.path.join(raiz, 'EAT', '~$d.pdf'), regras)
+    assert not aceitar(raiz, os.path.join(raiz, 'EAT', 'c.txt'), regras)
+    assert aceitar(raiz, os.path.join(raiz, 'EAT', '2024'), regras, pasta=True)
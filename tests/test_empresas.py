@@ -0,0 +1,134 @@
+"""Classificação da empresa e do tipo de nota (ret/empresas.py)
+
+A TABELA compara nomes de arquivos reais com a classificação da versão
+anterior (busca de substrings, reproduzida em _empresa_antiga e
+_nota_antiga): toda diferença em relação a ela precisa estar listada em
+MELHORIAS, com o motivo.
+"""
+import os
+
+import pytest
+
+from ret.empresas import (
+    EMPRESAS_CONHECIDAS, NAO_IDENTIFICADO, NOTA_CREDITO, NOTA_DEBITO, Empresa,
+    DicionarioEmpresas, EMPRESAS_PADRAO, carregar_dicionario, classificar_nome,
+    completar_pelo_texto, usar_dicionario,
+)
+
+
+def _empresa_antiga(caminho):
+    nome = os.path.basename(caminho).upper()
+    for empresa in EMPRESAS_CONHECIDAS:
+        if empresa in nome:
+            return empresa
+    return NAO_IDENTIFICADO
+
+
+def _nota_antiga(caminho):
+    nome = os.path.basename(caminho).upper()
+    if 'ND' in nome or 'DEBITO' in nome or 'DÉBITO' in nome:
+        return NOTA_DEBITO
+    if 'NC' in nome or 'CREDITO' in nome or 'CRÉDITO' in nome:
+        return NOTA_CREDITO
+    return NAO_IDENTIFICADO
+
+
+# (nome do arquivo, empresa, tipo de nota)
+TABELA = [
+    ('AMBEV_ND_1234.pdf', 'AMBEV', NOTA_DEBITO),
+    ('AMBEV_NC_1234.pdf', 'AMBEV', NOTA_CREDITO),
+    ('AMBEV_ND123.pdf', 'AMBEV', NOTA_DEBITO),
+    ('ND000123 COPERGAS.pdf', 'COPERGAS', NOTA_DEBITO),
+    ('NC000123 COPERGAS.pdf', 'COPERGAS', NOTA_CREDITO),
+    ('COPERGAS2024_ND_1.pdf', 'COPERGAS', NOTA_DEBITO),
+    ('KLABIN-NotaDebito-12.pdf', 'KLABIN', NOTA_DEBITO),
+    ('KLABIN-NotaCredito-12.pdf', 'KLABIN', NOTA_CREDITO),
+    ('Nota_de_Débito_GERDAU_55.pdf', 'GERDAU', NOTA_DEBITO),
+    ('gerdau nota de crédito 55.pdf', 'GERDAU', NOTA_CREDITO),
+    ('M DIAS BRANCO ND 77.pdf', 'M DIAS BRANCO', NOTA_DEBITO),
+    ('M_DIAS_BRANCO_NC_77.pdf', 'M DIAS BRANCO', NOTA_CREDITO),
+    ('PETROBRAS.ND.2024.03.pdf', 'PETROBRAS', NOTA_DEBITO),
+    ('CBA_ND_001.pdf', 'CBA', NOTA_DEBITO),
+    ('INDORAMA_DEBITOS_MARCO.pdf', 'INDORAMA', NOTA_DEBITO),
+    ('ingredion_nc_9.pdf', 'INGREDION', NOTA_CREDITO),
+    ('CERVEJARIA AMBEV ND 10.pdf', 'AMBEV', NOTA_DEBITO),
+    ('CERVEJARIA_PETROPOLIS_ND_10.pdf', 'CERVEJARIA', NOTA_DEBITO),
+    ('NISSIN_ND_5.pdf', 'NISSIN', NOTA_DEBITO),
+    ('VETRUS_NC_5.pdf', 'VETRUS', NOTA_CREDITO),
+    ('GALP_ND_31.pdf', 'GALP', NOTA_DEBITO),
+    ('DEXCO_ND_8.pdf', 'DEXCO', NOTA_DEBITO),
+    ('MONDELEZ_NC_8.pdf', 'MONDELEZ', NOTA_CREDITO),
+    ('relatorio.pdf', NAO_IDENTIFICADO, NAO_IDENTIFICADO),
+    ('SECUNDARIO_FUNDO_2024.pdf', NAO_IDENTIFICADO, NAO_IDENTIFICADO),
+    ('ACBAR_NC_3.pdf', NAO_IDENTIFICADO, NOTA_CREDITO),
+]
+
+# Diferenças intencionais em relação à versão anterior: {nome: motivo}
+MELHORIAS = {
+    'M_DIAS_BRANCO_NC_77.pdf': "'_' separa as palavras de 'M DIAS BRANCO'",
+    'MONDELEZ_NC_8.pdf': "'ND' dentro de MONDELEZ não é o tipo de nota",
+    'SECUNDARIO_FUNDO_2024.pdf': "'ND' dentro de SECUNDARIO/FUNDO não é o tipo de nota",
+    'ACBAR_NC_3.pdf': "'CBA' dentro de ACBAR não é a empresa",
+}
+
+
+@pytest.fixture(autouse=True)
+def dicionario_padrao():
+    """Só as empresas padrão, sem o arquivo de configuração do usuário"""
+    usar_dicionario(DicionarioEmpresas(EMPRESAS_PADRAO))
+    yield
+    usar_dicionario(None)
+
+
+@pytest.mark.parametrize('nome, empresa, nota', TABELA)
+def test_classificacao_pelo_nome(nome, empresa, nota):
+    assert classificar_nome(os.path.join('RET', 'EAT', nome)) == (empresa, nota)
+
+
+@pytest.mark.parametrize('nome, empresa, nota', TABELA)
+def test_diferencas_da_versao_anterior_sao_intencionais(nome, empresa, nota):
+    antiga = (_empresa_antiga(nome), _nota_antiga(nome))
+    if nome in MELHORIAS:
+        assert antiga != (empresa, nota)
+    else:
+        assert antiga == (empresa, nota)
+
+
+def test_nome_da_pasta_nao_conta():
+    assert classificar_nome(os.path.join('AMBEV', 'ND', 'relatorio.pdf')) == (NAO_IDENTIFICADO, NAO_IDENTIFICADO)
+
+
+def test_texto_completa_o_que_o_nome_nao_trouxe():
+    dicionario = DicionarioEmpresas(EMPRESAS_PADRAO + (Empresa('ACME', ('ACME LTDA',), ('12.345.678/0001-90',)),))
+    dados = {'empresa': NAO_IDENTIFICADO, 'nota_tipo': NAO_IDENTIFICADO}
+    texto = 'KLABIN S.A.\nNOTA DE CRÉDITO\nCNPJ 12.345.678/0001-90'
+    completar_pelo_texto(dados, texto, dicionario)
+    # O CNPJ conhecido vence o primeiro apelido
+    assert dados == {'empresa': 'ACME', 'nota_tipo': NOTA_CREDITO}
+
+
+def test_texto_nao_substitui_o_nome():
+    dados = {'empresa': 'GALP', 'nota_tipo': NOTA_DEBITO}
+    completar_pelo_texto(dados, 'KLABIN NOTA DE CRÉDITO')
+    assert dados == {'empresa': 'GALP', 'nota_tipo': NOTA_DEBITO}
+
+
+def test_dicionario_do_arquivo(tmp_path):
+    arquivo = tmp_path / 'empresas.csv'
+    arquivo.write_text('empresa;apelidos;cnpjs\n# comentário\nACME;ACME LTDA|ACM;\n', encoding='utf-8')
+    dicionario = carregar_dicionario(str(arquivo))
+    assert classificar_nome('ACM_ND_1.pdf', dicionario) == ('ACME', NOTA_DEBITO)
+    assert classificar_nome('KLABIN_ND_1.pdf', dicionario) == ('KLABIN', NOTA_DEBITO)
+
+
+def test_dicionario_sem_arquivo(tmp_path):
+    dicionario = carregar_dicionario(str(tmp_path / 'inexistente.csv'))
+    assert len(dicionario) == len(set(EMPRESAS_CONHECIDAS))
+
+
+def test_classificacao_nao_consulta_o_arquivo(monkeypatch):
+    # Com o dicionário definido, classificar não toca no sistema de arquivos
+    def proibido(*args, **kwargs):
+        raise AssertionError('os.stat chamado na classificação')
+    monkeypatch.setattr(os, 'stat', proibido)
+    assert classificar_nome('GERDAU_ND_999.pdf') == ('GERDAU', NOTA_DEBITO)
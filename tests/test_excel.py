@@ -0,0 +1,83 @@
+"""Relatório Excel em streaming (ret/excel.py)"""
+from openpyxl import load_workbook
+
+from ret.agregacao import ModeloResultados
+from ret.excel import COLUNAS_DADOS, EscritorExcel, exportar_excel
+
+ABAS = ['Dados Completos', 'Resumo por Tipo', 'Resumo por Empresa', 'Resumo por Mês', 'Resumo Geral']
+
+
+def _registro(tipo, empresa, nota, numero_nd, data, valor_total):
+    return {
+        'tipo_encargo': tipo, 'empresa': empresa, 'nota_tipo': nota, 'numero_nd': numero_nd,
+        'data_vencimento': data, 'valor_total': valor_total, 'quantidade': 10.0,
+        'valor_unitario': valor_total / 10, 'arquivo': f'{numero_nd}.pdf', 'caminho': f'/r/{numero_nd}.pdf',
+    }
+
+
+REGISTROS = [
+    _registro('EAT', 'GALP', 'Débito', '1', '05/03/2024', 100.0),
+    _registro('EAT', 'CBA', 'Crédito', '2', '20/03/2024', 40.0),
+    _registro('TOP', 'GALP', 'Débito', '3', '02/04/2024', 0.0),
+]
+
+
+def _linhas(ws):
+    return [list(linha) for linha in ws.iter_rows(values_only=True)]
+
+
+def _valores_gerais(ws):
+    return {linha[0]: linha[1] for linha in ws.iter_rows(values_only=True) if linha[0]}
+
+
+def test_abas_dados_e_resumos(tmp_path):
+    caminho = str(tmp_path / 'relatorio.xlsx')
+    assert exportar_excel(REGISTROS, caminho, taxa=2.0) == caminho
+    wb = load_workbook(caminho)
+    assert wb.sheetnames == ABAS
+
+    dados = _linhas(wb['Dados Completos'])
+    assert dados[0] == [titulo for titulo, _, _, _ in COLUNAS_DADOS]
+    assert dados[1] == ['EAT', 'GALP', 'Débito', '1', '05/03/2024', 100.0, 10.0, 10.0, '1.pdf']
+    assert len(dados) == 1 + len(REGISTROS)
+    celula = wb['Dados Completos']['F2']
+    assert celula.style == 'ret_numero' and celula.number_format == '#,##0.00'
+    assert wb['Dados Completos']['A1'].style == 'ret_cabecalho'
+
+    por_tipo = _linhas(wb['Resumo por Tipo'])
+    assert por_tipo[1:] == [['EAT', 140.0, 20.0, 2, 280.0], ['TOP', 0.0, 10.0, 1, 0.0]]
+    assert [linha[0] for linha in _linhas(wb['Resumo por Mês'])[1:]] == ['2024-03', '2024-04']
+
+    geral = _valores_gerais(wb['Resumo Geral'])
+    assert geral['Total de PDFs Processados'] == 3
+    assert geral['Notas de Débito (R$)'] == 200.0
+    assert geral['Notas de Crédito (R$)'] == 80.0
+    assert geral['Saldo Débito - Crédito (R$)'] == 120.0
+
+
+def test_escrita_em_lotes_igual_a_de_uma_vez(tmp_path):
+    inteiro = str(tmp_path / 'inteiro.xlsx')
+    em_lotes = str(tmp_path / 'lotes.xlsx')
+    modelo = ModeloResultados.de_registros(REGISTROS, 2.0)
+    exportar_excel(modelo, inteiro)
+
+    escritor = EscritorExcel(em_lotes)
+    for registro in REGISTROS:
+        escritor.escrever(ModeloResultados.de_registros([registro], 2.0))
+    escritor.finalizar(modelo)
+
+    a, b = load_workbook(inteiro), load_workbook(em_lotes)
+    for aba in ABAS[:-1]:
+        assert _linhas(a[aba]) == _linhas(b[aba])
+    geral_a, geral_b = _valores_gerais(a['Resumo Geral']), _valores_gerais(b['Resumo Geral'])
+    geral_a.pop('Data do Processamento')
+    geral_b.pop('Data do Processamento')
+    assert geral_a == geral_b
+
+
+def test_relatorio_vazio(tmp_path):
+    caminho = str(tmp_path / 'vazio.xlsx')
+    exportar_excel([], caminho, taxa=2.0)
+    wb = load_workbook(caminho)
+    assert _linhas(wb['Dados Completos'])[1:] == []
+    assert _valores_gerais(wb['Resumo Geral'])['Total de PDFs Processados'] == 0
@@ -0,0 +1,87 @@
+"""Leitura dos PDFs (ret/leitura.py)"""
+import faulthandler
+import io
+import mmap
+import os
+
+import pytest
+
+from ret import leitura
+from ret.extracao import extrair_dados_pdf
+from ret.leitura import (
+    LIMITE_BUFFER_THREAD, LIMITE_MMAP, MODO_AUTO, MODO_BUFFER, MODO_MMAP, FluxoMemoria,
+    abrir_pdf, escolher_modo,
+)
+from ret.supervisao import FALHA_CORROMPIDO, LIMITES_PADRAO, ExecutorSupervisionado, FalhaExtracao
+from tests.conftest import listar_pdfs
+
+
+def test_fluxo_memoria_como_um_arquivo():
+    conteudo = bytes(range(256)) * 4
+    fluxo = FluxoMemoria(bytearray(conteudo) + b'lixo', len(conteudo))
+    assert fluxo.read(10) == conteudo[:10]
+    assert fluxo.seek(-6, io.SEEK_END) == len(conteudo) - 6
+    destino = bytearray(10)
+    assert fluxo.readinto(destino) == 6
+    assert bytes(destino[:6]) == conteudo[-6:]
+    assert fluxo.read() == b''
+    fluxo.seek(100)
+    assert io.BufferedReader(fluxo).read() == conteudo[100:]
+    with pytest.raises(ValueError):
+        fluxo.seek(-1)
+
+
+def test_auto_usa_buffer_fora_da_supervisao(tmp_path):
+    grande = tmp_path / 'grande.pdf'
+    grande.write_bytes(b'0' * LIMITE_MMAP)
+    assert escolher_modo(str(grande), LIMITE_MMAP) == MODO_BUFFER
+    metricas = {}
+    with abrir_pdf(str(grande), MODO_AUTO, metricas) as fluxo:
+        assert fluxo.read(4) == b'0000'
+    assert metricas['leitura'] == MODO_BUFFER
+    # Pedido explícito continua mapeando
+    assert escolher_modo(str(grande), LIMITE_MMAP, MODO_MMAP) == MODO_MMAP
+
+
+def test_auto_mapeia_arquivos_grandes_depois_de_permitir(monkeypatch, tmp_path):
+    monkeypatch.setattr(leitura, '_MMAP_AUTOMATICO', False)
+    leitura.permitir_mmap()
+    assert escolher_modo(str(tmp_path / 'a.pdf'), LIMITE_MMAP) == MODO_MMAP
+    assert escolher_modo(str(tmp_path / 'a.pdf'), LIMITE_MMAP - 1) == MODO_BUFFER
+
+
+def test_extracao_no_processo_nao_mapeia(acervo):
+    dados = extrair_dados_pdf(listar_pdfs(acervo)[0])
+    assert dados['metricas']['leitura'] == MODO_BUFFER
+
+
+def test_buffer_da_thread_limitado(tmp_path):
+    grande = tmp_path / 'grande.pdf'
+    grande.write_bytes(os.urandom(LIMITE_BUFFER_THREAD + 1))
+    with abrir_pdf(str(grande), MODO_BUFFER) as fluxo:
+        assert fluxo.read() == grande.read_bytes()
+    assert len(getattr(leitura._LOCAL, 'buffer', b'')) <= LIMITE_BUFFER_THREAD
+
+
+def _ler_mapeado_truncado(caminho):
+    """Mapeia o arquivo, trunca-o e lê a parte que sumiu (SIGBUS)"""
+    faulthandler.disable()  # o pytest o ativa; aqui a morte é esperada
+    with open(caminho, 'r+b') as f:
+        mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        f.truncate(0)
+        return mapa[len(mapa) - 1]
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="SIGBUS só existe nos sistemas POSIX")
+def test_sigbus_no_worker_supervisionado_vira_falha(tmp_path):
+    arquivo = tmp_path / 'mudou.pdf'
+    arquivo.write_bytes(b'x' * mmap.PAGESIZE * 4)
+    executor = ExecutorSupervisionado(1, LIMITES_PADRAO)
+    try:
+        with pytest.raises(FalhaExtracao) as falha:
+            executor.submit(_ler_mapeado_truncado, str(arquivo)).result()
+        assert falha.value.motivo == FALHA_CORROMPIDO
+        # A vaga recebe um worker novo
+        assert executor.submit(len, 'abc').result() == 3
+    finally:
+        executor.shutdown()
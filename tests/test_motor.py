@@ -0,0 +1,45 @@
+"""Motor de extração paralela (ret/motor.py)"""
+import pytest
+
+from ret.extracao import EstrategiaPaginas, extrair_dados_pdf
+from ret.leitura import MODO_ARQUIVO, MODO_BUFFER, MODO_MMAP
+from ret.motor import extrair_arquivos, processar_pasta
+from ret.supervisao import LIMITES_PADRAO, SEM_LIMITES
+from tests.conftest import OPCOES_EXTRACAO, listar_pdfs
+
+CAMPOS = ('caminho', 'empresa', 'nota_tipo', 'numero_nd', 'data_vencimento', 'valor_total', 'quantidade')
+
+
+def _campos(registros):
+    return [tuple(dados[campo] for campo in CAMPOS) for dados in registros]
+
+
+@pytest.fixture
+def sequencial(acervo):
+    return _campos(extrair_dados_pdf(caminho) for caminho in listar_pdfs(acervo))
+
+
+@pytest.mark.parametrize('limites', [SEM_LIMITES, LIMITES_PADRAO], ids=['pool', 'supervisionado'])
+def test_paralelo_igual_ao_sequencial_e_na_ordem(acervo, sequencial, limites):
+    registros = list(extrair_arquivos(listar_pdfs(acervo), workers=2, limites=limites))
+    assert _campos(registros) == sequencial
+    assert all(not dados['erro'] for dados in registros)
+
+
+@pytest.mark.parametrize('leitura', [MODO_MMAP, MODO_BUFFER, MODO_ARQUIVO])
+def test_modos_de_leitura_dao_o_mesmo_resultado(acervo, sequencial, leitura):
+    estrategia = EstrategiaPaginas(leitura=leitura)
+    registros = extrair_arquivos(listar_pdfs(acervo), workers=1, limites=SEM_LIMITES, estrategia=estrategia)
+    assert _campos(registros) == sequencial
+
+
+def test_pdf_corrompido_nao_interrompe_o_lote(acervo, sequencial, tmp_path):
+    ruim = tmp_path / 'ruim.pdf'
+    ruim.write_bytes(b'%PDF-1.4 nada aqui')
+    registros = list(extrair_arquivos([str(ruim)] + listar_pdfs(acervo), workers=2, limites=SEM_LIMITES))
+    assert registros[0]['erro']
+    assert _campos(registros[1:]) == sequencial
+
+
+def test_processar_pasta(acervo, sequencial):
+    assert _campos(processar_pasta(acervo, **OPCOES_EXTRACAO)) == sequencial
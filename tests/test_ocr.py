@@ -0,0 +1,83 @@
+"""OCR das páginas sem texto (ret/ocr.py) no pool supervisionado"""
+import os
+import stat
+
+import pytest
+
+from benchmarks.corpus import escrever_pdf
+from ret import ocr
+from ret.extracao import EstrategiaPaginas
+from ret.motor import extrair_arquivos
+from ret.ocr import ConfigOCR, pagina_sem_texto, reconhecer_paginas
+from ret.supervisao import FALHA_CORROMPIDO, FALHA_TIMEOUT, LimitesExtracao, SEM_LIMITES
+
+pytestmark = pytest.mark.skipif(os.name == 'nt', reason="o Tesseract falso é um script sh")
+
+NOTA = "NOTA DE DEBITO\nND: 4321\nVencimento 05/03/2024\nQT: 10\nValor unitario R$ 2,00\nTotal € 20,00\n"
+
+
+def _tesseract(tmp_path, corpo):
+    """Executável no lugar do Tesseract: lê o PNG da entrada e roda 'corpo'"""
+    script = tmp_path / 'tesseract'
+    script.write_text(f"#!/bin/sh\ncat > /dev/null\n{corpo}\n")
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(script)
+
+
+def _escaneados(tmp_path, quantidade=1):
+    """PDFs de uma página sem camada de texto"""
+    pasta = tmp_path / 'RET' / 'EAT'
+    pasta.mkdir(parents=True)
+    caminhos = []
+    for i in range(quantidade):
+        caminho = str(pasta / f'ND {i} AMBEV.pdf')
+        escrever_pdf(caminho, [[]])
+        caminhos.append(caminho)
+    return caminhos
+
+
+def _extrair(caminhos, config):
+    estrategia = EstrategiaPaginas(ocr=config)
+    return list(extrair_arquivos(caminhos, workers=1, limites=SEM_LIMITES, estrategia=estrategia))
+
+
+def test_pagina_sem_texto():
+    assert pagina_sem_texto(' \n\t')
+    assert not pagina_sem_texto('ND: 1')
+
+
+def test_ocr_completa_o_registro(tmp_path):
+    config = ConfigOCR(cache=None, comando=_tesseract(tmp_path, f"printf '{NOTA}'"))
+    dados, = _extrair(_escaneados(tmp_path), config)
+    assert dados['erro'] == ''
+    assert dados['valor_total'] == 20.0 and dados['numero_nd'] == '4321'
+    assert dados['metricas']['paginas_ocr'] == 1
+
+
+def test_cache_de_ocr_evita_o_tesseract(tmp_path):
+    caminho, = _escaneados(tmp_path)
+    cache = str(tmp_path / 'ocr.db')
+    config = ConfigOCR(cache=cache, comando=_tesseract(tmp_path, f"printf '{NOTA}'"))
+    textos, _ = reconhecer_paginas(caminho, [0], config)
+    # Tesseract quebrado: a segunda leitura só funciona pelo cache
+    config = config._replace(comando=_tesseract(tmp_path, 'exit 1'))
+    textos_cache, metricas = reconhecer_paginas(caminho, [0], config)
+    assert textos_cache == textos and metricas[0]['cache']
+
+
+def test_pagina_travada_vira_timeout(tmp_path, monkeypatch):
+    monkeypatch.setattr(ocr, 'limites_ocr', lambda config: LimitesExtracao(1, None))
+    config = ConfigOCR(cache=None, comando=_tesseract(tmp_path, 'sleep 5'))
+    dados, = _extrair(_escaneados(tmp_path), config)
+    assert dados['falha'] == FALHA_TIMEOUT
+    assert dados['metricas']['ocr'][0]['falha'] == FALHA_TIMEOUT
+
+
+def test_worker_que_morre_nao_quebra_o_pool(tmp_path):
+    marca = tmp_path / 'morreu'
+    # A primeira página derruba o worker do OCR; a seguinte vai para um worker novo
+    corpo = f"if [ ! -e {marca} ]; then touch {marca}; kill -TERM $PPID; sleep 5; fi\nprintf '{NOTA}'"
+    config = ConfigOCR(cache=None, comando=_tesseract(tmp_path, corpo))
+    primeiro, segundo = _extrair(_escaneados(tmp_path, 2), config)
+    assert primeiro['falha'] == FALHA_CORROMPIDO
+    assert segundo['erro'] == '' and segundo['valor_total'] == 20.0
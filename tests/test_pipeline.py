@@ -0,0 +1,107 @@
+"""Pipeline em lotes e resumos incrementais (ret/pipeline.py, ret/agregacao.py)"""
+import os
+
+import pandas as pd
+import pytest
+
+from ret.agregacao import ModeloResultados, ResumoIncremental
+from ret.cambio import TabelaCambio
+from ret.pipeline import DestinoExcel, DestinoModelo, DestinoSemValores, em_lotes, executar_pipeline
+from tests.conftest import ARQUIVOS_ACERVO, OPCOES_EXTRACAO
+
+CAMBIO = TabelaCambio(['2024-03-01', '2025-01-10'], [5.5, 6.1], 6.3)
+
+
+def _registro(tipo, empresa, nota, data, valor_total):
+    return {
+        'tipo_encargo': tipo, 'empresa': empresa, 'nota_tipo': nota, 'numero_nd': '1',
+        'data_vencimento': data, 'valor_total': valor_total, 'quantidade': 2.0,
+        'valor_unitario': valor_total / 2, 'arquivo': 'a.pdf', 'caminho': '/r/a.pdf', 'erro': '', 'falha': '',
+    }
+
+
+REGISTROS = [
+    _registro('EAT', 'GALP', 'Débito', '05/03/2024', 100.0),
+    _registro('TOP', 'CBA', 'Crédito', '20/01/2025', 40.0),
+    _registro('EAT', 'CBA', 'Débito', '', 0.0),
+    _registro('Penalidades', 'GALP', 'Débito', '02/02/2024', 10.0),
+]
+
+
+def _mesmos_resumos(obtido, esperado):
+    assert obtido.totais() == pytest.approx(esperado.totais())
+    assert obtido.debito_credito() == pytest.approx(esperado.debito_credito())
+    for nome in ('por_tipo', 'por_empresa', 'por_mes'):
+        a, b = getattr(obtido, nome)(), getattr(esperado, nome)()
+        pd.testing.assert_frame_equal(a, b[a.columns], check_dtype=False, check_names=False,
+                                      check_index_type=False, check_categorical=False)
+
+
+def test_em_lotes():
+    assert [len(lote) for lote in em_lotes(REGISTROS, 3)] == [3, 1]
+    assert list(em_lotes([], 3)) == []
+
+
+def test_modelo_converte_pela_data_de_cada_registro():
+    modelo = ModeloResultados.de_registros(REGISTROS, CAMBIO)
+    # Antes da primeira cotação e sem data: taxa padrão
+    assert modelo.df['taxa'].tolist() == [5.5, 6.1, 6.3, 6.3]
+    assert modelo.totais()['total_geral_brl'] == pytest.approx(100 * 5.5 + 40 * 6.1 + 10 * 6.3)
+    assert modelo.debito_credito()['saldo'] == pytest.approx(100 * 5.5 + 10 * 6.3 - 40 * 6.1)
+    assert modelo.totais()['com_valores'] == 3
+    assert modelo.datas_iso().tolist() == ['2024-03-05', '2025-01-20', '', '2024-02-02']
+    # O mês sem data fica de fora
+    assert modelo.por_mes()['arquivos'].sum() == 3
+
+
+def test_resumo_incremental_igual_ao_do_modelo():
+    resumo = ResumoIncremental()
+    # Lotes com categorias diferentes: os grupos se juntam pelo nome
+    for registros in (REGISTROS[:1], REGISTROS[1:3], REGISTROS[3:]):
+        resumo.receber(ModeloResultados.de_registros(registros, CAMBIO))
+    _mesmos_resumos(resumo, ModeloResultados.de_registros(REGISTROS, CAMBIO))
+
+
+def test_resumo_incremental_sem_lotes():
+    resumo = ResumoIncremental()
+    assert resumo.totais()['total_arquivos'] == 0
+    assert resumo.por_tipo().empty and resumo.debito_credito()['saldo'] == 0
+
+
+class _DestinoQuebrado:
+    nome = 'quebrado'
+
+    def __init__(self):
+        self.recebidos = 0
+        self.erro = None
+
+    def receber(self, modelo):
+        self.recebidos += 1
+        raise RuntimeError('disco cheio')
+
+    def fechar(self):
+        raise AssertionError('destino desligado não é fechado')
+
+
+def test_pipeline_entrega_os_lotes_a_todos_os_destinos(acervo, tmp_path):
+    resumo = ResumoIncremental()
+    modelo = DestinoModelo(CAMBIO)
+    sem_valores = DestinoSemValores()
+    excel = DestinoExcel(str(tmp_path / 'relatorio.xlsx'), resumo)
+    quebrado = _DestinoQuebrado()
+    mensagens = []
+
+    opcoes = dict(OPCOES_EXTRACAO, log=mensagens.append)
+    processados = executar_pipeline(
+        acervo, [resumo, quebrado, modelo, sem_valores, excel], taxa=CAMBIO, tamanho_lote=5, **opcoes
+    )
+
+    assert processados == ARQUIVOS_ACERVO
+    # O destino com erro é desligado no primeiro lote; os demais seguem
+    assert quebrado.recebidos == 1 and isinstance(quebrado.erro, RuntimeError)
+    assert any('disco cheio' in mensagem for mensagem in mensagens)
+    resultados = modelo.resultados()
+    assert len(resultados) == ARQUIVOS_ACERVO
+    _mesmos_resumos(resumo, resultados)
+    assert sem_valores.registros == []
+    assert excel.erro is None and os.path.isfile(excel.excel_path)
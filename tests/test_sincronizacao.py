@@ -0,0 +1,113 @@
+"""Sincronização incremental (ret/sincronizacao.py)"""
+import os
+import shutil
+import sqlite3
+
+from ret import descoberta
+from ret.banco import carregar_dados
+from ret.pipeline import DestinoBanco, executar_pipeline
+from ret.sincronizacao import sincronizar_arquivos, sincronizar_pasta
+from tests.conftest import ARQUIVOS_ACERVO, OPCOES_EXTRACAO, listar_pdfs
+
+
+def _manifesto(db_path):
+    conexao = sqlite3.connect(db_path)
+    try:
+        return {caminho for caminho, in conexao.execute('SELECT caminho FROM arquivos_ret')}
+    finally:
+        conexao.close()
+
+
+def _contagens(resultado):
+    return {chave: valor for chave, valor in resultado.items() if chave != 'dados'}
+
+
+def _avancar_mtime(caminho, segundos):
+    st = os.stat(caminho)
+    os.utime(caminho, ns=(st.st_atime_ns, st.st_mtime_ns + segundos * 10**9))
+
+
+def test_novos_alterados_e_removidos(acervo, tmp_path):
+    db_path = str(tmp_path / 'dados.db')
+    caminhos = listar_pdfs(acervo)
+
+    resultado = sincronizar_pasta(acervo, db_path, **OPCOES_EXTRACAO)
+    assert _contagens(resultado) == {'novos': ARQUIVOS_ACERVO, 'alterados': 0, 'removidos': 0, 'inalterados': 0}
+    assert len(resultado['dados']) == ARQUIVOS_ACERVO
+    assert _manifesto(db_path) == set(caminhos)
+
+    # Nada mudou: nada é extraído
+    resultado = sincronizar_pasta(acervo, db_path, **OPCOES_EXTRACAO)
+    assert _contagens(resultado) == {'novos': 0, 'alterados': 0, 'removidos': 0, 'inalterados': ARQUIVOS_ACERVO}
+    assert len(resultado['dados']) == 0
+
+    # Tocado (só o mtime), alterado (outro conteúdo), removido e novo
+    tocado, alterado, removido = caminhos[:3]
+    _avancar_mtime(tocado, 5)
+    valor_antes = {d['caminho']: d['valor_total'] for d in carregar_dados(db_path)}
+    shutil.copyfile(caminhos[3], alterado)
+    _avancar_mtime(alterado, 5)
+    os.remove(removido)
+    novo = os.path.join(os.path.dirname(caminhos[4]), 'GERDAU_ND_999999.pdf')
+    shutil.copyfile(caminhos[4], novo)
+
+    resultado = sincronizar_pasta(acervo, db_path, **OPCOES_EXTRACAO)
+    assert _contagens(resultado) == {
+        'novos': 1, 'alterados': 1, 'removidos': 1, 'inalterados': ARQUIVOS_ACERVO - 2
+    }
+    assert sorted(resultado['dados'].coluna('caminho')) == sorted([alterado, novo])
+
+    gravados = {d['caminho']: d for d in carregar_dados(db_path)}
+    assert removido not in gravados and removido not in _manifesto(db_path)
+    assert gravados[alterado]['valor_total'] == valor_antes[caminhos[3]]
+    assert gravados[novo]['empresa'] == 'GERDAU'
+    assert len(gravados) == ARQUIVOS_ACERVO
+
+
+def test_sincronizar_depois_do_processamento_completo(acervo, tmp_path):
+    db_path = str(tmp_path / 'dados.db')
+    executar_pipeline(acervo, [DestinoBanco(db_path)], **OPCOES_EXTRACAO)
+    assert _manifesto(db_path) == set(listar_pdfs(acervo))
+
+    resultado = sincronizar_pasta(acervo, db_path, **OPCOES_EXTRACAO)
+    assert _contagens(resultado) == {'novos': 0, 'alterados': 0, 'removidos': 0, 'inalterados': ARQUIVOS_ACERVO}
+
+
+def test_sincronizar_arquivos_avisados(acervo, tmp_path):
+    db_path = str(tmp_path / 'dados.db')
+    caminhos = listar_pdfs(acervo)
+    sincronizar_pasta(acervo, db_path, **OPCOES_EXTRACAO)
+
+    os.remove(caminhos[0])
+    shutil.copyfile(caminhos[2], caminhos[1])
+    _avancar_mtime(caminhos[1], 5)
+    resultado = sincronizar_arquivos(caminhos[:3], db_path, **OPCOES_EXTRACAO)
+    assert _contagens(resultado) == {'novos': 0, 'alterados': 1, 'removidos': 1, 'inalterados': 1}
+    assert _manifesto(db_path) == set(caminhos[1:])
+
+
+def test_pasta_ilegivel_nao_conta_como_removida(acervo, tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'dados.db')
+    sincronizar_pasta(acervo, db_path, **OPCOES_EXTRACAO)
+    todos = set(listar_pdfs(acervo))
+    pasta_eat = os.path.join(acervo, 'EAT')
+    sob_eat = [caminho for caminho in todos if caminho.startswith(pasta_eat + os.sep)]
+    assert sob_eat
+
+    scandir = os.scandir
+
+    def scandir_sem_eat(caminho):
+        if caminho == pasta_eat:
+            raise PermissionError(13, 'Permission denied', caminho)
+        return scandir(caminho)
+
+    monkeypatch.setattr(descoberta.os, 'scandir', scandir_sem_eat)
+    mensagens = []
+    opcoes = dict(OPCOES_EXTRACAO, log=mensagens.append)
+    resultado = sincronizar_pasta(acervo, db_path, **opcoes)
+
+    assert _contagens(resultado) == {
+        'novos': 0, 'alterados': 0, 'removidos': 0, 'inalterados': ARQUIVOS_ACERVO - len(sob_eat)
+    }
+    assert _manifesto(db_path) == todos
+    assert any(pasta_eat in mensagem for mensagem in mensagens)
@@ -0,0 +1,115 @@
+"""Extração supervisionada: tempo e memória por tarefa (ret/supervisao.py)"""
+import os
+import time
+from concurrent.futures import CancelledError
+
+import pytest
+
+from ret.extracao import extrair_dados_pdf
+from ret.motor import extrair_arquivos
+from ret.supervisao import (
+    FALHA_CORROMPIDO, FALHA_MEMORIA, FALHA_TIMEOUT, ExecutorSupervisionado, FalhaExtracao,
+    LimitesExtracao, rss_mb,
+)
+from tests.conftest import listar_pdfs
+
+MB = 1024 * 1024
+
+
+def _dormir(segundos):
+    time.sleep(segundos)
+    return segundos
+
+
+def _alocar(mb, segundos):
+    """Ocupa 'mb' MB (páginas tocadas) e espera a supervisão medir"""
+    bloco = bytearray(mb * MB)
+    for i in range(0, len(bloco), 4096):
+        bloco[i] = 1
+    time.sleep(segundos)
+    return len(bloco)
+
+
+def _falhar():
+    raise ValueError('xref quebrada')
+
+
+def _sair():
+    os._exit(3)
+
+
+def _extrair_ou_travar(caminho):
+    if caminho.endswith('travado.pdf'):
+        time.sleep(30)
+    return extrair_dados_pdf(caminho)
+
+
+def _pid():
+    return os.getpid()
+
+
+def _falha(futuro):
+    with pytest.raises(FalhaExtracao) as falha:
+        futuro.result(timeout=30)
+    return falha.value
+
+
+def test_tempo_limite_e_worker_novo():
+    executor = ExecutorSupervisionado(1, LimitesExtracao(timeout_s=0.3, memoria_mb=None))
+    try:
+        antes = executor.submit(_pid).result()
+        falha = _falha(executor.submit(_dormir, 30))
+        assert falha.motivo == FALHA_TIMEOUT
+        # O worker travado foi encerrado: a vaga tem outro processo
+        assert executor.submit(_pid).result() != antes
+        assert executor.submit(_dormir, 0).result() == 0
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.skipif(rss_mb(os.getpid()) is None, reason="sem medição de memória neste sistema")
+def test_limite_de_memoria():
+    executor = ExecutorSupervisionado(1, LimitesExtracao(timeout_s=30, memoria_mb=200))
+    try:
+        assert _falha(executor.submit(_alocar, 400, 5)).motivo == FALHA_MEMORIA
+        assert executor.submit(_alocar, 10, 0).result() == 10 * MB
+    finally:
+        executor.shutdown()
+
+
+def test_erro_e_morte_do_worker_viram_corrupt():
+    executor = ExecutorSupervisionado(2, LimitesExtracao(timeout_s=30, memoria_mb=None))
+    try:
+        erro = _falha(executor.submit(_falhar))
+        assert erro.motivo == FALHA_CORROMPIDO and 'xref quebrada' in str(erro)
+        morte = _falha(executor.submit(_sair))
+        assert morte.motivo == FALHA_CORROMPIDO and 'código 3' in str(morte)
+        # As demais tarefas seguem
+        assert [f.result() for f in [executor.submit(_dormir, 0) for _ in range(4)]] == [0] * 4
+    finally:
+        executor.shutdown()
+
+
+def test_cancelamento_interrompe_as_tarefas():
+    executor = ExecutorSupervisionado(1, LimitesExtracao(timeout_s=None, memoria_mb=None))
+    em_andamento = executor.submit(_dormir, 30)
+    na_fila = executor.submit(_dormir, 30)
+    inicio = time.monotonic()
+    executor.shutdown(wait=True, cancel_futures=True)
+    assert time.monotonic() - inicio < 10
+    assert na_fila.cancelled()
+    with pytest.raises(CancelledError):
+        em_andamento.result()
+
+
+def test_falha_vira_registro_com_motivo(acervo, tmp_path):
+    travado = str(tmp_path / 'travado.pdf')
+    with open(travado, 'wb') as f:
+        f.write(b'%PDF-1.4\n')
+    caminhos = listar_pdfs(acervo)[:2] + [travado]
+
+    limites = LimitesExtracao(timeout_s=1, memoria_mb=None)
+    registros = list(extrair_arquivos(caminhos, workers=2, funcao=_extrair_ou_travar, limites=limites))
+    assert [r['caminho'] for r in registros] == caminhos
+    assert all(r['erro'] == '' and r['valor_total'] > 0 for r in registros[:2])
+    assert registros[2]['falha'] == FALHA_TIMEOUT and registros[2]['valor_total'] == 0
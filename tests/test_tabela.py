@@ -0,0 +1,129 @@
+"""Modelos da tabela de Dados Detalhados (ret/tabela.py)"""
+import pytest
+
+from ret.cambio import TabelaCambio
+from ret.consulta import FiltroConsulta, consultar
+from ret.pipeline import DestinoBanco, executar_pipeline
+from ret.tabela import COLUNAS_TABELA, ModeloTabela, ModeloTabelaBanco
+from tests.conftest import OPCOES_EXTRACAO
+
+CAMBIO = TabelaCambio(['2024-03-01', '2025-01-10'], [5.5, 6.1], 6.3)
+
+# (texto, coluna): termos que casam em várias colunas, numa coluna só e em nenhuma
+FILTROS_TEXTO = [('a', None), ('12', None), ('débito', 2), ('.5', 5), ('2024', 4), ('zzz', None)]
+
+
+@pytest.fixture
+def banco(acervo, tmp_path):
+    db_path = str(tmp_path / 'RET_dados.db')
+    executar_pipeline(acervo, [DestinoBanco(db_path)], **OPCOES_EXTRACAO)
+    return db_path
+
+
+def _registro(empresa, numero_nd, data, valor_total, nota='Débito'):
+    return {
+        'tipo_encargo': 'EAT', 'empresa': empresa, 'nota_tipo': nota, 'numero_nd': numero_nd,
+        'data_vencimento': data, 'valor_total': valor_total, 'quantidade': 1.0, 'valor_unitario': valor_total,
+    }
+
+
+REGISTROS = [
+    _registro('galp', '3', '05/03/2024', 10.0),
+    _registro('AMBEV', '1', '', None),
+    _registro('Cba', '2', '31/12/2023', 2.5, nota='Crédito'),
+]
+
+
+def _coluna(modelo, campo):
+    indice = [c.campo for c in COLUNAS_TABELA].index(campo)
+    return [linha[indice] for linha in modelo.linhas(0, len(modelo))]
+
+
+def test_ordenacao_por_tipo_de_coluna():
+    modelo = ModeloTabela(REGISTROS, taxa=2.0)
+    assert _coluna(modelo, 'empresa') == ['galp', 'AMBEV', 'Cba']
+
+    modelo.ordenar(1)  # texto, sem diferenciar maiúsculas
+    assert _coluna(modelo, 'empresa') == ['AMBEV', 'Cba', 'galp']
+    modelo.ordenar(1)  # o mesmo clique inverte
+    assert modelo.decrescente and _coluna(modelo, 'empresa') == ['galp', 'Cba', 'AMBEV']
+
+    modelo.ordenar(4, decrescente=False)  # data pelo ano; sem data vai para o fim
+    assert _coluna(modelo, 'data_vencimento') == ['31/12/2023', '05/03/2024', '']
+
+    modelo.ordenar(5, decrescente=False)  # número; sem valor vai para o fim
+    assert _coluna(modelo, 'valor_total') == ['5.00', '20.00', '']
+
+
+def test_taxa_por_registro_na_exibicao_e_na_ordem():
+    modelo = ModeloTabela()
+    # Com a taxa de cada registro, 10 EUR * 1 fica abaixo de 2,5 EUR * 6
+    modelo.definir_registros(REGISTROS, taxas=[1.0, 5.0, 6.0])
+    modelo.ordenar(5, decrescente=False)
+    assert _coluna(modelo, 'valor_total') == ['10.00', '15.00', '']
+
+
+def test_filtro_geral_e_por_coluna():
+    modelo = ModeloTabela(REGISTROS, taxa=2.0)
+    modelo.filtrar('  AMB ')
+    assert _coluna(modelo, 'empresa') == ['AMBEV']
+    # O termo não casa atravessando duas colunas ('Cba' + 'Crédito')
+    modelo.filtrar('bacr')
+    assert len(modelo) == 0 and modelo.total == 3
+    modelo.filtrar('crédito', 2)
+    assert _coluna(modelo, 'empresa') == ['Cba']
+    modelo.filtrar('20.0', 5)  # o filtro usa o valor exibido, em R$
+    assert _coluna(modelo, 'empresa') == ['galp']
+    modelo.ordenar(1)
+    modelo.filtrar('')
+    assert _coluna(modelo, 'empresa') == ['AMBEV', 'Cba', 'galp']
+
+
+def test_janelas_e_troca_de_registros():
+    modelo = ModeloTabela(REGISTROS, taxa=2.0)
+    modelo.ordenar(3)
+    modelo.preparar()
+    assert [linha[3] for linha in modelo.linhas(1, 5)] == ['2', '3']
+    assert modelo.linhas(3, 5) == []
+    # A coluna de ordenação continua; o filtro é limpo
+    modelo.filtrar('galp')
+    modelo.definir_registros(REGISTROS[:2])
+    assert modelo.texto_filtro == '' and [linha[3] for linha in modelo.linhas(0, 5)] == ['1', '3']
+
+
+def _iguais(memoria, banco):
+    assert len(banco) == len(memoria)
+    assert banco.linhas(0, len(memoria) + 5) == memoria.linhas(0, len(memoria) + 5)
+    assert banco.linhas(3, 4) == memoria.linhas(3, 4)
+
+
+@pytest.mark.parametrize('taxa', [6.0, CAMBIO])
+@pytest.mark.parametrize('filtro', [FiltroConsulta(), FiltroConsulta(nota_tipo='Débito')])
+def test_tabela_do_banco_igual_a_em_memoria(banco, taxa, filtro):
+    memoria = ModeloTabela()
+    memoria.definir_registros(consultar(banco, filtro, taxa))
+    tabela = ModeloTabelaBanco(banco, filtro, taxa)
+    try:
+        assert tabela.total == memoria.total > 0
+        _iguais(memoria, tabela)
+        for indice in range(len(COLUNAS_TABELA)):
+            for decrescente in (False, True):
+                memoria.ordenar(indice, decrescente)
+                tabela.ordenar(indice, decrescente)
+                _iguais(memoria, tabela)
+        for texto, coluna in FILTROS_TEXTO:
+            memoria.filtrar(texto, coluna)
+            tabela.filtrar(texto, coluna)
+            _iguais(memoria, tabela)
+    finally:
+        tabela.fechar()
+
+
+def test_tabela_do_banco_le_so_a_janela(banco):
+    tabela = ModeloTabelaBanco(banco, taxa=6.0)
+    try:
+        assert len(tabela.linhas(0, 5)) == 5
+        assert len(tabela.linhas(len(tabela) - 2, 5)) == 2
+        assert tabela.linhas(0, 0) == []
+    finally:
+        tabela.fechar()
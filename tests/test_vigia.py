@@ -0,0 +1,103 @@
+"""Modo vigia (ret/vigia.py)"""
+import os
+import threading
+
+from ret import vigia
+from ret.vigia import Estabilizador, pdf_completo
+from tests.conftest import OPCOES_EXTRACAO, listar_pdfs
+
+PDF = b'%PDF-1.4\n1 0 obj\n<<>>\nendobj\n%%EOF\n'
+
+
+def test_pdf_completo(tmp_path):
+    arquivo = tmp_path / 'a.pdf'
+    arquivo.write_bytes(PDF[:-7])
+    assert not pdf_completo(str(arquivo))
+    arquivo.write_bytes(PDF)
+    assert pdf_completo(str(arquivo))
+    assert not pdf_completo(str(tmp_path / 'sumiu.pdf'))
+
+
+def test_estavel_depois_da_espera(tmp_path):
+    arquivo = tmp_path / 'a.pdf'
+    arquivo.write_bytes(PDF)
+    estabilizador = Estabilizador(espera=1.0)
+    estabilizador.marcar(str(arquivo), agora=0.0)
+    assert estabilizador.prontos(agora=0.5) == []
+    assert estabilizador.prontos(agora=1.0) == [str(arquivo)]
+    assert len(estabilizador) == 0
+
+
+def test_arquivo_crescendo_reinicia_a_espera(tmp_path):
+    arquivo = tmp_path / 'a.pdf'
+    arquivo.write_bytes(PDF[:10])
+    estabilizador = Estabilizador(espera=1.0)
+    estabilizador.marcar(str(arquivo), agora=0.0)
+    arquivo.write_bytes(PDF)
+    # Mudou desde o aviso: a espera recomeça a partir de agora
+    assert estabilizador.prontos(agora=1.0) == []
+    assert estabilizador.prontos(agora=1.5) == []
+    assert estabilizador.prontos(agora=2.0) == [str(arquivo)]
+
+
+def test_pdf_incompleto_espera_ate_o_maximo(tmp_path):
+    arquivo = tmp_path / 'a.pdf'
+    arquivo.write_bytes(PDF[:-7])
+    estabilizador = Estabilizador(espera=1.0, espera_maxima=5.0)
+    estabilizador.marcar(str(arquivo), agora=0.0)
+    assert estabilizador.prontos(agora=1.0) == []
+    assert estabilizador.prontos(agora=3.0) == []
+    assert estabilizador.prontos(agora=5.0) == [str(arquivo)]
+
+
+def test_remocao_segue_sem_esperar_o_pdf(tmp_path):
+    caminho = str(tmp_path / 'removido.pdf')
+    estabilizador = Estabilizador(espera=1.0)
+    estabilizador.marcar(caminho, agora=0.0)
+    estabilizador.marcar(caminho, agora=0.5)  # avisos repetidos não reiniciam a espera
+    assert estabilizador.prontos(agora=1.0) == [caminho]
+
+
+def test_vigia_usa_um_pool_para_todos_os_lotes(acervo, tmp_path, monkeypatch):
+    criados, lotes = [], []
+    criar_executor = vigia.criar_executor
+
+    def criar(*args):
+        executor = criar_executor(*args)
+        criados.append(executor)
+        return executor
+
+    def sincronizar(caminhos, db_path, **opcoes):
+        lotes.append(opcoes['executor'])
+        return original(caminhos, db_path, **opcoes)
+
+    original = vigia.sincronizar_arquivos
+    monkeypatch.setattr(vigia, 'criar_executor', criar)
+    monkeypatch.setattr(vigia, 'sincronizar_arquivos', sincronizar)
+
+    db_path = str(tmp_path / 'RET_dados.db')
+    parar = threading.Event()
+    atualizacoes = []
+
+    def ao_atualizar(resultado):
+        atualizacoes.append(resultado)
+        if len(atualizacoes) == 1:
+            # Depois da sincronização inicial, dois lotes de mudanças
+            os.remove(listar_pdfs(acervo)[0])
+        elif len(atualizacoes) == 2:
+            os.remove(listar_pdfs(acervo)[0])
+        else:
+            parar.set()
+
+    limite = threading.Timer(30, parar.set)  # o teste não fica preso se um lote não vier
+    limite.start()
+    try:
+        vigia.vigiar(
+            acervo, db_path, parar=parar, ao_atualizar=ao_atualizar, espera=0.1, intervalo=0.1,
+            varredura=True, **OPCOES_EXTRACAO
+        )
+    finally:
+        limite.cancel()
+    assert len(criados) == 1
+    assert len(lotes) == 2 and all(executor is criados[0] for executor in lotes)
+    assert [r['removidos'] for r in atualizacoes[1:]] == [1, 1]